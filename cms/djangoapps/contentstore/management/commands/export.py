@@ -21,6 +21,10 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('course_id')
         parser.add_argument('output_path')
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Update a previous incremental export in output_path, only writing the blocks and assets which changed'
+        )
 
     def handle(self, *args, **options):
         """
@@ -45,4 +49,6 @@ class Command(BaseCommand):
         root_dir = os.path.dirname(output_path)
         course_dir = os.path.splitext(os.path.basename(output_path))[0]
 
-        export_course_to_xml(modulestore(), contentstore(), course_key, root_dir, course_dir)
+        export_course_to_xml(
+            modulestore(), contentstore(), course_key, root_dir, course_dir, incremental=options['incremental']
+        )
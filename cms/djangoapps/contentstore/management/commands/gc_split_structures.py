@@ -0,0 +1,68 @@
+"""
+Script for removing the split modulestore's unreachable structures and definitions
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.split_mongo.garbage_collector import StructureGarbageCollector
+
+
+# To run from command line: ./manage.py cms gc_split_structures --history-depth 10 --commit
+
+
+class Command(BaseCommand):
+    """Remove the split modulestore's unreachable structures and definitions"""
+    help = '''
+    Removes the structures of the split modulestore which aren't the heads of course or library
+    branches or within --history-depth versions of them, and the definitions which no remaining
+    structure uses. Documents younger than --min-age hours are kept.
+
+    If you do not specify '--commit', the command only prints how many documents would be removed,
+    and an estimate of their size.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--history-depth', type=int, default=10, help="Number of previous versions of each head to keep"
+        )
+        parser.add_argument(
+            '--min-age', type=float, default=24, help="Age in hours of the youngest documents which may be removed"
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help="Number of documents to remove at a time")
+        parser.add_argument('--delay', type=float, default=0.1, help="Seconds to wait between batches")
+        parser.add_argument(
+            '--archive', action='store_true', help="Copy the removed documents to the *_archive collections"
+        )
+        parser.add_argument('--resume', action='store_true', help="Resume an interrupted run from its checkpoints")
+        parser.add_argument(
+            '--compact', action='store_true',
+            help="Compact the collections afterwards. N.B. this blocks the database while it runs."
+        )
+        parser.add_argument('--commit', action='store_true', help="Remove the unreachable documents")
+
+    def handle(self, *args, **options):
+        """Execute the command"""
+        # pylint: disable=protected-access
+        db_connection = modulestore()._get_modulestore_by_type(ModuleStoreEnum.Type.split).db_connection
+        collector = StructureGarbageCollector(
+            db_connection,
+            history_depth=options['history_depth'],
+            min_age=timedelta(hours=options['min_age']),
+            batch_size=options['batch_size'],
+            batch_delay=options['delay'],
+            archive=options['archive'],
+        )
+
+        if not options['commit']:
+            self.stdout.write("Dry run. The following unreachable documents would have been removed:")
+        results = collector.collect(dry_run=not options['commit'], resume=options['resume'])
+        for collection_name in StructureGarbageCollector.COLLECTIONS:
+            self.stdout.write("{}: {} documents, about {} bytes".format(
+                collection_name, results[collection_name]['documents'], results[collection_name]['bytes']
+            ))
+
+        if options['commit'] and options['compact']:
+            collector.compact()
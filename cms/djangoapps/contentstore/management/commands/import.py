@@ -3,6 +3,7 @@ Script for importing courseware from XML format
 """
 from optparse import make_option
 
+from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 
 from django_comment_common.utils import are_permissions_roles_seeded, seed_permissions_roles
@@ -46,6 +47,7 @@ class Command(BaseCommand):
             static_content_store=contentstore(), verbose=True,
             do_import_static=do_import_static,
             create_if_not_present=True,
+            static_content_threads=settings.COURSE_IMPORT_STATIC_CONTENT_THREADS,
         )
 
         for course in course_items:
@@ -0,0 +1,109 @@
+"""
+Script for ranking the courses in the split modulestore by the cost of their structures
+"""
+from time import time
+
+from bson import BSON
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+from opaque_keys.edx.locator import CourseLocator
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.django import modulestore
+
+
+# To run from command line: ./manage.py cms rank_course_structures --sort decode_time --limit 20
+
+COLUMNS = ('size', 'blocks', 'depth', 'decode_time')
+
+
+class Command(BaseCommand):
+    """Rank the split courses by the cost of their structures"""
+    help = '''
+    Ranks the courses in the split modulestore by the size of their structure in bytes, its
+    number of blocks, its depth, or the time in seconds to decode it, and prints the top ones.
+    Reads every course of the split modulestore unless course ids are given.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_ids', nargs='*', help="IDs of the courses to rank; all split courses if none")
+        parser.add_argument('--sort', choices=COLUMNS, default='decode_time', help="The measure to rank by")
+        parser.add_argument('--limit', type=int, default=20, help="The number of courses to print")
+        parser.add_argument(
+            '--branch', default=ModuleStoreEnum.BranchName.published, help="The branch of the structures to measure"
+        )
+
+    def handle(self, *args, **options):
+        """Execute the command"""
+        # pylint: disable=protected-access
+        db_connection = modulestore()._get_modulestore_by_type(ModuleStoreEnum.Type.split).db_connection
+
+        if options['course_ids']:
+            try:
+                course_keys = [CourseKey.from_string(course_id) for course_id in options['course_ids']]
+            except InvalidKeyError:
+                raise CommandError("Invalid course key.")
+            course_indexes = [db_connection.get_course_index(course_key) for course_key in course_keys]
+        else:
+            course_indexes = db_connection.find_matching_course_indexes(branch=options['branch'])
+
+        rows = []
+        for course_index in course_indexes:
+            if course_index is None or options['branch'] not in course_index['versions']:
+                continue
+            course_key = CourseLocator(course_index['org'], course_index['course'], course_index['run'])
+            measures = measure_structure(db_connection, course_index['versions'][options['branch']], course_key)
+            if measures is not None:
+                rows.append((course_key, measures))
+
+        rows.sort(key=lambda row: row[1][options['sort']], reverse=True)
+        self.stdout.write(u'{:<60} {:>12} {:>8} {:>6} {:>12}'.format(u'course', *COLUMNS))
+        for course_key, measures in rows[:options['limit']]:
+            self.stdout.write(u'{:<60} {size:>12} {blocks:>8} {depth:>6} {decode_time:>12.6f}'.format(
+                unicode(course_key), **measures
+            ))
+
+
+def measure_structure(db_connection, version_guid, course_key):
+    """
+    Returns a dict of the size in bytes, number of blocks, depth and decoding time in seconds
+    of the structure with the given version, read from the db, or None if it doesn't exist.
+    """
+    document = db_connection.structures.find_one({'_id': version_guid})
+    if document is None:
+        return None
+
+    size = len(BSON.encode(document))
+    start = time()
+    structure = db_connection.decode_structure(document, course_key)
+    decode_time = time() - start
+    return {
+        'size': size,
+        'blocks': len(structure['blocks']),
+        'depth': structure_depth(structure),
+        'decode_time': decode_time,
+    }
+
+
+def structure_depth(structure):
+    """
+    Returns the number of levels of blocks below the root of the given decoded structure.
+    """
+    blocks = structure['blocks']
+    if structure['root'] not in blocks:
+        return 0
+    visited = {structure['root']}
+    level = [structure['root']]
+    depth = 0
+    while True:
+        next_level = []
+        for block_key in level:
+            for child in blocks[block_key].fields.get('children', []):
+                if child in blocks and child not in visited:
+                    visited.add(child)
+                    next_level.append(child)
+        if not next_level:
+            return depth
+        depth += 1
+        level = next_level
@@ -1,16 +1,21 @@
 """
 Tests for exporting courseware to the desired path
 """
+import os
 import unittest
 import shutil
 import ddt
 from django.core.management import CommandError, call_command
+from mock import patch
 from tempfile import mkdtemp
 
-from xmodule.modulestore.tests.factories import CourseFactory
+from xmodule.contentstore.content import StaticContent
+from xmodule.contentstore.django import contentstore
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.xml_exporter import EXPORT_MANIFEST_SUFFIX
 
 
 class TestArgParsingCourseExport(unittest.TestCase):
@@ -69,3 +74,97 @@ class TestCourseExport(ModuleStoreTestCase):
         errstring = "Course with x/y/z key not found."
         with self.assertRaisesRegexp(CommandError, errstring):
             call_command('export', "x/y/z", self.temp_dir_1)
+
+    def test_incremental_export(self):
+        """
+        Test that an incremental export only writes the assets which changed, and removes the files
+        of the previous export which it doesn't write
+        """
+        course = CourseFactory.create(default_store=ModuleStoreEnum.Type.split)
+        kept_key = course.id.make_asset_key('asset', 'kept.txt')
+        removed_key = course.id.make_asset_key('asset', 'removed.txt')
+        for asset_key in (kept_key, removed_key):
+            contentstore().save(StaticContent(asset_key, asset_key.name, 'text/plain', 'content'))
+
+        call_command('export', unicode(course.id), self.temp_dir_1, '--incremental')
+        self.addCleanup(os.remove, self.temp_dir_1 + EXPORT_MANIFEST_SUFFIX)
+        static_dir = os.path.join(self.temp_dir_1, 'static')
+        self.assertItemsEqual(os.listdir(static_dir), ['kept.txt', 'removed.txt'])
+
+        contentstore().delete(removed_key)
+        self._date_back_files(self.temp_dir_1)
+        with patch.object(contentstore(), 'export', wraps=contentstore().export) as mock_export:
+            call_command('export', unicode(course.id), self.temp_dir_1, '--incremental')
+            self.assertFalse(mock_export.called)
+        self.assertEqual(os.listdir(static_dir), ['kept.txt'])
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir_1, 'course.xml')))
+
+    def test_incremental_export_of_blocks(self):
+        """
+        Test that an incremental export only serializes the blocks whose subtrees were edited, and
+        matches a full export
+        """
+        course = CourseFactory.create(default_store=ModuleStoreEnum.Type.split)
+        chapter = ItemFactory.create(parent=course, category='chapter')
+        sequential = ItemFactory.create(parent=chapter, category='sequential')
+        vertical = ItemFactory.create(parent=sequential, category='vertical')
+        edited, unedited = [ItemFactory.create(parent=vertical, category='problem') for __ in range(2)]
+
+        call_command('export', unicode(course.id), self.temp_dir_1, '--incremental')
+        self.addCleanup(os.remove, self.temp_dir_1 + EXPORT_MANIFEST_SUFFIX)
+        self._date_back_files(self.temp_dir_1)
+
+        edited.data = '<problem><p>Edited</p></problem>'
+        self.store.update_item(edited, self.user.id)
+        self.store.publish(edited.location, self.user.id)
+        call_command('export', unicode(course.id), self.temp_dir_1, '--incremental')
+
+        self.assertNotEqual(self._modified_time('problem', edited.location.block_id), 0)
+        self.assertEqual(self._modified_time('problem', unedited.location.block_id), 0)
+        call_command('export', unicode(course.id), self.temp_dir_2)
+        self.assertEqual(self._read_files(self.temp_dir_1), self._read_files(self.temp_dir_2))
+
+    def test_failed_incremental_export(self):
+        """
+        Test that the files written by a failed incremental export are removed by the next export
+        if it doesn't write them
+        """
+        course = CourseFactory.create(default_store=ModuleStoreEnum.Type.split)
+        chapter = ItemFactory.create(parent=course, category='chapter')
+
+        with patch.object(contentstore(), 'export_all_for_course', side_effect=IOError):
+            with self.assertRaises(IOError):
+                call_command('export', unicode(course.id), self.temp_dir_1, '--incremental')
+        self.addCleanup(os.remove, self.temp_dir_1 + EXPORT_MANIFEST_SUFFIX)
+        chapter_file = os.path.join(self.temp_dir_1, 'chapter', chapter.location.block_id + '.xml')
+        self.assertTrue(os.path.exists(chapter_file))
+
+        self.store.delete_item(chapter.location, self.user.id)
+        call_command('export', unicode(course.id), self.temp_dir_1, '--incremental')
+        self.assertFalse(os.path.exists(chapter_file))
+
+    def _date_back_files(self, directory):
+        """
+        Dates the files in the directory back, as exports are told apart by modification time
+        """
+        for dirpath, __, filenames in os.walk(directory):
+            for filename in filenames:
+                os.utime(os.path.join(dirpath, filename), (0, 0))
+
+    def _modified_time(self, category, block_id):
+        """
+        Returns the modification time of the exported file of the block in temp_dir_1
+        """
+        return os.path.getmtime(os.path.join(self.temp_dir_1, category, block_id + '.xml'))
+
+    def _read_files(self, directory):
+        """
+        Returns the contents of the files in the directory, by their paths relative to it
+        """
+        files = {}
+        for dirpath, __, filenames in os.walk(directory):
+            for filename in filenames:
+                file_path = os.path.join(dirpath, filename)
+                with open(file_path) as exported_file:
+                    files[os.path.relpath(file_path, directory)] = exported_file.read()
+        return files
@@ -0,0 +1,98 @@
+"""
+Tests for the gc_split_structures management command
+"""
+from StringIO import StringIO
+
+import mock
+from django.core.management import call_command
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+
+class TestGcSplitStructures(ModuleStoreTestCase):
+    """
+    Tests for the gc_split_structures management command
+    """
+    def setUp(self):
+        super(TestGcSplitStructures, self).setUp()
+        self.course = CourseFactory.create(default_store=ModuleStoreEnum.Type.split)
+        chapter = ItemFactory.create(parent=self.course, category='chapter')
+        ItemFactory.create(parent=chapter, category='sequential')
+        # pylint: disable=protected-access
+        self.db_connection = modulestore()._get_modulestore_by_type(ModuleStoreEnum.Type.split).db_connection
+        self.heads = {
+            version
+            for course_index in self.db_connection.course_index.find()
+            for version in course_index['versions'].itervalues()
+        }
+        self.structure_ids = self.find_ids(self.db_connection.structures)
+
+    def find_ids(self, collection):
+        """
+        Returns the set of the ids of the documents of the given collection.
+        """
+        return {document['_id'] for document in collection.find({}, {'_id': 1})}
+
+    def collect(self, **options):
+        """
+        Runs the command with the given options, allowing it to remove documents of any age, and
+        returns its output.
+        """
+        output = StringIO()
+        call_command('gc_split_structures', stdout=output, min_age=-1, **options)
+        return output.getvalue()
+
+    def assert_course_intact(self):
+        """
+        Asserts that the structures of the course's heads, and the definitions they use, remain.
+        """
+        self.assertTrue(self.heads.issubset(self.find_ids(self.db_connection.structures)))
+        definition_ids = self.find_ids(self.db_connection.definitions)
+        for structure in self.db_connection.structures.find({'_id': {'$in': list(self.heads)}}):
+            for block in structure['blocks']:
+                self.assertIn(block['definition'], definition_ids)
+        course = modulestore().get_course(self.course.id, depth=None)
+        self.assertEqual(len(course.get_children()), 1)
+        self.assertEqual(len(course.get_children()[0].get_children()), 1)
+
+    def test_dry_run(self):
+        output = self.collect(history_depth=0)
+        self.assertIn("Dry run.", output)
+        self.assertIn("structures: {} documents".format(len(self.structure_ids - self.heads)), output)
+        self.assertEqual(self.find_ids(self.db_connection.structures), self.structure_ids)
+
+    def test_commit(self):
+        self.assertGreater(len(self.structure_ids - self.heads), 0)
+        self.collect(history_depth=0, commit=True)
+        self.assertEqual(self.find_ids(self.db_connection.structures), self.heads)
+        self.assert_course_intact()
+
+    def test_history_depth(self):
+        previous_versions = {
+            structure['previous_version']
+            for structure in self.db_connection.structures.find({'_id': {'$in': list(self.heads)}})
+        } - {None}
+        self.collect(history_depth=1, commit=True)
+        self.assertEqual(self.find_ids(self.db_connection.structures), self.heads | previous_versions)
+        self.assert_course_intact()
+
+    def test_archive(self):
+        self.collect(history_depth=0, archive=True, commit=True)
+        archive = self.db_connection.database[self.db_connection.structures.name + '_archive']
+        self.assertEqual(self.find_ids(archive), self.structure_ids - self.heads)
+
+    def test_resume(self):
+        # interrupt the run after its first batch
+        with mock.patch(
+            'xmodule.modulestore.split_mongo.garbage_collector.time.sleep', side_effect=KeyboardInterrupt
+        ):
+            with self.assertRaises(KeyboardInterrupt):
+                self.collect(history_depth=0, batch_size=1, commit=True)
+        self.assertEqual(len(self.structure_ids - self.find_ids(self.db_connection.structures)), 1)
+
+        self.collect(history_depth=0, batch_size=1, delay=0, resume=True, commit=True)
+        self.assertEqual(self.find_ids(self.db_connection.structures), self.heads)
+        self.assert_course_intact()
@@ -0,0 +1,53 @@
+"""
+Tests for the rank_course_structures management command
+"""
+from StringIO import StringIO
+
+from django.core.management import call_command, CommandError
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+
+class TestRankCourseStructures(SharedModuleStoreTestCase):
+    """
+    Tests for the rank_course_structures management command
+    """
+    @classmethod
+    def setUpClass(cls):
+        super(TestRankCourseStructures, cls).setUpClass()
+        cls.small_course = CourseFactory.create(default_store=ModuleStoreEnum.Type.split)
+        cls.large_course = CourseFactory.create(default_store=ModuleStoreEnum.Type.split)
+        chapter = ItemFactory.create(parent=cls.large_course, category='chapter')
+        for _ in range(3):
+            ItemFactory.create(parent=chapter, category='sequential')
+
+    def rank(self, *args):
+        """
+        Runs the command with the given arguments and returns the printed rows, as lists of
+        the course id, size, blocks and depth, without the header.
+        """
+        output = StringIO()
+        call_command('rank_course_structures', *args, stdout=output)
+        return [line.split()[:4] for line in output.getvalue().splitlines()[1:]]
+
+    def test_rank_by_blocks(self):
+        rows = self.rank('--sort', 'blocks')
+        course_ids = [row[0] for row in rows]
+        large_index = course_ids.index(unicode(self.large_course.id))
+        small_index = course_ids.index(unicode(self.small_course.id))
+        self.assertLess(large_index, small_index)
+        # the large course has a chapter and three sequentials more, two levels below the course
+        self.assertEqual(int(rows[large_index][2]) - int(rows[small_index][2]), 4)
+        self.assertEqual(rows[large_index][3], '2')
+
+    def test_given_courses_and_limit(self):
+        rows = self.rank(
+            unicode(self.small_course.id), unicode(self.large_course.id), '--sort', 'blocks', '--limit', '1'
+        )
+        self.assertEqual([row[0] for row in rows], [unicode(self.large_course.id)])
+
+    def test_invalid_course_key(self):
+        with self.assertRaisesRegexp(CommandError, "Invalid course key."):
+            call_command('rank_course_structures', 'TestX/TS01')
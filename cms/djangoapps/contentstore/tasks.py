@@ -4,6 +4,7 @@ This file contains celery tasks for contentstore views
 from __future__ import absolute_import
 
 import base64
+import fcntl
 import json
 import os
 import shutil
@@ -272,13 +273,24 @@ def create_export_tarball(course_module, course_key, context, status=None):
     """
     name = course_module.url_name
     export_file = NamedTemporaryFile(prefix=name + '.', suffix=".tar.gz")
-    root_dir = path(mkdtemp())
+    incremental = bool(settings.COURSE_EXPORT_CACHE_ROOT)
+    if incremental:
+        # Update the course's previous export, so that its unchanged blocks and assets aren't written again
+        cache_name = base64.urlsafe_b64encode(text_type(course_key).encode('utf-8'))
+        root_dir = path(settings.COURSE_EXPORT_CACHE_ROOT) / cache_name
+        root_dir.makedirs_p()
+        lock_file = open(root_dir / '.lock', 'w')
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+    else:
+        root_dir = path(mkdtemp())
 
     try:
         if isinstance(course_key, LibraryLocator):
-            export_library_to_xml(modulestore(), contentstore(), course_key, root_dir, name)
+            export_library_to_xml(modulestore(), contentstore(), course_key, root_dir, name, incremental=incremental)
         else:
-            export_course_to_xml(modulestore(), contentstore(), course_module.id, root_dir, name)
+            export_course_to_xml(
+                modulestore(), contentstore(), course_module.id, root_dir, name, incremental=incremental
+            )
 
         if status:
             status.set_state(u'Compressing')
@@ -319,7 +331,10 @@ def create_export_tarball(course_module, course_key, context, status=None):
             status.fail(json.dumps({'raw_error_msg': context['raw_err_msg']}))
         raise
     finally:
-        if os.path.exists(root_dir / name):
+        if incremental:
+            # Closing the file releases the lock
+            lock_file.close()
+        elif os.path.exists(root_dir / name):
             shutil.rmtree(root_dir / name)
 
     return export_file
@@ -499,6 +514,19 @@ def import_olx(self, user_id, course_key_string, archive_path, archive_name, lan
         self.status.set_state(u'Updating')
         self.status.increment_completed_steps()
 
+        # Record how long each stage of the import took with the task, as it completes
+        stage_timings = []
+        timings_artifact = UserTaskArtifact(status=self.status, name=u'Import timings')
+
+        def record_import_stage(stage, elapsed):
+            """
+            Log and record the duration in seconds of the given stage of the import.
+            """
+            LOGGER.info(u'Course import %s: %s stage completed in %.3fs', courselike_key, stage, elapsed)
+            stage_timings.append({u'stage': stage, u'seconds': round(elapsed, 3)})
+            timings_artifact.text = json.dumps(stage_timings)
+            timings_artifact.save()
+
         with dog_stats_api.timer(
             u'courselike_import.time',
             tags=[u"courselike:{}".format(courselike_key)]
@@ -508,7 +536,9 @@ def import_olx(self, user_id, course_key_string, archive_path, archive_name, lan
                 settings.GITHUB_REPO_ROOT, [dirpath],
                 load_error_modules=False,
                 static_content_store=contentstore(),
-                target_id=courselike_key
+                target_id=courselike_key,
+                static_content_threads=settings.COURSE_IMPORT_STATIC_CONTENT_THREADS,
+                stage_callback=record_import_stage,
             )
 
         new_location = courselike_items[0].location
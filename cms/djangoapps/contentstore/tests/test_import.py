@@ -157,6 +157,29 @@ class ContentStoreImportTest(SignalDisconnectTestMixin, ModuleStoreTestCase):
         self.assertEqual(len(all_assets), 0)
         self.assertEqual(count, 0)
 
+    def test_asset_import_threads(self):
+        '''
+        This test validates that all assets are imported when they are saved concurrently, and that
+        each stage of the import is reported
+        '''
+        content_store = contentstore()
+        stages = []
+
+        module_store = modulestore()
+        import_course_from_xml(
+            module_store, self.user.id, TEST_DATA_DIR, ['toy'],
+            static_content_store=content_store, static_content_threads=3,
+            create_if_not_present=True, stage_callback=lambda stage, _elapsed: stages.append(stage)
+        )
+
+        course = module_store.get_course(module_store.make_course_key('edX', 'toy', '2012_Fall'))
+
+        static_files = list((TEST_DATA_DIR / 'toy' / 'static').walkfiles())
+        all_assets, count = content_store.get_all_content_for_course(course.id)
+        self.assertEqual(len(all_assets), len(static_files))
+        self.assertEqual(count, len(static_files))
+        self.assertEqual(stages, ['parse', 'static', 'asset_metadata', 'children', 'drafts'])
+
     def test_no_static_link_rewrites_on_import(self):
         module_store = modulestore()
         courses = import_course_from_xml(
@@ -199,6 +199,7 @@ for name, value in ENV_TOKENS.get("CODE_JAIL", {}).items():
         CODE_JAIL[name] = value
 
 COURSES_WITH_UNSAFE_CODE = ENV_TOKENS.get("COURSES_WITH_UNSAFE_CODE", [])
+CAPA_TEMPLATE_CACHE_SIZE = ENV_TOKENS.get('CAPA_TEMPLATE_CACHE_SIZE', CAPA_TEMPLATE_CACHE_SIZE)
 
 ASSET_IGNORE_REGEX = ENV_TOKENS.get('ASSET_IGNORE_REGEX', ASSET_IGNORE_REGEX)
 
@@ -333,6 +334,11 @@ else:
 
 USER_TASKS_ARTIFACT_STORAGE = COURSE_IMPORT_EXPORT_STORAGE
 
+COURSE_IMPORT_STATIC_CONTENT_THREADS = ENV_TOKENS.get(
+    'COURSE_IMPORT_STATIC_CONTENT_THREADS', COURSE_IMPORT_STATIC_CONTENT_THREADS
+)
+COURSE_EXPORT_CACHE_ROOT = ENV_TOKENS.get('COURSE_EXPORT_CACHE_ROOT', COURSE_EXPORT_CACHE_ROOT)
+
 DATABASES = AUTH_TOKENS['DATABASES']
 
 # The normal database user does not have enough permissions to run migrations.
@@ -356,6 +362,13 @@ MODULESTORE_FIELD_OVERRIDE_PROVIDERS = ENV_TOKENS.get(
     MODULESTORE_FIELD_OVERRIDE_PROVIDERS
 )
 
+COURSE_STRUCTURE_PROCESS_CACHE_MAX_BLOCKS = ENV_TOKENS.get(
+    'COURSE_STRUCTURE_PROCESS_CACHE_MAX_BLOCKS',
+    COURSE_STRUCTURE_PROCESS_CACHE_MAX_BLOCKS
+)
+
+MODULESTORE_QUERY_STATS = ENV_TOKENS.get('MODULESTORE_QUERY_STATS', MODULESTORE_QUERY_STATS)
+
 XBLOCK_FIELD_DATA_WRAPPERS = ENV_TOKENS.get(
     'XBLOCK_FIELD_DATA_WRAPPERS',
     XBLOCK_FIELD_DATA_WRAPPERS
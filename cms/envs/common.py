@@ -491,6 +491,7 @@ MODULESTORE = {
                         'default_class': 'xmodule.hidden_module.HiddenDescriptor',
                         'fs_root': DATA_DIR,
                         'render_template': 'edxmako.shortcuts.render_to_string',
+                        'prefetch_definitions': True,
                     }
                 },
                 {
@@ -512,6 +513,15 @@ MODULESTORE = {
 # require student context.
 MODULESTORE_FIELD_OVERRIDE_PROVIDERS = ()
 
+# Upper bound on the total number of blocks of the split modulestore structures which
+# each process keeps decoded in memory, in front of the course_structure_cache. 0 turns
+# off this in-process cache.
+COURSE_STRUCTURE_PROCESS_CACHE_MAX_BLOCKS = 100000
+
+# Whether to count the modulestores' round trips to Mongo, the bytes they read and the
+# time spent decoding them, per request and per course, in the request cache.
+MODULESTORE_QUERY_STATS = False
+
 #################### Python sandbox ############################################
 
 CODE_JAIL = {
@@ -525,8 +535,26 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # Pool of warm sandboxed Python processes, which have imported numpy, scipy and the
+    # other modules assumed by problems, to execute problems' code in.
+    'pool': {
+        # How many processes does each server process keep?  0 starts a new sandboxed
+        # process for each execution.
+        'size': 0,
+        # How many executions does a process run before it is replaced?  Executions in
+        # the same process could affect each other.
+        'max_executions': 1,
+        # How many executions can wait for a process to be free, and for how many seconds?
+        'max_waiting': 16,
+        'wait_timeout': 10,
+    },
 }
 
+# Number of capa problem templates, parsed problem trees and the contexts which their scripts
+# compute for a seed, which each process keeps to build problems from.  0 turns this cache off.
+CAPA_TEMPLATE_CACHE_SIZE = 0
+
 ############################ DJANGO_BUILTINS ################################
 # Change DEBUG in your environment settings files, not here
 DEBUG = False
@@ -598,6 +626,13 @@ MESSAGE_STORAGE = 'django.contrib.messages.storage.session.SessionStorage'
 
 COURSE_IMPORT_EXPORT_STORAGE = 'django.core.files.storage.FileSystemStorage'
 
+# Number of static files which course imports save into the contentstore concurrently
+COURSE_IMPORT_STATIC_CONTENT_THREADS = 4
+
+# Directory in which course exports are kept between export tasks, so that each export only writes
+# the blocks and assets which changed since the previous one. None exports to a new temporary directory.
+COURSE_EXPORT_CACHE_ROOT = None
+
 ##### EMBARGO #####
 EMBARGO_SITE_REDIRECT_URL = None
 
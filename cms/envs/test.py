@@ -186,6 +186,9 @@ CACHES = {
     },
 }
 
+# Don't keep decoded structures between tests, like the dummy course_structure_cache
+COURSE_STRUCTURE_PROCESS_CACHE_MAX_BLOCKS = 0
+
 # hide ratelimit warnings while running tests
 filterwarnings('ignore', message='No request passed to the backend, unable to rate-limit')
 
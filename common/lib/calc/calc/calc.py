@@ -7,6 +7,8 @@ Uses pyparsing to parse. Main function as of now is evaluator().
 import math
 import numbers
 import operator
+import threading
+from collections import OrderedDict
 
 import numpy
 import scipy.constants
@@ -242,34 +244,221 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
     if math_expr.strip() == "":
         return float('nan')
 
-    # Parse the tree.
-    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
-    math_interpreter.parse_algebra()
+    # Parse the tree, or reuse the compiled form of a previous parse.
+    compiled = compile_expression(math_expr, case_sensitive)
 
     # Get our variables together.
     all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
 
     # ...and check them
-    math_interpreter.check_variables(all_variables, all_functions)
+    compiled.check_variables(all_variables, all_functions)
 
-    # Create a recursion to evaluate the tree.
-    if case_sensitive:
-        casify = lambda x: x
-    else:
-        casify = lambda x: x.lower()  # Lowercase for case insens.
-
-    evaluate_actions = {
-        'number': eval_number,
-        'variable': lambda x: all_variables[casify(x[0])],
-        'function': lambda x: all_functions[casify(x[0])](x[1]),
-        'atom': eval_atom,
-        'power': eval_power,
-        'parallel': eval_parallel,
-        'product': eval_product,
-        'sum': eval_sum
-    }
-
-    return math_interpreter.reduce_tree(evaluate_actions)
+    return compiled.evaluate(all_variables, all_functions)
+
+
+def evaluate_samples(variables, functions, math_expr, size, case_sensitive=False):
+    """
+    Evaluate an expression for `size` sets of values of its variables at once.
+
+    -Variables are passed as a dictionary from string to a numpy array of
+     `size` values, or to a python number which is the same for all of them.
+    -Unary functions are passed as a dictionary from string to function, which
+     must take numpy arrays.
+
+    Return a numpy array of the `size` results.
+
+    numpy's floating point errors (division by zero, overflow, invalid values)
+    are raised as `FloatingPointError`, and functions which don't take arrays
+    (e.g. `fact`) raise their own errors. Then, `evaluator` can be called for
+    each set of values, which handles those cases one value at a time.
+    """
+    compiled = compile_expression(math_expr, case_sensitive)
+    all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
+    compiled.check_variables(all_variables, all_functions)
+
+    with numpy.errstate(divide='raise', over='raise', invalid='raise'):
+        result = numpy.asarray(compiled.evaluate(all_variables, all_functions))
+
+    # Constant expressions have the same value for all the samples.
+    results = numpy.empty(size, dtype=result.dtype)
+    results[:] = result
+    return results
+
+
+# How many compiled expressions to keep, the least recently used being dropped first.
+COMPILED_EXPRESSIONS_CACHE_SIZE = 1000
+_COMPILED_EXPRESSIONS = OrderedDict()
+_COMPILED_EXPRESSIONS_LOCK = threading.Lock()
+
+
+def compile_expression(math_expr, case_sensitive=False):
+    """
+    Return a `CompiledExpression` for the math expression string.
+
+    Parsing is much slower than evaluating, and the same expressions are
+    evaluated again and again (for each sample of a formula, each submission
+    of a problem...), so the compiled expressions are kept in a bounded cache.
+    They don't depend on the variables and functions they are evaluated with.
+    """
+    key = (math_expr, case_sensitive)
+    with _COMPILED_EXPRESSIONS_LOCK:
+        compiled = _COMPILED_EXPRESSIONS.pop(key, None)
+        if compiled is not None:
+            # Put it back at the end, as the most recently used.
+            _COMPILED_EXPRESSIONS[key] = compiled
+            return compiled
+
+    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
+    math_interpreter.parse_algebra()
+    compiled = CompiledExpression(math_interpreter)
+
+    with _COMPILED_EXPRESSIONS_LOCK:
+        _COMPILED_EXPRESSIONS[key] = compiled
+        while len(_COMPILED_EXPRESSIONS) > COMPILED_EXPRESSIONS_CACHE_SIZE:
+            _COMPILED_EXPRESSIONS.popitem(last=False)
+    return compiled
+
+
+class CompiledExpression(object):
+    """
+    A parsed math expression, turned into a tree of closures to evaluate it.
+
+    Evaluating it gives the same result as `reduce_tree` with the evaluation
+    actions above, without going through the pyparsing results again.
+    """
+    def __init__(self, math_interpreter):
+        """
+        Compile the tree of a `ParseAugmenter` on which `parse_algebra` was called.
+        """
+        self.math_expr = math_interpreter.math_expr
+        self.case_sensitive = math_interpreter.case_sensitive
+        self.variables_used = frozenset(math_interpreter.variables_used)
+        self.functions_used = frozenset(math_interpreter.functions_used)
+        self.check_variables = math_interpreter.check_variables
+        if self.case_sensitive:
+            self.casify = lambda x: x
+        else:
+            self.casify = lambda x: x.lower()  # Lowercase for case insens.
+        self._evaluate = self.compile_node(math_interpreter.tree)
+
+    def evaluate(self, all_variables, all_functions):
+        """
+        Evaluate the expression with the given variables and functions.
+
+        They must include the defaults, as returned by `add_defaults`, and be
+        checked with `check_variables`.
+        """
+        return self._evaluate(all_variables, all_functions)
+
+    def compile_node(self, node):
+        """
+        Return a function of (all_variables, all_functions) evaluating the node.
+        """
+        node_name = node.getName()
+        compiler = getattr(self, 'compile_' + node_name, None)
+        if compiler is None:  # pragma: no cover
+            raise Exception(u"Unknown branch name '{}'".format(node_name))
+        return compiler(node)
+
+    def compile_kids(self, node):
+        """
+        Return the compiled child nodes of the node, and its operator tokens.
+        """
+        kids = [self.compile_node(k) for k in node if isinstance(k, ParseResults)]
+        operators = [k for k in node if not isinstance(k, ParseResults)]
+        return kids, operators
+
+    def compile_number(self, node):
+        """
+        A number is a constant.
+        """
+        value = eval_number(list(node))
+        return lambda all_variables, all_functions: value
+
+    def compile_variable(self, node):
+        """
+        Look up the variable.
+        """
+        varname = self.casify(node[0])
+        return lambda all_variables, all_functions: all_variables[varname]
+
+    def compile_function(self, node):
+        """
+        Look up the function and call it on its argument.
+        """
+        funcname = self.casify(node[0])
+        argument = self.compile_node(node[1])
+        return lambda all_variables, all_functions: all_functions[funcname](
+            argument(all_variables, all_functions)
+        )
+
+    def compile_atom(self, node):
+        """
+        An atom is its only child node, ignoring any parentheses.
+        """
+        (kid,), __ = self.compile_kids(node)
+        return kid
+
+    def compile_power(self, node):
+        """
+        Exponentiate right to left, as `eval_power` does.
+        """
+        kids, __ = self.compile_kids(node)
+        if len(kids) == 1:
+            return kids[0]
+        kids.reverse()
+
+        def evaluate(all_variables, all_functions):
+            """
+            Raise `b` to the power of `a`, from the last child to the first.
+            """
+            return reduce(lambda a, b: b ** a, [kid(all_variables, all_functions) for kid in kids])
+        return evaluate
+
+    def compile_parallel(self, node):
+        """
+        Combine like parallel resistors, as `eval_parallel` does.
+        """
+        kids, __ = self.compile_kids(node)
+        if len(kids) == 1:
+            return kids[0]
+        return lambda all_variables, all_functions: eval_parallel(
+            [kid(all_variables, all_functions) for kid in kids]
+        )
+
+    def compile_product(self, node):
+        """
+        Multiply and divide from left to right, as `eval_product` does.
+        """
+        return self.compile_operations(node, 1.0, operator.mul, {'*': operator.mul, '/': operator.truediv})
+
+    def compile_sum(self, node):
+        """
+        Add and subtract from left to right, as `eval_sum` does.
+        """
+        return self.compile_operations(node, 0.0, operator.add, {'+': operator.add, '-': operator.sub})
+
+    def compile_operations(self, node, start, current_op, operators):
+        """
+        Fold the children of the node into `start`, from left to right, applying
+        `current_op` until an operator token of the node changes it.
+        """
+        terms = []
+        for kid in node:
+            if isinstance(kid, ParseResults):
+                terms.append((current_op, self.compile_node(kid)))
+            else:
+                current_op = operators[kid]
+
+        def evaluate(all_variables, all_functions):
+            """
+            Fold the children's values into `start`.
+            """
+            total = start
+            for op, kid in terms:
+                total = op(total, kid(all_variables, all_functions))
+            return total
+        return evaluate
 
 
 class ParseAugmenter(object):
@@ -49,6 +49,9 @@ def arccot(val):
     """
     Inverse cotangent
     """
+    if isinstance(val, numpy.ndarray):
+        # Element by element, for arrays of values.
+        return numpy.where(numpy.real(val) < 0, -numpy.pi / 2, numpy.pi / 2) - numpy.arctan(val)
     if numpy.real(val) < 0:
         return -numpy.pi / 2 - numpy.arctan(val)
     else:
@@ -559,3 +559,55 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({'r1': 5}, {}, "r1+r2")
         with self.assertRaisesRegexp(calc.UndefinedVariable, 'r1 r3'):
             calc.evaluator(variables, {}, "r1*r3", case_sensitive=True)
+
+    def test_compiled_expressions_are_reused(self):
+        """
+        Check that an expression is parsed once, for any variables and functions
+        """
+        calc.calc._COMPILED_EXPRESSIONS.clear()
+        compiled = calc.compile_expression('x^2 + f(x)')
+        self.assertIs(compiled, calc.compile_expression('x^2 + f(x)'))
+        self.assertIsNot(compiled, calc.compile_expression('x^2 + f(x)', case_sensitive=True))
+
+        self.assertEqual(calc.evaluator({'x': 3}, {'f': lambda x: x + 1}, 'x^2 + f(x)'), 13)
+        self.assertEqual(calc.evaluator({'x': 1}, {'f': lambda x: -x}, 'x^2 + f(x)'), 0)
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'f'):
+            calc.evaluator({'x': 1}, {}, 'x^2 + f(x)')
+        self.assertEqual(len(calc.calc._COMPILED_EXPRESSIONS), 2)
+
+    def test_compiled_expressions_cache_is_bounded(self):
+        """
+        Check that the least recently used compiled expressions are dropped
+        """
+        calc.calc._COMPILED_EXPRESSIONS.clear()
+        cache_size = calc.calc.COMPILED_EXPRESSIONS_CACHE_SIZE
+        self.addCleanup(setattr, calc.calc, 'COMPILED_EXPRESSIONS_CACHE_SIZE', cache_size)
+        calc.calc.COMPILED_EXPRESSIONS_CACHE_SIZE = 2
+
+        for math_expr in ('1+1', '2+2', '1+1', '3+3'):
+            calc.evaluator({}, {}, math_expr)
+        self.assertEqual(
+            calc.calc._COMPILED_EXPRESSIONS.keys(),
+            [('1+1', False), ('3+3', False)]
+        )
+
+    def test_evaluate_samples(self):
+        """
+        Check evaluating an expression for arrays of values at once
+        """
+        x_values = numpy.array([0.5, 1.0, -2.0])
+        math_expr = 'x^2 + arccot(x)*i - 3'
+        results = calc.evaluate_samples({'x': x_values}, {}, math_expr, 3)
+        expected = [calc.evaluator({'x': x}, {}, math_expr) for x in x_values.tolist()]
+        self.assertTrue(numpy.allclose(results, expected, rtol=1e-15))
+
+        # Constant expressions are the same for all the samples.
+        self.assertEqual(calc.evaluate_samples({'x': x_values}, {}, '2*pi', 3).tolist(), [2 * numpy.pi] * 3)
+
+        # Errors are raised, rather than giving infinite or invalid values.
+        with self.assertRaises(FloatingPointError):
+            calc.evaluate_samples({'x': x_values}, {}, '1/(x-1)', 3)
+        with self.assertRaises(FloatingPointError):
+            calc.evaluate_samples({'x': x_values}, {}, 'sqrt(x)', 3)
+        with self.assertRaises(TypeError):
+            calc.evaluate_samples({'x': x_values}, {}, 'fact(x)', 3)
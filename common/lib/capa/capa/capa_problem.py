@@ -13,6 +13,7 @@ Main module which shows problems (of "capa" type).
 This is used by capa_module.
 """
 
+import hashlib
 import logging
 import os.path
 import re
@@ -30,6 +31,7 @@ import capa.responsetypes as responsetypes
 import capa.xqueue_interface as xqueue_interface
 from capa.correctmap import CorrectMap
 from capa.safe_exec import safe_exec
+from capa.template_cache import get_cache as get_template_cache, template_key
 from capa.util import contextualize_text, convert_files_to_filenames
 from openedx.core.djangolib.markup import HTML
 from xmodule.stringify import stringify_children
@@ -176,13 +178,19 @@ class LoncapaProblem(object):
         problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
         self.problem_text = problem_text
 
-        # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
-
-        self.make_xml_compatible(self.tree)
-
-        # handle any <include file="foo"> tags
-        self._process_includes()
+        # parse problem XML file into an element tree, from the cached template if any
+        template_cache = get_template_cache()
+        if template_cache is None:
+            self.tree = self._parse_problem()
+        else:
+            filestore = self.capa_system.filestore
+            self.tree = template_cache.get(
+                'tree',
+                template_key(
+                    problem_text, getattr(filestore, 'root_path', None) or repr(filestore), self.capa_system.DEBUG
+                ),
+                self._parse_problem,
+            )
 
         # construct script processor context (eg for customresponse problems)
         if minimal_init:
@@ -214,6 +222,16 @@ class LoncapaProblem(object):
 
             self.extracted_tree = self._extract_html(self.tree)
 
+    def _parse_problem(self):
+        """
+        Parses the problem XML into an element tree, makes it compatible, and handles any
+        <include file="foo"> tags.  Returns the tree.
+        """
+        self.tree = etree.XML(self.problem_text)
+        self.make_xml_compatible(self.tree)
+        self._process_includes()
+        return self.tree
+
     def make_xml_compatible(self, tree):
         """
         Adjust tree xml in-place for compatibility before creating
@@ -729,21 +747,27 @@ class LoncapaProblem(object):
                 extra_files.append(("python_lib.zip", zip_lib))
                 python_path.append("python_lib.zip")
 
-            try:
-                safe_exec(
+            template_cache = get_template_cache()
+            if template_cache is None:
+                self._execute_script_code(all_code, context, python_path, extra_files)
+            else:
+                # Unless the code uses the learner's anonymous id, its results are the same
+                # for all the learners with the same seed.
+                student_specific = 'anonymous_student_id' in all_code
+                key = template_key(
                     all_code,
-                    context,
-                    random_seed=self.seed,
-                    python_path=python_path,
-                    extra_files=extra_files,
-                    cache=self.capa_system.cache,
-                    slug=self.problem_id,
-                    unsafely=self.capa_system.can_execute_unsafe_code(),
+                    self.seed,
+                    python_path,
+                    [(name, hashlib.md5(contents).hexdigest()) for name, contents in extra_files],
+                    self.capa_system.can_execute_unsafe_code(),
+                    self.capa_system.anonymous_student_id if student_specific else None,
                 )
-            except Exception as err:
-                log.exception("Error while execing script code: " + all_code)
-                msg = "Error while executing script code: %s" % str(err).replace('<', '&lt;')
-                raise responsetypes.LoncapaProblemError(msg)
+                context = template_cache.get(
+                    'context', key,
+                    lambda: self._execute_script_code(all_code, dict(context), python_path, extra_files),
+                )
+                if not student_specific:
+                    context['anonymous_student_id'] = self.capa_system.anonymous_student_id
 
         # Store code source in context, along with the Python path needed to run it correctly.
         context['script_code'] = all_code
@@ -751,6 +775,27 @@ class LoncapaProblem(object):
         context['extra_files'] = extra_files or None
         return context
 
+    def _execute_script_code(self, code, context, python_path, extra_files):
+        """
+        Executes the problem's script code in context, and returns the context.
+        """
+        try:
+            safe_exec(
+                code,
+                context,
+                random_seed=self.seed,
+                python_path=python_path,
+                extra_files=extra_files,
+                cache=self.capa_system.cache,
+                slug=self.problem_id,
+                unsafely=self.capa_system.can_execute_unsafe_code(),
+            )
+        except Exception as err:
+            log.exception("Error while execing script code: " + code)
+            msg = "Error while executing script code: %s" % str(err).replace('<', '&lt;')
+            raise responsetypes.LoncapaProblemError(msg)
+        return context
+
     def _extract_html(self, problemtree):  # private
         """
         Main (private) function which converts Problem XML tree to HTML.
@@ -42,7 +42,7 @@ import capa.safe_exec as safe_exec
 import capa.xqueue_interface as xqueue_interface
 import dogstats_wrapper as dog_stats_api
 # specific library imports
-from calc import UndefinedVariable, evaluator
+from calc import UndefinedVariable, evaluate_samples, evaluator
 from cmath import isnan
 from openedx.core.djangolib.markup import HTML, Text
 
@@ -3094,6 +3094,10 @@ class FormulaResponse(LoncapaResponse):
         """
         _ = self.capa_system.i18n.ugettext
 
+        out = self.tupleize_answers_at_once(answer, var_dict_list)
+        if out is not None:
+            return out
+
         out = []
         for var_dict in var_dict_list:
             try:
@@ -3145,6 +3149,35 @@ class FormulaResponse(LoncapaResponse):
                 )
         return out
 
+    def tupleize_answers_at_once(self, answer, var_dict_list):
+        """
+        Like tupleize_answers, but evaluates the answer for all the test cases at
+        once, with numpy arrays of the values of the variables.
+
+        Returns None if the answer can't be evaluated that way, or if any result
+        isn't a finite number; tupleize_answers then evaluates the test cases one
+        by one, which handles those cases and their errors.
+        """
+        if not var_dict_list:
+            return None
+        variables = dict(
+            (var, numpy.array([var_dict[var] for var_dict in var_dict_list]))
+            for var in var_dict_list[0]
+        )
+        try:
+            results = evaluate_samples(
+                variables,
+                dict(),
+                answer,
+                len(var_dict_list),
+                case_sensitive=self.case_sensitive,
+            )
+        except Exception:  # pylint: disable=broad-except
+            return None
+        if results.dtype.kind not in 'iufc' or not numpy.isfinite(results).all():
+            return None
+        return results.tolist()
+
     def randomize_variables(self, samples):
         """
         Returns a list of dictionaries mapping variables to random values in range,
@@ -0,0 +1,138 @@
+"""
+Batched execution of capa problems' sandboxed code.
+
+Rescoring a problem for many learners executes the same code for each of them,
+each time in a new sandboxed process.  A SafeExecBatch records the executions
+which some work needs, runs all those of the same code in one sandboxed process
+with `safe_exec_batch`, and keeps their results, which `safe_exec` uses instead
+of executing the code again while the batch is active.
+
+The executions are recorded by doing the work while the batch collects them:
+`safe_exec` records each execution which the batch has no result for, and
+interrupts the work by raising SafeExecDeferred.  Work which executes code more
+than once, with the results of the earlier executions, is collected again after
+the batch has run what it recorded, until it completes.
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from codejail.safe_exec import SafeExecException
+
+log = logging.getLogger(__name__)
+
+_ACTIVE = threading.local()
+
+
+class SafeExecDeferred(BaseException):
+    """
+    Raised by safe_exec, while a batch is collecting, for an execution the batch has no
+    result for yet.
+
+    It derives from BaseException, like KeyboardInterrupt, so that the code which handles
+    the errors of executions lets it through.
+    """
+    pass
+
+
+def active_batch():
+    """
+    Returns the SafeExecBatch active in this thread, if any.
+    """
+    return getattr(_ACTIVE, 'batch', None)
+
+
+class SafeExecBatch(object):
+    """
+    The results of executions of sandboxed code, run in batches.
+    """
+    def __init__(self):
+        self.collecting = False
+        # Map of execution key, as computed by safe_exec, to the pair of the exception message,
+        # if any, else None, and the resulting globals
+        self.results = {}
+        # Map of execution key to the arguments of the recorded executions which haven't run
+        self.pending = OrderedDict()
+        # Keys of the executions whose batch failed
+        self.failed = set()
+
+    @contextmanager
+    def activate(self, collecting=False):
+        """
+        Makes safe_exec use the results of the batch, in this thread, and if collecting,
+        record the executions which the batch has no result for.
+        """
+        previous = active_batch()
+        _ACTIVE.batch = self
+        self.collecting = collecting
+        try:
+            yield self
+        finally:
+            self.collecting = False
+            _ACTIVE.batch = previous
+
+    def collect(self, work):
+        """
+        Calls work with the batch collecting. Returns False if the work needs an execution
+        which is waiting to run in the batch, else True.
+        """
+        with self.activate(collecting=True):
+            try:
+                work()
+            except SafeExecDeferred as deferred:
+                return deferred.args[0] not in self.pending
+        return True
+
+    def get(self, key):
+        """
+        Returns the result of the execution with the given key, or None if the batch has none.
+        """
+        return self.results.get(key)
+
+    def defer(self, key, code, globals_dict, random_seed, python_path, extra_files, slug):
+        """
+        Records an execution, to run with run_pending, and raises SafeExecDeferred.
+        """
+        if key not in self.pending and key not in self.failed:
+            self.pending[key] = (code, globals_dict, random_seed, python_path, extra_files, slug)
+        raise SafeExecDeferred(key)
+
+    def run_pending(self):
+        """
+        Runs the recorded executions, those of the same code in one sandboxed process, and
+        keeps their results.
+
+        When the sandboxed process of a batch fails as a whole, its executions get no results,
+        and will run separately when the work is done.
+        """
+        # Imported here, as safe_exec imports this module
+        from .safe_exec import safe_exec_batch
+
+        groups = OrderedDict()
+        for key, (code, globals_dict, random_seed, python_path, extra_files, slug) in self.pending.iteritems():
+            group_key = (
+                code,
+                tuple(python_path or ()),
+                tuple((name, hashlib.md5(contents).hexdigest()) for name, contents in extra_files or ()),
+            )
+            group = groups.setdefault(group_key, {
+                'code': code, 'python_path': python_path, 'extra_files': extra_files, 'slug': slug,
+                'keys': [], 'inputs': [],
+            })
+            group['keys'].append(key)
+            group['inputs'].append((random_seed, globals_dict))
+        self.pending = OrderedDict()
+
+        for group in groups.itervalues():
+            try:
+                results = safe_exec_batch(
+                    group['code'], group['inputs'],
+                    python_path=group['python_path'], extra_files=group['extra_files'], slug=group['slug'],
+                )
+            except SafeExecException:
+                log.exception("Couldn't execute a batch of %d executions of %s", len(group['keys']), group['slug'])
+                self.failed.update(group['keys'])
+                continue
+            self.results.update(zip(group['keys'], results))
@@ -2,8 +2,11 @@
 
 from codejail.safe_exec import safe_exec as codejail_safe_exec
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
+from codejail import jail_code
 from codejail.safe_exec import json_safe, SafeExecException
 from . import lazymod
+from . import sandbox_pool
+from .batch import active_batch
 from dogapi import dog_stats_api
 
 import hashlib
@@ -49,6 +52,64 @@ for name, modname in ASSUMED_IMPORTS:
 
 LAZY_IMPORTS = "".join(LAZY_IMPORTS)
 
+# The modules which the processes of the sandbox pool import before executing any code.
+WARM_IMPORTS = [modname for __, modname in ASSUMED_IMPORTS]
+
+# The code which executes a batch of inputs in one sandboxed process, for safe_exec_batch.
+# Each input is a pair of the code prolog, with its random seed, and the globals to execute
+# the code in.  The modules and path entries which an input adds are dropped after it, but
+# the assumed modules are imported first, as sandbox_worker.py does, so that they are kept.
+BATCH_DRIVER = """\
+import json
+import resource
+import sys
+import traceback
+
+for batch_modname in batch_warm_imports:
+    try:
+        __import__(batch_modname)
+    except Exception:
+        # The inputs will get the error when they use the module.
+        pass
+
+def batch_jsonable(value):
+    if not isinstance(value, (type(None), int, long, float, str, unicode, list, tuple, dict)):
+        return False
+    try:
+        json.dumps(value)
+    except Exception:
+        return False
+    return True
+
+batch_clean_path = list(sys.path)
+batch_clean_modules = dict(sys.modules)
+batch_results = []
+for batch_prolog, batch_globals in batch_inputs:
+    if batch_cpu:
+        # Let each input use the CPU time of one execution.
+        batch_usage = resource.getrusage(resource.RUSAGE_SELF)
+        batch_hard = resource.getrlimit(resource.RLIMIT_CPU)[1]
+        batch_soft = int(batch_usage.ru_utime + batch_usage.ru_stime + batch_cpu) + 1
+        if batch_hard != resource.RLIM_INFINITY:
+            batch_soft = min(batch_soft, batch_hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (batch_soft, batch_hard))
+    try:
+        exec compile(batch_prolog + batch_code, "<string>", "exec") in batch_globals
+        batch_results.append({"globals": dict(
+            (key, value) for key, value in batch_globals.iteritems()
+            if key != "__builtins__" and batch_jsonable(value)
+        )})
+    except BaseException:
+        batch_results.append({"error": traceback.format_exc()})
+    finally:
+        sys.path[:] = batch_clean_path
+        for batch_modname in set(sys.modules) - set(batch_clean_modules):
+            del sys.modules[batch_modname]
+        sys.modules.update(batch_clean_modules)
+
+del batch_inputs, batch_code, batch_clean_path, batch_warm_imports
+"""
+
 
 def update_hash(hasher, obj):
     """
@@ -109,15 +170,31 @@ def safe_exec(
 
     If `unsafely` is true, then the code will actually be executed without sandboxing.
 
+    If a sandbox pool is configured (see `sandbox_pool.configure`), the code is
+    executed in one of its warm processes rather than in a new one.
+
+    If a `batch.SafeExecBatch` is active, its result for the execution is used,
+    and if it is collecting executions and has no result, the execution is
+    recorded in it and `batch.SafeExecDeferred` is raised.
+
     """
-    # Check the cache for a previous result.
-    if cache:
+    # Code which doesn't run in a sandbox is cheap to run, so it isn't batched.
+    batch = active_batch() if jail_code.is_configured("python") and not unsafely else None
+
+    # Check the batch, then the cache, for a previous result.
+    if cache or batch is not None:
         safe_globals = json_safe(globals_dict)
         md5er = hashlib.md5()
         md5er.update(repr(code))
         update_hash(md5er, safe_globals)
         key = "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
-        cached = cache.get(key)
+        cached = batch.get(key) if batch is not None else None
+        if cached is not None and cache:
+            cache.set(key, cached)
+        if cached is None and cache:
+            cached = cache.get(key)
+        if cached is None and batch is not None and batch.collecting:
+            batch.defer(key, code, safe_globals, random_seed, python_path, extra_files, slug)
         if cached is not None:
             # We have a cached result.  The result is a pair: the exception
             # message, if any, else None; and the resulting globals dictionary.
@@ -131,8 +208,11 @@ def safe_exec(
     code_prolog = CODE_PROLOG % random_seed
 
     # Decide which code executor to use.
+    pool = sandbox_pool.get_pool(WARM_IMPORTS)
     if unsafely:
         exec_fn = codejail_not_safe_exec
+    elif pool is not None:
+        exec_fn = pool.safe_exec
     else:
         exec_fn = codejail_safe_exec
 
@@ -156,3 +236,64 @@ def safe_exec(
     # If an exception happened, raise it now.
     if emsg:
         raise e
+
+
+def _batch_limits(size):
+    """
+    Returns codejail's limits, with the CPU and real time limits multiplied by the size of a batch.
+
+    The batch limits the CPU time of each of its inputs itself.
+    """
+    limits = dict(jail_code.LIMITS)
+    for name in ("CPU", "REALTIME"):
+        if limits.get(name):
+            limits[name] *= size
+    return limits
+
+
+@dog_stats_api.timed('capa.safe_exec.batch_time')
+def safe_exec_batch(code, inputs, python_path=None, extra_files=None, slug=None):
+    """
+    Execute python code safely for a list of inputs, all in one sandboxed process.
+
+    `code`, `python_path`, `extra_files` and `slug` are as for `safe_exec`.
+
+    `inputs` is a list of (random_seed, globals_dict) pairs.  The code is executed
+    for each of them as `safe_exec` would execute it, in a copy of the globals, with
+    the `random` module seeded with the random seed.
+
+    Returns a list of the results of the inputs, each a pair of the exception
+    message, if the code raised one, else None, and the resulting globals, as
+    `safe_exec` caches them.  Raises SafeExecException if the sandboxed process
+    fails as a whole.
+
+    The inputs are executed one after the other in the same process, which is less
+    isolation than `safe_exec` gives them.  The process is started as the processes
+    of the sandbox pool are, with codejail's CPU and real time limits multiplied by
+    the number of inputs, so codejail must be configured to run Python in a sandbox.
+
+    """
+    batch_globals = {
+        "batch_code": LAZY_IMPORTS + code,
+        "batch_inputs": [[CODE_PROLOG % random_seed, json_safe(globals_dict)] for random_seed, globals_dict in inputs],
+        "batch_cpu": jail_code.LIMITS.get("CPU", 0),
+        "batch_warm_imports": WARM_IMPORTS,
+    }
+    process = sandbox_pool.SandboxProcess(WARM_IMPORTS, max_executions=1, limits=_batch_limits(len(inputs)))
+    try:
+        if not process.wait_ready():
+            raise SafeExecException(
+                "Couldn't execute jailed code: the sandbox process failed to start: {!r}".format(process.stderr)
+            )
+        process.execute(BATCH_DRIVER, batch_globals, python_path=python_path, extra_files=extra_files, slug=slug)
+    finally:
+        if not process.retired:
+            process.retire()
+
+    results = []
+    for result in batch_globals["batch_results"]:
+        if "error" in result:
+            results.append(("Couldn't execute jailed code: {}".format(result["error"]), {}))
+        else:
+            results.append((None, result["globals"]))
+    return results
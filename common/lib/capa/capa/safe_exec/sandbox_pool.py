@@ -0,0 +1,374 @@
+"""
+A pool of warm sandboxed Python processes for capa's safe_exec.
+
+Starting a sandboxed process, and importing numpy and scipy in it, costs much
+more than running the code of most problems.  The SandboxPool starts its
+processes ahead of time, with the modules which problem code assumes already
+imported, and runs each execution in one of them.
+
+The processes are started as codejail starts its jailed processes: with the
+Python command and the user configured in codejail, in their own process group,
+with codejail's limits on subprocesses, memory and file sizes.  Codejail's CPU
+limit applies to each execution, and its real time limit too, the process being
+killed if an execution exceeds it.  A process is replaced after an execution
+which fails, and after max_executions executions, and is stopped and its files
+removed on a background thread, so that the execution doesn't wait for it.
+Each execution gets new globals and the modules it imports are dropped after it,
+but code which tampers with the process could affect the following executions
+in it, so max_executions is 1 by default, when the pool only saves the callers
+the start-up time.
+
+Each process of the pool runs one execution at a time.  Up to max_waiting
+callers wait for a process to be free, for up to wait_timeout seconds; the
+executions beyond that fail straight away, rather than queuing without bound.
+"""
+import json
+import logging
+import os
+import Queue
+import resource
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+
+from codejail import jail_code
+from codejail.safe_exec import SafeExecException, json_safe
+
+log = logging.getLogger(__name__)
+
+# The worker script, run in the sandbox.
+WORKER_PY_FILE = os.path.join(os.path.dirname(__file__), "sandbox_worker.py")
+WORKER_NAME = "sandbox_worker.py"
+
+# CPU seconds and real time seconds that a process may use to start and import its modules.
+STARTUP_CPU = 10
+STARTUP_REALTIME = 30
+# Seconds to wait before starting another process, after one failed to start.
+STARTUP_RETRY_DELAY = 5
+# Bytes of the end of a process's stderr kept for error messages.
+STDERR_KEPT = 4096
+
+_OPTIONS = {}
+_POOL = None
+_POOL_PID = None
+_POOL_LOCK = threading.Lock()
+
+
+def configure(size=0, max_executions=1, max_waiting=0, wait_timeout=10):
+    """
+    Configures the sandbox pool which each process starts when it first executes code.
+
+    Arguments:
+        size (int): the number of sandboxed processes to keep; 0 turns the pool off
+        max_executions (int): the number of executions after which a process is replaced
+        max_waiting (int): the number of executions which may wait for a free process
+        wait_timeout (float): how many seconds an execution may wait for a free process
+    """
+    global _POOL  # pylint: disable=global-statement
+    with _POOL_LOCK:
+        _OPTIONS.clear()
+        _OPTIONS.update(
+            size=size, max_executions=max_executions, max_waiting=max_waiting, wait_timeout=wait_timeout,
+        )
+        if _POOL is not None:
+            _POOL.close()
+            _POOL = None
+
+
+def get_pool(warm_imports=()):
+    """
+    Returns this process's SandboxPool, starting it, with processes which have imported the
+    modules named in warm_imports, if it isn't started yet.
+
+    Returns None if the pool is off, or codejail isn't configured to run Python in a sandbox.
+    """
+    global _POOL, _POOL_PID  # pylint: disable=global-statement
+    if not _OPTIONS.get('size') or not jail_code.is_configured("python"):
+        return None
+    with _POOL_LOCK:
+        # A forked process can't use its parent's pool
+        if _POOL is None or _POOL_PID != os.getpid():
+            _POOL = SandboxPool(warm_imports=warm_imports, **_OPTIONS)
+            _POOL_PID = os.getpid()
+        return _POOL
+
+
+class SandboxPool(object):
+    """
+    Executes code in a pool of warm sandboxed Python processes.
+    """
+    def __init__(self, size, max_executions=1, max_waiting=0, wait_timeout=10, warm_imports=()):
+        self.max_executions = max_executions
+        self.wait_timeout = wait_timeout
+        self.warm_imports = list(warm_imports)
+        self.closed = False
+        self.idle = Queue.Queue()
+        # Admits the executions which run or wait for a process
+        self.admission = threading.Semaphore(size + max_waiting)
+        for __ in xrange(size):
+            self._start_process()
+
+    def _start_process(self):
+        """
+        Starts a process in the background, adding it to the idle ones once it is warm.
+        """
+        thread = threading.Thread(target=self._warm_up, name="sandbox-pool-start")
+        thread.daemon = True
+        thread.start()
+
+    def _warm_up(self):
+        """
+        Starts a process and waits for it to be warm, retrying until one is.
+        """
+        while not self.closed:
+            try:
+                process = SandboxProcess(self.warm_imports, self.max_executions)
+            except (IOError, OSError):
+                log.exception("Couldn't start a sandbox pool process")
+            else:
+                ready = process.wait_ready()
+                if ready and not self.closed:
+                    self.idle.put(process)
+                    return
+                if not ready:
+                    log.error("A sandbox pool process failed to start: %r", process.stderr)
+                process.retire()
+            time.sleep(STARTUP_RETRY_DELAY)
+
+    def safe_exec(self, code, globals_dict, python_path=None, extra_files=None, slug=None):
+        """
+        Executes code in a process of the pool, as codejail.safe_exec.safe_exec does.
+
+        Raises SafeExecException if the code fails, or if no process is free.
+        """
+        if not self.admission.acquire(False):
+            raise SafeExecException("Couldn't execute jailed code: all sandbox processes are busy")
+        try:
+            try:
+                process = self.idle.get(timeout=self.wait_timeout)
+            except Queue.Empty:
+                raise SafeExecException(
+                    "Couldn't execute jailed code: no sandbox process was free within {} seconds".format(
+                        self.wait_timeout
+                    )
+                )
+            try:
+                process.execute(code, globals_dict, python_path, extra_files, slug)
+            finally:
+                if self.closed and not process.retired:
+                    process.retire()
+                if not process.retired:
+                    self.idle.put(process)
+                elif not self.closed:
+                    self._start_process()
+        finally:
+            self.admission.release()
+
+    def close(self):
+        """
+        Retires the idle processes, and the busy ones when they finish their executions.
+        """
+        self.closed = True
+        while True:
+            try:
+                process = self.idle.get_nowait()
+            except Queue.Empty:
+                return
+            process.retire()
+
+
+class SandboxProcess(object):
+    """
+    A warm sandboxed Python process, running sandbox_worker.py.
+
+    The process has codejail's limits, or the given limits, which are a dict like
+    codejail's LIMITS.
+    """
+    def __init__(self, warm_imports, max_executions, limits=None):
+        self.max_executions = max_executions
+        self.executions = 0
+        self.retired = False
+        self.cleaner = None
+        self.user = jail_code.COMMANDS["python"]["user"]
+        self.limits = dict(jail_code.LIMITS if limits is None else limits)
+        cpu = self.limits.get("CPU", 0)
+
+        self.home = tempfile.mkdtemp(prefix="codejail-pool-")
+        os.chmod(self.home, 0o755)
+        self.tmp = os.path.join(self.home, "tmp")
+        os.mkdir(self.tmp)
+        os.chmod(self.tmp, 0o777)
+        shutil.copy(WORKER_PY_FILE, os.path.join(self.home, WORKER_NAME))
+        os.chmod(os.path.join(self.home, WORKER_NAME), 0o644)
+
+        cmd = []
+        if self.user:
+            cmd.extend(["sudo", "-u", self.user])
+        cmd.extend(jail_code.COMMANDS["python"]["cmdline_start"])
+        cmd.extend([WORKER_NAME, str(cpu)] + list(warm_imports))
+        self.process = subprocess.Popen(
+            cmd, preexec_fn=_process_limits(max_executions, self.limits), cwd=self.home, env={"TMPDIR": self.tmp},
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        # The end of what the process wrote to stderr, read in the background so that it can't block
+        self.stderr = ""
+        reader = threading.Thread(target=self._read_stderr, name="sandbox-pool-stderr")
+        reader.daemon = True
+        reader.start()
+
+    def _read_stderr(self):
+        """
+        Reads the process's stderr until it closes, keeping the end of it.
+        """
+        for chunk in iter(lambda: os.read(self.process.stderr.fileno(), STDERR_KEPT), ""):
+            self.stderr = (self.stderr + chunk)[-STDERR_KEPT:]
+
+    def _read_line(self, timeout):
+        """
+        Returns the next line which the process writes, killing the process if it takes more
+        than timeout seconds. Returns "" if the process is dead.
+        """
+        killer = threading.Timer(timeout, self.kill) if timeout else None
+        if killer:
+            killer.start()
+        try:
+            return self.process.stdout.readline()
+        except IOError:
+            return ""
+        finally:
+            if killer:
+                killer.cancel()
+
+    def wait_ready(self):
+        """
+        Waits for the process to import its modules, returning whether it is ready.
+        """
+        try:
+            return json.loads(self._read_line(STARTUP_REALTIME)).get("ready", False)
+        except ValueError:
+            return False
+
+    def execute(self, code, globals_dict, python_path=None, extra_files=None, slug=None):
+        """
+        Executes code in the process, updating globals_dict with its results.
+        """
+        self.executions += 1
+        job_dir = tempfile.mkdtemp(prefix="job-", dir=self.home)
+        try:
+            os.chmod(job_dir, 0o755)
+            extra_names = set()
+            for name, contents in extra_files or ():
+                extra_names.add(name)
+                with open(os.path.join(job_dir, name), "wb") as extra_file:
+                    extra_file.write(contents)
+            path = []
+            for pydir in python_path or ():
+                pybase = os.path.basename(pydir)
+                path.append(pybase)
+                if pybase not in extra_names:
+                    if os.path.isdir(pydir):
+                        shutil.copytree(pydir, os.path.join(job_dir, pybase))
+                    else:
+                        shutil.copy(pydir, os.path.join(job_dir, pybase))
+
+            job = {"code": code, "globals": json_safe(globals_dict), "directory": job_dir, "python_path": path}
+            log.debug("Executing jailed code %s in sandbox pool process %d", slug, self.process.pid)
+            try:
+                self.process.stdin.write(json.dumps(job) + "\n")
+                self.process.stdin.flush()
+            except IOError:
+                pass
+            response = self._read_line(self.limits.get("REALTIME", 0))
+        finally:
+            shutil.rmtree(job_dir, ignore_errors=True)
+
+        try:
+            result = json.loads(response)
+        except ValueError:
+            if not response:
+                # The process died, or was killed
+                self.process.wait()
+            result = {"error": "stdout: {!r}, stderr: {!r} with status code: {}".format(
+                response, self.stderr, self.process.poll()
+            )}
+        if "error" in result or self.executions >= self.max_executions:
+            self.retire()
+        if "error" in result:
+            raise SafeExecException("Couldn't execute jailed code: {}".format(result["error"]))
+        globals_dict.update(result["globals"])
+
+    def kill(self):
+        """
+        Kills the process, and anything in its process group.
+        """
+        if self.process.poll() is not None:
+            return
+        try:
+            pgid = os.getpgid(self.process.pid)
+        except OSError:
+            return
+        log.warning("Killing sandbox pool process %d", self.process.pid)
+        if self.user:
+            # Can't signal the process directly, as it runs as another user.
+            subprocess.call(["sudo", "pkill", "-9", "-g", str(pgid)])
+        else:
+            os.killpg(pgid, signal.SIGKILL)
+
+    def retire(self):
+        """
+        Stops the process and removes its files, in the background.
+        """
+        self.retired = True
+        try:
+            self.process.stdin.close()
+        except IOError:
+            pass
+        self.cleaner = threading.Thread(target=self._clean_up, name="sandbox-pool-retire")
+        self.cleaner.daemon = True
+        self.cleaner.start()
+
+    def _clean_up(self):
+        """
+        Waits for the retired process to stop, killing it if it takes too long, and removes its files.
+        """
+        killer = threading.Timer(self.limits.get("REALTIME", 0) or 1, self.kill)
+        killer.start()
+        self.process.wait()
+        killer.cancel()
+        if self.user:
+            # Remove what the process wrote to its tmp directory, which is owned by the sandbox user.
+            subprocess.call(
+                ["sudo", "-u", self.user, "find", self.tmp, "-mindepth", "1", "-maxdepth", "1",
+                 "-exec", "rm", "-rf", "{}", ";"],
+                cwd=self.home,
+            )
+        shutil.rmtree(self.home, ignore_errors=True)
+
+
+def _process_limits(max_executions, limits):
+    """
+    Returns the function which sets the given limits of a sandbox pool process before it starts.
+    """
+    cpu = limits.get("CPU", 0)
+    vmem = limits.get("VMEM", 0)
+    fsize = limits.get("FSIZE", 0)
+
+    def set_process_limits():
+        """
+        Sets the limits, as codejail does, but allowing CPU time for all the executions.
+        """
+        os.setsid()
+        # No subprocesses.
+        resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+        # The process lowers its soft CPU limit for each execution.
+        if cpu:
+            total_cpu = STARTUP_CPU + cpu * max_executions
+            resource.setrlimit(resource.RLIMIT_CPU, (total_cpu, total_cpu))
+        if vmem:
+            resource.setrlimit(resource.RLIMIT_AS, (vmem, vmem))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (fsize, fsize))
+
+    return set_process_limits
@@ -0,0 +1,113 @@
+"""
+A warm sandboxed Python process of capa's SandboxPool.
+
+This script is run in the sandbox, as codejail runs jailed code.  It imports the
+modules named in its arguments, which problem code assumes, then executes the
+jobs which it reads from stdin, one JSON line each, writing the result of each
+to stdout as a JSON line.  Each job runs in its own globals, in its own
+directory, and the modules and path entries that it adds are dropped after it.
+
+Usage: sandbox_worker.py CPU_SECONDS_PER_JOB MODULE...
+"""
+import json
+import os
+import resource
+import sys
+import traceback
+
+os.environ["OPENBLAS_NUM_THREADS"] = "1"    # See TNL-6456
+
+# The types of the globals which are sent back to the calling process.
+OK_TYPES = (type(None), int, long, float, str, unicode, list, tuple, dict)
+BAD_KEYS = ("__builtins__",)
+
+
+class DevNull(object):
+    """
+    Where the jobs' prints go, so that they don't pollute the results on stdout.
+    """
+    def write(self, *args, **kwargs):
+        pass
+
+
+def jsonable(value):
+    """
+    Returns whether the value can be sent back to the calling process.
+    """
+    if not isinstance(value, OK_TYPES):
+        return False
+    try:
+        json.dumps(value)
+    except Exception:  # pylint: disable=broad-except
+        return False
+    return True
+
+
+def limit_cpu(cpu_seconds):
+    """
+    Lets the next job use cpu_seconds more CPU time, within the process's hard limit.
+    """
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime + cpu_seconds) + 1
+    __, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def run_job(job):
+    """
+    Executes the job's code in its globals, and returns the globals to send back.
+    """
+    os.chdir(job["directory"])
+    sys.path.extend(job["python_path"])
+    g_dict = job["globals"]
+    exec job["code"] in g_dict  # pylint: disable=exec-used
+    return dict(
+        (key, value)
+        for key, value in g_dict.iteritems()
+        if jsonable(value) and key not in BAD_KEYS
+    )
+
+
+def main():
+    """
+    Warms up, then runs jobs until stdin is closed.
+    """
+    cpu_seconds = float(sys.argv[1])
+    for modname in sys.argv[2:]:
+        try:
+            __import__(modname)
+        except Exception:  # pylint: disable=broad-except
+            # The jobs will get the error when they use the module.
+            pass
+
+    output = sys.stdout
+    home = os.getcwd()
+    clean_path = list(sys.path)
+    clean_modules = dict(sys.modules)
+
+    output.write(json.dumps({"ready": True}) + "\n")
+    output.flush()
+
+    for line in iter(sys.stdin.readline, ""):
+        job = json.loads(line)
+        if cpu_seconds:
+            limit_cpu(cpu_seconds)
+        sys.stdout = DevNull()
+        try:
+            result = {"globals": run_job(job)}
+        except BaseException:  # pylint: disable=broad-except
+            result = {"error": traceback.format_exc()}
+        finally:
+            os.chdir(home)
+            sys.path[:] = clean_path
+            for modname in set(sys.modules) - set(clean_modules):
+                del sys.modules[modname]
+            sys.modules.update(clean_modules)
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+
+
+if __name__ == "__main__":
+    main()
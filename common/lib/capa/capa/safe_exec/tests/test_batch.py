@@ -0,0 +1,92 @@
+"""Test batch.py"""
+
+import random
+import sys
+import unittest
+
+from codejail import jail_code
+from codejail.safe_exec import SafeExecException
+from mock import patch
+
+from capa.safe_exec.batch import SafeExecBatch, SafeExecDeferred
+from capa.safe_exec import sandbox_pool
+from capa.safe_exec.safe_exec import safe_exec, safe_exec_batch
+
+
+@patch.dict(jail_code.COMMANDS, {"python": {"cmdline_start": [sys.executable, "-E", "-B"], "user": None}})
+class TestSafeExecBatch(unittest.TestCase):
+    """
+    Test executing code in batches, with the test's Python standing in for the sandbox.
+    """
+    def test_safe_exec_batch(self):
+        results = safe_exec_batch(
+            "rnums = [random.randint(0, 999) for _ in xrange(3)]\nhalf = x / 2\ninverse = 1 / (x - 3)",
+            [(17, {"x": 1}), (17, {"x": 3}), (18, {"x": 5})],
+        )
+        r = random.Random(17)
+        emsg, results_globals = results[0]
+        self.assertIsNone(emsg)
+        self.assertEqual(results_globals["rnums"], [r.randint(0, 999) for _ in xrange(3)])
+        self.assertEqual(results_globals["half"], 0.5)
+        self.assertIn("ZeroDivisionError", results[1][0])
+        self.assertEqual(results[2][1]["inverse"], 0.5)
+
+    @patch.dict(jail_code.LIMITS, {"CPU": 1, "REALTIME": 5})
+    def test_batch_process(self):
+        with patch.object(sandbox_pool, "SandboxProcess", wraps=sandbox_pool.SandboxProcess) as mock_process:
+            results = safe_exec_batch("a = int(numpy.sum([x, 1]))", [(1, {"x": 1}), (2, {"x": 2}), (3, {"x": 3})])
+        # Numpy is imported once for the batch, not again for each input.
+        self.assertEqual(results, [(None, {"x": 1, "a": 2}), (None, {"x": 2, "a": 3}), (None, {"x": 3, "a": 4})])
+        self.assertEqual(mock_process.call_args[1]["limits"]["CPU"], 3)
+        self.assertEqual(mock_process.call_args[1]["limits"]["REALTIME"], 15)
+        # Codejail's own limits are unchanged.
+        self.assertEqual((jail_code.LIMITS["CPU"], jail_code.LIMITS["REALTIME"]), (1, 5))
+
+    def test_collect_and_use_results(self):
+        def work(x, results):
+            """Executes two pieces of code, the second using the results of the first."""
+            g = {"x": x}
+            try:
+                safe_exec("y = x * 2", g)
+                safe_exec("z = 1 / (y - 4)", g)
+            except SafeExecException as exc:
+                g = exc.message
+            results.append(g)
+
+        batch = SafeExecBatch()
+        with patch.object(sandbox_pool, "SandboxProcess", wraps=sandbox_pool.SandboxProcess) as mock_process:
+            waiting = [1, 2, 2, 3]
+            rounds = 0
+            while waiting:
+                rounds += 1
+                waiting = [x for x in waiting if not batch.collect(lambda x=x: work(x, []))]
+                batch.run_pending()
+            self.assertEqual(rounds, 3)
+            # One sandboxed process for each of the two rounds with executions to run
+            self.assertEqual(mock_process.call_count, 2)
+
+            results = []
+            with batch.activate():
+                for x in (1, 2, 3):
+                    work(x, results)
+            self.assertEqual(mock_process.call_count, 2)
+        self.assertEqual(results[0], {"x": 1, "y": 2, "z": -0.5})
+        self.assertIn("ZeroDivisionError", results[1])
+        self.assertEqual(results[2], {"x": 3, "y": 6, "z": 0.5})
+
+    def test_executions_without_results(self):
+        batch = SafeExecBatch()
+        with batch.activate(collecting=True):
+            with self.assertRaises(SafeExecDeferred):
+                safe_exec("a = 17", {})
+
+        # Outside of collecting, the executions run as usual.
+        g = {}
+        with batch.activate():
+            safe_exec("a = 17", g)
+        self.assertEqual(g["a"], 17)
+
+        # Executions run unsafely aren't collected.
+        with batch.activate(collecting=True):
+            safe_exec("b = 17", g, unsafely=True)
+        self.assertEqual(g["b"], 17)
@@ -0,0 +1,114 @@
+"""Test sandbox_pool.py"""
+
+import os.path
+import sys
+import unittest
+
+from codejail import jail_code
+from codejail.safe_exec import SafeExecException
+from mock import patch
+
+from capa.safe_exec import safe_exec, sandbox_pool
+
+
+@patch.dict(jail_code.COMMANDS, {"python": {"cmdline_start": [sys.executable, "-E", "-B"], "user": None}})
+class TestSandboxPool(unittest.TestCase):
+    """
+    Test executing code in a pool of processes running the test's Python, without a sandbox user.
+    """
+    def make_pool(self, size=1, **options):
+        """
+        Returns a SandboxPool of the given size, which is closed at the end of the test.
+        """
+        pool = sandbox_pool.SandboxPool(size, warm_imports=["math"], **options)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_set_values(self):
+        pool = self.make_pool()
+        g = {"x": 3}
+        pool.safe_exec("from __future__ import division\na = x / 2", g)
+        self.assertEqual(g, {"x": 3, "a": 1.5})
+
+    def test_python_path(self):
+        pool = self.make_pool()
+        pylib = os.path.dirname(__file__) + "/test_files/pylib"
+        g = {}
+        pool.safe_exec("import constant; a = constant.THE_CONST", g, python_path=[pylib])
+        self.assertEqual(g["a"], 23)
+
+        # The module isn't left behind for the next execution.
+        pool.safe_exec("import sys; imported = 'constant' in sys.modules", g)
+        self.assertFalse(g["imported"])
+
+    def test_raising_exceptions(self):
+        pool = self.make_pool()
+        with self.assertRaises(SafeExecException) as cm:
+            pool.safe_exec("1/0", {})
+        self.assertIn("ZeroDivisionError", cm.exception.message)
+
+    def test_processes_are_recycled(self):
+        pool = self.make_pool(max_executions=2)
+        pids = []
+        for __ in xrange(3):
+            g = {}
+            pool.safe_exec("import os; pid = os.getpid()", g)
+            pids.append(g["pid"])
+        self.assertEqual(pids[0], pids[1])
+        self.assertNotEqual(pids[1], pids[2])
+
+        # Any error replaces the process too.
+        with self.assertRaises(SafeExecException):
+            pool.safe_exec("import os; pid = os.getpid(); 1/0", g)
+        pool.safe_exec("import os; pid = os.getpid()", g)
+        self.assertNotEqual(g["pid"], pids[2])
+
+    @patch.dict(jail_code.LIMITS, {"REALTIME": 1})
+    def test_realtime_limit(self):
+        pool = self.make_pool()
+        with self.assertRaises(SafeExecException):
+            pool.safe_exec("import time; time.sleep(30)", {})
+        g = {}
+        pool.safe_exec("a = 17", g)
+        self.assertEqual(g["a"], 17)
+
+    def test_retiring_in_the_background(self):
+        process = sandbox_pool.SandboxProcess(["math"], max_executions=1)
+        self.assertTrue(process.wait_ready())
+        process.execute("a = 17", {})
+        self.assertTrue(process.retired)
+        process.cleaner.join(10)
+        self.assertFalse(process.cleaner.is_alive())
+        self.assertIsNotNone(process.process.poll())
+        self.assertFalse(os.path.exists(process.home))
+
+    @patch.dict(jail_code.LIMITS, {"REALTIME": 1})
+    def test_retiring_doesnt_wait_for_the_process(self):
+        process = sandbox_pool.SandboxProcess(["math"], max_executions=2)
+        self.assertTrue(process.wait_ready())
+        # The process doesn't stop when its stdin closes, until it is killed.
+        process.process.stdin.write('{"code": "import time; time.sleep(30)", "globals": {}, ')
+        process.process.stdin.write('"directory": ".", "python_path": []}\n')
+        process.process.stdin.flush()
+        process.retire()
+        self.assertIsNone(process.process.poll())
+        process.cleaner.join(10)
+        self.assertIsNotNone(process.process.poll())
+        self.assertFalse(os.path.exists(process.home))
+
+    def test_busy(self):
+        pool = self.make_pool(max_waiting=0)
+        with patch.object(pool.admission, "acquire", return_value=False):
+            with self.assertRaises(SafeExecException) as cm:
+                pool.safe_exec("a = 17", {})
+        self.assertIn("busy", cm.exception.message)
+
+    def test_safe_exec_uses_pool(self):
+        self.addCleanup(sandbox_pool.configure)
+        sandbox_pool.configure(size=1)
+        g = {}
+        safe_exec("rnums = [random.randint(0, 999) for _ in xrange(3)]; pi = int(math.pi)", g, random_seed=17)
+        self.assertEqual(g["pi"], 3)
+        with patch.object(sandbox_pool.SandboxPool, "safe_exec", side_effect=SafeExecException("pooled")):
+            with self.assertRaisesRegexp(SafeExecException, "pooled"):
+                safe_exec("a = 17", {})
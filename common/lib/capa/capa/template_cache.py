@@ -0,0 +1,112 @@
+"""
+An in-process cache of the templates which capa problems are built from.
+
+Building a LoncapaProblem parses its XML, reads the files it includes, and
+executes its scripts, whose results only depend on the problem's definition, its
+seed and a few settings of its LoncapaSystem: learners who share a seed get the
+same ones.  The TemplateCache keeps the parsed tree and the script context, keyed
+by hashes of what they depend on, and gives each problem its own copy of them,
+which it is free to change.
+
+Each process has one cache, which `configure` sizes; it is off by default.  The
+hits and misses are counted in the `capa.template_cache` metric, tagged with the
+kind of template, so that the hit rate can be followed.
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from copy import deepcopy
+
+import dogstats_wrapper as dog_stats_api
+
+log = logging.getLogger(__name__)
+
+METRIC_NAME = 'capa.template_cache'
+
+
+class TemplateCache(object):
+    """
+    A least-recently-used cache of templates, which returns copies of them.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.templates = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @property
+    def hit_rate(self):
+        """
+        The fraction of the lookups which found their template, or None before any lookup.
+        """
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else None
+
+    def get(self, kind, key, build):
+        """
+        Returns a copy of the template of the given kind and key, calling build() to make
+        the template if the cache doesn't have it.
+
+        The value that build returns is kept as the template, so it must not be used by the
+        caller afterwards.  Nothing is kept if build raises an exception.
+        """
+        key = (kind, key)
+        with self.lock:
+            template = self.templates.get(key)
+            if template is not None:
+                # Move to the end, as the most recently used
+                del self.templates[key]
+                self.templates[key] = template
+                self.hits += 1
+            else:
+                self.misses += 1
+        dog_stats_api.increment(METRIC_NAME, tags=[
+            u'kind:{}'.format(kind),
+            u'result:{}'.format('hit' if template is not None else 'miss'),
+        ])
+
+        if template is None:
+            template = build()
+            with self.lock:
+                self.templates[key] = template
+                while len(self.templates) > self.size:
+                    self.templates.popitem(last=False)
+        return deepcopy(template)
+
+
+_CACHE = None
+
+
+def configure(size=0):
+    """
+    Sizes this process's cache of problem templates.
+
+    Arguments:
+        size (int): the number of templates kept; 0 turns the cache off
+    """
+    global _CACHE  # pylint: disable=global-statement
+    _CACHE = TemplateCache(size) if size else None
+
+
+def get_cache():
+    """
+    Returns this process's TemplateCache, or None if the cache is off.
+    """
+    return _CACHE
+
+
+def template_key(*parts):
+    """
+    Returns a hash of the parts, which are strings or other values with a stable repr.
+    """
+    md5er = hashlib.md5()
+    for part in parts:
+        if isinstance(part, unicode):
+            part = part.encode('utf-8')
+        elif not isinstance(part, str):
+            part = repr(part)
+        md5er.update(part)
+        md5er.update('\0')
+    return md5er.hexdigest()
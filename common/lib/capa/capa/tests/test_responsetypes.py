@@ -619,6 +619,27 @@ class FormulaResponseTest(ResponseTest):
         self.assertTrue(problem.responders.values()[0].validate_answer('14*x'))
         self.assertFalse(problem.responders.values()[0].validate_answer('3*y+2*x'))
 
+    def test_samples_evaluated_at_once(self):
+        """
+        Test that answers are evaluated for all the samples at once, and one
+        sample at a time when they can't be evaluated that way.
+        """
+        sample_dict = {'x': (1, 2), 'y': (3, 4)}
+        problem = self.build_problem(
+            sample_dict=sample_dict,
+            num_samples=10,
+            tolerance="0.01%",
+            answer="arccot(x) + sec(y)*i"
+        )
+        with mock.patch('capa.responsetypes.evaluator', wraps=calc.evaluator) as mock_eval:
+            self.assert_grade(problem, "pi/2 - arctan(x) + i/cos(y)", "correct")
+            self.assert_grade(problem, "pi/2 - arctan(x) + i*cos(y)", "incorrect")
+            self.assertEqual(mock_eval.call_count, 0)
+
+            # The parallel operator doesn't take arrays of values.
+            self.assert_grade(problem, "(2*arccot(x) || 2*arccot(x)) + sec(y)*i", "correct")
+            self.assertEqual(mock_eval.call_count, 10)
+
 
 class StringResponseTest(ResponseTest):  # pylint: disable=missing-docstring
     xml_factory_class = StringResponseXMLFactory
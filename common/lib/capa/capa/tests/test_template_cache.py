@@ -0,0 +1,91 @@
+"""
+Test building capa problems from the template cache.
+"""
+import textwrap
+import unittest
+
+from mock import patch
+
+from capa import capa_problem, template_cache
+from capa.tests.helpers import new_loncapa_problem, test_capa_system
+
+
+class TemplateCacheTest(unittest.TestCase):
+    """
+    Test that problems built from cached templates are the same as those built without them.
+    """
+    xml = textwrap.dedent("""
+        <problem>
+            <script type="loncapa/python">
+    answer = random.randint(0, 1000)
+    {extra}
+            </script>
+            <p>What is $answer?</p>
+            <customresponse cfn="check" expect="$answer">
+                <textline size="10"/>
+            </customresponse>
+            <script type="loncapa/python">
+    def check(expect, ans):
+        return ans == str(answer)
+            </script>
+        </problem>
+    """)
+
+    def setUp(self):
+        super(TemplateCacheTest, self).setUp()
+        template_cache.configure(size=10)
+        self.addCleanup(template_cache.configure)
+
+    def build_problems(self, xml, students, seed=17):
+        """
+        Returns a problem for each of the students, and the number of times their code ran.
+        """
+        problems = []
+        with patch.object(capa_problem, 'safe_exec', wraps=capa_problem.safe_exec) as mock_safe_exec:
+            for student in students:
+                capa_system = test_capa_system()
+                capa_system.anonymous_student_id = student
+                problems.append(new_loncapa_problem(xml, capa_system=capa_system, seed=seed))
+        return problems, mock_safe_exec.call_count
+
+    def test_same_seed_shares_templates(self):
+        problems, executions = self.build_problems(self.xml.format(extra=""), ["alice", "bob"])
+        self.assertEqual(executions, 1)
+        alice, bob = problems
+        self.assertEqual(alice.context['answer'], bob.context['answer'])
+        self.assertEqual(alice.context['anonymous_student_id'], "alice")
+        self.assertEqual(bob.context['anonymous_student_id'], "bob")
+        self.assertEqual(alice.get_html(), bob.get_html())
+
+        # Each problem has its own copies.
+        self.assertIsNot(alice.tree, bob.tree)
+        self.assertIsNot(alice.context, bob.context)
+        answer = alice.context['answer']
+        self.assertEqual(alice.grade_answers({'1_2_1': str(answer)}).get_correctness('1_2_1'), 'correct')
+
+        cache = template_cache.get_cache()
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+        self.assertEqual(cache.hit_rate, 0.5)
+
+        # Another seed has its own context, from the same tree.
+        __, executions = self.build_problems(self.xml.format(extra=""), ["alice"], seed=18)
+        self.assertEqual(executions, 1)
+        self.assertEqual((cache.hits, cache.misses), (3, 3))
+
+    def test_student_specific_code(self):
+        xml = self.xml.format(extra="name = anonymous_student_id.upper()")
+        problems, executions = self.build_problems(xml, ["alice", "bob", "alice"])
+        self.assertEqual(executions, 2)
+        self.assertEqual([problem.context['name'] for problem in problems], ["ALICE", "BOB", "ALICE"])
+
+    def test_least_recently_used_are_dropped(self):
+        template_cache.configure(size=2)
+        cache = template_cache.get_cache()
+        for key in ("a", "b", "a", "c"):
+            self.assertEqual(cache.get("test", key, lambda key=key: [key]), [key])
+        self.assertEqual(cache.templates.keys(), [("test", "a"), ("test", "c")])
+
+    def test_off_by_default(self):
+        template_cache.configure()
+        __, executions = self.build_problems(self.xml.format(extra=""), ["alice", "bob"])
+        self.assertEqual(executions, 2)
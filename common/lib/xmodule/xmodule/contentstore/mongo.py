@@ -155,22 +155,33 @@ class MongoContentStore(ContentStore):
     def export(self, location, output_directory):
         content = self.find(location)
 
-        filename = content.name
         if content.import_path is not None:
-            output_directory = output_directory + '/' + os.path.dirname(content.import_path)
+            output_directory = output_directory + '/' + self._export_dirname(content.import_path)
 
         if not os.path.exists(output_directory):
             os.makedirs(output_directory)
 
-        # Escape invalid char from filename.
-        export_name = escape_invalid_characters(name=filename, invalid_char_list=['/', '\\'])
-
         disk_fs = OSFS(output_directory)
 
-        with disk_fs.open(export_name, 'wb') as asset_file:
+        with disk_fs.open(self._export_filename(content.name), 'wb') as asset_file:
             asset_file.write(content.data)
 
-    def export_all_for_course(self, course_key, output_directory, assets_policy_file):
+    @staticmethod
+    def _export_dirname(import_path):
+        """
+        Returns the directory, relative to the export's static directory, of an asset with the given import path.
+        """
+        return os.path.dirname(import_path) if import_path is not None else ''
+
+    @staticmethod
+    def _export_filename(name):
+        """
+        Returns the name of the exported file of an asset with the given name.
+        """
+        # Escape invalid char from filename.
+        return escape_invalid_characters(name=name, invalid_char_list=['/', '\\'])
+
+    def export_all_for_course(self, course_key, output_directory, assets_policy_file, previous_digests=None):
         """
         Export all of this course's assets to the output_directory. Export all of the assets'
         attributes to the policy file.
@@ -180,11 +191,27 @@ class MongoContentStore(ContentStore):
             output_directory: the directory under which to put all the asset files
             assets_policy_file: the filename for the policy file which should be in the same
                 directory as the other policy files.
+            previous_digests (dict): the result of a previous export of the course's assets to the same
+                output_directory. The assets whose files are still there, with the same md5 digest, aren't
+                read and written again.
+
+        Returns:
+            dict: the md5 digest of each asset's file, by its path relative to the output_directory
         """
         policy = {}
+        digests = {}
         assets, __ = self.get_all_content_for_course(course_key)
 
         for asset in assets:
+            export_path = os.path.join(
+                self._export_dirname(asset.get('import_path')), self._export_filename(asset['displayname'])
+            )
+            digest = asset.get('md5')
+            # Assets exported to the same path overwrite each other, so they must all be written again
+            unchanged = (
+                previous_digests is not None and digest is not None and previous_digests.get(export_path) == digest
+                and export_path not in digests and os.path.isfile(os.path.join(output_directory, export_path))
+            )
             # TODO: On 6/19/14, I had to put a try/except around this
             # to export a course. The course failed on JSON files in
             # the /static/ directory placed in it with an import.
@@ -193,7 +220,9 @@ class MongoContentStore(ContentStore):
             #
             # When debugging course exports, this might be a good place
             # to look. -- pmitros
-            self.export(asset['asset_key'], output_directory)
+            if not unchanged:
+                self.export(asset['asset_key'], output_directory)
+            digests[export_path] = digest
             for attr, value in asset.iteritems():
                 if attr not in ['_id', 'md5', 'uploadDate', 'length', 'chunkSize', 'asset_key']:
                     policy.setdefault(asset['asset_key'].name, {})[attr] = value
@@ -201,6 +230,8 @@ class MongoContentStore(ContentStore):
         with open(assets_policy_file, 'w') as f:
             json.dump(policy, f, sort_keys=True, indent=4)
 
+        return digests
+
     def get_all_content_thumbnails_for_course(self, course_key):
         return self._get_all_content_for_course(course_key, get_thumbnails=True)[0]
 
@@ -26,6 +26,7 @@ from django.utils.translation import get_language, to_locale
 
 from pymongo import ReadPreference
 from xmodule.contentstore.django import contentstore
+from xmodule.modulestore import query_instrumentation
 from xmodule.modulestore.draft_and_published import BranchSettingMixin
 from xmodule.modulestore.mixed import MixedModuleStore
 from xmodule.util.django import get_current_request_hostname
@@ -342,6 +343,9 @@ def modulestore():
             from lms.djangoapps.ccx.modulestore import CCXModulestoreWrapper
             _MIXED_MODULESTORE = CCXModulestoreWrapper(_MIXED_MODULESTORE)
 
+        if getattr(settings, 'MODULESTORE_QUERY_STATS', False):
+            query_instrumentation.add_listener(REQUEST_QUERY_STATS)
+
     return _MIXED_MODULESTORE
 
 
@@ -356,6 +360,38 @@ def clear_existing_modulestores():
     _MIXED_MODULESTORE = None
 
 
+def get_request_query_stats():
+    """
+    Returns the QueryStats of the modulestore queries made during the current request, or
+    None if they aren't being measured. They are measured if settings.MODULESTORE_QUERY_STATS
+    is True.
+    """
+    if not HAS_REQUEST_CACHE or not getattr(settings, 'MODULESTORE_QUERY_STATS', False):
+        return None
+    return RequestCache.get_request_cache().data.setdefault(
+        'modulestore_query_stats', query_instrumentation.QueryStats()
+    )
+
+
+class RequestQueryStats(query_instrumentation.QueryListener):
+    """
+    A query listener which accumulates the queries made during each request in the
+    QueryStats returned by get_request_query_stats.
+    """
+    def round_trip(self, store, operation, course_key, size):
+        stats = get_request_query_stats()
+        if stats is not None:
+            stats.round_trip(store, operation, course_key, size)
+
+    def decode(self, store, course_key, duration):
+        stats = get_request_query_stats()
+        if stats is not None:
+            stats.decode(store, course_key, duration)
+
+
+REQUEST_QUERY_STATS = RequestQueryStats()
+
+
 class ModuleI18nService(object):
     """
     Implement the XBlock runtime "i18n" service.
@@ -329,9 +329,36 @@ class InheritingFieldData(KvsFieldData):
         return super(InheritingFieldData, self).default(block, name)
 
 
-def inheriting_field_data(kvs):
-    """Create an InheritanceFieldData that inherits the names in InheritanceMixin."""
-    return InheritingFieldData(
+class PrecomputedInheritingFieldData(InheritingFieldData):
+    """
+    An `InheritingFieldData` whose kvs's inherited_settings already hold the
+    values set by the block's ancestors, so that they are found without
+    walking up the content tree.
+    """
+    def default(self, block, name):
+        """
+        The default for an inheritable name is the value set by the nearest
+        ancestor, found in the kvs's inherited_settings.
+        """
+        if name in self.inheritable_names:
+            # As InheritingFieldData does, use the kvs' default for the
+            # children of 'library_content' blocks.
+            parent = block.parent
+            if parent is not None and parent.block_type == 'library_content' and self.has_default_value(name):
+                return KvsFieldData.default(self, block, name)
+            if name in self._kvs.inherited_settings:
+                return self._kvs.inherited_settings[name]
+        return KvsFieldData.default(self, block, name)
+
+
+def inheriting_field_data(kvs, precomputed=False):
+    """
+    Create an InheritanceFieldData that inherits the names in InheritanceMixin.
+
+    If precomputed, the values which the block inherits are the kvs's inherited_settings.
+    """
+    field_data_class = PrecomputedInheritingFieldData if precomputed else InheritingFieldData
+    return field_data_class(
         inheritable_names=InheritanceMixin.fields.keys(),
         kvs=kvs,
     )
@@ -19,6 +19,7 @@ import logging
 import pymongo
 import re
 import sys
+from time import time
 from uuid import uuid4
 
 from bson.son import SON
@@ -43,6 +44,7 @@ from xmodule.exceptions import HeartbeatFailure
 from xmodule.mako_module import MakoDescriptorSystem
 from xmodule.mongo_utils import connect_to_mongodb, create_collection_index
 from xmodule.modulestore import ModuleStoreWriteBase, ModuleStoreEnum, BulkOperationsMixin, BulkOpsRecord
+from xmodule.modulestore import query_instrumentation
 from xmodule.modulestore.draft_and_published import ModuleStoreDraftAndPublished, DIRECT_ONLY_CATEGORIES
 from xmodule.modulestore.edit_info import EditInfoRuntimeMixin
 from xmodule.modulestore.exceptions import ItemNotFoundError, DuplicateCourseError, ReferentialIntegrityError
@@ -706,7 +708,10 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             record_filter['metadata.{0}'.format(field_name)] = 1
 
         # call out to the DB
-        resultset = self.collection.find(query, record_filter)
+        resultset = list(self.collection.find(query, record_filter))
+        query_instrumentation.record_round_trip(
+            ModuleStoreEnum.Type.mongo, 'compute_metadata_inheritance_tree', course_id, resultset
+        )
 
         # it's ok to keep these as deprecated strings b/c the overall cache is indexed by course_key and this
         # is a dictionary relative to that course
@@ -840,7 +845,9 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                 UsageKey.from_string(item).map_into_course(course_key).to_deprecated_son() for item in items
             ]}
         }
-        return list(self.collection.find(query))
+        children = list(self.collection.find(query))
+        query_instrumentation.record_round_trip(ModuleStoreEnum.Type.mongo, 'cache_children', course_key, children)
+        return children
 
     def _cache_children(self, course_key, items, depth=0):
         """
@@ -972,7 +979,8 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
 
         # if we are loading a course object, if we're not prefetching children (depth != 0) then don't
         # bother with the metadata inheritance
-        return [
+        start = time()
+        modules = [
             self._load_item(
                 course_key,
                 item,
@@ -983,6 +991,8 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             )
             for item in items
         ]
+        query_instrumentation.record_decode(ModuleStoreEnum.Type.mongo, course_key, time() - start)
+        return modules
 
     def _should_apply_cached_metadata(self, item, depth):
         """
@@ -1074,6 +1084,7 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         item = self.collection.find_one(
             {'_id': location.to_deprecated_son()}
         )
+        query_instrumentation.record_round_trip(ModuleStoreEnum.Type.mongo, 'find_one', location.course_key, [item])
         if item is None:
             raise ItemNotFoundError(location)
         return item
@@ -1266,14 +1277,15 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             query['definition.children'] = qualifiers.pop('children')
 
         query.update(qualifiers)
-        items = self.collection.find(
+        items = list(self.collection.find(
             query,
             sort=[SORT_REVISION_FAVOR_DRAFT],
-        )
+        ))
+        query_instrumentation.record_round_trip(ModuleStoreEnum.Type.mongo, 'get_items', course_id, items)
 
         modules = self._load_items(
             course_id,
-            list(items),
+            items,
             using_descriptor_system=using_descriptor_system
         )
         return modules
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+Compares the time taken to compute the inherited settings of a synthetic
+split course structure with SplitMongoModuleStore.inherit_settings and with
+the recursive implementation it replaced.
+"""
+
+import timeit
+
+from xmodule.modulestore import BlockData
+from xmodule.modulestore.inheritance import InheritanceMixin
+from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore
+
+try:
+    import click
+except ImportError:
+    click = None
+
+
+# The number of children of each block at each level below the course, which
+# gives 20 + 200 + 2,000 + 18,000 = 20,220 blocks below the course by default.
+FANOUT = (('chapter', 20), ('sequential', 10), ('vertical', 10), ('problem', 9))
+
+
+def make_structure(fanout=FANOUT):
+    """
+    Returns the blocks of a synthetic course structure and its root block key.
+    Every tenth block sets an inheritable setting.
+    """
+    root = BlockKey('course', 'course')
+    blocks = {root: BlockData(block_type='course', fields={'children': [], 'graded': False})}
+    level = [root]
+    count = 0
+    for block_type, num_children in fanout:
+        next_level = []
+        for parent in level:
+            for _ in range(num_children):
+                count += 1
+                block_key = BlockKey(block_type, u'{}{}'.format(block_type, count))
+                fields = {'children': [], 'display_name': block_key.id}
+                if count % 10 == 0:
+                    fields['due'] = u'2030-01-01T00:00:{:02d}Z'.format(count % 60)
+                blocks[block_key] = BlockData(block_type=block_type, fields=fields)
+                blocks[parent].fields['children'].append(block_key)
+                next_level.append(block_key)
+        level = next_level
+    return blocks, root
+
+
+def recursive_inherit_settings(block_map, block_key, inherited_settings_map, inheriting_settings=None,
+                               inherited_from=None):
+    """
+    The recursive implementation of inherit_settings, for comparison.
+    """
+    if block_key not in block_map:
+        return
+    block_data = block_map[block_key]
+    if inheriting_settings is None:
+        inheriting_settings = {}
+    if inherited_from is None:
+        inherited_from = []
+
+    inherited_settings_map.setdefault(block_key, {}).update(inheriting_settings)
+    inheriting_settings = inherited_settings_map[block_key].copy()
+    block_fields = block_data.fields
+    for field_name in InheritanceMixin.fields:
+        if field_name in block_fields:
+            inheriting_settings[field_name] = block_fields[field_name]
+
+    for child in block_fields.get('children', []):
+        if child in inherited_from:
+            raise Exception(u'Infinite loop detected')
+        recursive_inherit_settings(
+            block_map, BlockKey(*child), inherited_settings_map, inheriting_settings, inherited_from + [child]
+        )
+
+
+def run_benchmark(repeat):
+    """
+    Computes the inherited settings of the synthetic course with both
+    implementations, returning the best time in seconds of each, as a tuple
+    (recursive, iterative).
+    """
+    blocks, root = make_structure()
+
+    def recursive():
+        inherited_settings_map = {}
+        recursive_inherit_settings(blocks, root, inherited_settings_map)
+        return inherited_settings_map
+
+    def iterative():
+        inherited_settings_map = {}
+        SplitMongoModuleStore.inherit_settings.__func__(None, blocks, root, inherited_settings_map)
+        return inherited_settings_map
+
+    assert recursive() == iterative()
+    return (
+        min(timeit.repeat(recursive, number=1, repeat=repeat)),
+        min(timeit.repeat(iterative, number=1, repeat=repeat)),
+    )
+
+
+if click is not None:
+    # pylint: disable=bad-continuation
+    @click.command()
+    @click.option('--repeat',
+                  type=click.INT,
+                  default=3,
+                  help="Number of timed runs of each implementation.",
+                  required=False
+                  )
+    def cli(repeat):
+        """
+        Times computing the inherited settings of a synthetic course.
+        """
+        recursive_time, iterative_time = run_benchmark(repeat)
+        click.echo(u"Blocks: {}".format(len(make_structure()[0])))
+        click.echo(u"Recursive: {:.3f}s".format(recursive_time))
+        click.echo(u"Iterative: {:.3f}s".format(iterative_time))
+        click.echo(u"Speedup: {:.1f}x".format(recursive_time / iterative_time))
+
+if __name__ == '__main__':
+    if click is not None:
+        cli()  # pylint: disable=no-value-for-parameter
+    else:
+        print "Aborted! Module 'click' is not installed."
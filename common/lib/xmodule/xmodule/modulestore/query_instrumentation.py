@@ -0,0 +1,144 @@
+"""
+Instrumentation of the queries which the modulestores make to Mongo.
+
+The modulestores report each round trip to Mongo, with the size of the
+documents it read, and the time they spend decoding what they read, to the
+listeners added with add_listener.  Nothing is measured while there are no
+listeners.  QueryStats is a listener which accumulates these measurements, in
+total and per course.
+"""
+from collections import defaultdict
+
+from bson import BSON
+
+
+_LISTENERS = []
+
+
+def add_listener(listener):
+    """
+    Adds the given QueryListener, to be told of all the queries of all the modulestores.
+    """
+    if listener not in _LISTENERS:
+        _LISTENERS.append(listener)
+
+
+def remove_listener(listener):
+    """
+    Removes the given QueryListener, if it was added.
+    """
+    if listener in _LISTENERS:
+        _LISTENERS.remove(listener)
+
+
+def is_active():
+    """
+    Returns whether there are any listeners, and so whether the queries should be measured.
+    """
+    return bool(_LISTENERS)
+
+
+def documents_size(documents):
+    """
+    Returns the total size of the BSON encoding of the given Mongo documents.
+    """
+    return sum(len(BSON.encode(document)) for document in documents if document is not None)
+
+
+def record_round_trip(store, operation, course_key, documents=()):
+    """
+    Tells the listeners of a round trip to Mongo.
+
+    Arguments:
+        store (str): the type of the modulestore which made the query, as in ModuleStoreEnum.Type
+        operation (str): the name of the query
+        course_key (CourseKey): the course which the query was made for, if known
+        documents (list): the documents read by the query, before being decoded
+    """
+    if not _LISTENERS:
+        return
+    size = documents_size(documents)
+    for listener in list(_LISTENERS):
+        listener.round_trip(store, operation, course_key, size)
+
+
+def record_decode(store, course_key, duration):
+    """
+    Tells the listeners of the time, in seconds, that a modulestore spent decoding documents
+    read for the given course.
+    """
+    for listener in list(_LISTENERS):
+        listener.decode(store, course_key, duration)
+
+
+class QueryListener(object):
+    """
+    Base class of the listeners of the modulestores' queries.
+    """
+    def round_trip(self, store, operation, course_key, size):
+        """
+        Called for each round trip to Mongo, with the size in bytes of the documents it read.
+        """
+        pass
+
+    def decode(self, store, course_key, duration):
+        """
+        Called with the time in seconds spent decoding documents read for the given course.
+        """
+        pass
+
+
+class QueryCounts(object):
+    """
+    The accumulated measurements of some modulestore queries.
+    """
+    def __init__(self):
+        self.round_trips = 0
+        self.bytes = 0
+        self.decode_time = 0.0
+        # Map of (store, operation) to the number of round trips
+        self.operations = defaultdict(int)
+
+    def __repr__(self):
+        return 'QueryCounts(round_trips={}, bytes={}, decode_time={:.6f})'.format(
+            self.round_trips, self.bytes, self.decode_time
+        )
+
+
+class QueryStats(QueryListener):
+    """
+    A listener which accumulates the measurements of the queries, in total and per course.
+    """
+    def __init__(self):
+        self.totals = QueryCounts()
+        # Map of course key (or None if not known) to QueryCounts
+        self.courses = defaultdict(QueryCounts)
+
+    def _counts(self, course_key):
+        """
+        Returns the QueryCounts to update for the given course.
+        """
+        return (self.totals, self.courses[_course_id(course_key)])
+
+    def round_trip(self, store, operation, course_key, size):
+        for counts in self._counts(course_key):
+            counts.round_trips += 1
+            counts.bytes += size
+            counts.operations[(store, operation)] += 1
+
+    def decode(self, store, course_key, duration):
+        for counts in self._counts(course_key):
+            counts.decode_time += duration
+
+
+def _course_id(course_key):
+    """
+    Returns the course key of the given course or usage key without branch or version, so
+    that all the queries for a course are accumulated together.
+    """
+    if course_key is None:
+        return None
+    course_key = getattr(course_key, 'course_key', course_key)
+    if getattr(course_key, 'org', None) and hasattr(course_key, 'for_branch'):
+        course_key = course_key.for_branch(None).version_agnostic()
+    return course_key
@@ -1,11 +1,12 @@
 import sys
 import logging
+from functools import partial
 
 from contracts import contract, new_contract
 from fs.osfs import OSFS
 from lazy import lazy
 from xblock.runtime import KvsFieldData, KeyValueStore
-from xblock.fields import ScopeIds
+from xblock.fields import Scope, ScopeIds
 from xblock.core import XBlock
 from opaque_keys.edx.locator import BlockUsageLocator, LocalId, CourseLocator, LibraryLocator, DefinitionLocator
 
@@ -82,8 +83,32 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
         self.module_data = module_data
         self.default_class = default_class
         self.local_modules = {}
+        # A function returning the map of block key to the inheritable settings set by the block's
+        # ancestors, which cache_items sets for structures which are no longer edited.  The map is
+        # loaded when a block first reads an inherited setting.
+        self.inherited_settings_loader = None
+        self._inherited_settings_map = None
+        # Map of block type to whether its blocks have content fields
+        self._has_content_fields = {}
         self._services['library_tools'] = LibraryToolsService(modulestore)
 
+    def has_content_fields(self, block_type):
+        """
+        Returns whether blocks of the given type have content scoped fields, which are
+        stored in their definitions, besides their children.
+        """
+        if block_type not in self._has_content_fields:
+            try:
+                block_class = self.mixologist.mix(self.load_block_type(block_type))
+            except Exception:  # pylint: disable=broad-except
+                # Let loading the block report the error; its definition may still be needed.
+                self._has_content_fields[block_type] = True
+            else:
+                self._has_content_fields[block_type] = any(
+                    field.scope == Scope.content for field in block_class.fields.itervalues()
+                )
+        return self._has_content_fields[block_type]
+
     @lazy
     @contract(returns="dict(BlockKey: BlockKey)")
     def _parent_map(self):
@@ -232,6 +257,13 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
         except AttributeError:
             pass
 
+        # Blocks of the structure find what they inherit in its inherited settings map, rather than
+        # by loading their ancestors.
+        if self.inherited_settings_loader is not None:
+            inherited_settings_loader = partial(self._get_inherited_settings, block_key)
+        else:
+            inherited_settings_loader = None
+
         try:
             kvs = SplitMongoKVS(
                 definition_loader,
@@ -239,11 +271,12 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
                 converted_defaults,
                 parent=parent,
                 aside_fields=aside_fields,
-                field_decorator=kwargs.get('field_decorator')
+                field_decorator=kwargs.get('field_decorator'),
+                inherited_settings_loader=inherited_settings_loader,
             )
 
             if InheritanceMixin in self.modulestore.xblock_mixins:
-                field_data = inheriting_field_data(kvs)
+                field_data = inheriting_field_data(kvs, precomputed=inherited_settings_loader is not None)
             else:
                 field_data = KvsFieldData(kvs)
 
@@ -285,6 +318,15 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
 
         return module
 
+    def _get_inherited_settings(self, block_key):
+        """
+        Returns the inheritable settings set by the ancestors of the block with the given key,
+        from the structure's inherited settings map, which is loaded on first use.
+        """
+        if self._inherited_settings_map is None:
+            self._inherited_settings_map = self.inherited_settings_loader()
+        return self._inherited_settings_map.get(block_key)
+
     def get_edited_by(self, xblock):
         """
         See :meth: cms.lib.xblock.runtime.EditInfoRuntimeMixin.get_edited_by
@@ -0,0 +1,202 @@
+"""
+Garbage collection of the split modulestore's structures and definitions.
+
+Every change to a split course creates a new structure, and every change to a block's content a
+new definition, and nothing removes the old ones. The StructureGarbageCollector marks the
+structures which are reachable from the course indexes' heads, with some of their history, and the
+definitions which those structures' blocks use, then removes (or archives) the rest of the
+documents in batches, recording a checkpoint after each so that an interrupted sweep can resume.
+"""
+import datetime
+import logging
+import time
+
+from bson.objectid import ObjectId
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from pytz import UTC
+
+log = logging.getLogger(__name__)
+
+
+class StructureGarbageCollector(object):
+    """
+    Removes the structures and definitions of a split modulestore which aren't reachable from
+    its course indexes.
+
+    A structure is reachable if it is the head of a branch of a course or library index, if it is
+    one of the ``history_depth`` previous versions of a head, or if a reachable structure is stored
+    as differences from it. A definition is reachable if a block of a reachable structure uses it.
+    Documents created less than ``min_age`` ago are never removed, so that the structures and
+    definitions of changes in progress are safe.
+    """
+    # The collections swept, as the names of the MongoConnection attributes
+    COLLECTIONS = ('structures', 'definitions')
+
+    def __init__(
+            self, db_connection, history_depth=0, min_age=datetime.timedelta(days=1), batch_size=1000,
+            batch_delay=0, archive=False
+    ):
+        """
+        Arguments:
+            db_connection (MongoConnection): the connection of the split modulestore to collect
+            history_depth (int): the number of previous versions of each head to keep
+            min_age (timedelta): the age of the youngest documents which may be removed
+            batch_size (int): the number of documents to remove at a time
+            batch_delay (float): the number of seconds to wait between batches, to throttle the load on Mongo
+            archive (bool): whether to copy the removed documents to archive collections, named as the
+                collections with '_archive' appended, before removing them
+        """
+        self.db_connection = db_connection
+        self.history_depth = history_depth
+        self.min_age = min_age
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.archive = archive
+
+        database = db_connection.database
+        prefix = db_connection.structures.name.rsplit('.', 1)[0]
+        self.checkpoints = database[prefix + '.gc_checkpoints']
+
+    def mark(self):
+        """
+        Returns the sets of the ids of the reachable structures and definitions, as a tuple.
+        """
+        # Map of structure id to the number of its previous versions still to keep
+        frontier = {}
+        for course_index in self.db_connection.course_index.find({}, {'versions': 1}):
+            for version in course_index.get('versions', {}).itervalues():
+                frontier[version] = max(frontier.get(version, 0), self.history_depth)
+
+        # Map of marked structure id to the number of its previous versions kept
+        marked = {}
+        definition_ids = set()
+        while frontier:
+            marked.update(frontier)
+            next_frontier = {}
+            fields = {'previous_version': 1, 'base_version': 1, 'blocks.definition': 1}
+            for batch in _batches(list(frontier), self.batch_size):
+                for structure in self.db_connection.structures.find({'_id': {'$in': batch}}, fields):
+                    definition_ids.update(
+                        block['definition'] for block in structure.get('blocks', []) if 'definition' in block
+                    )
+                    remaining = frontier[structure['_id']]
+                    # The bases of reachable structures are needed to read them, but not their history
+                    versions = [(structure.get('base_version'), 0)]
+                    if remaining > 0:
+                        versions.append((structure.get('previous_version'), remaining - 1))
+                    for version, version_remaining in versions:
+                        if version is None or marked.get(version, -1) >= version_remaining:
+                            continue
+                        next_frontier[version] = max(next_frontier.get(version, 0), version_remaining)
+            frontier = next_frontier
+
+        return set(marked), definition_ids
+
+    def collect(self, dry_run=True, resume=False):
+        """
+        Marks the reachable structures and definitions and sweeps the rest.
+
+        Arguments:
+            dry_run (bool): if True, only counts the unreachable documents, without removing them
+            resume (bool): if True, resumes the sweep of each collection after its last checkpoint,
+                with the same age limit, instead of starting it over
+
+        Returns a dict of each collection's name to the number of unreachable documents found and an
+        estimate of their size in bytes, as a dict {'documents': int, 'bytes': int}.
+        """
+        structure_ids, definition_ids = self.mark()
+        log.info(
+            "Marked %d reachable structures and %d reachable definitions", len(structure_ids), len(definition_ids)
+        )
+        return {
+            'structures': self.sweep('structures', structure_ids, dry_run, resume),
+            'definitions': self.sweep('definitions', definition_ids, dry_run, resume),
+        }
+
+    def sweep(self, collection_name, reachable_ids, dry_run=True, resume=False):
+        """
+        Removes the documents of the given collection, one of COLLECTIONS, which aren't among the
+        given reachable ids and are older than min_age, in batches of batch_size, in order of id.
+
+        Returns the number of documents removed, or which would be removed if dry_run, and an estimate
+        of their size in bytes, as a dict {'documents': int, 'bytes': int}.
+        """
+        collection = getattr(self.db_connection, collection_name)
+        checkpoint = self.checkpoints.find_one({'_id': collection_name}) if resume else None
+        if checkpoint is None:
+            cutoff = datetime.datetime.now(UTC) - self.min_age
+            checkpoint = {'_id': collection_name, 'cutoff': ObjectId.from_datetime(cutoff), 'last_id': None}
+            if not dry_run:
+                self.checkpoints.save(checkpoint)
+
+        query = {'_id': {'$lt': checkpoint['cutoff']}}
+        if checkpoint['last_id'] is not None:
+            query['_id']['$gt'] = checkpoint['last_id']
+
+        average_size = _average_size(collection)
+        removed = 0
+        candidates = (document['_id'] for document in collection.find(query, {'_id': 1}).sort('_id', 1))
+        unreachable = (document_id for document_id in candidates if document_id not in reachable_ids)
+        for batch in _batches(unreachable, self.batch_size):
+            removed += len(batch)
+            if dry_run:
+                continue
+            if self.archive:
+                self._archive(collection, batch)
+            collection.remove({'_id': {'$in': batch}})
+            checkpoint['last_id'] = batch[-1]
+            self.checkpoints.save(checkpoint)
+            log.info("Removed %d unreachable documents from %s, up to %s", removed, collection.name, batch[-1])
+            if self.batch_delay:
+                time.sleep(self.batch_delay)
+
+        if not dry_run:
+            self.checkpoints.remove({'_id': collection_name})
+        return {'documents': removed, 'bytes': removed * average_size}
+
+    def _archive(self, collection, document_ids):
+        """
+        Copies the documents with the given ids to the archive collection of the given collection.
+        Documents already archived, by a sweep which was interrupted, are skipped.
+        """
+        documents = list(collection.find({'_id': {'$in': document_ids}}))
+        if not documents:
+            return
+        archive = collection.database[collection.name + '_archive']
+        try:
+            archive.insert(documents, continue_on_error=True)
+        except DuplicateKeyError:
+            pass
+
+    def compact(self):
+        """
+        Asks Mongo to compact the swept collections, to release the space of the removed documents.
+        N.B. compact blocks the operations on the database while it runs.
+        """
+        for collection_name in self.COLLECTIONS:
+            collection = getattr(self.db_connection, collection_name)
+            collection.database.command('compact', collection.name)
+
+
+def _batches(iterable, batch_size):
+    """
+    Yields the items of the given iterable in lists of at most batch_size items.
+    """
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _average_size(collection):
+    """
+    Returns Mongo's average size in bytes of the documents of the given collection, or 0 if unknown.
+    """
+    try:
+        return int(collection.database.command('collstats', collection.name).get('avgObjSize', 0))
+    except OperationFailure:
+        return 0
@@ -8,13 +8,16 @@ import zlib
 import pymongo
 import pytz
 import re
+from collections import OrderedDict
 from contextlib import contextmanager
+from threading import Lock
 from time import time
 
 # Import this just to export it
 from pymongo.errors import DuplicateKeyError  # pylint: disable=unused-import
 
 try:
+    from django.conf import settings
     from django.core.cache import caches, InvalidCacheBackendError
     DJANGO_AVAILABLE = True
 except ImportError:
@@ -26,7 +29,9 @@ import logging
 from contracts import check, new_contract
 from mongodb_proxy import autoretry_read
 from xmodule.exceptions import HeartbeatFailure
-from xmodule.modulestore import BlockData
+from xmodule.modulestore import BlockData, EditInfo, ModuleStoreEnum
+from xmodule.modulestore import query_instrumentation
+from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.modulestore.split_mongo import BlockKey
 from xmodule.mongo_utils import connect_to_mongodb, create_collection_index
 
@@ -163,6 +168,13 @@ class QueryTimer(object):
 TIMER = QueryTimer(__name__, 0.01)
 
 
+def record_round_trip(operation, course_context, documents=()):
+    """
+    Tells the query instrumentation listeners of a round trip to Mongo which read the given documents.
+    """
+    query_instrumentation.record_round_trip(ModuleStoreEnum.Type.split, operation, course_context, documents)
+
+
 def structure_from_mongo(structure, course_context=None):
     """
     Converts the 'blocks' key from a list [block_data] to a map
@@ -177,6 +189,7 @@ def structure_from_mongo(structure, course_context=None):
             for the course that this data is being processed for.
     """
     with TIMER.timer('structure_from_mongo', course_context) as tagger:
+        start = time()
         tagger.measure('blocks', len(structure['blocks']))
 
         check('seq[2]', structure['root'])
@@ -185,14 +198,23 @@ def structure_from_mongo(structure, course_context=None):
             if 'children' in block['fields']:
                 check('list(list[2])', block['fields']['children'])
 
-        structure['root'] = BlockKey(*structure['root'])
+        # Build each BlockKey once, and share it between the block and its parents' children.
+        keyed_blocks = [
+            (BlockKey(block['block_type'], block.pop('block_id')), block) for block in structure['blocks']
+        ]
+        block_keys = {block_key: block_key for block_key, _ in keyed_blocks}
+
+        structure['root'] = block_keys.get(tuple(structure['root'])) or BlockKey(*structure['root'])
         new_blocks = {}
-        for block in structure['blocks']:
+        for block_key, block in keyed_blocks:
             if 'children' in block['fields']:
-                block['fields']['children'] = [BlockKey(*child) for child in block['fields']['children']]
-            new_blocks[BlockKey(block['block_type'], block.pop('block_id'))] = BlockData(**block)
+                block['fields']['children'] = [
+                    block_keys.get(tuple(child)) or BlockKey(*child) for child in block['fields']['children']
+                ]
+            new_blocks[block_key] = BlockData(**block)
         structure['blocks'] = new_blocks
 
+        query_instrumentation.record_decode(ModuleStoreEnum.Type.split, course_context, time() - start)
         return structure
 
 
@@ -279,17 +301,148 @@ class CourseStructureCache(object):
             self.cache.set(key, compressed_pickled_data, None)
 
 
+def copy_structure(structure):
+    """
+    Returns a copy of the given decoded structure whose blocks' fields and edit info
+    can be updated without affecting the given structure's. The field values themselves
+    are shared, as they're only modified in structures copied by version_structure.
+    """
+    new_structure = dict(structure)
+    new_blocks = {}
+    for block_key, block in structure['blocks'].iteritems():
+        # Copy the attributes directly, rather than decoding them again in BlockData.__init__.
+        new_block = BlockData.__new__(BlockData)
+        new_block.__dict__.update(block.__dict__)
+        new_block.fields = dict(block.fields)
+        new_block.edit_info = EditInfo.__new__(EditInfo)
+        new_block.edit_info.__dict__.update(block.edit_info.__dict__)
+        new_blocks[block_key] = new_block
+    new_structure['blocks'] = new_blocks
+    return new_structure
+
+
+class DecodedStructureCache(object):
+    """
+    A least recently used, in-process cache of decoded structures, keyed by their version
+    guid, in front of the CourseStructureCache.
+
+    Structures are immutable, so entries are never updated, only evicted. The total
+    number of blocks of the cached structures is bounded by the
+    COURSE_STRUCTURE_PROCESS_CACHE_MAX_BLOCKS setting; 0 turns off the cache.
+
+    Cached structures are never handed out, only copies of them, since callers may
+    update the blocks of the structures they get (e.g. to load their definitions).
+    """
+    def __init__(self, max_blocks=None):
+        self._max_blocks = max_blocks
+
+        # Map of version guid to a (structure, number of blocks) tuple, ordered from
+        # least to most recently used.
+        self._entries = OrderedDict()
+        self._total_blocks = 0
+        self._lock = Lock()
+
+    @property
+    def max_blocks(self):
+        """
+        Returns the upper bound on the total number of blocks of the cached structures.
+        """
+        if self._max_blocks is not None:
+            return self._max_blocks
+        if not DJANGO_AVAILABLE:
+            return 0
+        return getattr(settings, 'COURSE_STRUCTURE_PROCESS_CACHE_MAX_BLOCKS', 0)
+
+    def get(self, key):
+        """
+        Returns a copy of the structure cached with the given version guid, or None.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            self._entries[key] = entry
+        return self._copy(entry[0])
+
+    def set(self, key, structure):
+        """
+        Caches a copy of the given structure with the given version guid, evicting the
+        least recently used structures as needed to stay within max_blocks.
+        """
+        num_blocks = self._num_blocks(structure)
+        max_blocks = self.max_blocks
+        if num_blocks > max_blocks:
+            return
+        structure = self._copy(structure)
+        with self._lock:
+            previous_entry = self._entries.pop(key, None)
+            if previous_entry is not None:
+                self._total_blocks -= previous_entry[1]
+            while self._entries and self._total_blocks + num_blocks > max_blocks:
+                _, (_, evicted_blocks) = self._entries.popitem(last=False)
+                self._total_blocks -= evicted_blocks
+            self._entries[key] = (structure, num_blocks)
+            self._total_blocks += num_blocks
+
+    def clear(self):
+        """
+        Removes all cached structures.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._total_blocks = 0
+
+    def _num_blocks(self, structure):
+        """
+        Returns the number of blocks of the given structure, which it counts for in max_blocks.
+        """
+        return len(structure['blocks'])
+
+    def _copy(self, structure):
+        """
+        Returns a copy of the given structure, to be cached or handed out.
+        """
+        return copy_structure(structure)
+
+
+class InheritedSettingsCache(DecodedStructureCache):
+    """
+    A least recently used, in-process cache of the inherited settings maps of structures,
+    keyed by their version guid, as computed by SplitMongoModuleStore.inherit_settings.
+
+    Maps count for the number of blocks they have entries for, within the same
+    COURSE_STRUCTURE_PROCESS_CACHE_MAX_BLOCKS bound. Their users must not modify them,
+    so they are handed out without being copied.
+    """
+    def _num_blocks(self, inherited_settings_map):
+        return len(inherited_settings_map)
+
+    def _copy(self, inherited_settings_map):
+        return inherited_settings_map
+
+
+# The decoded structure cache and inherited settings cache of the current process.
+decoded_structure_cache = DecodedStructureCache()  # pylint: disable=invalid-name
+inherited_settings_cache = InheritedSettingsCache()  # pylint: disable=invalid-name
+
+
 class MongoConnection(object):
     """
     Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
     """
     def __init__(
         self, db, collection, host, port=27017, tz_aware=True, user=None, password=None,
-        asset_collection=None, retry_wait_time=0.1, **kwargs
+        asset_collection=None, retry_wait_time=0.1, structure_delta_ratio=0, **kwargs
     ):
         """
         Create & open the connection, authenticate, and provide pointers to the collections
+
+        :param structure_delta_ratio: the largest fraction of its blocks by which a new structure may
+            differ from the full structure its previous version was based on, and still be stored as only
+            the blocks which differ plus a pointer to that base structure. 0 stores every structure in full.
         """
+        self.structure_delta_ratio = structure_delta_ratio
+
         # Set a write concern of 1, which makes writes complete successfully to the primary
         # only before returning. Also makes pymongo report write errors.
         kwargs['w'] = 1
@@ -320,6 +473,11 @@ class MongoConnection(object):
         This method will use a cached version of the structure if it is available.
         """
         with TIMER.timer("get_structure", course_context) as tagger_get_structure:
+            structure = decoded_structure_cache.get(key)
+            tagger_get_structure.tag(from_process_cache=str(bool(structure)).lower())
+            if structure:
+                return structure
+
             cache = CourseStructureCache()
 
             structure = cache.get(key, course_context)
@@ -330,6 +488,7 @@ class MongoConnection(object):
 
                 with TIMER.timer("get_structure.find_one", course_context) as tagger_find_one:
                     doc = self.structures.find_one({'_id': key})
+                    record_round_trip('get_structure', course_context, [doc])
                     if doc is None:
                         log.warning(
                             "doc was None when attempting to retrieve structure for item with key %s",
@@ -337,11 +496,12 @@ class MongoConnection(object):
                         )
                         return None
                     tagger_find_one.measure("blocks", len(doc['blocks']))
-                    structure = structure_from_mongo(doc, course_context)
+                    structure = self.decode_structure(doc, course_context)
                     tagger_find_one.sample_rate = 1
 
                 cache.set(key, structure, course_context)
 
+            decoded_structure_cache.set(key, structure)
             return structure
 
     @autoretry_read()
@@ -354,10 +514,9 @@ class MongoConnection(object):
         """
         with TIMER.timer("find_structures_by_id", course_context) as tagger:
             tagger.measure("requested_ids", len(ids))
-            docs = [
-                structure_from_mongo(structure, course_context)
-                for structure in self.structures.find({'_id': {'$in': ids}})
-            ]
+            docs = list(self.structures.find({'_id': {'$in': ids}}))
+            record_round_trip('find_structures_by_id', course_context, docs)
+            docs = [self.decode_structure(structure, course_context) for structure in docs]
             tagger.measure("structures", len(docs))
             return docs
 
@@ -371,13 +530,23 @@ class MongoConnection(object):
         """
         with TIMER.timer("find_course_blocks_by_id", course_context) as tagger:
             tagger.measure("requested_ids", len(ids))
-            docs = [
-                structure_from_mongo(structure, course_context)
-                for structure in self.structures.find(
-                    {'_id': {'$in': ids}},
-                    {'blocks': {'$elemMatch': {'block_type': 'course'}}, 'root': 1}
-                )
-            ]
+            projection = {'blocks': {'$elemMatch': {'block_type': 'course'}}, 'root': 1, 'base_version': 1}
+            docs = list(self.structures.find({'_id': {'$in': ids}}, projection))
+            record_round_trip('find_course_blocks_by_id', course_context, docs)
+
+            # Structures stored as differences only have a course block if it differs from their base's
+            base_ids = list({doc['base_version'] for doc in docs if 'base_version' in doc and not doc.get('blocks')})
+            if base_ids:
+                base_docs = list(self.structures.find({'_id': {'$in': base_ids}}, projection))
+                record_round_trip('find_course_blocks_by_id', course_context, base_docs)
+                base_blocks = {base_doc['_id']: base_doc.get('blocks', []) for base_doc in base_docs}
+                for doc in docs:
+                    if 'base_version' in doc and not doc.get('blocks'):
+                        doc['blocks'] = base_blocks.get(doc['base_version'], [])
+
+            for doc in docs:
+                doc.setdefault('blocks', [])
+            docs = [structure_from_mongo(structure, course_context) for structure in docs]
             tagger.measure("structures", len(docs))
             return docs
 
@@ -391,10 +560,9 @@ class MongoConnection(object):
         """
         with TIMER.timer("find_structures_derived_from", course_context) as tagger:
             tagger.measure("base_ids", len(ids))
-            docs = [
-                structure_from_mongo(structure, course_context)
-                for structure in self.structures.find({'previous_version': {'$in': ids}})
-            ]
+            docs = list(self.structures.find({'previous_version': {'$in': ids}}))
+            record_round_trip('find_structures_derived_from', course_context, docs)
+            docs = [self.decode_structure(structure, course_context) for structure in docs]
             tagger.measure("structures", len(docs))
             return docs
 
@@ -403,36 +571,104 @@ class MongoConnection(object):
         """
         Find all structures that originated from ``original_version`` that contain ``block_key``.
 
+        Structures stored as differences from a base structure are only found if ``block_key``
+        differs from the base's, which is always the case in the versions which updated it.
+
         Arguments:
             original_version (str or ObjectID): The id of a structure
             block_key (BlockKey): The id of the block in question
         """
         with TIMER.timer("find_ancestor_structures", course_context) as tagger:
-            docs = [
-                structure_from_mongo(structure, course_context)
-                for structure in self.structures.find({
-                    'original_version': original_version,
-                    'blocks': {
-                        '$elemMatch': {
-                            'block_id': block_key.id,
-                            'block_type': block_key.type,
-                            'edit_info.update_version': {
-                                '$exists': True,
-                            },
+            docs = list(self.structures.find({
+                'original_version': original_version,
+                'blocks': {
+                    '$elemMatch': {
+                        'block_id': block_key.id,
+                        'block_type': block_key.type,
+                        'edit_info.update_version': {
+                            '$exists': True,
                         },
                     },
-                })
-            ]
+                },
+            }))
+            record_round_trip('find_ancestor_structures', course_context, docs)
+            docs = [self.decode_structure(structure, course_context) for structure in docs]
             tagger.measure("structures", len(docs))
             return docs
 
     def insert_structure(self, structure, course_context=None):
         """
         Insert a new structure into the database.
+
+        If the connection stores structures as differences (see structure_delta_ratio), and the
+        structure differs little enough from the full structure which its previous version was based
+        on, only the blocks which differ are stored, and the structure is given a 'base_version'.
         """
         with TIMER.timer("insert_structure", course_context) as tagger:
             tagger.measure("blocks", len(structure["blocks"]))
-            self.structures.insert(structure_to_mongo(structure, course_context))
+            delta = self._structure_delta(structure, course_context)
+            if delta is None:
+                structure.pop('base_version', None)
+                self.structures.insert(structure_to_mongo(structure, course_context))
+            else:
+                changed_blocks, removed_blocks = delta
+                tagger.measure("changed_blocks", len(changed_blocks) + len(removed_blocks))
+                document = structure_to_mongo(dict(structure, blocks=changed_blocks), course_context)
+                document['removed_blocks'] = removed_blocks
+                self.structures.insert(document)
+            record_round_trip('insert_structure', course_context)
+
+    def _structure_delta(self, structure, course_context=None):
+        """
+        Returns the blocks of the given structure which differ from its base structure, and the keys of
+        the base's blocks which it no longer has, as a tuple (changed_blocks, removed_blocks), or None
+        if the structure should be stored in full.
+
+        The base is the full structure which the structure's previous version was based on, or its
+        previous version if that was stored in full. Its id is recorded as the structure's 'base_version'.
+        """
+        if not self.structure_delta_ratio or structure.get('previous_version') is None:
+            return None
+
+        base_version = structure.get('base_version', structure['previous_version'])
+        base = self.get_structure(base_version, course_context)
+        if base is None or 'base_version' in base:
+            return None
+
+        base_blocks = base['blocks']
+        # BlockData has no __ne__, so != would compare identities: use == only.
+        changed_blocks = {
+            block_key: block for block_key, block in structure['blocks'].iteritems()
+            if block_key not in base_blocks or not base_blocks[block_key] == block
+        }
+        removed_blocks = [block_key for block_key in base_blocks if block_key not in structure['blocks']]
+        if len(changed_blocks) + len(removed_blocks) > self.structure_delta_ratio * len(structure['blocks']):
+            return None
+
+        structure['base_version'] = base_version
+        return changed_blocks, removed_blocks
+
+    def decode_structure(self, document, course_context=None):
+        """
+        Converts a structure document read from the database to a structure, as structure_from_mongo.
+        A structure stored as differences is applied to its base structure, which is retrieved with
+        get_structure, so that the returned structure has all its blocks.
+        """
+        removed_blocks = document.pop('removed_blocks', None)
+        structure = structure_from_mongo(document, course_context)
+        if 'base_version' not in structure:
+            return structure
+
+        base = self.get_structure(structure['base_version'], course_context)
+        if base is None:
+            raise ItemNotFoundError(structure['base_version'])
+        # get_structure returns a structure which isn't shared with any cache, so its blocks can be reused
+        blocks = base['blocks']
+        for block_key in removed_blocks or []:
+            blocks.pop(BlockKey(*block_key), None)
+        blocks.update(structure['blocks'])
+        structure['blocks'] = blocks
+        return structure
 
     def get_course_index(self, key, ignore_case=False):
         """
@@ -449,7 +685,9 @@ class MongoConnection(object):
                     key_attr: getattr(key, key_attr)
                     for key_attr in ('org', 'course', 'run')
                 }
-            return self.course_index.find_one(query)
+            course_index = self.course_index.find_one(query)
+            record_round_trip('get_course_index', key, [course_index])
+            return course_index
 
     def find_matching_course_indexes(self, branch=None, search_targets=None, org_target=None, course_context=None):
         """
@@ -474,6 +712,8 @@ class MongoConnection(object):
             if org_target:
                 query['org'] = org_target
 
+            # The documents are read as the cursor is iterated, so their size isn't known here.
+            record_round_trip('find_matching_course_indexes', course_context)
             return self.course_index.find(query)
 
     def insert_course_index(self, course_index, course_context=None):
@@ -483,6 +723,7 @@ class MongoConnection(object):
         with TIMER.timer("insert_course_index", course_context):
             course_index['last_update'] = datetime.datetime.now(pytz.utc)
             self.course_index.insert(course_index)
+            record_round_trip('insert_course_index', course_context)
 
     def update_course_index(self, course_index, from_index=None, course_context=None):
         """
@@ -506,6 +747,7 @@ class MongoConnection(object):
                 }
             course_index['last_update'] = datetime.datetime.now(pytz.utc)
             self.course_index.update(query, course_index, upsert=False,)
+            record_round_trip('update_course_index', course_context)
 
     def delete_course_index(self, course_key):
         """
@@ -516,7 +758,9 @@ class MongoConnection(object):
                 key_attr: getattr(course_key, key_attr)
                 for key_attr in ('org', 'course', 'run')
             }
-            return self.course_index.remove(query)
+            result = self.course_index.remove(query)
+            record_round_trip('delete_course_index', course_key)
+            return result
 
     def get_definition(self, key, course_context=None):
         """
@@ -524,6 +768,7 @@ class MongoConnection(object):
         """
         with TIMER.timer("get_definition", course_context) as tagger:
             definition = self.definitions.find_one({'_id': key})
+            record_round_trip('get_definition', course_context, [definition])
             tagger.measure("fields", len(definition['fields']))
             tagger.tag(block_type=definition['block_type'])
             return definition
@@ -534,7 +779,8 @@ class MongoConnection(object):
         """
         with TIMER.timer("get_definitions", course_context) as tagger:
             tagger.measure('definitions', len(definitions))
-            definitions = self.definitions.find({'_id': {'$in': definitions}})
+            definitions = list(self.definitions.find({'_id': {'$in': definitions}}))
+            record_round_trip('get_definitions', course_context, definitions)
             return definitions
 
     def insert_definition(self, definition, course_context=None):
@@ -545,6 +791,7 @@ class MongoConnection(object):
             tagger.measure('fields', len(definition['fields']))
             tagger.tag(block_type=definition['block_type'])
             self.definitions.insert(definition)
+            record_round_trip('insert_definition', course_context)
 
     def ensure_indexes(self):
         """
@@ -57,7 +57,9 @@ import copy
 import datetime
 import hashlib
 import logging
+import re
 import six
+from functools import partial
 from contracts import contract, new_contract
 from importlib import import_module
 from mongodb_proxy import autoretry_read
@@ -85,6 +87,7 @@ from ..exceptions import ItemNotFoundError
 from .caching_descriptor_system import CachingDescriptorSystem
 from xmodule.partitions.partitions_service import PartitionService
 from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection, DuplicateKeyError
+from xmodule.modulestore.split_mongo import mongo_connection
 from xmodule.modulestore.split_mongo import BlockKey, CourseEnvelope
 from xmodule.modulestore.store_utilities import DETACHED_XBLOCK_TYPES
 from xmodule.error_module import ErrorDescriptor
@@ -133,6 +136,8 @@ class SplitBulkWriteRecord(BulkOpsRecord):
         self.modules = defaultdict(dict)
         self.definitions = {}
         self.definitions_in_db = set()
+        # dict(version_guid, dict(index_name, index)) for structures in the db
+        self.structure_indexes = defaultdict(dict)
         self.course_key = None
 
     # TODO: This needs to track which branches have actually been modified/versioned,
@@ -654,19 +659,26 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
     # It won't recompute the value on operations such as update_course_index (e.g., to revert to a prev
     # version) but those functions will have an optional arg for setting these.
     SEARCH_TARGET_DICT = ['wiki_slug']
+    # settings fields which get_items can look up in a structure's items index
+    INDEXED_SETTINGS_FIELDS = ('format', 'graded')
 
     def __init__(self, contentstore, doc_store_config, fs_root, render_template,
                  default_class=None,
                  error_tracker=null_error_tracker,
                  i18n_service=None, fs_service=None, user_service=None,
-                 services=None, signal_handler=None, **kwargs):
+                 services=None, signal_handler=None, prefetch_definitions=False, structure_delta_ratio=0,
+                 **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param prefetch_definitions: whether loading a subtree of blocks should also load, in one query, the
+            definitions of all its blocks which have content fields, instead of each one when it's first used.
+        :param structure_delta_ratio: the largest fraction of its blocks by which a new structure may differ
+            from its base structure and be stored as only those differences. 0 stores every structure in full.
         """
 
         super(SplitMongoModuleStore, self).__init__(contentstore, **kwargs)
 
-        self.db_connection = MongoConnection(**doc_store_config)
+        self.db_connection = MongoConnection(structure_delta_ratio=structure_delta_ratio, **doc_store_config)
 
         if default_class is not None:
             module_path, __, class_name = default_class.rpartition('.')
@@ -691,6 +703,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             self.services["request_cache"] = self.request_cache
 
         self.signal_handler = signal_handler
+        self.prefetch_definitions = prefetch_definitions
 
     def close_connections(self):
         """
@@ -734,6 +747,12 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             lazy: whether to load definitions now or later
         """
         with self.bulk_operations(course_key, emit_signals=False):
+            structure = system.course_entry.structure
+            if system.inherited_settings_loader is None and not self._is_structure_unsaved(course_key, structure):
+                # The inherited settings of stored structures are only computed once a block of the
+                # structure needs them.
+                system.inherited_settings_loader = partial(self._get_inherited_settings_map, course_key, structure)
+
             new_module_data = {}
             for block_id in base_block_ids:
                 new_module_data = self.descendants(
@@ -747,37 +766,51 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             # until they're actually needed.
             if not lazy:
                 # Non-lazy loading: Load all descendants by id.
-                descendent_definitions = self.get_definitions(
-                    course_key,
-                    [
-                        block.definition
-                        for block in new_module_data.itervalues()
-                    ]
-                )
-                # Turn definitions into a map.
-                definitions = {definition['_id']: definition
-                               for definition in descendent_definitions}
-
-                for block in new_module_data.itervalues():
-                    if block.definition in definitions:
-                        definition = definitions[block.definition]
-                        # convert_fields gets done later in the runtime's xblock_from_json
-                        block.fields.update(definition.get('fields'))
-                        block.definition_loaded = True
+                self._load_definitions(course_key, new_module_data.values())
+            elif self.prefetch_definitions and depth != 0:
+                # Prefetching: Load the descendants which will read their definitions.
+                self._load_definitions(course_key, [
+                    block for block in new_module_data.itervalues()
+                    if not block.definition_loaded and system.has_content_fields(block.block_type)
+                ])
 
             system.module_data.update(new_module_data)
             return system.module_data
 
+    def _load_definitions(self, course_key, blocks):
+        """
+        Loads the definitions of the given blocks into their fields with one query.
+
+        Arguments:
+            course_key: the course of the blocks, to respect bulk operations
+            blocks: list of BlockData
+        """
+        if not blocks:
+            return
+
+        definitions = {
+            definition['_id']: definition
+            for definition in self.get_definitions(course_key, [block.definition for block in blocks])
+        }
+        for block in blocks:
+            if block.definition in definitions:
+                definition = definitions[block.definition]
+                # convert_fields gets done later in the runtime's xblock_from_json
+                block.fields.update(definition.get('fields'))
+                block.definition_loaded = True
+
     @contract(course_entry=CourseEnvelope, block_keys="list(BlockKey)", depth="int | None")
     def _load_items(self, course_entry, block_keys, depth=0, **kwargs):
         """
         Load & cache the given blocks from the course. May return the blocks in any order.
 
         Load the definitions into each block if lazy is in kwargs and is False;
-        otherwise, do not load the definitions - they'll be loaded later when needed.
+        otherwise, do not load the definitions - they'll be loaded later when needed -
+        unless the store prefetches definitions and depth isn't 0, in which case those of
+        the blocks with content fields are loaded.
         """
         lazy = kwargs.pop('lazy', True)
-        should_cache_items = not lazy
+        should_cache_items = not lazy or (self.prefetch_definitions and depth != 0)
 
         runtime = self._get_cache(course_entry.structure['_id'])
         if runtime is None:
@@ -824,8 +857,10 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                 del self.request_cache.data.setdefault('course_cache', {})[course_version_guid]
             except KeyError:
                 pass
+            self.request_cache.data.setdefault('structure_index_cache', {}).pop(course_version_guid, None)
         else:
             self.request_cache.data['course_cache'] = {}
+            self.request_cache.data['structure_index_cache'] = {}
 
     def _lookup_course(self, course_key, head_validation=True):
         """
@@ -1183,21 +1218,6 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         items = []
         qualifiers = qualifiers.copy() if qualifiers else {}  # copy the qualifiers (destructively manipulated here)
 
-        def _block_matches_all(block_data):
-            """
-            Check that the block matches all the criteria
-            """
-            # do the checks which don't require loading any additional data
-            if (  # pylint: disable=bad-continuation
-                self._block_matches(block_data, qualifiers) and
-                self._block_matches(block_data.fields, settings)
-            ):
-                if content:
-                    definition_block = self.get_definition(course_locator, block_data.definition)
-                    return self._block_matches(definition_block['fields'], content)
-                else:
-                    return True
-
         if settings is None:
             settings = {}
         if 'name' in qualifiers:
@@ -1215,9 +1235,10 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                     name_matches = block_id.id == block_name
                 else:
                     name_matches = block_id.id in block_name
-                if name_matches and _block_matches_all(block):
+                if name_matches:
                     block_ids.append(block_id)
 
+            block_ids = self._filter_items(course_locator, course, block_ids, qualifiers, settings, content)
             return self._load_items(course, block_ids, **kwargs)
 
         if 'category' in qualifiers:
@@ -1233,24 +1254,201 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
 
         if not include_orphans:
             path_cache = {}
-            parents_cache = self.build_block_key_to_parents_mapping(course.structure)
-
-        for block_id, value in course.structure['blocks'].iteritems():
-            if _block_matches_all(value):
-                if not include_orphans:
-                    if (  # pylint: disable=bad-continuation
-                        block_id.type in DETACHED_XBLOCK_TYPES or
-                        self.has_path_to_root(block_id, course, path_cache, parents_cache)
-                    ):
-                        items.append(block_id)
-                else:
+            parents_cache = self._get_parent_index(course.course_key, course.structure)
+
+        block_ids = self._plan_items_query(course, qualifiers, settings)
+        if block_ids is None:
+            block_ids = course.structure['blocks'].iterkeys()
+
+        for block_id in self._filter_items(course_locator, course, block_ids, qualifiers, settings, content):
+            if not include_orphans:
+                if (  # pylint: disable=bad-continuation
+                    block_id.type in DETACHED_XBLOCK_TYPES or
+                    self.has_path_to_root(block_id, course, path_cache, parents_cache)
+                ):
                     items.append(block_id)
+            else:
+                items.append(block_id)
 
         if len(items) > 0:
             return self._load_items(course, items, depth=0, **kwargs)
         else:
             return []
 
+    def _get_structure_index(self, course_key, structure, index_name, build_index):
+        """
+        Returns the index of the given structure with the given name, as returned by
+        build_index(structure).
+
+        The index is built once per structure version and cached in the active bulk
+        operation, if the structure was loaded in it, or else in the request cache.
+        Structures that are not yet in the db may still be edited, so their indexes are
+        built afresh on each call.
+
+        :param course_key: the course of the structure, to respect bulk operations
+        :param structure: db json of course structure
+        :param index_name: the name under which to cache the index
+        :param build_index: a function which builds the index from the structure
+        """
+        structure_id = structure['_id']
+        bulk_write_record = self._get_bulk_ops_record(course_key)
+        if self._is_structure_unsaved(course_key, structure):
+            return build_index(structure)
+        elif bulk_write_record.active and structure_id in bulk_write_record.structures_in_db:
+            structure_indexes = bulk_write_record.structure_indexes[structure_id]
+        elif self.request_cache is not None:
+            structure_indexes = self.request_cache.data.setdefault('structure_index_cache', {}).setdefault(
+                structure_id, {}
+            )
+        else:
+            return build_index(structure)
+
+        index = structure_indexes.get(index_name)
+        if index is None:
+            index = structure_indexes[index_name] = build_index(structure)
+        return index
+
+    def _is_structure_unsaved(self, course_key, structure):
+        """
+        Returns whether the structure was created in the active bulk operation and isn't in
+        the db yet, so that it may still be edited.
+        """
+        structure_id = structure['_id']
+        bulk_write_record = self._get_bulk_ops_record(course_key)
+        return (
+            bulk_write_record.active and
+            structure_id in bulk_write_record.structures and
+            structure_id not in bulk_write_record.structures_in_db
+        )
+
+    def _get_parent_index(self, course_key, structure):
+        """
+        Returns the mapping of block_keys to their parents for the given structure, as
+        returned by build_block_key_to_parents_mapping, built once per structure version.
+        """
+        return self._get_structure_index(course_key, structure, 'parents', self.build_block_key_to_parents_mapping)
+
+    def _build_items_index(self, structure):
+        """
+        Builds the index which get_items uses to find candidate blocks in the given
+        structure, as a dict of:
+            'block_type': dict(block_type, list(BlockKey))
+            field name in INDEXED_SETTINGS_FIELDS: tuple(
+                dict(value, list(BlockKey)) of the blocks by each hashable value of the field,
+                list(BlockKey) of the blocks with unhashable values of the field,
+            )
+        where the block keys are in the order of the structure's blocks.
+        """
+        index = {'block_type': defaultdict(list)}
+        for field_name in self.INDEXED_SETTINGS_FIELDS:
+            index[field_name] = (defaultdict(list), [])
+
+        for block_key, block_data in structure['blocks'].iteritems():
+            index['block_type'][block_data.block_type].append(block_key)
+            for field_name in self.INDEXED_SETTINGS_FIELDS:
+                if field_name not in block_data.fields:
+                    continue
+                value = block_data.fields[field_name]
+                by_value, unhashable = index[field_name]
+                for element in (value if isinstance(value, list) else [value]):
+                    try:
+                        by_value[element].append(block_key)
+                    except TypeError:
+                        unhashable.append(block_key)
+                        break
+        return index
+
+    @staticmethod
+    def _indexable_values(criteria):
+        """
+        Returns the list of values to look up in an items index for the given get_items
+        criteria, or None if the criteria can't be answered from the index (regexes,
+        functions, and other operators).
+        """
+        if isinstance(criteria, dict):
+            if criteria.keys() != ['$in']:
+                return None
+            values = list(criteria['$in'])
+        else:
+            values = [criteria]
+
+        for value in values:
+            if isinstance(value, re._pattern_type) or callable(value):  # pylint: disable=protected-access
+                return None
+            try:
+                hash(value)
+            except TypeError:
+                return None
+        return values
+
+    def _plan_items_query(self, course, qualifiers, settings):
+        """
+        Returns the keys of the blocks in the course which may match the given get_items
+        qualifiers and settings, looked up in the structure's items index by the most
+        selective criteria that it can answer, or None if the blocks must be scanned.
+        Each returned block must still be checked against all the criteria.
+        """
+        lookups = []
+        if 'block_type' in qualifiers:
+            lookups.append((qualifiers['block_type'], 'block_type'))
+        for field_name in self.INDEXED_SETTINGS_FIELDS:
+            if field_name in settings:
+                lookups.append((settings[field_name], field_name))
+
+        index = None
+        candidates = None
+        for criteria, index_name in lookups:
+            values = self._indexable_values(criteria)
+            if values is None:
+                continue
+            if index is None:
+                index = self._get_structure_index(
+                    course.course_key, course.structure, 'items', self._build_items_index
+                )
+            if index_name == 'block_type':
+                by_value, unhashable = index['block_type'], []
+            else:
+                by_value, unhashable = index[index_name]
+            block_keys = list(unhashable)
+            for value in values:
+                block_keys.extend(by_value.get(value, []))
+            if candidates is None or len(block_keys) < len(candidates):
+                candidates = block_keys
+
+        if candidates is None:
+            return None
+        # A block with several of the looked up values is listed once for each of them.
+        seen = set()
+        return [block_key for block_key in candidates if not (block_key in seen or seen.add(block_key))]
+
+    def _filter_items(self, course_locator, course, block_ids, qualifiers, settings, content):
+        """
+        Returns the keys of those of the given blocks which match all the get_items criteria.
+        The definitions needed to check the content criteria are loaded at once, and only
+        for the blocks which match the other criteria.
+        """
+        blocks = course.structure['blocks']
+        # do the checks which don't require loading any additional data
+        block_ids = [
+            block_id for block_id in block_ids
+            if self._block_matches(blocks[block_id], qualifiers) and
+            self._block_matches(blocks[block_id].fields, settings)
+        ]
+        if not content or not block_ids:
+            return block_ids
+
+        definitions = {
+            definition['_id']: definition
+            for definition in self.get_definitions(
+                course_locator, list(set(blocks[block_id].definition for block_id in block_ids))
+            )
+        }
+        return [
+            block_id for block_id in block_ids
+            if blocks[block_id].definition in definitions and
+            self._block_matches(definitions[blocks[block_id].definition]['fields'], content)
+        ]
+
     def build_block_key_to_parents_mapping(self, structure):
         """
         Given a structure, builds block_key to parents mapping for all block keys in structure
@@ -1259,13 +1457,14 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         :param structure: db json of course structure
 
         :return dict: a dictionary containing mapping of block_keys against their parents.
+        Block keys without parents are not in the dictionary.
         """
         children_to_parents = defaultdict(list)
         for parent_key, value in structure['blocks'].iteritems():
             for child_key in value.fields.get('children', []):
                 children_to_parents[child_key].append(parent_key)
 
-        return children_to_parents
+        return dict(children_to_parents)
 
     def has_path_to_root(self, block_key, course, path_cache=None, parents_cache=None):
         """
@@ -1287,7 +1486,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         if parents_cache is None:
             xblock_parents = self._get_parents_from_structure(block_key, course.structure)
         else:
-            xblock_parents = parents_cache[block_key]
+            xblock_parents = parents_cache.get(block_key, [])
 
         if len(xblock_parents) == 0 and block_key.type in ["course", "library"]:
             # Found, xblock has the path to the root
@@ -1319,14 +1518,16 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             raise ItemNotFoundError(locator)
 
         course = self._lookup_course(locator.course_key)
-        all_parent_ids = self._get_parents_from_structure(BlockKey.from_usage_key(locator), course.structure)
+        parent_index = self._get_parent_index(course.course_key, course.structure)
+        all_parent_ids = parent_index.get(BlockKey.from_usage_key(locator), [])
 
         # Check and verify the found parent_ids are not orphans; Remove parent which has no valid path
         # to the course root
+        path_cache = {}
         parent_ids = [
             valid_parent
             for valid_parent in all_parent_ids
-            if self.has_path_to_root(valid_parent, course)
+            if self.has_path_to_root(valid_parent, course, path_cache, parent_index)
         ]
 
         if len(parent_ids) == 0:
@@ -1350,16 +1551,15 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
 
         detached_categories = [name for name, __ in XBlock.load_tagged_classes("detached")]
         course = self._lookup_course(course_key)
-        items = set(course.structure['blocks'].keys())
-        items.remove(course.structure['root'])
-        blocks = course.structure['blocks']
-        for block_id, block_data in blocks.iteritems():
-            items.difference_update(BlockKey(*child) for child in block_data.fields.get('children', []))
-            if block_data.block_type in detached_categories:
-                items.discard(block_id)
+        parent_index = self._get_parent_index(course.course_key, course.structure)
         return [
             course_key.make_usage_key(block_type=block_id.type, block_id=block_id.id)
-            for block_id in items
+            for block_id, block_data in course.structure['blocks'].iteritems()
+            if (
+                block_id not in parent_index and
+                block_id != course.structure['root'] and
+                block_data.block_type not in detached_categories
+            )
         ]
 
     def get_course_index_info(self, course_key):
@@ -2674,51 +2874,96 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
 
         self._emit_course_deleted_signal(course_key)
 
-    @contract(block_map="dict(BlockKey: dict)", block_key=BlockKey)
+    @contract(block_map="dict(BlockKey: BlockData)", block_key=BlockKey)
     def inherit_settings(
         self, block_map, block_key, inherited_settings_map, inheriting_settings=None, inherited_from=None
     ):
         """
-        Updates block_data with any inheritable setting set by an ancestor and recurses to children.
-        """
-        if block_key not in block_map:
-            return
-        block_data = block_map[block_key]
+        Updates inherited_settings_map with the inheritable settings set by the ancestors of
+        block_key and of each of its descendants, walking the tree iteratively.
 
+        Blocks which don't set any inheritable setting share their inherited settings dict with
+        their parent, so the dicts in inherited_settings_map must not be modified.
+        """
+        inheritable_fields = inheritance.InheritanceMixin.fields
         if inheriting_settings is None:
             inheriting_settings = {}
+        # the blocks on the path from the root to the block being visited
+        path = set(BlockKey(*ancestor) for ancestor in inherited_from or [])
+
+        # None in place of the inheriting settings marks the end of a block's descendants
+        stack = [(block_key, inheriting_settings)]
+        while stack:
+            block_key, inheriting_settings = stack.pop()
+            if inheriting_settings is None:
+                path.remove(block_key)
+                continue
+            # here's where we need logic for looking up in other structures when we allow cross pointers
+            # but it's also getting this during course creation if creating top down w/ children set or
+            # migration where the old mongo published had pointers to privates
+            block_data = block_map.get(block_key)
+            if block_data is None:
+                continue
+            if block_key in path:
+                raise Exception(
+                    u'Infinite loop detected when inheriting to {}, having already inherited from {}'.format(
+                        block_key, list(path)
+                    )
+                )
 
-        if inherited_from is None:
-            inherited_from = []
+            # the currently passed down values take precedence over any previously cached ones
+            # NOTE: this should show the values which all fields would have if inherited: i.e.,
+            # not set to the locally defined value but to value set by nearest ancestor who sets it
+            block_settings = inherited_settings_map.get(block_key)
+            if block_settings is None:
+                block_settings = inheriting_settings
+            elif inheriting_settings:
+                block_settings = block_settings.copy()
+                block_settings.update(inheriting_settings)
+            inherited_settings_map[block_key] = block_settings
+
+            # update the inheriting w/ what should pass to children, copying only if the block sets any
+            block_fields = block_data.fields
+            local_settings = [
+                (field_name, value) for field_name, value in block_fields.iteritems()
+                if field_name in inheritable_fields
+            ]
+            if local_settings:
+                inheriting_settings = block_settings.copy()
+                inheriting_settings.update(local_settings)
+            else:
+                inheriting_settings = block_settings
 
-        # the currently passed down values take precedence over any previously cached ones
-        # NOTE: this should show the values which all fields would have if inherited: i.e.,
-        # not set to the locally defined value but to value set by nearest ancestor who sets it
-        inherited_settings_map.setdefault(block_key, {}).update(inheriting_settings)
+            path.add(block_key)
+            stack.append((block_key, None))
+            for child in reversed(block_fields.get('children', [])):
+                stack.append((child if isinstance(child, BlockKey) else BlockKey(*child), inheriting_settings))
 
-        # update the inheriting w/ what should pass to children
-        inheriting_settings = inherited_settings_map[block_key].copy()
-        block_fields = block_data.fields
-        for field_name in inheritance.InheritanceMixin.fields:
-            if field_name in block_fields:
-                inheriting_settings[field_name] = block_fields[field_name]
+    def _get_inherited_settings_map(self, course_key, structure):
+        """
+        Returns the map of each block key in the structure to the inheritable settings set by
+        its ancestors, as computed by inherit_settings from the structure's root, computed once
+        per structure version and kept in the process's inherited settings cache. The returned
+        dicts must not be modified.
 
-        for child in block_fields.get('children', []):
-            try:
-                if child in inherited_from:
-                    raise Exception(u'Infinite loop detected when inheriting to {}, having already inherited from {}'.format(child, inherited_from))
-                self.inherit_settings(
-                    block_map,
-                    BlockKey(*child),
-                    inherited_settings_map,
-                    inheriting_settings,
-                    inherited_from + [child]
-                )
-            except KeyError:
-                # here's where we need logic for looking up in other structures when we allow cross pointers
-                # but it's also getting this during course creation if creating top down w/ children set or
-                # migration where the old mongo published had pointers to privates
-                pass
+        The structure must be in the db already, as structures still being edited can change.
+        """
+        structure_id = structure['_id']
+        inherited_settings_map = mongo_connection.inherited_settings_cache.get(structure_id)
+        if inherited_settings_map is None:
+            inherited_settings_map = self._get_structure_index(
+                course_key, structure, 'inherited_settings', self._build_inherited_settings_map
+            )
+            mongo_connection.inherited_settings_cache.set(structure_id, inherited_settings_map)
+        return inherited_settings_map
+
+    def _build_inherited_settings_map(self, structure):
+        """
+        Computes the inherited settings map of the structure for _get_inherited_settings_map.
+        """
+        inherited_settings_map = {}
+        self.inherit_settings(structure['blocks'], BlockKey(*structure['root']), inherited_settings_map)
+        return inherited_settings_map
 
     def descendants(self, block_map, block_id, depth, descendent_map):
         """
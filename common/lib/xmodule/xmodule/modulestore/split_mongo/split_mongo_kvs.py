@@ -22,16 +22,22 @@ class SplitMongoKVS(InheritanceKeyValueStore):
     VALID_SCOPES = (Scope.parent, Scope.children, Scope.settings, Scope.content)
 
     @contract(parent="BlockUsageLocator | None")
-    def __init__(self, definition, initial_values, default_values, parent, aside_fields=None, field_decorator=None):
+    def __init__(
+            self, definition, initial_values, default_values, parent, aside_fields=None, field_decorator=None,
+            inherited_settings_loader=None,
+    ):
         """
 
         :param definition: either a lazyloader or definition id for the definition
         :param initial_values: a dictionary of the locally set values
         :param default_values: any Scope.settings field defaults that are set locally
             (copied from a template block with copy_from_template)
+        :param inherited_settings_loader: if the inheritable settings set by the block's ancestors
+            are known, a function which returns them, called when they are first needed
         """
         # deepcopy so that manipulations of fields does not pollute the source
         super(SplitMongoKVS, self).__init__(copy.deepcopy(initial_values))
+        self._inherited_settings_loader = inherited_settings_loader
         self._definition = definition  # either a DefinitionLazyLoader or the db id of the definition.
         # if the db id, then the definition is presumed to be loaded into _fields
 
@@ -45,6 +51,21 @@ class SplitMongoKVS(InheritanceKeyValueStore):
         self.parent = parent
         self.aside_fields = aside_fields if aside_fields else {}
 
+    @property
+    def inherited_settings(self):
+        """
+        The inheritable settings set by the block's ancestors.
+        """
+        if self._inherited_settings_loader is not None:
+            self._inherited_settings = self._inherited_settings_loader() or {}
+            self._inherited_settings_loader = None
+        return self._inherited_settings
+
+    @inherited_settings.setter
+    def inherited_settings(self, inherited_settings):
+        self._inherited_settings = inherited_settings
+        self._inherited_settings_loader = None
+
     def get(self, key):
         if key.block_family == XBlockAside.entry_point:
             if key.scope not in self.VALID_SCOPES:
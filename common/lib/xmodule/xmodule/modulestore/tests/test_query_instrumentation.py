@@ -0,0 +1,53 @@
+"""
+Tests of the modulestore query instrumentation.
+"""
+import unittest
+
+from bson import BSON
+from opaque_keys.edx.locator import CourseLocator
+
+from xmodule.modulestore import query_instrumentation
+from xmodule.modulestore.query_instrumentation import QueryStats
+
+
+class TestQueryStats(unittest.TestCase):
+    """
+    Tests of QueryStats, as a listener of the modulestore queries.
+    """
+    def setUp(self):
+        super(TestQueryStats, self).setUp()
+        self.stats = QueryStats()
+        query_instrumentation.add_listener(self.stats)
+        self.addCleanup(query_instrumentation.remove_listener, self.stats)
+        self.course_key = CourseLocator('org', 'course', 'run')
+
+    def test_round_trips(self):
+        documents = [{'_id': 1, 'blocks': []}, {'_id': 2}]
+        query_instrumentation.record_round_trip('split', 'get_structure', self.course_key, documents)
+        query_instrumentation.record_round_trip('split', 'get_definition', self.course_key, [None])
+        query_instrumentation.record_round_trip('mongo', 'find_one', None)
+
+        size = sum(len(BSON.encode(document)) for document in documents)
+        course_counts = self.stats.courses[self.course_key]
+        self.assertEqual((course_counts.round_trips, course_counts.bytes), (2, size))
+        self.assertEqual(
+            dict(course_counts.operations), {('split', 'get_structure'): 1, ('split', 'get_definition'): 1}
+        )
+        self.assertEqual((self.stats.totals.round_trips, self.stats.totals.bytes), (3, size))
+        self.assertEqual(self.stats.courses[None].round_trips, 1)
+
+    def test_courses_accumulated_across_branches(self):
+        draft_key = self.course_key.for_branch('draft-branch')
+        query_instrumentation.record_round_trip('split', 'get_structure', draft_key)
+        query_instrumentation.record_decode('split', draft_key.make_usage_key('html', 'html'), 0.5)
+        query_instrumentation.record_decode('split', self.course_key.for_branch('published-branch'), 0.25)
+
+        self.assertEqual(self.stats.courses.keys(), [self.course_key])
+        self.assertEqual(self.stats.courses[self.course_key].round_trips, 1)
+        self.assertEqual(self.stats.courses[self.course_key].decode_time, 0.75)
+
+    def test_removed_listener(self):
+        query_instrumentation.remove_listener(self.stats)
+        self.assertFalse(query_instrumentation.is_active())
+        query_instrumentation.record_round_trip('split', 'get_structure', self.course_key)
+        self.assertEqual(self.stats.totals.round_trips, 0)
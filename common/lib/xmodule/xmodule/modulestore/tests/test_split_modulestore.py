@@ -29,6 +29,7 @@ from ccx_keys.locator import CCXBlockUsageLocator
 from xmodule.modulestore.inheritance import InheritanceMixin
 from xmodule.x_module import XModuleMixin
 from xmodule.fields import Date, Timedelta
+from xmodule.modulestore.split_mongo.mongo_connection import DecodedStructureCache, InheritedSettingsCache
 from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore
 from xmodule.modulestore.tests.test_modulestore import check_has_course_method
 from xmodule.modulestore.split_mongo import BlockKey
@@ -999,6 +1000,34 @@ class TestCourseStructureCache(SplitModuleTest):
         # now make sure that you get the same structure
         self.assertEqual(cached_structure, not_cached_structure)
 
+    def test_decoded_structure_cache(self):
+        decoded_cache = DecodedStructureCache(max_blocks=100)
+        with patch('xmodule.modulestore.split_mongo.mongo_connection.decoded_structure_cache', decoded_cache):
+            with check_mongo_calls(1):
+                not_cached_structure = self._get_structure(self.new_course)
+
+            # the process cache is in front of the dummy course_structure_cache
+            with check_mongo_calls(0):
+                cached_structure = self._get_structure(self.new_course)
+            self.assertEqual(cached_structure, not_cached_structure)
+
+            # the cached structure can't be modified through the structures handed out
+            course_block = cached_structure['blocks'][cached_structure['root']]
+            course_block.fields['display_name'] = 'Modified'
+            course_block.edit_info.edited_by = 'modifier'
+            with check_mongo_calls(0):
+                self.assertEqual(self._get_structure(self.new_course), not_cached_structure)
+
+    def test_decoded_structure_cache_max_blocks(self):
+        decoded_cache = DecodedStructureCache(max_blocks=0)
+        with patch('xmodule.modulestore.split_mongo.mongo_connection.decoded_structure_cache', decoded_cache):
+            with check_mongo_calls(1):
+                self._get_structure(self.new_course)
+
+            # the structure has more blocks than the cache can hold
+            with check_mongo_calls(1):
+                self._get_structure(self.new_course)
+
     def _get_structure(self, course):
         """
         Helper function to get a structure from a course.
@@ -1221,6 +1250,26 @@ class SplitModuleItemTests(SplitModuleTest):
         matches = modulestore().get_items(locator, settings={'group_access': {'$exists': False}})
         self.assertEqual(len(matches), 7)
 
+    def test_get_items_uses_items_index(self):
+        """
+        get_items looks up blocks by category in an index built once per stored structure.
+        """
+        store = modulestore()
+        locator = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        with store.bulk_operations(locator):
+            with patch.object(store, '_build_items_index', wraps=store._build_items_index) as mock_build:
+                matches = store.get_items(locator, qualifiers={'category': 'chapter'})
+                self.assertEqual(len(matches), 4)
+                matches = store.get_items(locator, qualifiers={'category': {'$in': ['chapter', 'course']}})
+                self.assertEqual(len(matches), 5)
+                matches = store.get_items(
+                    locator,
+                    qualifiers={'category': 'chapter'},
+                    settings={'display_name': re.compile(r'Hera')},
+                )
+                self.assertEqual(len(matches), 2)
+                self.assertEqual(mock_build.call_count, 1)
+
     def test_get_parents(self):
         '''
         get_parent_location(locator): BlockUsageLocator
@@ -1242,6 +1291,40 @@ class SplitModuleItemTests(SplitModuleTest):
         parent = modulestore().get_parent_location(locator)
         self.assertIsNone(parent)
 
+    def test_get_parents_uses_parent_index(self):
+        """
+        The child to parent index of a stored structure is built only once.
+        """
+        store = modulestore()
+        course_key = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        with store.bulk_operations(course_key):
+            with patch.object(
+                store, 'build_block_key_to_parents_mapping', wraps=store.build_block_key_to_parents_mapping
+            ) as mock_build:
+                for block_id in ('chapter1', 'chapter2', 'chapter3'):
+                    parent = store.get_parent_location(course_key.make_usage_key('chapter', block_id))
+                    self.assertEqual(parent.block_id, 'head12345')
+                self.assertEqual(mock_build.call_count, 1)
+
+    @patch('xmodule.tabs.CourseTab.from_json', side_effect=mock_tab_from_json)
+    def test_prefetch_definitions(self, _from_json):
+        """
+        Loading a subtree loads the definitions of its blocks with content fields in one query.
+        """
+        store = modulestore()
+        locator = BlockUsageLocator(
+            CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT), 'chapter', 'chapter3'
+        )
+        with patch.object(store, 'prefetch_definitions', True):
+            with patch.object(store, 'get_definitions', wraps=store.get_definitions) as mock_get_definitions:
+                chapter = store.get_item(locator, depth=None)
+                self.assertEqual(mock_get_definitions.call_count, 1)
+
+            with patch.object(store, 'get_definition', wraps=store.get_definition) as mock_get_definition:
+                for problem in chapter.get_children():
+                    self.assertIsNotNone(problem.data)
+                self.assertFalse(mock_get_definition.called)
+
     @patch('xmodule.tabs.CourseTab.from_json', side_effect=mock_tab_from_json)
     def test_get_children(self, _from_json):
         """
@@ -1703,6 +1786,45 @@ class TestItemCrud(SplitModuleTest):
                         check_subtree(sub)
         check_subtree(nodes[0])
 
+    def test_structure_deltas(self):
+        """
+        Test storing new structures as the blocks which differ from their base structure
+        """
+        store = modulestore()
+        course = self.create_course_for_deletion()
+        base_version = course.location.as_object_id(course.location.version_guid)
+        reusable_location = course.id.version_agnostic().for_branch(BRANCH_NAME_DRAFT)
+        problems = store.get_items(reusable_location, qualifiers={'category': 'problem'})
+        updated_key = BlockKey.from_usage_key(problems[0].location)
+        deleted_key = BlockKey.from_usage_key(problems[1].location)
+        parent_key = BlockKey.from_usage_key(store.get_parent_location(problems[1].location))
+
+        with patch.object(store.db_connection, 'structure_delta_ratio', 0.5):
+            problems[0].display_name = 'Changed'
+            store.update_item(problems[0], self.user_id)
+            new_course_loc = store.delete_item(problems[1].location, self.user_id)
+        new_version = new_course_loc.as_object_id(new_course_loc.version_guid)
+
+        # only the blocks which differ from the base are stored
+        document = store.db_connection.structures.find_one({'_id': new_version})
+        self.assertEqual(document['base_version'], base_version)
+        self.assertItemsEqual(
+            [BlockKey(block['block_type'], block['block_id']) for block in document['blocks']],
+            [updated_key, parent_key]
+        )
+        self.assertEqual([BlockKey(*block_key) for block_key in document['removed_blocks']], [deleted_key])
+
+        # but the structure read back has all its blocks
+        base_structure = store.db_connection.get_structure(base_version)
+        structure = store.db_connection.get_structure(new_version)
+        self.assertEqual(set(structure['blocks']), set(base_structure['blocks']) - {deleted_key})
+        self.assertEqual(structure['blocks'][updated_key].fields['display_name'], 'Changed')
+        self.assertNotIn(deleted_key, structure['blocks'][parent_key].fields['children'])
+        self.assertEqual(
+            structure['blocks'][structure['root']], base_structure['blocks'][base_structure['root']]
+        )
+        self.assertFalse(store.has_item(problems[1].location.version_agnostic()))
+
     def create_course_for_deletion(self):
         """
         Create a course we can delete
@@ -1984,6 +2106,71 @@ class TestInheritance(SplitModuleTest):
         # overridden
         self.assertEqual(node.graceperiod, datetime.timedelta(hours=4))
 
+    def test_inherited_settings_map(self):
+        """
+        The inherited settings of a stored structure are computed once and hold the values set by ancestors.
+        """
+        store = modulestore()
+        course_key = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        with store.bulk_operations(course_key):
+            structure = store._lookup_course(course_key).structure
+            blocks = structure['blocks']
+            course_graceperiod = blocks[BlockKey('course', 'head12345')].fields['graceperiod']
+            with patch.object(store, 'inherit_settings', wraps=store.inherit_settings) as mock_inherit:
+                inherited_settings_map = store._get_inherited_settings_map(course_key, structure)
+                self.assertIs(store._get_inherited_settings_map(course_key, structure), inherited_settings_map)
+                self.assertEqual(mock_inherit.call_count, 1)
+
+        self.assertEqual(inherited_settings_map[BlockKey('course', 'head12345')], {})
+        # problem1 overrides the graceperiod, which doesn't change what it inherits
+        for block_key in (BlockKey('problem', 'problem3_2'), BlockKey('problem', 'problem1')):
+            self.assertEqual(inherited_settings_map[block_key]['graceperiod'], course_graceperiod)
+        self.assertNotEqual(blocks[BlockKey('problem', 'problem1')].fields['graceperiod'], course_graceperiod)
+
+    def test_inheritance_from_inherited_settings_map(self):
+        """
+        Blocks of a stored structure inherit their settings without loading their ancestors,
+        while blocks of a structure edited in a bulk operation inherit from their edited ancestors.
+        """
+        course_key = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        problem = modulestore().get_item(BlockUsageLocator(course_key, 'problem', 'problem3_2'))
+        self.assertIsNotNone(problem.runtime.inherited_settings_loader)
+        with patch.object(problem.runtime, 'get_block', wraps=problem.runtime.get_block) as mock_get_block:
+            self.assertEqual(problem.graceperiod, datetime.timedelta(hours=2))
+            self.assertFalse(problem.visible_to_staff_only)
+            self.assertFalse(mock_get_block.called)
+
+        with modulestore().bulk_operations(course_key):
+            chapter = modulestore().get_item(BlockUsageLocator(course_key, 'chapter', 'chapter3'))
+            chapter.visible_to_staff_only = True
+            modulestore().update_item(chapter, self.user_id)
+            problem = modulestore().get_item(problem.location.version_agnostic())
+            self.assertIsNone(problem.runtime.inherited_settings_loader)
+            self.assertTrue(problem.visible_to_staff_only)
+
+    def test_inherited_settings_map_loaded_lazily(self):
+        """
+        The inherited settings map of a stored structure is only built once a block reads an
+        inherited setting, and is then kept in the process's inherited settings cache.
+        """
+        course_key = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        locator = BlockUsageLocator(course_key, 'problem', 'problem3_2')
+        inherited_settings_cache = InheritedSettingsCache(max_blocks=1000)
+        build_map = SplitMongoModuleStore._build_inherited_settings_map
+        cache_path = 'xmodule.modulestore.split_mongo.mongo_connection.inherited_settings_cache'
+        with patch(cache_path, inherited_settings_cache):
+            with patch.object(
+                SplitMongoModuleStore, '_build_inherited_settings_map', autospec=True, side_effect=build_map
+            ) as mock_build:
+                problem = modulestore().get_item(locator)
+                self.assertFalse(mock_build.called)
+                self.assertEqual(problem.graceperiod, datetime.timedelta(hours=2))
+                self.assertEqual(mock_build.call_count, 1)
+
+                problem = modulestore().get_item(locator)
+                self.assertEqual(problem.graceperiod, datetime.timedelta(hours=2))
+                self.assertEqual(mock_build.call_count, 1)
+
     def test_inheritance_not_saved(self):
         """
         Was saving inherited settings with updated blocks causing inheritance to be sticky
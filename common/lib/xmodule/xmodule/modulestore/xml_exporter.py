@@ -2,6 +2,7 @@
 Methods for exporting course data to XML
 """
 
+import hashlib
 import logging
 from abc import abstractmethod
 import lxml.etree
@@ -14,8 +15,9 @@ from xmodule.modulestore.inheritance import own_metadata
 from xmodule.modulestore.store_utilities import draft_node_constructor, get_draft_subtree_roots
 from xmodule.modulestore import LIBRARY_ROOT
 from fs.osfs import OSFS
-from json import dumps
+from json import dump, dumps, load
 import os
+import time
 
 from xmodule.modulestore.draft_and_published import DIRECT_ONLY_CATEGORIES
 from opaque_keys.edx.locator import CourseLocator, LibraryLocator
@@ -25,6 +27,9 @@ PUBLISHED_DIR = "published"
 
 DEFAULT_CONTENT_FIELDS = ['metadata', 'data']
 
+# Suffix of the manifest which an incremental export keeps next to the directory it exported to
+EXPORT_MANIFEST_SUFFIX = '.export_manifest.json'
+
 
 def _export_drafts(modulestore, course_key, export_fs, xml_centric_course_key):
     """
@@ -100,11 +105,138 @@ def _export_drafts(modulestore, course_key, export_fs, xml_centric_course_key):
                 draft_node.module.add_xml_to_node(node)
 
 
+class _RecordingFS(object):
+    """
+    Wraps a filesystem, calling `record` with the path of each file opened on it for writing.
+    """
+    def __init__(self, wrapped_fs, record):
+        self._wrapped_fs = wrapped_fs
+        self._record = record
+
+    def open(self, path, mode='r', *args, **kwargs):  # pylint: disable=missing-docstring
+        if set(mode) & set('wa+'):
+            self._record(os.path.normpath(path.lstrip('/')))
+        return self._wrapped_fs.open(path, mode, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped_fs, name)
+
+
+class BlockExportCache(object):
+    """
+    Reuses the xml which a previous incremental export wrote for the subtrees of blocks which haven't
+    been edited since.
+
+    Each subtree's version is a digest of the locations, `edited_on` dates and definition ids of its
+    blocks, so editing, adding, removing or moving any block changes the versions of its ancestors'
+    subtrees. The runtime asks this cache for each child's xml during the export: a subtree whose
+    version is the same as in the previous export, and whose files are all still there, gets the
+    node which the previous export made for it, and its files are kept rather than written again.
+    """
+    def __init__(self, export_fs, previous_blocks):
+        """
+        `export_fs`: The filesystem which the courselike is exported to
+        `previous_blocks`: The `blocks` of the previous export's manifest
+        """
+        self.export_fs = _RecordingFS(export_fs, self._record_file)
+        self.previous_blocks = previous_blocks
+        # The version, the xml of the node and the files written of each exported subtree, by location
+        self.blocks = {}
+        # The files of the reused subtrees
+        self.kept_files = set()
+        self._versions = {}
+        # The sets of files written by the subtrees being exported, innermost last
+        self._recorders = []
+
+    def add_xml_to_node(self, block, node):
+        """
+        Sets the block's xml on the node and writes its files, as `block.add_xml_to_node(node)` does,
+        unless the previous export's can be reused.
+        """
+        if block.runtime.export_fs is not self.export_fs:
+            # Not exported to this export's filesystem, like a draft
+            block.add_xml_to_node(node)
+            return
+
+        version = self._subtree_version(block)
+        location = unicode(block.location)
+        previous = self.previous_blocks.get(location)
+        if version is not None and previous is not None and previous['version'] == version and all(
+            self.export_fs.isfile(file_path) for file_path in previous['files']
+        ):
+            previous_node = lxml.etree.fromstring(previous['node'])
+            node.clear()
+            node.tag = previous_node.tag
+            node.text = previous_node.text
+            node.attrib.update(previous_node.attrib)
+            node.extend(previous_node)
+            files = previous['files']
+            self.kept_files.update(files)
+            self._keep_descendants(block)
+        else:
+            written = set()
+            self._recorders.append(written)
+            try:
+                block.add_xml_to_node(node)
+            finally:
+                self._recorders.pop()
+            files = sorted(written)
+
+        for written in self._recorders:
+            written.update(files)
+        if version is not None:
+            self.blocks[location] = {
+                'version': version,
+                'node': lxml.etree.tostring(node, encoding='unicode', with_tail=False),
+                'files': files,
+            }
+
+    def _record_file(self, file_path):
+        """
+        Records that the subtrees being exported wrote the file at file_path.
+        """
+        for written in self._recorders:
+            written.add(file_path)
+
+    def _keep_descendants(self, block):
+        """
+        Keeps the previous export's entries of the descendants of the block, whose subtree is reused,
+        so that they can be reused by the next export even if the block has been edited by then.
+        """
+        for child in block.get_children() if block.has_children else []:
+            location = unicode(child.location)
+            if location in self.previous_blocks:
+                self.blocks[location] = self.previous_blocks[location]
+            self._keep_descendants(child)
+
+    def _subtree_version(self, block):
+        """
+        Returns the version of the block's subtree, or None if one of its blocks has no edit info.
+        """
+        location = unicode(block.location)
+        if location not in self._versions:
+            child_versions = [
+                self._subtree_version(child) for child in (block.get_children() if block.has_children else [])
+            ]
+            edited_on = getattr(block, 'edited_on', None)
+            definition_locator = getattr(block, 'definition_locator', None)
+            if edited_on is None or None in child_versions:
+                self._versions[location] = None
+            else:
+                parts = [
+                    location,
+                    unicode(edited_on),
+                    unicode(definition_locator.definition_id) if definition_locator is not None else u'',
+                ] + child_versions
+                self._versions[location] = hashlib.md5(u'\n'.join(parts).encode('utf-8')).hexdigest()
+        return self._versions[location]
+
+
 class ExportManager(object):
     """
     Manages XML exporting for courselike objects.
     """
-    def __init__(self, modulestore, contentstore, courselike_key, root_dir, target_dir):
+    def __init__(self, modulestore, contentstore, courselike_key, root_dir, target_dir, incremental=False):
         """
         Export all modules from `modulestore` and content from `contentstore` as xml to `root_dir`.
 
@@ -113,12 +245,25 @@ class ExportManager(object):
         `courselike_key`: The Locator of the Descriptor to export
         `root_dir`: The directory to write the exported xml to
         `target_dir`: The name of the directory inside `root_dir` to write the content to
+        `incremental`: Whether to update a previous incremental export in the same directory: the static
+            assets which haven't changed since aren't downloaded again, the blocks which haven't been
+            edited since aren't serialized again (see BlockExportCache), and the files of the previous
+            export which this export doesn't write are removed. The files written, the digests of the
+            assets and the versions of the blocks are kept in a manifest next to the directory.
         """
         self.modulestore = modulestore
         self.contentstore = contentstore
         self.courselike_key = courselike_key
         self.root_dir = root_dir
         self.target_dir = target_dir
+        self.incremental = incremental
+        # The digests of the static assets exported, by path in the static directory, and those of the
+        # previous incremental export
+        self.asset_digests = {}
+        self.previous_asset_digests = None
+        # The BlockExportCache of an incremental export, and the manifest's blocks it starts from
+        self.block_cache = None
+        self.previous_blocks = {}
 
     @abstractmethod
     def get_key(self):
@@ -148,10 +293,100 @@ class ExportManager(object):
         Get the target courselike object for this export.
         """
 
+    def export_assets(self, static_dir, assets_policy_file):
+        """
+        Export the courselike's static assets from the contentstore to static_dir, and their
+        attributes to the assets_policy_file.
+        """
+        if self.incremental:
+            digests = self.contentstore.export_all_for_course(
+                self.courselike_key, static_dir, assets_policy_file, previous_digests=self.previous_asset_digests
+            )
+            self.asset_digests.update(digests)
+        else:
+            self.contentstore.export_all_for_course(self.courselike_key, static_dir, assets_policy_file)
+
+    def _written_files(self, start, manifest_path):
+        """
+        Returns the paths, relative to the target directory, of the files modified since start.
+        """
+        courselike_dir = os.path.join(self.root_dir, self.target_dir)
+        files = set()
+        for dirpath, dirnames, filenames in os.walk(courselike_dir):
+            # Leave alone anything hidden, like a repository the export is kept in
+            dirnames[:] = [dirname for dirname in dirnames if not dirname.startswith('.')]
+            for filename in filenames:
+                file_path = os.path.join(dirpath, filename)
+                if file_path != manifest_path and os.path.getmtime(file_path) >= start:
+                    files.add(os.path.relpath(file_path, courselike_dir))
+        return files
+
+    def _remove_stale_files(self, manifest, start, manifest_path):
+        """
+        Removes the files which the previous incremental export wrote, as listed in its manifest,
+        and which this export hasn't written or kept, then writes the manifest of this export.
+        """
+        courselike_dir = os.path.join(self.root_dir, self.target_dir)
+        files = self._written_files(start, manifest_path)
+        files.update(os.path.join('static', asset_path) for asset_path in self.asset_digests)
+        if self.block_cache is not None:
+            files.update(self.block_cache.kept_files)
+        files = {
+            relative_path for relative_path in files if os.path.isfile(os.path.join(courselike_dir, relative_path))
+        }
+
+        for relative_path in set(manifest['files']) - files:
+            file_path = os.path.join(courselike_dir, relative_path)
+            if os.path.isfile(file_path):
+                os.remove(file_path)
+
+        blocks = self.block_cache.blocks if self.block_cache is not None else {}
+        _write_export_manifest(manifest_path, files, self.asset_digests, blocks)
+
+    def _record_failed_export(self, manifest, start, manifest_path):
+        """
+        Writes the manifest of a failed incremental export, listing the files which it may have written
+        besides those of the previous export, so that the next export removes them if they are stale.
+        Nothing which it wrote is reused, as it may only be partly written.
+        """
+        written = self._written_files(start, manifest_path)
+        assets = {
+            asset_path: digest for asset_path, digest in manifest['assets'].iteritems()
+            if os.path.join('static', asset_path) not in written
+        }
+        blocks = {
+            location: block for location, block in manifest['blocks'].iteritems()
+            if not written.intersection(block['files'])
+        }
+        _write_export_manifest(manifest_path, written.union(manifest['files']), assets, blocks)
+
     def export(self):
         """
         Perform the export given the parameters handed to this class at init.
         """
+        if not self.incremental:
+            self._export()
+            return
+
+        manifest_path = os.path.join(self.root_dir, self.target_dir) + EXPORT_MANIFEST_SUFFIX
+        manifest = _read_export_manifest(manifest_path)
+        self.previous_asset_digests = manifest['assets']
+        self.previous_blocks = manifest['blocks']
+        # Files modified from then on were written by this export. (Some file systems only keep
+        # modification times to the second.)
+        start = int(time.time()) - 1
+
+        try:
+            self._export()
+        except Exception:
+            self._record_failed_export(manifest, start, manifest_path)
+            raise
+        self._remove_stale_files(manifest, start, manifest_path)
+
+    def _export(self):
+        """
+        Export the courselike into the target directory.
+        """
         with self.modulestore.bulk_operations(self.courselike_key):
 
             fsm = OSFS(self.root_dir)
@@ -161,11 +396,18 @@ class ExportManager(object):
             with self.modulestore.branch_setting(ModuleStoreEnum.Branch.published_only, self.courselike_key):
                 courselike = self.get_courselike()
                 export_fs = courselike.runtime.export_fs = fsm.makeopendir(self.target_dir)
+                if self.incremental:
+                    self.block_cache = BlockExportCache(export_fs, self.previous_blocks)
+                    export_fs = courselike.runtime.export_fs = self.block_cache.export_fs
 
                 # change all of the references inside the course to use the xml expected key type w/o version & branch
                 xml_centric_courselike_key = self.get_key()
                 adapt_references(courselike, xml_centric_courselike_key, export_fs)
-                courselike.add_xml_to_node(root)
+                courselike.runtime.export_cache = self.block_cache
+                try:
+                    courselike.add_xml_to_node(root)
+                finally:
+                    courselike.runtime.export_cache = None
 
             # Make any needed adjustments to the root node.
             self.process_root(root, export_fs)
@@ -216,11 +458,7 @@ class CourseExportManager(ExportManager):
         # export the static assets
         policies_dir = export_fs.makeopendir('policies')
         if self.contentstore:
-            self.contentstore.export_all_for_course(
-                self.courselike_key,
-                root_courselike_dir + '/static/',
-                root_courselike_dir + '/policies/assets.json',
-            )
+            self.export_assets(root_courselike_dir + '/static/', root_courselike_dir + '/policies/assets.json')
 
             # If we are using the default course image, export it to the
             # legacy location to support backwards compatibility.
@@ -318,8 +556,7 @@ class LibraryExportManager(ExportManager):
         export_fs.makeopendir('policies')
 
         if self.contentstore:
-            self.contentstore.export_all_for_course(
-                self.courselike_key,
+            self.export_assets(
                 self.root_dir + '/' + self.target_dir + '/static/',
                 self.root_dir + '/' + self.target_dir + '/policies/assets.json',
             )
@@ -337,18 +574,39 @@ class LibraryExportManager(ExportManager):
         xml_file.close()
 
 
-def export_course_to_xml(modulestore, contentstore, course_key, root_dir, course_dir):
+def export_course_to_xml(modulestore, contentstore, course_key, root_dir, course_dir, incremental=False):
     """
     Thin wrapper for the Course Export Manager. See ExportManager for details.
     """
-    CourseExportManager(modulestore, contentstore, course_key, root_dir, course_dir).export()
+    CourseExportManager(modulestore, contentstore, course_key, root_dir, course_dir, incremental).export()
 
 
-def export_library_to_xml(modulestore, contentstore, library_key, root_dir, library_dir):
+def export_library_to_xml(modulestore, contentstore, library_key, root_dir, library_dir, incremental=False):
     """
     Thin wrapper for the Library Export Manager. See ExportManager for details.
     """
-    LibraryExportManager(modulestore, contentstore, library_key, root_dir, library_dir).export()
+    LibraryExportManager(modulestore, contentstore, library_key, root_dir, library_dir, incremental).export()
+
+
+def _read_export_manifest(manifest_path):
+    """
+    Returns the manifest of the incremental export at the given path, or an empty manifest if
+    there was none, or it can't be read.
+    """
+    try:
+        with open(manifest_path) as manifest_file:
+            manifest = load(manifest_file)
+        return {'files': manifest['files'], 'assets': manifest['assets'], 'blocks': manifest['blocks']}
+    except (IOError, ValueError, KeyError, TypeError):
+        return {'files': [], 'assets': {}, 'blocks': {}}
+
+
+def _write_export_manifest(manifest_path, files, assets, blocks):
+    """
+    Writes the manifest of an incremental export to the given path.
+    """
+    with open(manifest_path, 'w') as manifest_file:
+        dump({'files': sorted(files), 'assets': assets, 'blocks': blocks}, manifest_file, sort_keys=True, indent=4)
 
 
 def adapt_references(subtree, destination_course_key, export_fs):
@@ -22,6 +22,9 @@ Modulestore virtual   |          XML physical (draft, published)
 """
 import logging
 from abc import abstractmethod
+from contextlib import contextmanager
+from multiprocessing.pool import ThreadPool
+from time import time
 from opaque_keys.edx.locator import LibraryLocator
 import os
 import mimetypes
@@ -57,8 +60,11 @@ log = logging.getLogger(__name__)
 
 def import_static_content(
         course_data_path, static_content_store,
-        target_id, subpath='static', verbose=False):
-
+        target_id, subpath='static', verbose=False, threads=1):
+    """
+    Imports the static files of the course in course_data_path/subpath into static_content_store,
+    saving up to `threads` files concurrently, and returns the map of their paths to their asset keys.
+    """
     remap_dict = {}
 
     # now import all static assets
@@ -77,70 +83,98 @@ def import_static_content(
     mimetypes.add_type('application/octet-stream', '.srt')
     mimetypes_list = mimetypes.types_map.values()
 
-    for dirname, _, filenames in os.walk(static_dir):
-        for filename in filenames:
-
-            content_path = os.path.join(dirname, filename)
-
-            if re.match(ASSET_IGNORE_REGEX, filename):
-                if verbose:
-                    log.debug('skipping static content %s...', content_path)
-                continue
+    def static_files():
+        """
+        Yields the path and name of each static file to import.
+        """
+        for dirname, _, filenames in os.walk(static_dir):
+            for filename in filenames:
 
-            if verbose:
-                log.debug('importing static content %s...', content_path)
+                content_path = os.path.join(dirname, filename)
 
-            try:
-                with open(content_path, 'rb') as f:
-                    data = f.read()
-            except IOError:
-                if filename.startswith('._'):
-                    # OS X "companion files". See
-                    # http://www.diigo.com/annotated/0c936fda5da4aa1159c189cea227e174
+                if re.match(ASSET_IGNORE_REGEX, filename):
+                    if verbose:
+                        log.debug('skipping static content %s...', content_path)
                     continue
-                # Not a 'hidden file', then re-raise exception
-                raise
 
-            # strip away leading path from the name
-            fullname_with_subpath = content_path.replace(static_dir, '')
-            if fullname_with_subpath.startswith('/'):
-                fullname_with_subpath = fullname_with_subpath[1:]
-            asset_key = StaticContent.compute_location(target_id, fullname_with_subpath)
+                yield content_path, filename
 
-            policy_ele = policy.get(asset_key.path, {})
+    def import_static_file(static_file):
+        """
+        Saves the given static file, a tuple of its path and name, into the contentstore, and returns
+        its path in the course's static files and its asset key, or None if it was skipped.
+        """
+        content_path, filename = static_file
+        if verbose:
+            log.debug('importing static content %s...', content_path)
 
-            # During export display name is used to create files, strip away slashes from name
-            displayname = escape_invalid_characters(
-                name=policy_ele.get('displayname', filename),
-                invalid_char_list=['/', '\\']
-            )
-            locked = policy_ele.get('locked', False)
-            mime_type = policy_ele.get('contentType')
-
-            # Check extracted contentType in list of all valid mimetypes
-            if not mime_type or mime_type not in mimetypes_list:
-                mime_type = mimetypes.guess_type(filename)[0]   # Assign guessed mimetype
-            content = StaticContent(
-                asset_key, displayname, mime_type, data,
-                import_path=fullname_with_subpath, locked=locked
-            )
+        try:
+            with open(content_path, 'rb') as f:
+                data = f.read()
+        except IOError:
+            if filename.startswith('._'):
+                # OS X "companion files". See
+                # http://www.diigo.com/annotated/0c936fda5da4aa1159c189cea227e174
+                return None
+            # Not a 'hidden file', then re-raise exception
+            raise
+
+        # strip away leading path from the name
+        fullname_with_subpath = content_path.replace(static_dir, '')
+        if fullname_with_subpath.startswith('/'):
+            fullname_with_subpath = fullname_with_subpath[1:]
+        asset_key = StaticContent.compute_location(target_id, fullname_with_subpath)
+
+        policy_ele = policy.get(asset_key.path, {})
+
+        # During export display name is used to create files, strip away slashes from name
+        displayname = escape_invalid_characters(
+            name=policy_ele.get('displayname', filename),
+            invalid_char_list=['/', '\\']
+        )
+        locked = policy_ele.get('locked', False)
+        mime_type = policy_ele.get('contentType')
+
+        # Check extracted contentType in list of all valid mimetypes
+        if not mime_type or mime_type not in mimetypes_list:
+            mime_type = mimetypes.guess_type(filename)[0]   # Assign guessed mimetype
+        content = StaticContent(
+            asset_key, displayname, mime_type, data,
+            import_path=fullname_with_subpath, locked=locked
+        )
 
-            # first let's save a thumbnail so we can get back a thumbnail location
-            thumbnail_content, thumbnail_location = static_content_store.generate_thumbnail(content)
+        # first let's save a thumbnail so we can get back a thumbnail location
+        thumbnail_content, thumbnail_location = static_content_store.generate_thumbnail(content)
 
-            if thumbnail_content is not None:
-                content.thumbnail_location = thumbnail_location
+        if thumbnail_content is not None:
+            content.thumbnail_location = thumbnail_location
 
-            # then commit the content
-            try:
-                static_content_store.save(content)
-            except Exception as err:
-                log.exception(u'Error importing {0}, error={1}'.format(
-                    fullname_with_subpath, err
-                ))
-
-            # store the remapping information which will be needed
-            # to subsitute in the module data
+        # then commit the content
+        try:
+            static_content_store.save(content)
+        except Exception as err:
+            log.exception(u'Error importing {0}, error={1}'.format(
+                fullname_with_subpath, err
+            ))
+
+        return fullname_with_subpath, asset_key
+
+    if threads > 1:
+        # Read and save the files in a pool of threads, as they are found, so that only the
+        # files being saved are held in memory while the others wait on the contentstore.
+        pool = ThreadPool(threads)
+        try:
+            results = list(pool.imap_unordered(import_static_file, static_files()))
+        finally:
+            pool.terminate()
+    else:
+        results = [import_static_file(static_file) for static_file in static_files()]
+
+    # store the remapping information which will be needed
+    # to subsitute in the module data
+    for result in results:
+        if result is not None:
+            fullname_with_subpath, asset_key = result
             remap_dict[fullname_with_subpath] = asset_key
 
     return remap_dict
@@ -178,6 +212,11 @@ class ImportManager(object):
             Otherwise, it throws an InvalidLocationError if the courselike does not exist.
 
         default_class, load_error_modules: are arguments for constructing the XMLModuleStore (see its doc)
+
+        static_content_threads: the number of static files to save into static_content_store concurrently
+
+        stage_callback: if given, is called with the name of each stage of the import ('parse', 'static',
+            'asset_metadata', 'children' and 'drafts') as it completes, and the seconds it took
     """
     store_class = XMLModuleStore
 
@@ -187,7 +226,7 @@ class ImportManager(object):
             load_error_modules=True, static_content_store=None,
             target_id=None, verbose=False,
             do_import_static=True, create_if_not_present=False,
-            raise_on_failure=False
+            raise_on_failure=False, static_content_threads=1, stage_callback=None
     ):
         self.store = store
         self.user_id = user_id
@@ -200,17 +239,32 @@ class ImportManager(object):
         self.do_import_static = do_import_static
         self.create_if_not_present = create_if_not_present
         self.raise_on_failure = raise_on_failure
-        self.xml_module_store = self.store_class(
-            data_dir,
-            default_class=default_class,
-            source_dirs=source_dirs,
-            load_error_modules=load_error_modules,
-            xblock_mixins=store.xblock_mixins,
-            xblock_select=store.xblock_select,
-            target_course_id=target_id,
-        )
+        self.static_content_threads = static_content_threads
+        self.stage_callback = stage_callback
+        with self.stage('parse'):
+            self.xml_module_store = self.store_class(
+                data_dir,
+                default_class=default_class,
+                source_dirs=source_dirs,
+                load_error_modules=load_error_modules,
+                xblock_mixins=store.xblock_mixins,
+                xblock_select=store.xblock_select,
+                target_course_id=target_id,
+            )
         self.logger, self.errors = make_error_tracker()
 
+    @contextmanager
+    def stage(self, name):
+        """
+        Times the stage of the import with the given name, and reports it to the stage_callback.
+        """
+        start = time()
+        yield
+        elapsed = time() - start
+        log.info(u'Import stage %s took %.3fs', name, elapsed)
+        if self.stage_callback is not None:
+            self.stage_callback(name, elapsed)
+
     def preflight(self):
         """
         Perform any pre-import sanity checks.
@@ -228,7 +282,8 @@ class ImportManager(object):
             # first pass to find everything in /static/
             import_static_content(
                 data_path, self.static_content_store,
-                dest_id, subpath='static', verbose=self.verbose
+                dest_id, subpath='static', verbose=self.verbose,
+                threads=self.static_content_threads
             )
 
         elif self.verbose and not self.do_import_static:
@@ -251,7 +306,8 @@ class ImportManager(object):
         if os.path.exists(data_path / simport):
             import_static_content(
                 data_path, self.static_content_store,
-                dest_id, subpath=simport, verbose=self.verbose
+                dest_id, subpath=simport, verbose=self.verbose,
+                threads=self.static_content_threads
             )
 
     def import_asset_metadata(self, data_dir, course_id):
@@ -440,20 +496,23 @@ class ImportManager(object):
                 source_courselike, courselike, data_path = self.get_courselike(courselike_key, runtime, dest_id)
 
                 # Import all static pieces.
-                self.import_static(data_path, dest_id)
+                with self.stage('static'):
+                    self.import_static(data_path, dest_id)
 
                 # Import asset metadata stored in XML.
-                self.import_asset_metadata(data_path, dest_id)
+                with self.stage('asset_metadata'):
+                    self.import_asset_metadata(data_path, dest_id)
 
                 # Import all children
-                self.import_children(source_courselike, courselike, courselike_key, dest_id)
+                with self.stage('children'):
+                    self.import_children(source_courselike, courselike, courselike_key, dest_id)
 
             # This bulk operation wraps all the operations to populate the draft branch with any items
             # from the /drafts subdirectory.
             # Drafts must be imported in a separate bulk operation from published items to import properly,
             # due to the recursive_build() above creating a draft item for each course block
             # and then publishing it.
-            with self.store.bulk_operations(dest_id):
+            with self.stage('drafts'), self.store.bulk_operations(dest_id):
                 # Import all draft items into the courselike.
                 courselike = self.import_drafts(courselike, courselike_key, data_path, dest_id)
 
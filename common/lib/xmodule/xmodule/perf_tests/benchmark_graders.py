@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""
+Compares the time taken to grade a synthetic course of many learners with
+the graders in xmodule.graders and with xmodule.vectorized_graders.
+"""
+
+import random
+import timeit
+from collections import OrderedDict
+
+import numpy
+
+from xmodule.graders import AggregatedScore, grader_from_conf
+from xmodule.vectorized_graders import VectorizedCourseGrader
+
+try:
+    import click
+except ImportError:
+    click = None
+
+
+GRADING_POLICY = [
+    {'type': 'Homework', 'min_count': 12, 'drop_count': 2, 'short_label': 'HW', 'weight': 0.15},
+    {'type': 'Lab', 'min_count': 12, 'drop_count': 2, 'weight': 0.15},
+    {'type': 'Midterm Exam', 'short_label': 'Midterm', 'min_count': 1, 'drop_count': 0, 'weight': 0.3},
+    {'type': 'Final Exam', 'short_label': 'Final', 'min_count': 1, 'drop_count': 0, 'weight': 0.4},
+]
+
+GRADE_CUTOFFS = {'Pass': 0.5}
+
+SUBSECTION_FORMATS = ['Homework'] * 12 + ['Lab'] * 12 + ['Midterm Exam', 'Final Exam']
+
+
+class _Grade(object):
+    """
+    Minimal stand-in for a SubsectionGrade in a grade sheet.
+    """
+    def __init__(self, earned, possible):
+        self.graded_total = AggregatedScore(earned, possible, graded=True, first_attempted=None)
+        self.display_name = u'Subsection'
+
+
+def make_scores(num_learners, seed=0):
+    """
+    Returns random (learners x subsections) arrays of earned and possible scores.
+    """
+    rand = numpy.random.RandomState(seed)
+    possible = rand.randint(1, 20, size=(num_learners, len(SUBSECTION_FORMATS))).astype(float)
+    possible *= rand.random_sample(possible.shape) < 0.9
+    earned = numpy.floor(possible * rand.random_sample(possible.shape))
+    return earned, possible
+
+
+def make_grade_sheets(earned, possible):
+    """
+    Returns a grade sheet for each learner, as built by CourseGrade.
+    """
+    grade_sheets = []
+    for learner in range(earned.shape[0]):
+        grade_sheet = {}
+        for index, subsection_format in enumerate(SUBSECTION_FORMATS):
+            if possible[learner, index] > 0:
+                grade_sheet.setdefault(subsection_format, OrderedDict())[index] = _Grade(
+                    earned[learner, index], possible[learner, index],
+                )
+        grade_sheets.append(grade_sheet)
+    return grade_sheets
+
+
+def run_benchmark(num_learners, repeat):
+    """
+    Grades num_learners random learners with both graders, returning the
+    best time in seconds of each, as a tuple (scalar, vectorized).
+    """
+    grader = grader_from_conf(GRADING_POLICY)
+    vectorized_grader = VectorizedCourseGrader(grader, GRADE_CUTOFFS)
+    earned, possible = make_scores(num_learners, seed=random.randint(0, 1000))
+    grade_sheets = make_grade_sheets(earned, possible)
+
+    def scalar():
+        return [grader.grade(grade_sheet)['percent'] for grade_sheet in grade_sheets]
+
+    def vectorized():
+        return vectorized_grader.grade(earned, possible, SUBSECTION_FORMATS)['percent']
+
+    numpy.testing.assert_array_almost_equal(scalar(), vectorized())
+    return (
+        min(timeit.repeat(scalar, number=1, repeat=repeat)),
+        min(timeit.repeat(vectorized, number=1, repeat=repeat)),
+    )
+
+
+if click is not None:
+    # pylint: disable=bad-continuation
+    @click.command()
+    @click.option('--num_learners',
+                  type=click.INT,
+                  default=10000,
+                  help="Number of learners to grade.",
+                  required=False
+                  )
+    @click.option('--repeat',
+                  type=click.INT,
+                  default=3,
+                  help="Number of timed runs of each grader.",
+                  required=False
+                  )
+    def cli(num_learners, repeat):
+        """
+        Times grading a synthetic course with the scalar and vectorized graders.
+        """
+        scalar_time, vectorized_time = run_benchmark(num_learners, repeat)
+        click.echo(u"Learners: {}".format(num_learners))
+        click.echo(u"xmodule.graders: {:.3f}s".format(scalar_time))
+        click.echo(u"xmodule.vectorized_graders: {:.3f}s".format(vectorized_time))
+        click.echo(u"Speedup: {:.1f}x".format(scalar_time / vectorized_time))
+
+if __name__ == '__main__':
+    if click is not None:
+        cli()  # pylint: disable=no-value-for-parameter
+    else:
+        print "Aborted! Module 'click' is not installed."
@@ -39,3 +39,20 @@ class IgnoredFilesTestCase(unittest.TestCase):
         self.assertNotIn(".DS_Store", name_val)
         self.assertIn("GREEN", name_val["example.txt"])
         self.assertIn("BLUE", name_val[".example.txt"])
+
+    def test_import_static_files_in_threads(self):
+        """
+        Test that saving the static files concurrently imports the same files
+        """
+        course_dir = DATA_DIR / "toy"
+        course_id = CourseLocator("edX", "toy", "2012_Fall")
+        remap_dicts = []
+        saved_names = []
+        for threads in (1, 3):
+            content_store = Mock()
+            content_store.generate_thumbnail.return_value = ("content", "location")
+            remap_dicts.append(import_static_content(course_dir, content_store, course_id, threads=threads))
+            saved_names.append(sorted(call[0][0].name for call in content_store.save.call_args_list))
+        self.assertEqual(remap_dicts[0], remap_dicts[1])
+        self.assertEqual(saved_names[0], saved_names[1])
+        self.assertIn("handouts/sample_handout.txt", remap_dicts[1])
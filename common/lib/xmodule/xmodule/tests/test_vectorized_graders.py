@@ -0,0 +1,173 @@
+"""
+Tests that the vectorized graders return the same results as xmodule.graders.
+"""
+
+import random
+import unittest
+from collections import OrderedDict
+from datetime import datetime
+
+import ddt
+import numpy
+
+from xmodule import graders
+from xmodule.graders import AggregatedScore, ProblemScore, aggregate_scores
+from xmodule.vectorized_graders import VectorizedCourseGrader, aggregate_problem_scores
+
+
+class MockGrade(object):
+    """
+    Mock class for SubsectionGrade object.
+    """
+    def __init__(self, graded_total, display_name):
+        self.graded_total = graded_total
+        self.display_name = display_name
+
+
+GRADING_POLICIES = [
+    [
+        {'type': 'Homework', 'min_count': 12, 'drop_count': 2, 'short_label': 'HW', 'weight': 0.25},
+        {'type': 'Lab', 'min_count': 3, 'drop_count': 2, 'weight': 0.25},
+        {'type': 'Midterm', 'min_count': 1, 'drop_count': 0, 'weight': 0.5},
+    ],
+    [
+        {'type': 'Homework', 'min_count': 2, 'drop_count': 0, 'weight': 0.5},
+        {'type': 'Lab', 'min_count': 0, 'drop_count': 1, 'weight': 0.5},
+        {'type': 'Final', 'min_count': 1, 'drop_count': 3, 'weight': 0.5},
+    ],
+    [
+        {'type': 'Homework', 'min_count': 0, 'drop_count': 0, 'weight': 1.0},
+    ],
+]
+
+GRADE_CUTOFFS = {'A': 0.87, 'B': 0.7, 'C': 0.5, 'F': 0.0}
+
+SUBSECTION_FORMATS = ['Homework'] * 6 + ['Lab'] * 5 + ['Midterm', 'Final', None]
+
+
+@ddt.ddt
+class VectorizedCourseGraderTest(unittest.TestCase):
+    """
+    Tests VectorizedCourseGrader against the graders in xmodule.graders.
+    """
+    def setUp(self):
+        super(VectorizedCourseGraderTest, self).setUp()
+        self.random = random.Random(42)
+
+    def _random_scores(self, num_learners):
+        """
+        Returns random (learners x subsections) arrays of earned and
+        possible scores, including subsections without possible points.
+        """
+        earned = numpy.zeros((num_learners, len(SUBSECTION_FORMATS)))
+        possible = numpy.zeros((num_learners, len(SUBSECTION_FORMATS)))
+        for learner in range(num_learners):
+            for subsection in range(len(SUBSECTION_FORMATS)):
+                if self.random.random() < 0.8:
+                    possible[learner, subsection] = self.random.randint(1, 20)
+                    earned[learner, subsection] = self.random.randint(0, int(possible[learner, subsection]))
+        return earned, possible
+
+    def _scalar_grade(self, grader, earned, possible):
+        """
+        Grades a single learner with the given grader, building the grade
+        sheet the way CourseGrade.graded_subsections_by_format does.
+        """
+        grade_sheet = {}
+        for index, subsection_format in enumerate(SUBSECTION_FORMATS):
+            if subsection_format is not None and possible[index] > 0:
+                grade_sheet.setdefault(subsection_format, OrderedDict())[index] = MockGrade(
+                    AggregatedScore(earned[index], possible[index], graded=True, first_attempted=None),
+                    display_name=u'Subsection {}'.format(index),
+                )
+        return grader.grade(grade_sheet)
+
+    @ddt.data(*GRADING_POLICIES)
+    def test_equivalence(self, grading_policy):
+        grader = graders.grader_from_conf(grading_policy)
+        vectorized_grader = VectorizedCourseGrader(grader, GRADE_CUTOFFS)
+        earned, possible = self._random_scores(200)
+
+        result = vectorized_grader.grade(earned, possible, SUBSECTION_FORMATS)
+        course_percent = vectorized_grader.course_percent(result['percent'])
+        letter_grade = vectorized_grader.letter_grade(course_percent)
+        passed = vectorized_grader.passed(course_percent)
+
+        for learner in range(earned.shape[0]):
+            expected = self._scalar_grade(grader, earned[learner], possible[learner])
+            self.assertAlmostEqual(result['percent'][learner], expected['percent'])
+            for assignment_type, breakdown in expected['grade_breakdown'].iteritems():
+                self.assertAlmostEqual(result['grade_breakdown'][assignment_type][learner], breakdown['percent'])
+
+            expected_percent = round(expected['percent'] * 100 + 0.05) / 100
+            self.assertAlmostEqual(course_percent[learner], expected_percent)
+            self.assertEqual(letter_grade[learner], self._scalar_letter_grade(expected_percent))
+            self.assertEqual(passed[learner], expected_percent >= 0.5)
+
+    @staticmethod
+    def _scalar_letter_grade(percent):
+        """
+        Returns the letter grade for the percent, as in CourseGrade.
+        """
+        for letter_grade in sorted(GRADE_CUTOFFS, key=lambda x: GRADE_CUTOFFS[x], reverse=True):
+            if percent >= GRADE_CUTOFFS[letter_grade]:
+                return letter_grade
+
+    def test_no_learners(self):
+        vectorized_grader = VectorizedCourseGrader(graders.grader_from_conf(GRADING_POLICIES[0]))
+        result = vectorized_grader.grade(
+            numpy.zeros((0, len(SUBSECTION_FORMATS))), numpy.zeros((0, len(SUBSECTION_FORMATS))), SUBSECTION_FORMATS,
+        )
+        self.assertEqual(result['percent'].shape, (0,))
+
+    def test_no_passing_cutoff(self):
+        vectorized_grader = VectorizedCourseGrader(graders.grader_from_conf(GRADING_POLICIES[0]), {'F': 0.0})
+        self.assertFalse(vectorized_grader.passed([0.0, 1.0]).any())
+
+    def test_unsupported_grader(self):
+        class CustomGrader(graders.CourseGrader):
+            """
+            A grader that can't be vectorized.
+            """
+            def grade(self, grade_sheet, generate_random_scores=False):
+                return {'percent': 1.0, 'section_breakdown': [], 'grade_breakdown': {}}
+
+        with self.assertRaises(TypeError):
+            VectorizedCourseGrader(CustomGrader())
+        with self.assertRaises(TypeError):
+            VectorizedCourseGrader(graders.WeightedSubsectionsGrader([(CustomGrader(), 'Custom', 1.0)]))
+
+
+class AggregateProblemScoresTest(unittest.TestCase):
+    """
+    Tests aggregate_problem_scores against aggregate_scores.
+    """
+    def test_equivalence(self):
+        rand = random.Random(7)
+        problem_subsections = [0, 0, 1, 2, 2, 2]
+        graded = [True, False, True, True, True, False]
+        earned = numpy.array([[rand.randint(0, 3) for _ in graded] for _ in range(20)], dtype=float)
+        possible = numpy.array([[rand.choice([0, 3]) for _ in graded] for _ in range(20)], dtype=float)
+        earned = numpy.minimum(earned, possible)
+
+        subsection_earned, subsection_possible = aggregate_problem_scores(
+            earned, possible, problem_subsections, 3, graded,
+        )
+
+        for learner in range(earned.shape[0]):
+            for subsection in range(3):
+                scores = [
+                    ProblemScore(
+                        raw_earned=earned[learner, problem],
+                        raw_possible=possible[learner, problem],
+                        weighted_earned=earned[learner, problem],
+                        weighted_possible=possible[learner, problem],
+                        weight=1,
+                        graded=graded[problem],
+                        first_attempted=datetime(2000, 1, 1),
+                    )
+                    for problem in range(len(graded)) if problem_subsections[problem] == subsection
+                ]
+                _, graded_total = aggregate_scores(scores)
+                self.assertAlmostEqual(subsection_earned[learner, subsection], graded_total.earned)
+                self.assertAlmostEqual(subsection_possible[learner, subsection], graded_total.possible)
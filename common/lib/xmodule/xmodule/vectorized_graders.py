@@ -0,0 +1,176 @@
+"""
+Code used to calculate the grades of many learners at once.
+
+The graders in xmodule.graders grade a single learner from a grade sheet of
+subsection grades.  When a course's grading policy changes, every learner in
+the course has to be regraded, so the classes here instead represent the
+scores of all learners as (learners x problems) and (learners x subsections)
+NumPy arrays and apply the same aggregation, drop-lowest, weighting and
+cutoff rules with array operations.
+
+The results match those of the graders in xmodule.graders, up to floating
+point summation order.
+"""
+
+from __future__ import division
+
+from collections import OrderedDict
+
+import numpy
+
+from xmodule.graders import AssignmentFormatGrader, WeightedSubsectionsGrader
+
+
+def aggregate_problem_scores(earned, possible, problem_subsections, num_subsections, graded=None):
+    """
+    Sums (learners x problems) arrays of weighted earned and possible problem
+    scores into (learners x subsections) arrays, as aggregate_scores does for
+    the graded_total of a single learner's subsection.
+
+    Arguments:
+        earned, possible: (learners x problems) arrays of weighted scores.  A
+            problem without a score for a learner should be 0 earned of 0
+            possible.
+        problem_subsections: for each problem, the index of its subsection.
+        num_subsections: the number of subsections.
+        graded: optional sequence of booleans, whether each problem is
+            graded.  Ungraded problems are not included in the totals.
+
+    Returns a tuple (earned, possible) of (learners x subsections) arrays.
+    """
+    num_problems = len(problem_subsections)
+    membership = numpy.zeros((num_problems, num_subsections))
+    membership[numpy.arange(num_problems), numpy.asarray(problem_subsections, dtype=int)] = 1.0
+    if graded is not None:
+        membership *= numpy.asarray(graded, dtype=bool)[:, numpy.newaxis]
+    return (
+        numpy.dot(numpy.asarray(earned, dtype=float), membership),
+        numpy.dot(numpy.asarray(possible, dtype=float), membership),
+    )
+
+
+class VectorizedCourseGrader(object):
+    """
+    Grades many learners at once with the policy of a course grader.
+
+    grader is the course's grader, as returned by grader_from_conf, and must
+    be made of AssignmentFormatGraders.  grade_cutoffs is the course's
+    grade_cutoffs dict, used to compute letter grades and passing status.
+    """
+    def __init__(self, grader, grade_cutoffs=None):
+        if isinstance(grader, WeightedSubsectionsGrader):
+            subgraders = grader.subgraders
+        elif isinstance(grader, AssignmentFormatGrader):
+            subgraders = [(grader, grader.category, 1.0)]
+        else:
+            raise TypeError(u"Unsupported grader for vectorized grading: {}".format(type(grader).__name__))
+
+        for subgrader, _, _ in subgraders:
+            if not isinstance(subgrader, AssignmentFormatGrader):
+                raise TypeError(
+                    u"Unsupported subgrader for vectorized grading: {}".format(type(subgrader).__name__)
+                )
+
+        self.subgraders = subgraders
+        self.grade_cutoffs = grade_cutoffs or {}
+
+    def grade(self, earned, possible, subsection_formats):
+        """
+        Grades all learners from (learners x subsections) arrays of the
+        graded earned and possible scores of each subsection.
+
+        subsection_formats gives the format (assignment type) of each
+        subsection column, or None for subsections that are not graded.  As
+        in CourseGrade.graded_subsections_by_format, a subsection without any
+        possible points for a learner is left out of that learner's grade.
+
+        Returns a dict with the same keys as WeightedSubsectionsGrader.grade,
+        except for section_breakdown, where each value is an array with an
+        entry per learner:
+        - percent: the unrounded course percentage.
+        - grade_breakdown: an OrderedDict of the weighted percentage
+          of each assignment type.
+        """
+        earned = numpy.asarray(earned, dtype=float)
+        possible = numpy.asarray(possible, dtype=float)
+        subsection_formats = numpy.asarray(subsection_formats, dtype=object)
+
+        total_percent = numpy.zeros(earned.shape[0])
+        grade_breakdown = OrderedDict()
+        for subgrader, assignment_type, weight in self.subgraders:
+            columns = subsection_formats == subgrader.type
+            weighted_percent = self._assignment_percent(subgrader, earned[:, columns], possible[:, columns]) * weight
+            total_percent += weighted_percent
+            grade_breakdown[assignment_type] = weighted_percent
+
+        return {
+            'percent': total_percent,
+            'grade_breakdown': grade_breakdown,
+        }
+
+    def course_percent(self, grader_percent):
+        """
+        Returns the rounded course percentages for the given grader
+        percentages, as in CourseGrade._compute_percent.
+        """
+        return numpy.floor(numpy.asarray(grader_percent) * 100 + 0.05 + 0.5) / 100
+
+    def letter_grade(self, percent):
+        """
+        Returns an object array of the letter grade, or None if not
+        passed, for each of the given course percentages, as in
+        CourseGrade._compute_letter_grade.
+        """
+        percent = numpy.asarray(percent)
+        letter_grades = numpy.empty(percent.shape, dtype=object)
+        # Assign from the lowest to the highest cutoff, so that each learner
+        # ends up with the highest letter grade they qualify for.
+        for possible_grade in sorted(self.grade_cutoffs, key=lambda x: self.grade_cutoffs[x]):
+            letter_grades[percent >= self.grade_cutoffs[possible_grade]] = possible_grade
+        return letter_grades
+
+    def passed(self, percent):
+        """
+        Returns a boolean array of whether each of the given course
+        percentages is passing, as in CourseGrade._compute_passed.
+        """
+        percent = numpy.asarray(percent)
+        nonzero_cutoffs = [cutoff for cutoff in self.grade_cutoffs.values() if cutoff > 0]
+        if not nonzero_cutoffs:
+            return numpy.zeros(percent.shape, dtype=bool)
+        return percent >= min(nonzero_cutoffs)
+
+    @staticmethod
+    def _assignment_percent(subgrader, earned, possible):
+        """
+        Returns the percentage of each learner for the given
+        AssignmentFormatGrader, given (learners x subsections) arrays of
+        the scores of the subsections of its assignment type.
+        """
+        num_learners = earned.shape[0]
+        valid = possible > 0
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            percents = numpy.where(valid, earned / numpy.where(valid, possible, 1.0), 0.0)
+
+        # Each learner's breakdown holds their valid scores, padded with
+        # zero-valued placeholders up to min_count entries.  Entries that are
+        # not part of a learner's breakdown are set to -inf, so that they
+        # sort after every real entry.
+        num_scores = valid.sum(axis=1)
+        num_entries = numpy.maximum(subgrader.min_count, num_scores)
+        placeholders = numpy.where(
+            numpy.arange(max(subgrader.min_count, 0))[numpy.newaxis, :] < (num_entries - num_scores)[:, numpy.newaxis],
+            0.0,
+            -numpy.inf,
+        )
+        entries = numpy.hstack([numpy.where(valid, percents, -numpy.inf), placeholders])
+        if entries.shape[1] == 0:
+            return numpy.zeros(num_learners)
+
+        # The lowest drop_count entries are dropped, so the total is the sum
+        # of the highest (num_entries - drop_count) entries of each learner.
+        entries = -numpy.sort(-entries, axis=1)
+        cumulative_totals = numpy.cumsum(numpy.where(numpy.isinf(entries), 0.0, entries), axis=1)
+        num_kept = num_entries - subgrader.drop_count
+        kept_totals = cumulative_totals[numpy.arange(num_learners), numpy.maximum(num_kept - 1, 0)]
+        return numpy.where(num_kept > 0, kept_totals / numpy.maximum(num_kept, 1), 0.0)
@@ -513,6 +513,7 @@ class XModuleMixin(XModuleFields, XBlock):
             return None
 
         child.runtime.export_fs = self.runtime.export_fs
+        child.runtime.export_cache = self.runtime.export_cache
         return child
 
     def get_required_module_descriptors(self):
@@ -1425,6 +1426,8 @@ class DescriptorSystem(MetricsMixin, ConfigurableFragmentWrapper, Runtime):
 
         # This is used by XModules to write out separate files during xml export
         self.export_fs = None
+        # This is used during incremental xml export to reuse the xml of unchanged children
+        self.export_cache = None
 
         self.load_item = load_item
         self.resources_fs = resources_fs
@@ -1509,7 +1512,10 @@ class DescriptorSystem(MetricsMixin, ConfigurableFragmentWrapper, Runtime):
     def add_block_as_child_node(self, block, node):
         child = etree.SubElement(node, "unknown")
         child.set('url_name', block.url_name)
-        block.add_xml_to_node(child)
+        if self.export_cache is not None:
+            self.export_cache.add_xml_to_node(block, child)
+        else:
+            block.add_xml_to_node(child)
 
     def publish(self, block, event_type, event):
         # A stub publish method that doesn't emit any events from XModuleDescriptors.
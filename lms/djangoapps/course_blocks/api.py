@@ -1,7 +1,9 @@
 """
 API entry point to the course_blocks app with top-level
-get_course_blocks function.
+get_course_blocks and get_course_blocks_for_users functions.
 """
+from collections import OrderedDict
+
 from openedx.core.djangoapps.content.block_structure.api import get_block_structure_manager
 from openedx.core.djangoapps.content.block_structure.transformers import BlockStructureTransformers
 
@@ -17,6 +19,10 @@ COURSE_BLOCK_ACCESS_TRANSFORMERS = [
     visibility.VisibilityTransformer(),
 ]
 
+# Maximum number of transformed block structures that
+# get_course_blocks_for_users keeps for sharing between users.
+MAX_SHARED_BLOCK_STRUCTURES = 50
+
 
 def get_course_blocks(
         user,
@@ -63,3 +69,67 @@ def get_course_blocks(
         starting_block_usage_key,
         collected_block_structure,
     )
+
+
+def get_course_blocks_for_users(
+        users,
+        starting_block_usage_key,
+        transformers=None,
+        collected_block_structure=None,
+):
+    """
+    Yields a transformed block structure for each of the given users,
+    as returned by get_course_blocks, starting at
+    starting_block_usage_key.
+
+    Users whose transform_context_key, combined from all the
+    transformers, is equal have equivalent access to the course's
+    blocks (for example, the same staff access, beta tester status and
+    partition groups), so the block structure is transformed only once
+    for all of them and each of them is given a copy-on-write copy of
+    it.  Users for which a transformer has no transform_context_key
+    have the block structure transformed for them alone.
+
+    Arguments:
+        users (iterable of django.contrib.auth.models.User) - User
+            objects for which the block structure is to be transformed.
+
+        starting_block_usage_key, transformers and
+        collected_block_structure are as in get_course_blocks.
+
+    Yields:
+        (User, BlockStructureBlockData) - Each of the given users, in
+            order, with the block structure transformed for the user.
+            Callers may modify each of the yielded block structures
+            without affecting any of the others.
+    """
+    course_key = starting_block_usage_key.course_key
+    block_structure_manager = get_block_structure_manager(course_key)
+    if not transformers:
+        transformers = BlockStructureTransformers(COURSE_BLOCK_ACCESS_TRANSFORMERS)
+    if collected_block_structure is None:
+        collected_block_structure = block_structure_manager.get_collected()
+
+    shared_block_structures = OrderedDict()
+    for user in users:
+        transformers.usage_info = CourseUsageInfo(course_key, user)
+        context_key = transformers.transform_context_key(collected_block_structure)
+        if context_key is None:
+            yield user, block_structure_manager.get_transformed(
+                transformers,
+                starting_block_usage_key,
+                collected_block_structure,
+            )
+            continue
+
+        block_structure = shared_block_structures.pop(context_key, None)
+        if block_structure is None:
+            block_structure = block_structure_manager.get_transformed(
+                transformers,
+                starting_block_usage_key,
+                collected_block_structure,
+            )
+            if len(shared_block_structures) >= MAX_SHARED_BLOCK_STRUCTURES:
+                shared_block_structures.popitem(last=False)
+        shared_block_structures[context_key] = block_structure
+        yield user, block_structure.copy_on_write()
@@ -0,0 +1,74 @@
+"""
+Tests for course_blocks API
+"""
+from mock import patch
+from nose.plugins.attrib import attr
+
+from courseware.tests.factories import BetaTesterFactory
+from openedx.core.djangoapps.content.block_structure.transformers import BlockStructureTransformers
+from student.tests.factories import UserFactory
+from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+from ..api import COURSE_BLOCK_ACCESS_TRANSFORMERS, get_course_blocks, get_course_blocks_for_users
+from ..transformers.tests.helpers import publish_course
+
+
+@attr(shard=3)
+class GetCourseBlocksForUsersTestCase(SharedModuleStoreTestCase):
+    """
+    Tests for get_course_blocks_for_users.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super(GetCourseBlocksForUsersTestCase, cls).setUpClass()
+        cls.course = CourseFactory.create()
+        chapter = ItemFactory.create(parent=cls.course, category='chapter')
+        ItemFactory.create(parent=chapter, category='sequential')
+        ItemFactory.create(parent=chapter, category='sequential', visible_to_staff_only=True)
+        publish_course(cls.course)
+
+    def setUp(self):
+        super(GetCourseBlocksForUsersTestCase, self).setUp()
+        self.students = [UserFactory.create() for _ in range(3)]
+        self.staff = UserFactory.create(is_staff=True)
+        self.beta_tester = BetaTesterFactory(course_key=self.course.id)
+        self.users = self.students + [self.staff, self.beta_tester]
+
+    def get_structures(self, transformers=None):
+        """
+        Returns the list of block structures returned by
+        get_course_blocks_for_users for self.users, counting the
+        number of transforms.
+        """
+        with patch.object(
+            BlockStructureTransformers, 'transform', autospec=True, side_effect=BlockStructureTransformers.transform,
+        ) as mock_transform:
+            results = list(get_course_blocks_for_users(self.users, self.course.location, transformers))
+        self.assertEqual([user for user, _ in results], self.users)
+        return [structure for _, structure in results], mock_transform.call_count
+
+    def test_same_as_get_course_blocks(self):
+        structures, _ = self.get_structures()
+        for user, structure in zip(self.users, structures):
+            self.assertEqual(set(structure), set(get_course_blocks(user, self.course.location)))
+        self.assertLess(len(structures[0]), len(structures[3]))
+
+    def test_transformed_once_per_access_context(self):
+        # Students, staff and beta testers are each transformed once.
+        _, transform_count = self.get_structures()
+        self.assertEqual(transform_count, 3)
+
+    def test_transformed_per_user(self):
+        transformers = BlockStructureTransformers(COURSE_BLOCK_ACCESS_TRANSFORMERS)
+        with patch.object(
+            COURSE_BLOCK_ACCESS_TRANSFORMERS[0].__class__, 'transform_context_key', return_value=None,
+        ):
+            _, transform_count = self.get_structures(transformers)
+        self.assertEqual(transform_count, len(self.users))
+
+    def test_structures_are_independent(self):
+        structures, _ = self.get_structures()
+        structures[0].remove_block(self.course.location, keep_descendants=False)
+        self.assertNotIn(self.course.location, structures[0])
+        self.assertIn(self.course.location, structures[1])
@@ -88,6 +88,9 @@ class HiddenContentTransformer(FilteringTransformerMixin, BlockStructureTransfor
 
         block_structure.request_xblock_fields(u'self_paced', u'end')
 
+    def transform_context_key(self, usage_info, block_structure):
+        return usage_info.has_staff_access
+
     def transform_block_filters(self, usage_info, block_structure):
         # Users with staff access bypass the Visibility check.
         if usage_info.has_staff_access:
@@ -67,7 +67,36 @@ class ContentLibraryTransformer(FilteringTransformerMixin, BlockStructureTransfo
                 summary = summarize_block(child_key)
                 block_structure.set_transformer_block_field(child_key, cls, 'block_analytics_summary', summary)
 
+    def transform_context_key(self, usage_info, block_structure):
+        # Selecting the user's children is repeated when the structure is
+        # transformed, but only saves and publishes changed selections.
+        return frozenset(self._select_children(usage_info, block_structure)[1])
+
     def transform_block_filters(self, usage_info, block_structure):
+        all_library_children, all_selected_children = self._select_children(usage_info, block_structure)
+
+        def check_child_removal(block_key):
+            """
+            Return True if selected block should be removed.
+
+            Block is removed if it is part of library_content, but has
+            not been selected for current user.
+            """
+            if block_key not in all_library_children:
+                return False
+            if block_key in all_selected_children:
+                return False
+            return True
+
+        return [block_structure.create_removal_filter(check_child_removal)]
+
+    def _select_children(self, usage_info, block_structure):
+        """
+        Returns the set of all children of library_content blocks in the
+        given block_structure, and the set of those that are selected for
+        the given usage_info's user, updating and publishing the user's
+        selections as needed.
+        """
         all_library_children = set()
         all_selected_children = set()
         for block_key in block_structure:
@@ -118,20 +147,7 @@ class ContentLibraryTransformer(FilteringTransformerMixin, BlockStructureTransfo
                 )
                 all_selected_children.update(usage_info.course_key.make_usage_key(s[0], s[1]) for s in selected)
 
-        def check_child_removal(block_key):
-            """
-            Return True if selected block should be removed.
-
-            Block is removed if it is part of library_content, but has
-            not been selected for current user.
-            """
-            if block_key not in all_library_children:
-                return False
-            if block_key in all_selected_children:
-                return False
-            return True
-
-        return [block_structure.create_removal_filter(check_child_removal)]
+        return all_library_children, all_selected_children
 
     def _publish_events(self, block_structure, location, previous_count, max_count, block_keys, user_id):
         """
@@ -72,6 +72,10 @@ class SplitTestTransformer(FilteringTransformerMixin, BlockStructureTransformer)
                 group = child_to_group.get(child_location, None)
                 child.group_access[partition_for_this_block.id] = [group] if group is not None else []
 
+    def transform_context_key(self, usage_info, block_structure):
+        # The filter does not depend on the user.
+        return ()
+
     def transform_block_filters(self, usage_info, block_structure):
         """
         Mutates block_structure based on the given usage_info.
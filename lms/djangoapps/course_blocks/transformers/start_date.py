@@ -1,11 +1,13 @@
 """
 Start Date Transformer implementation.
 """
+from courseware.masquerade import is_masquerading_as_student
 from lms.djangoapps.courseware.access_utils import check_start_date
 from openedx.core.djangoapps.content.block_structure.transformer import (
     BlockStructureTransformer,
     FilteringTransformerMixin
 )
+from student.roles import CourseBetaTesterRole
 from xmodule.course_metadata_utils import DEFAULT_START_DATE
 
 from .utils import collect_merged_date_field
@@ -67,6 +69,18 @@ class StartDateTransformer(FilteringTransformerMixin, BlockStructureTransformer)
             func_merge_ancestors=max,
         )
 
+    def transform_context_key(self, usage_info, block_structure):
+        if usage_info.has_staff_access:
+            return True
+
+        # Otherwise, the start dates only differ between users that are
+        # and are not beta testers (or are masquerading as students).
+        return (
+            False,
+            is_masquerading_as_student(usage_info.user, usage_info.course_key),
+            CourseBetaTesterRole(usage_info.course_key).has_user(usage_info.user),
+        )
+
     def transform_block_filters(self, usage_info, block_structure):
         # Users with staff access bypass the Start Date check.
         if usage_info.has_staff_access:
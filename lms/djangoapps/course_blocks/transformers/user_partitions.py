@@ -69,6 +69,16 @@ class UserPartitionTransformer(FilteringTransformerMixin, BlockStructureTransfor
             merged_group_access = _MergedGroupAccess(user_partitions, xblock, merged_parent_access_list)
             block_structure.set_transformer_block_field(block_key, cls, 'merged_group_access', merged_group_access)
 
+    def transform_context_key(self, usage_info, block_structure):
+        user_partitions = block_structure.get_transformer_data(self, 'user_partitions')
+        if not user_partitions:
+            return ()
+
+        user_groups = _get_user_partition_groups(
+            usage_info.course_key, user_partitions, usage_info.user
+        )
+        return frozenset((partition_id, group.id) for partition_id, group in user_groups.iteritems())
+
     def transform_block_filters(self, usage_info, block_structure):
         result_list = SplitTestTransformer().transform_block_filters(usage_info, block_structure)
 
@@ -0,0 +1,18 @@
+"""
+This module contains various configuration settings via
+waffle switches for the Courseware app.
+"""
+from openedx.core.djangoapps.waffle_utils import WaffleSwitchNamespace
+
+# Namespace
+WAFFLE_NAMESPACE = u'courseware'
+
+# Switches
+LAZY_USER_STATE_LOADING = u'lazy_user_state_loading'
+
+
+def waffle():
+    """
+    Returns the namespaced, cached, audited Waffle class for Courseware.
+    """
+    return WaffleSwitchNamespace(name=WAFFLE_NAMESPACE, log_prefix=u'Courseware: ')
@@ -37,8 +37,10 @@ from xblock.fields import Scope, UserScope
 from xblock.runtime import KeyValueStore
 
 from courseware.user_state_client import DjangoXBlockUserStateClient
+from openedx.core.djangoapps import monitoring_utils
 from xmodule.modulestore.django import modulestore
 
+from .config import LAZY_USER_STATE_LOADING, waffle
 from .models import StudentModule, XModuleStudentInfoField, XModuleStudentPrefsField, XModuleUserStateSummaryField
 
 log = logging.getLogger(__name__)
@@ -67,6 +69,20 @@ def _all_usage_keys(descriptors, aside_types):
     return usage_ids
 
 
+def _sibling_usage_keys(descriptors, aside_types):
+    """
+    Return a list of sets of usage_ids, as returned by `_all_usage_keys`,
+    one for each group of the `descriptors` that share the same parent.
+    """
+    descriptors_by_parent = defaultdict(list)
+    for descriptor in descriptors:
+        descriptors_by_parent[getattr(descriptor, 'parent', None)].append(descriptor)
+    return [
+        _all_usage_keys(sibling_descriptors, aside_types)
+        for sibling_descriptors in descriptors_by_parent.itervalues()
+    ]
+
+
 def _all_block_types(descriptors, aside_types):
     """
     Return a set of all block_types for the supplied `descriptors` and for
@@ -344,12 +360,31 @@ class DjangoOrmFieldCache(object):
 class UserStateCache(object):
     """
     Cache for Scope.user_state xblock field data.
+
+    If ``lazy`` is True, the state of the cached xblocks is not loaded
+    by ``cache_fields``, but the first time the state of any of them is
+    used, along with that of its siblings, in a single query.
+
+    Whether the state of each block was already loaded when it was
+    first used, and how many of the loaded states were used, are
+    reported as custom metrics of the current request.
     """
-    def __init__(self, user, course_id):
+    def __init__(self, user, course_id, lazy=False):
         self._cache = defaultdict(dict)
         self.course_id = course_id
         self.user = user
         self._client = DjangoXBlockUserStateClient(self.user)
+        self._lazy = lazy
+
+        # The block keys whose state has been queried.
+        self._loaded_keys = set()
+
+        # The block keys whose state is to be queried when first used,
+        # each mapped to the set of its sibling keys to query with it.
+        self._pending_keys = {}
+
+        # The block keys whose state has been used.
+        self._used_keys = set()
 
     def cache_fields(self, fields, xblocks, aside_types):  # pylint: disable=unused-argument
         """
@@ -361,12 +396,48 @@ class UserStateCache(object):
             xblocks (list of :class:`XBlock`): XBlocks to cache fields for.
             aside_types (list of str): Aside types to cache fields for.
         """
-        block_field_state = self._client.get_many(
-            self.user.username,
-            _all_usage_keys(xblocks, aside_types),
-        )
-        for user_state in block_field_state:
+        if not self._lazy:
+            self._load(_all_usage_keys(xblocks, aside_types))
+            return
+
+        for sibling_keys in _sibling_usage_keys(xblocks, aside_types):
+            sibling_keys.difference_update(self._loaded_keys)
+            for block_key in sibling_keys:
+                self._pending_keys[block_key] = sibling_keys
+
+    def _load(self, block_keys):
+        """
+        Load the state of the blocks with the given keys into this cache.
+        """
+        self._loaded_keys.update(block_keys)
+        num_rows = 0
+        for user_state in self._client.get_many(self.user.username, block_keys):
             self._cache[user_state.block_key] = user_state.state
+            num_rows += 1
+        monitoring_utils.accumulate('field_data_cache.user_state.rows_loaded', num_rows)
+
+    def _use(self, cache_key):
+        """
+        Record that the state of the block with the given key is used,
+        loading it and that of its siblings first if it is pending.
+        """
+        was_loaded = cache_key in self._loaded_keys
+        sibling_keys = self._pending_keys.get(cache_key)
+        if sibling_keys is not None:
+            for block_key in sibling_keys:
+                self._pending_keys.pop(block_key, None)
+            self._load(sibling_keys.difference(self._loaded_keys))
+
+        if cache_key in self._used_keys:
+            return
+        self._used_keys.add(cache_key)
+
+        if was_loaded:
+            monitoring_utils.increment('field_data_cache.user_state.prefetch_hits')
+        elif sibling_keys is not None:
+            monitoring_utils.increment('field_data_cache.user_state.prefetch_misses')
+        if cache_key in self._cache:
+            monitoring_utils.increment('field_data_cache.user_state.rows_used')
 
     @contract(kvs_key=DjangoKeyValueStore.Key)
     def set(self, kvs_key, value):
@@ -410,6 +481,7 @@ class UserStateCache(object):
         pending_updates = defaultdict(dict)
         for kvs_key, value in kv_dict.items():
             cache_key = self._cache_key_for_kvs_key(kvs_key)
+            self._use(cache_key)
 
             pending_updates[cache_key][kvs_key.field_name] = value
 
@@ -436,6 +508,7 @@ class UserStateCache(object):
         Returns: A django orm object from the cache
         """
         cache_key = self._cache_key_for_kvs_key(kvs_key)
+        self._use(cache_key)
         if cache_key not in self._cache:
             raise KeyError(kvs_key.field_name)
 
@@ -452,6 +525,7 @@ class UserStateCache(object):
         Raises: KeyError if key isn't found in the cache
         """
         cache_key = self._cache_key_for_kvs_key(kvs_key)
+        self._use(cache_key)
         if cache_key not in self._cache:
             raise KeyError(kvs_key.field_name)
 
@@ -474,6 +548,7 @@ class UserStateCache(object):
         Returns: bool
         """
         cache_key = self._cache_key_for_kvs_key(kvs_key)
+        self._use(cache_key)
 
         return (
             cache_key in self._cache and
@@ -695,6 +770,10 @@ class FieldDataCache(object):
         user: The user for which to cache data
         asides: The list of aside types to load, or None to prefetch no asides.
         read_only: We should not perform writes (they become a no-op).
+
+        If the courseware.lazy_user_state_loading waffle switch is enabled,
+        StudentModules are not loaded until the state of their block, or of
+        one of its siblings, is first used.
         """
         if asides is None:
             self.asides = []
@@ -710,6 +789,7 @@ class FieldDataCache(object):
             Scope.user_state: UserStateCache(
                 self.user,
                 self.course_id,
+                lazy=waffle().is_enabled(LAZY_USER_STATE_LOADING),
             ),
             Scope.user_info: UserInfoCache(
                 self.user,
@@ -988,6 +1068,29 @@ class ScoresClient(object):
         client.fetch_scores(scorable_locations)
         return client
 
+    @classmethod
+    def bulk_create_for_locations(cls, course_id, user_ids, scorable_locations):
+        """
+        Create ScoresClients with pre-fetched data for the given users and
+        locations, using a single query.  Returns a dict of user_id to
+        ScoresClient.
+        """
+        clients = {user_id: cls(course_id, user_id) for user_id in user_ids}
+        scores_qset = StudentModule.objects.filter(
+            student_id__in=user_ids,
+            course_id=course_id,
+            module_state_key__in=set(scorable_locations),
+        )
+        for user_id, location, correct, total, created in scores_qset.values_list(
+                'student_id', 'module_state_key', 'grade', 'max_grade', 'created'
+        ):
+            clients[user_id]._locations_to_scores[  # pylint: disable=protected-access
+                UsageKey.from_string(location).map_into_course(course_id)
+            ] = cls.Score(correct, total, created)
+        for client in clients.itervalues():
+            client._has_fetched = True  # pylint: disable=protected-access
+        return clients
+
 
 # @contract(user_id=int, usage_key=UsageKey, score="number|None", max_score="number|None")
 def set_score(user_id, usage_key, score, max_score):
@@ -12,6 +12,7 @@ from xblock.core import XBlock
 from xblock.exceptions import KeyValueMultiSaveError
 from xblock.fields import BlockScope, Scope, ScopeIds
 
+from courseware.config import LAZY_USER_STATE_LOADING, waffle
 from courseware.model_data import DjangoKeyValueStore, FieldDataCache, InvalidScopeError
 from courseware.models import (
     StudentModule,
@@ -235,6 +236,77 @@ class TestStudentModuleStorage(OtherUserFailureTestMixin, TestCase):
         self.assertEquals(exception_context.exception.saved_field_names, [])
 
 
+@attr(shard=1)
+class TestLazyStudentModuleStorage(TestCase):
+    """Tests for loading user_state from StudentModules lazily"""
+    # Tell Django to clean out all databases, not just default
+    multi_db = True
+
+    def setUp(self):
+        super(TestLazyStudentModuleStorage, self).setUp()
+        self.user = UserFactory.create(username='user')
+        self.assertEqual(self.user.id, 1)   # check our assumption hard-coded in the key functions above.
+        for block_id in ('usage_id', 'sibling_id', 'other_id'):
+            StudentModuleFactory(
+                student=self.user,
+                module_state_key=location(block_id),
+                state=json.dumps({'a_field': block_id}),
+            )
+
+        descriptors = []
+        for block_id, parent_id in (('usage_id', 'parent'), ('sibling_id', 'parent'), ('other_id', 'other_parent')):
+            descriptor = mock_descriptor([mock_field(Scope.user_state, 'a_field')])
+            descriptor.scope_ids = descriptor.scope_ids._replace(usage_id=location(block_id))
+            descriptor.parent = location(parent_id)
+            descriptors.append(descriptor)
+
+        # No queries are made until the state is used
+        with waffle().override(LAZY_USER_STATE_LOADING, active=True):
+            with self.assertNumQueries(0):
+                self.field_data_cache = FieldDataCache(descriptors, course_id, self.user)
+        self.kvs = DjangoKeyValueStore(self.field_data_cache)
+
+    def test_get_loads_siblings(self):
+        with self.assertNumQueries(1):
+            self.assertEquals('usage_id', self.kvs.get(user_state_key('a_field')))
+        with self.assertNumQueries(0):
+            self.assertEquals(
+                'sibling_id', self.kvs.get(user_state_key('a_field')._replace(block_scope_id=location('sibling_id')))
+            )
+        with self.assertNumQueries(1):
+            self.assertTrue(self.kvs.has(user_state_key('a_field')._replace(block_scope_id=location('other_id'))))
+
+    def test_get_unknown_block(self):
+        with self.assertNumQueries(0):
+            self.assertRaises(
+                KeyError, self.kvs.get, user_state_key('a_field')._replace(block_scope_id=location('unknown_id'))
+            )
+
+    def test_set_loads_existing_state(self):
+        self.kvs.set(user_state_key('b_field'), 'b_value')
+        self.assertTrue(self.kvs.has(user_state_key('b_field')))
+        self.assertEquals(
+            {'a_field': 'usage_id', 'b_field': 'b_value'},
+            json.loads(StudentModule.objects.get(module_state_key=location('usage_id')).state),
+        )
+
+    @patch('courseware.model_data.monitoring_utils')
+    def test_metrics(self, mock_monitoring_utils):
+        self.kvs.get(user_state_key('a_field'))
+        self.kvs.get(user_state_key('a_field'))
+        self.kvs.get(user_state_key('a_field')._replace(block_scope_id=location('sibling_id')))
+        mock_monitoring_utils.accumulate.assert_called_once_with('field_data_cache.user_state.rows_loaded', 2)
+        self.assertEquals(
+            sorted(call[0][0] for call in mock_monitoring_utils.increment.call_args_list),
+            [
+                'field_data_cache.user_state.prefetch_hits',
+                'field_data_cache.user_state.prefetch_misses',
+                'field_data_cache.user_state.rows_used',
+                'field_data_cache.user_state.rows_used',
+            ],
+        )
+
+
 @attr(shard=1)
 class TestMissingStudentModule(TestCase):
     # Tell Django to clean out all databases, not just default
@@ -12,6 +12,8 @@ WRITE_ONLY_IF_ENGAGED = u'write_only_if_engaged'
 ASSUME_ZERO_GRADE_IF_ABSENT = u'assume_zero_grade_if_absent'
 ESTIMATE_FIRST_ATTEMPTED = u'estimate_first_attempted'
 DISABLE_REGRADE_ON_POLICY_CHANGE = u'disable_regrade_on_policy_change'
+INCREMENTAL_SUBSECTION_REGRADE = u'incremental_subsection_regrade'
+COALESCE_SUBSECTION_REGRADES = u'coalesce_subsection_regrades'
 
 # Course Flags
 REJECTED_EXAM_OVERRIDES_GRADE = u'rejected_exam_overrides_grade'
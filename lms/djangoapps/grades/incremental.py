@@ -0,0 +1,219 @@
+"""
+Incremental updates of persisted grades from the change in score of a
+single problem.
+
+Rather than recomputing a learner's subsection and course grades from all
+of the learner's scores, the persisted totals of the subsections containing
+the problem are adjusted by the difference between the problem's previous
+and new score, and the course grade is recomputed from the persisted
+subsection totals.  Whenever the persisted grades cannot be trusted to
+reflect the previous score, nothing is updated and the caller is expected
+to fall back to a full regrade.
+"""
+from collections import OrderedDict, namedtuple
+from logging import getLogger
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now
+
+from openedx.core.djangoapps.content.block_structure.api import get_block_structure_manager
+from xmodule.graders import AggregatedScore
+from xmodule.modulestore.django import modulestore
+
+from .config import should_persist_grades
+from .config.waffle import ESTIMATE_FIRST_ATTEMPTED, waffle
+from .context import grading_context
+from .models import PersistentCourseGrade, PersistentSubsectionGrade
+from .new.course_data import CourseData
+from .new.course_grade import CourseGrade
+from .new.course_grade_factory import CourseGradeFactory
+from .scores import weighted_score
+from .transformer import GradesTransformer
+
+log = getLogger(__name__)
+
+
+# The previous and new weighted score of a single problem, and when the
+# previous score was saved.  The previous values are None if the learner had
+# no score for the problem.
+ScoreDelta = namedtuple(
+    'ScoreDelta',
+    ['previous_earned', 'previous_possible', 'previous_modified', 'earned', 'possible'],
+)
+
+
+class _PersistedSubsectionGrade(object):
+    """
+    Minimal subsection grade, as needed by the course grader,
+    built from a persisted subsection grade.
+    """
+    def __init__(self, subsection, grade):
+        self.display_name = getattr(subsection, 'display_name', None) or subsection.location.block_id
+        self.graded_total = AggregatedScore(
+            tw_earned=grade.earned_graded,
+            tw_possible=grade.possible_graded,
+            graded=True,
+            first_attempted=grade.first_attempted,
+        )
+
+
+def update_grades_from_score_delta(user, course_key, scored_block_usage_key, score_delta, score_modified):
+    """
+    Updates the persisted subsection grades containing the given problem,
+    and the persisted course grade, of the given user from the given
+    ScoreDelta of the problem.  score_modified is when the new score was
+    saved.
+
+    Returns whether the grades were updated.  If False, no grades were
+    changed and the caller should regrade the user from all of their scores.
+    """
+    if not should_persist_grades(course_key):
+        return False
+
+    course = modulestore().get_course(course_key, depth=0)
+    if getattr(course, 'entrance_exam_enabled', False) or getattr(course, 'enable_subsection_gating', False):
+        # Milestone evaluation needs full subsection and course grades.
+        return False
+
+    collected_structure = get_block_structure_manager(course_key).get_collected()
+    course_data = CourseData(user, course=course, collected_block_structure=collected_structure)
+    structure = course_data.structure
+    if scored_block_usage_key not in structure:
+        return False
+    subsection_keys = {
+        subsection_key
+        for subsection_key in structure.get_transformer_block_field(
+            scored_block_usage_key, GradesTransformer, 'subsections', set(),
+        )
+        if subsection_key in structure
+    }
+    if not subsection_keys:
+        return False
+
+    with transaction.atomic():
+        subsection_grades = list(
+            PersistentSubsectionGrade.objects.select_for_update().select_related('visible_blocks').filter(
+                user_id=user.id,
+                course_id=course_key,
+                usage_key__in=subsection_keys,
+            )
+        )
+        if len(subsection_grades) != len(subsection_keys):
+            return False
+
+        course_version = unicode(course_data.version or '')
+        graded_by_subsection = {}
+        for grade in subsection_grades:
+            is_graded = _problem_graded_in(grade, course_version, scored_block_usage_key, score_delta, score_modified)
+            if is_graded is None:
+                return False
+            graded_by_subsection[grade.id] = is_graded
+
+        earned_delta = score_delta.earned - (score_delta.previous_earned or 0.0)
+        for grade in subsection_grades:
+            grade.earned_all += earned_delta
+            if graded_by_subsection[grade.id]:
+                grade.earned_graded += earned_delta
+            if grade.first_attempted is None:
+                grade.first_attempted = score_modified if waffle().is_enabled(ESTIMATE_FIRST_ATTEMPTED) else now()
+            grade.save()
+            PersistentSubsectionGrade._emit_grade_calculated_event(grade)  # pylint: disable=protected-access
+
+    log.info(
+        u'Grades: IncrementalUpdate, course: %s, user: %s, block: %s, subsections: %s, delta: %s',
+        course_key, user.id, scored_block_usage_key, len(subsection_grades), earned_delta,
+    )
+
+    if not _update_course_grade(user, course_data):
+        CourseGradeFactory().update(user, course=course, collected_block_structure=collected_structure)
+    return True
+
+
+def _problem_graded_in(subsection_grade, course_version, scored_block_usage_key, score_delta, score_modified):
+    """
+    Returns whether the problem counts toward the graded total of the
+    given persisted subsection grade, or None if the persisted grade can't
+    be incrementally updated with the given ScoreDelta.  course_version is
+    the version of the course structure the grades are updated from.
+    """
+    if hasattr(subsection_grade, 'override'):
+        return None
+    if subsection_grade.course_version != course_version:
+        # The grade was computed from another version of the course,
+        # whose problems or weights may differ.
+        return None
+    if subsection_grade.modified >= score_modified:
+        # The grade was computed after the new score was saved,
+        # so it may already include it.
+        return None
+    if score_delta.previous_modified is not None and subsection_grade.modified < score_delta.previous_modified:
+        # The grade was computed before the previous score was saved,
+        # so it may not include it.
+        return None
+
+    for block in subsection_grade.visible_blocks.blocks:
+        if block.locator == scored_block_usage_key:
+            if block.raw_possible is None:
+                return None
+            _, persisted_possible = weighted_score(block.raw_possible, block.raw_possible, block.weight)
+            if persisted_possible != score_delta.possible:
+                return None
+            if score_delta.previous_possible not in (None, score_delta.possible):
+                return None
+            return block.graded
+    return None
+
+
+def _update_course_grade(user, course_data):
+    """
+    Recomputes and persists the user's course grade from their persisted
+    grades of the subsections in the course structure transformed for the
+    user.  Returns False, without updating anything, if the user doesn't
+    have a persisted grade for every graded subsection.
+    """
+    course = course_data.course
+    persisted_grades = {
+        grade.full_usage_key: grade
+        for grade in PersistentSubsectionGrade.bulk_read_grades(user.id, course.id)
+    }
+
+    grade_sheet = OrderedDict()
+    for subsection_format, subsection_infos in grading_context(course_data.structure)[
+            'all_graded_subsections_by_type'
+    ].iteritems():
+        for subsection_info in subsection_infos:
+            if not subsection_info['scored_descendants']:
+                continue
+            subsection = subsection_info['subsection_block']
+            grade = persisted_grades.get(subsection.location)
+            if grade is None:
+                return False
+            if grade.possible_graded > 0:
+                grade_sheet.setdefault(subsection_format, OrderedDict())[subsection.location] = (
+                    _PersistedSubsectionGrade(subsection, grade)
+                )
+
+    course.set_grading_policy(course.grading_policy)
+    grader_result = course.grader.grade(grade_sheet, generate_random_scores=settings.GENERATE_PROFILE_SCORES)
+    course_grade = CourseGrade(user, course_data)
+    course_grade.percent = CourseGrade._compute_percent(grader_result)  # pylint: disable=protected-access
+    course_grade.letter_grade = CourseGrade._compute_letter_grade(  # pylint: disable=protected-access
+        course.grade_cutoffs, course_grade.percent,
+    )
+    course_grade.passed = CourseGrade._compute_passed(  # pylint: disable=protected-access
+        course.grade_cutoffs, course_grade.percent,
+    )
+
+    PersistentCourseGrade.update_or_create(
+        user_id=user.id,
+        course_id=course.id,
+        course_version=course_data.version,
+        course_edited_timestamp=course_data.edited_on,
+        grading_policy_hash=course_data.grading_policy_hash,
+        percent_grade=course_grade.percent,
+        letter_grade=course_grade.letter_grade or "",
+        passed=course_grade.passed,
+    )
+    CourseGradeFactory._send_grade_signals(user, course_data, course_grade)  # pylint: disable=protected-access
+    return True
@@ -11,10 +11,11 @@ persisted, course grades are also immune to changes in course content.
 import json
 import logging
 from base64 import b64encode
-from collections import namedtuple
+from collections import defaultdict, namedtuple
 from hashlib import sha1
 
 from django.db import models
+from django.db.models import Case, Value, When
 from django.utils.timezone import now
 from lazy import lazy
 from model_utils.models import TimeStampedModel
@@ -34,6 +35,44 @@ log = logging.getLogger(__name__)
 
 BLOCK_RECORD_LIST_VERSION = 1
 
+# The number of rows which _bulk_update updates with each query, which keeps
+# the number of its parameters within SQLite's limit of 999.
+BULK_UPDATE_BATCH_SIZE = 40
+
+
+def _update_changed_fields(instance, values):
+    """
+    Sets the given field values on the given model instance.
+    Returns whether any of the values differed from the instance's.
+    """
+    changed = False
+    for field_name, value in values.iteritems():
+        if getattr(instance, field_name) != value:
+            setattr(instance, field_name, value)
+            changed = True
+    return changed
+
+
+def _bulk_update(model_class, instances, field_names):
+    """
+    Saves the given fields of the given existing instances of the given
+    TimeStampedModel, and updates their modified timestamps, with one
+    UPDATE query for each BULK_UPDATE_BATCH_SIZE instances.
+    """
+    modified = now()
+    for instance in instances:
+        instance.modified = modified
+    for start in xrange(0, len(instances), BULK_UPDATE_BATCH_SIZE):
+        batch = instances[start:start + BULK_UPDATE_BATCH_SIZE]
+        values = {
+            field_name: Case(
+                *[When(id=instance.id, then=Value(getattr(instance, field_name))) for instance in batch],
+                output_field=model_class._meta.get_field(field_name)  # pylint: disable=protected-access
+            )
+            for field_name in field_names
+        }
+        model_class.objects.filter(id__in=[instance.id for instance in batch]).update(modified=modified, **values)
+
 # Used to serialize information about a block at the time it was used in
 # grade calculation.
 BlockRecord = namedtuple('BlockRecord', ['locator', 'weight', 'raw_possible', 'graded'])
@@ -400,6 +439,21 @@ class PersistentSubsectionGrade(DeleteGradesMixin, TimeStampedModel):
             course_id=course_key,
         )
 
+    @classmethod
+    def bulk_read_grades_for_users(cls, user_ids, course_key):
+        """
+        Reads all grades for the given users and course with a single query.
+        Returns a dict of user id to a list of that user's grades.
+
+        Arguments:
+            user_ids: The users associated with the desired grades
+            course_key: The course identifier for the desired grades
+        """
+        grades_by_user = defaultdict(list)
+        for grade in cls.objects.select_related('visible_blocks').filter(user_id__in=user_ids, course_id=course_key):
+            grades_by_user[grade.user_id].append(grade)
+        return grades_by_user
+
     @classmethod
     def update_or_create_grade(cls, **params):
         """
@@ -469,6 +523,57 @@ class PersistentSubsectionGrade(DeleteGradesMixin, TimeStampedModel):
             cls._emit_grade_calculated_event(grade)
         return grades
 
+    # The fields which bulk_update_or_create_grades updates
+    BULK_UPDATE_FIELDS = (
+        'course_version', 'subtree_edited_timestamp', 'earned_all', 'possible_all', 'earned_graded',
+        'possible_graded', 'visible_blocks_id', 'first_attempted',
+    )
+
+    @classmethod
+    def bulk_update_or_create_grades(cls, grade_params_iter, course_key):
+        """
+        Bulk creation or update of grades for any number of users in
+        the given course.  Grades that are not yet persisted are created
+        with a single bulk insert, and existing grades whose values
+        changed are saved with bulk updates.  Returns the grades, whose
+        grade_calculated events the caller is expected to emit.
+        """
+        if not grade_params_iter:
+            return []
+
+        map(cls._prepare_params, grade_params_iter)
+        VisibleBlocks.bulk_get_or_create([params['visible_blocks'] for params in grade_params_iter], course_key)
+        map(cls._prepare_params_visible_blocks_id, grade_params_iter)
+        map(cls._prepare_first_attempted_for_create, grade_params_iter)
+
+        existing_grades = {
+            (grade.user_id, grade.full_usage_key): grade
+            for grade in cls.objects.filter(
+                user_id__in=set(params['user_id'] for params in grade_params_iter),
+                course_id=course_key,
+            )
+        }
+
+        grades, new_grades, changed_grades = [], [], []
+        for params in grade_params_iter:
+            grade = existing_grades.get((params['user_id'], params['usage_key']))
+            if grade is None:
+                new_grades.append(PersistentSubsectionGrade(**params))
+            else:
+                first_attempted = params.pop('first_attempted')
+                for identifying_field in ('user_id', 'course_id', 'usage_key'):
+                    del params[identifying_field]
+                changed = _update_changed_fields(grade, params)
+                if first_attempted is not None and grade.first_attempted is None:
+                    grade.first_attempted = first_attempted
+                    changed = True
+                if changed:
+                    changed_grades.append(grade)
+                grades.append(grade)
+        _bulk_update(cls, changed_grades, cls.BULK_UPDATE_FIELDS)
+        grades.extend(cls.objects.bulk_create(new_grades))
+        return grades
+
     @classmethod
     def _prepare_params_and_visible_blocks(cls, params):
         """
@@ -645,6 +750,59 @@ class PersistentCourseGrade(DeleteGradesMixin, TimeStampedModel):
         cls._emit_grade_calculated_event(grade)
         return grade
 
+    # The fields which bulk_update_or_create updates
+    BULK_UPDATE_FIELDS = (
+        'course_version', 'course_edited_timestamp', 'grading_policy_hash', 'percent_grade', 'letter_grade',
+        'passed_timestamp',
+    )
+
+    @classmethod
+    def bulk_update_or_create(cls, course_id, grade_params_iter):
+        """
+        Creates or updates the course grades of any number of users in
+        the given course.  Grades that are not yet persisted are created
+        with a single bulk insert, and existing grades whose values
+        changed are saved with bulk updates.
+        Returns a list of PersistedCourseGrade objects, whose
+        grade_calculated events the caller is expected to emit.
+        """
+        if not grade_params_iter:
+            return []
+
+        existing_grades = {
+            grade.user_id: grade
+            for grade in cls.objects.filter(
+                user_id__in=[params['user_id'] for params in grade_params_iter],
+                course_id=course_id,
+            )
+        }
+
+        grades, new_grades, changed_grades = [], [], []
+        for params in grade_params_iter:
+            params = dict(params)
+            user_id = params.pop('user_id')
+            passed = params.pop('passed')
+            if params.get('course_version', None) is None:
+                params['course_version'] = ""
+
+            grade = existing_grades.get(user_id)
+            if grade is None:
+                grade = cls(user_id=user_id, course_id=course_id, **params)
+                if passed:
+                    grade.passed_timestamp = now()
+                new_grades.append(grade)
+            else:
+                changed = _update_changed_fields(grade, params)
+                if passed and not grade.passed_timestamp:
+                    grade.passed_timestamp = now()
+                    changed = True
+                if changed:
+                    changed_grades.append(grade)
+                grades.append(grade)
+        _bulk_update(cls, changed_grades, cls.BULK_UPDATE_FIELDS)
+        grades.extend(cls.objects.bulk_create(new_grades))
+        return grades
+
     @staticmethod
     def _emit_grade_calculated_event(grade):
         """
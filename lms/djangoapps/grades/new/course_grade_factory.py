@@ -1,16 +1,23 @@
-from collections import namedtuple
+from collections import OrderedDict, namedtuple
 from contextlib import contextmanager
 from logging import getLogger
 
 import dogstats_wrapper as dog_stats_api
+from django.db import IntegrityError, transaction
+from submissions import api as submissions_api
 
+from courseware.model_data import ScoresClient
+from lms.djangoapps.course_blocks.api import get_course_blocks_for_users
 from openedx.core.djangoapps.signals.signals import COURSE_GRADE_CHANGED, COURSE_GRADE_NOW_PASSED
+from student.models import anonymous_id_for_user
 
 from ..config import assume_zero_if_absent, should_persist_grades
 from ..config.waffle import WRITE_ONLY_IF_ENGAGED, waffle
-from ..models import PersistentCourseGrade, VisibleBlocks
+from ..models import PersistentCourseGrade, PersistentSubsectionGrade, VisibleBlocks
+from ..scores import possibly_scored
 from .course_data import CourseData
 from .course_grade import CourseGrade, ZeroCourseGrade
+from .subsection_grade import SubsectionGrade
 
 log = getLogger(__name__)
 
@@ -20,6 +27,7 @@ class CourseGradeFactory(object):
     Factory class to create Course Grade objects.
     """
     GradeResult = namedtuple('GradeResult', ['student', 'course_grade', 'error'])
+    BulkScores = namedtuple('BulkScores', ['submissions_scores', 'csm_scores', 'persisted_grades'])
 
     def create(self, user, course=None, collected_block_structure=None, course_structure=None, course_key=None):
         """
@@ -85,6 +93,55 @@ class CourseGradeFactory(object):
         course_data = CourseData(user, course, collected_block_structure, course_structure, course_key)
         return self._update(user, course_data, read_only=False, force_update_subsections=force_update_subsections)
 
+    def bulk_update(
+            self,
+            users,
+            course_key,
+            course=None,
+            collected_block_structure=None,
+            force_update_subsections=False,
+    ):
+        """
+        Computes, updates, and returns a list of GradeResults for the
+        given users in the course, as in iter.
+
+        Unlike calling update for each user, the scores and persisted
+        subsection grades of all the users are read with a constant
+        number of queries, the course is transformed once for each group
+        of users with equivalent access to its blocks, the grades are
+        computed in memory, and all the resulting subsection and course
+        grades are written in bulk.  If the grades of a user can't be
+        written, their GradeResult has the error, and the grades of the
+        other users are still written.
+        """
+        if not users:
+            return []
+        course_data = CourseData(
+            user=None, course=course, collected_block_structure=collected_block_structure, course_key=course_key,
+        )
+        with self._course_transaction(course_data.course_key):
+            bulk_scores = self._bulk_read_scores(users, course_data)
+            structures = self._bulk_course_blocks(users, course_data)
+            results = [
+                self._bulk_grade_result(
+                    user, course_data, bulk_scores, structures.get(user.id), force_update_subsections,
+                )
+                for user in users
+            ]
+            persisted_user_ids, persist_errors = self._bulk_persist(
+                course_data, [result for result in results if result.course_grade],
+            )
+            for index, (user, course_grade, _) in enumerate(results):
+                if user.id in persist_errors:
+                    results[index] = self.GradeResult(user, None, persist_errors[user.id])
+                elif course_grade:
+                    self._send_grade_signals(user, course_data, course_grade)
+                    log.info(
+                        u'Grades: BulkUpdate, %s, User: %s, %s, persisted: %s',
+                        course_data.full_string(), user.id, course_grade, user.id in persisted_user_ids,
+                    )
+        return results
+
     @contextmanager
     def _course_transaction(self, course_key):
         """
@@ -149,6 +206,183 @@ class CourseGradeFactory(object):
             )
             return self.GradeResult(user, None, exc)
 
+    def _bulk_read_scores(self, users, course_data):
+        """
+        Returns the BulkScores for all the given users in the course,
+        each keyed by user id.
+        """
+        user_ids = [user.id for user in users]
+        scorable_locations = [
+            block_key for block_key in course_data.collected_structure if possibly_scored(block_key)
+        ]
+        if should_persist_grades(course_data.course_key):
+            persisted_grades = PersistentSubsectionGrade.bulk_read_grades_for_users(user_ids, course_data.course_key)
+            VisibleBlocks.bulk_read(course_data.course_key)
+        else:
+            persisted_grades = {}
+        return self.BulkScores(
+            submissions_scores=self._bulk_read_submissions_scores(users, course_data.course_key),
+            csm_scores=ScoresClient.bulk_create_for_locations(course_data.course_key, user_ids, scorable_locations),
+            persisted_grades=persisted_grades,
+        )
+
+    @staticmethod
+    def _bulk_read_submissions_scores(users, course_key):
+        """
+        Returns the scores stored by the Submissions API for the given
+        users in the course, as returned by submissions_api.get_scores,
+        keyed by user id.
+
+        The Submissions API only reads the scores of one student at a
+        time, so these take a query per user.
+        """
+        course_id = unicode(course_key)
+        return {
+            user.id: submissions_api.get_scores(course_id, anonymous_id_for_user(user, course_key, save=False))
+            for user in users
+        }
+
+    @staticmethod
+    def _bulk_course_blocks(users, course_data):
+        """
+        Returns the course's block structures transformed for the given
+        users, keyed by user id, transforming the course only once for
+        users with equivalent access to it.
+
+        If the block structures can not be transformed together, an empty
+        dict is returned so that each user's is transformed on its own.
+        """
+        try:
+            return {
+                user.id: structure
+                for user, structure in get_course_blocks_for_users(
+                    users,
+                    course_data.location,
+                    collected_block_structure=course_data.collected_structure,
+                )
+            }
+        except Exception:  # pylint: disable=broad-except
+            log.exception(
+                u'Grades: BulkUpdate, %s, Cannot transform the course for all users at once',
+                course_data.full_string(),
+            )
+            return {}
+
+    def _bulk_grade_result(self, user, course_data, bulk_scores, structure, force_update_subsections):
+        """
+        Computes, without persisting, the grade of the given user from
+        the given BulkScores and the given course structure transformed
+        for the user, if any, and returns it as a GradeResult.
+        """
+        try:
+            user_course_data = CourseData(
+                user,
+                course=course_data.course,
+                collected_block_structure=course_data.collected_structure,
+                structure=structure,
+                course_key=course_data.course_key,
+            )
+            course_grade = CourseGrade(user, user_course_data, force_update_subsections=force_update_subsections)
+            course_grade._subsection_grade_factory.prefetch(  # pylint: disable=protected-access
+                bulk_scores.submissions_scores[user.id],
+                bulk_scores.csm_scores[user.id],
+                bulk_scores.persisted_grades.get(user.id, []),
+                defer_updates=True,
+            )
+            course_grade.update()
+            return self.GradeResult(user, course_grade, None)
+        except Exception as exc:  # pylint: disable=broad-except
+            log.exception(
+                'Cannot grade student %s in course %s because of exception: %s',
+                user.id,
+                course_data.course_key,
+                exc.message
+            )
+            return self.GradeResult(user, None, exc)
+
+    @classmethod
+    def _bulk_persist(cls, course_data, graded_results):
+        """
+        Saves the subsection and course grades of the given GradeResults
+        in bulk.  If that fails with an IntegrityError, as when another
+        process saved some of the grades in the meantime, the grades of
+        each user are saved on their own, so that a failure only affects
+        the grades of that user.
+
+        Returns the set of ids of the users whose grades were persisted,
+        and a dict of user id to the IntegrityError which kept the grades
+        of the user from being persisted.
+        """
+        if not should_persist_grades(course_data.course_key):
+            return set(), {}
+
+        # user id -> (subsection grade params, course grade params)
+        grade_params = OrderedDict()
+        for user, course_grade, _ in graded_results:
+            if waffle().is_enabled(WRITE_ONLY_IF_ENGAGED) and not course_grade.attempted:
+                continue
+            subsection_grade_factory = course_grade._subsection_grade_factory  # pylint: disable=protected-access
+            grade_params[user.id] = (
+                SubsectionGrade.bulk_model_params(user, subsection_grade_factory.pop_unsaved_subsection_grades()),
+                dict(
+                    user_id=user.id,
+                    course_version=course_data.version,
+                    course_edited_timestamp=course_data.edited_on,
+                    grading_policy_hash=course_data.grading_policy_hash,
+                    percent_grade=course_grade.percent,
+                    letter_grade=course_grade.letter_grade or "",
+                    passed=course_grade.passed,
+                ),
+            )
+
+        try:
+            cls._bulk_persist_params(course_data.course_key, grade_params.values())
+            return set(grade_params), {}
+        except IntegrityError:
+            log.exception(
+                u'Grades: BulkUpdate, %s, Cannot persist the grades of all users at once',
+                course_data.full_string(),
+            )
+
+        persisted_user_ids, errors = set(), {}
+        for user_id, params in grade_params.iteritems():
+            try:
+                cls._bulk_persist_params(course_data.course_key, [params])
+                persisted_user_ids.add(user_id)
+            except IntegrityError as exc:
+                log.exception(
+                    u'Grades: BulkUpdate, %s, Cannot persist the grades of user %s',
+                    course_data.full_string(), user_id,
+                )
+                errors[user_id] = exc
+        return persisted_user_ids, errors
+
+    @staticmethod
+    def _bulk_persist_params(course_key, grade_params):
+        """
+        Saves, in one transaction, the grades with the given pairs of
+        subsection grade params and course grade params, then emits
+        their grade_calculated events.
+        """
+        try:
+            with transaction.atomic():
+                subsection_grades = PersistentSubsectionGrade.bulk_update_or_create_grades(
+                    [dict(params) for subsection_params, _ in grade_params for params in subsection_params],
+                    course_key,
+                )
+                course_grades = PersistentCourseGrade.bulk_update_or_create(
+                    course_key, [course_params for _, course_params in grade_params],
+                )
+        except IntegrityError:
+            # The cached VisibleBlocks may include those whose creation was rolled back.
+            VisibleBlocks.clear_cache(course_key)
+            raise
+
+        for grade in subsection_grades:
+            PersistentSubsectionGrade._emit_grade_calculated_event(grade)  # pylint: disable=protected-access
+        for grade in course_grades:
+            PersistentCourseGrade._emit_grade_calculated_event(grade)  # pylint: disable=protected-access
+
     @staticmethod
     def _create_zero(user, course_data):
         """
@@ -208,6 +442,21 @@ class CourseGradeFactory(object):
                 passed=course_grade.passed,
             )
 
+        CourseGradeFactory._send_grade_signals(user, course_data, course_grade)
+
+        log.info(
+            u'Grades: Update, %s, User: %s, %s, persisted: %s',
+            course_data.full_string(), user.id, course_grade, should_persist,
+        )
+
+        return course_grade
+
+    @staticmethod
+    def _send_grade_signals(user, course_data, course_grade):
+        """
+        Sends a COURSE_GRADE_CHANGED signal to listeners and a
+        COURSE_GRADE_NOW_PASSED if learner has passed course.
+        """
         COURSE_GRADE_CHANGED.send_robust(
             sender=None,
             user=user,
@@ -221,10 +470,3 @@ class CourseGradeFactory(object):
                 user=user,
                 course_id=course_data.course_key,
             )
-
-        log.info(
-            u'Grades: Update, %s, User: %s, %s, persisted: %s',
-            course_data.full_string(), user.id, course_grade, should_persist,
-        )
-
-        return course_grade
@@ -148,12 +148,20 @@ class SubsectionGrade(SubsectionGradeBase):
         """
         Saves the subsection grade in a persisted model.
         """
-        subsection_grades = filter(lambda subs_grade: subs_grade._should_persist_per_attempted, subsection_grades)
         return PersistentSubsectionGrade.bulk_create_grades(
-            [subsection_grade._persisted_model_params(student) for subsection_grade in subsection_grades],  # pylint: disable=protected-access
+            cls.bulk_model_params(student, subsection_grades),
             course_key,
         )
 
+    @classmethod
+    def bulk_model_params(cls, student, subsection_grades):
+        """
+        Returns the parameters for persisting the models of the
+        given subsection grades that should be persisted.
+        """
+        subsection_grades = filter(lambda subs_grade: subs_grade._should_persist_per_attempted, subsection_grades)
+        return [subsection_grade._persisted_model_params(student) for subsection_grade in subsection_grades]  # pylint: disable=protected-access
+
     def create_model(self, student):
         """
         Saves the subsection grade in a persisted model.
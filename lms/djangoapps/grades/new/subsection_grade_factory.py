@@ -27,6 +27,7 @@ class SubsectionGradeFactory(object):
 
         self._cached_subsection_grades = None
         self._unsaved_subsection_grades = OrderedDict()
+        self._defer_updates = False
 
     def create(self, subsection, read_only=False):
         """
@@ -59,9 +60,31 @@ class SubsectionGradeFactory(object):
         Bulk creates all the unsaved subsection_grades to this point.
         """
         SubsectionGrade.bulk_create_models(
-            self.student, self._unsaved_subsection_grades.values(), self.course_data.course_key
+            self.student, self.pop_unsaved_subsection_grades(), self.course_data.course_key
         )
+
+    def pop_unsaved_subsection_grades(self):
+        """
+        Returns and clears all the unsaved subsection_grades to this point.
+        """
+        unsaved_subsection_grades = self._unsaved_subsection_grades.values()
         self._unsaved_subsection_grades.clear()
+        return unsaved_subsection_grades
+
+    def prefetch(self, submissions_scores, csm_scores, persisted_grades, defer_updates=False):
+        """
+        Provides this factory with the student's scores and persisted
+        subsection grades, as read in bulk for many students, so that no
+        further queries are made to compute the student's grades.
+
+        If defer_updates is True, grades computed by update are not saved,
+        but are left for the caller to persist in bulk along with the
+        grades from pop_unsaved_subsection_grades.
+        """
+        self._submissions_scores = submissions_scores
+        self._csm_scores = csm_scores
+        self._cached_subsection_grades = {record.full_usage_key: record for record in persisted_grades}
+        self._defer_updates = defer_updates
 
     def update(self, subsection, only_if_higher=None):
         """
@@ -93,8 +116,11 @@ class SubsectionGradeFactory(object):
                     ):
                         return orig_subsection_grade
 
-            grade_model = calculated_grade.update_or_create_model(self.student)
-            self._update_saved_subsection_grade(subsection.location, grade_model)
+            if self._defer_updates:
+                self._unsaved_subsection_grades[subsection.location] = calculated_grade
+            else:
+                grade_model = calculated_grade.update_or_create_model(self.student)
+                self._update_saved_subsection_grade(subsection.location, grade_model)
 
         return calculated_grade
 
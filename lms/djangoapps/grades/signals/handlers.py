@@ -22,10 +22,16 @@ from track.event_transaction_utils import (
 )
 from util.date_utils import to_timestamp
 
+from ..config.waffle import COALESCE_SUBSECTION_REGRADES, INCREMENTAL_SUBSECTION_REGRADE, waffle
 from ..constants import ScoreDatabaseTableEnum
 from ..new.course_grade_factory import CourseGradeFactory
 from ..scores import weighted_score
-from ..tasks import RECALCULATE_GRADE_DELAY, recalculate_subsection_grade_v3
+from ..tasks import (
+    RECALCULATE_GRADE_COALESCE_DELAY,
+    RECALCULATE_GRADE_DELAY,
+    recalculate_subsection_grade_v3,
+    register_pending_subsection_update
+)
 from .signals import (
     PROBLEM_RAW_SCORE_CHANGED,
     PROBLEM_WEIGHTED_SCORE_CHANGED,
@@ -142,9 +148,12 @@ def score_published_handler(sender, block, user, raw_earned, raw_possible, only_
     Returns whether the score was actually updated.
     """
     update_score = True
-    if only_if_higher:
+    track_previous_score = waffle().is_enabled(INCREMENTAL_SUBSECTION_REGRADE)
+    previous_score = None
+    if only_if_higher or track_previous_score:
         previous_score = get_score(user.id, block.location)
 
+    if only_if_higher:
         if previous_score is not None:
             prev_raw_earned, prev_raw_possible = (previous_score.grade, previous_score.max_grade)
 
@@ -165,6 +174,15 @@ def score_published_handler(sender, block, user, raw_earned, raw_possible, only_
         if isinstance(block, ScorableXBlockMixin):
             block.set_score(Score(raw_earned=raw_earned, raw_possible=raw_possible))
 
+        signal_kwargs = {}
+        if track_previous_score:
+            # Lets the grade update apply only the change in this problem's score.
+            signal_kwargs.update(
+                previous_raw_earned=getattr(previous_score, 'grade', None),
+                previous_raw_possible=getattr(previous_score, 'max_grade', None),
+                previous_modified=getattr(previous_score, 'modified', None),
+            )
+
         # Fire a signal (consumed by enqueue_subsection_update, below)
         PROBLEM_RAW_SCORE_CHANGED.send(
             sender=None,
@@ -177,6 +195,7 @@ def score_published_handler(sender, block, user, raw_earned, raw_possible, only_
             only_if_higher=only_if_higher,
             modified=score_modified_time,
             score_db_table=ScoreDatabaseTableEnum.courseware_student_module,
+            **signal_kwargs
         )
     return update_score
 
@@ -196,6 +215,21 @@ def problem_raw_score_changed_handler(sender, **kwargs):  # pylint: disable=unus
     else:  # TODO: remove as part of TNL-5982
         weighted_earned, weighted_possible = kwargs['raw_earned'], kwargs['raw_possible']
 
+    signal_kwargs = {}
+    if 'previous_raw_earned' in kwargs and kwargs['raw_possible'] is not None:
+        previous_weighted_earned, previous_weighted_possible = None, None
+        if kwargs['previous_raw_possible'] is not None:
+            previous_weighted_earned, previous_weighted_possible = weighted_score(
+                kwargs['previous_raw_earned'],
+                kwargs['previous_raw_possible'],
+                kwargs['weight'],
+            )
+        signal_kwargs.update(
+            previous_weighted_earned=previous_weighted_earned,
+            previous_weighted_possible=previous_weighted_possible,
+            previous_modified=kwargs['previous_modified'],
+        )
+
     PROBLEM_WEIGHTED_SCORE_CHANGED.send(
         sender=None,
         weighted_earned=weighted_earned,
@@ -207,6 +241,7 @@ def problem_raw_score_changed_handler(sender, **kwargs):  # pylint: disable=unus
         score_deleted=kwargs.get('score_deleted', False),
         modified=kwargs['modified'],
         score_db_table=kwargs['score_db_table'],
+        **signal_kwargs
     )
 
 
@@ -218,20 +253,37 @@ def enqueue_subsection_update(sender, **kwargs):  # pylint: disable=unused-argum
     enqueueing a subsection update operation to occur asynchronously.
     """
     _emit_event(kwargs)
+    task_kwargs = dict(
+        user_id=kwargs['user_id'],
+        anonymous_user_id=kwargs.get('anonymous_user_id'),
+        course_id=kwargs['course_id'],
+        usage_id=kwargs['usage_id'],
+        only_if_higher=kwargs.get('only_if_higher'),
+        expected_modified_time=to_timestamp(kwargs['modified']),
+        score_deleted=kwargs.get('score_deleted', False),
+        event_transaction_id=unicode(get_event_transaction_id()),
+        event_transaction_type=unicode(get_event_transaction_type()),
+        score_db_table=kwargs['score_db_table'],
+    )
+    if 'previous_weighted_earned' in kwargs:
+        previous_modified = kwargs['previous_modified']
+        task_kwargs.update(
+            weighted_earned=kwargs['weighted_earned'],
+            weighted_possible=kwargs['weighted_possible'],
+            previous_weighted_earned=kwargs['previous_weighted_earned'],
+            previous_weighted_possible=kwargs['previous_weighted_possible'],
+            previous_modified_time=to_timestamp(previous_modified) if previous_modified else None,
+        )
+    countdown = RECALCULATE_GRADE_DELAY
+    if waffle().is_enabled(COALESCE_SUBSECTION_REGRADES):
+        # Updates queued for the same user and subsections within the delay are coalesced.
+        task_kwargs['coalesce_version'] = register_pending_subsection_update(
+            kwargs['user_id'], kwargs['course_id'], kwargs['usage_id'], kwargs.get('only_if_higher'),
+        )
+        countdown = RECALCULATE_GRADE_COALESCE_DELAY
     result = recalculate_subsection_grade_v3.apply_async(
-        kwargs=dict(
-            user_id=kwargs['user_id'],
-            anonymous_user_id=kwargs.get('anonymous_user_id'),
-            course_id=kwargs['course_id'],
-            usage_id=kwargs['usage_id'],
-            only_if_higher=kwargs.get('only_if_higher'),
-            expected_modified_time=to_timestamp(kwargs['modified']),
-            score_deleted=kwargs.get('score_deleted', False),
-            event_transaction_id=unicode(get_event_transaction_id()),
-            event_transaction_type=unicode(get_event_transaction_type()),
-            score_db_table=kwargs['score_db_table'],
-        ),
-        countdown=RECALCULATE_GRADE_DELAY,
+        kwargs=task_kwargs,
+        countdown=countdown,
     )
 
 
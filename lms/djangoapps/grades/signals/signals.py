@@ -26,6 +26,9 @@ PROBLEM_RAW_SCORE_CHANGED = Signal(
         'modified',  # A datetime indicating when the database representation of
                      # this the problem score was saved.
         'score_db_table',  # The database table that houses the score that changed.
+        'previous_raw_earned',  # Optional, previous score obtained by the user
+        'previous_raw_possible',  # Optional, previous maximum score available
+        'previous_modified',  # Optional, when the previous score was saved.
     ]
 )
 
@@ -49,6 +52,9 @@ PROBLEM_WEIGHTED_SCORE_CHANGED = Signal(
         'modified',  # A datetime indicating when the database representation of
                      # this the problem score was saved.
         'score_db_table',  # The database table that houses the score that changed.
+        'previous_weighted_earned',  # Optional, previous score obtained by the user
+        'previous_weighted_possible',  # Optional, previous maximum score available
+        'previous_modified',  # Optional, when the previous score was saved.
     ]
 )
 
@@ -2,6 +2,8 @@
 This module contains tasks for asynchronous execution of grade updates.
 """
 
+import hashlib
+from datetime import timedelta
 from logging import getLogger
 
 import six
@@ -10,6 +12,7 @@ from celery_utils.logged_task import LoggedTask
 from celery_utils.persist_on_failure import PersistOnFailureTask
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db.utils import DatabaseError
 from opaque_keys.edx.keys import CourseKey, UsageKey
@@ -19,6 +22,7 @@ from courseware.model_data import get_score
 from lms.djangoapps.course_blocks.api import get_course_blocks
 from lms.djangoapps.courseware import courses
 from lms.djangoapps.grades.config.models import ComputeGradesSetting
+from openedx.core.djangoapps.content.block_structure.api import get_block_structure_manager
 from openedx.core.djangoapps.monitoring_utils import set_custom_metric, set_custom_metrics_for_course_key
 from student.models import CourseEnrollment
 from submissions import api as sub_api
@@ -26,9 +30,15 @@ from track.event_transaction_utils import set_event_transaction_id, set_event_tr
 from util.date_utils import from_timestamp
 from xmodule.modulestore.django import modulestore
 
-from .config.waffle import ESTIMATE_FIRST_ATTEMPTED, DISABLE_REGRADE_ON_POLICY_CHANGE, waffle
+from .config.waffle import (
+    DISABLE_REGRADE_ON_POLICY_CHANGE,
+    ESTIMATE_FIRST_ATTEMPTED,
+    INCREMENTAL_SUBSECTION_REGRADE,
+    waffle
+)
 from .constants import ScoreDatabaseTableEnum
 from .exceptions import DatabaseNotReadyError
+from .incremental import ScoreDelta, update_grades_from_score_delta
 from .new.course_grade_factory import CourseGradeFactory
 from .new.subsection_grade_factory import SubsectionGradeFactory
 from .services import GradesService
@@ -43,6 +53,9 @@ KNOWN_RETRY_ERRORS = (  # Errors we expect occasionally, should be resolved on r
     DatabaseNotReadyError,
 )
 RECALCULATE_GRADE_DELAY = 2  # in seconds, to prevent excessive _has_db_updated failures. See TNL-6424.
+RECALCULATE_GRADE_COALESCE_DELAY = 10  # in seconds, window in which updates for a subsection are coalesced.
+COALESCE_MAX_LATER_UPDATES = 100  # number of later updates checked for ones superseding an update
+PENDING_UPDATE_CACHE_TIMEOUT = 60 * 60  # in seconds
 
 
 class _BaseTask(PersistOnFailureTask, LoggedTask):  # pylint: disable=abstract-method
@@ -119,9 +132,9 @@ def compute_grades_for_course(course_key, offset, batch_size, **kwargs):  # pyli
     offset.
     """
     course = courses.get_course_by_id(CourseKey.from_string(course_key))
-    enrollments = CourseEnrollment.objects.filter(course_id=course.id).order_by('created')
-    student_iter = (enrollment.user for enrollment in enrollments[offset:offset + batch_size])
-    for result in CourseGradeFactory().iter(users=student_iter, course=course, force_update=True):
+    enrollments = CourseEnrollment.objects.filter(course_id=course.id).select_related('user').order_by('created')
+    students = [enrollment.user for enrollment in enrollments[offset:offset + batch_size]]
+    for result in CourseGradeFactory().bulk_update(students, course.id, course=course, force_update_subsections=True):
         if result.error is not None:
             raise result.error
 
@@ -157,6 +170,19 @@ def _recalculate_subsection_grade(self, **kwargs):
             event at the root of the current event transaction.
         score_db_table (ScoreDatabaseTableEnum): database table that houses
             the changed score. Used in conjunction with expected_modified_time.
+        weighted_earned, weighted_possible (float, OPTIONAL): the new
+            weighted score of the problem.
+        previous_weighted_earned, previous_weighted_possible (float, OPTIONAL):
+            the previous weighted score of the problem, or None if it had
+            no score.  When given, the persisted grades are updated from the
+            change in the problem's score, if possible.
+        previous_modified_time (serialized timestamp, OPTIONAL): indicates
+            when the previous score was saved.
+        coalesce_version (int, OPTIONAL): the version returned by
+            register_pending_subsection_update when the task was queued.
+            The task does nothing if later tasks were queued for the same
+            user which update all of the subsections containing the problem,
+            since those tasks recompute them from the latest scores.
     """
     try:
         course_key = CourseLocator.from_string(kwargs['course_id'])
@@ -165,6 +191,11 @@ def _recalculate_subsection_grade(self, **kwargs):
         set_custom_metrics_for_course_key(course_key)
         set_custom_metric('usage_id', unicode(scored_block_usage_key))
 
+        if 'coalesce_version' in kwargs and _is_superseded_subsection_update(
+                course_key, scored_block_usage_key, **kwargs
+        ):
+            return
+
         # The request cache is not maintained on celery workers,
         # where this code runs. So we take the values from the
         # main request cache and store them in the local request
@@ -182,6 +213,13 @@ def _recalculate_subsection_grade(self, **kwargs):
         if not has_database_updated:
             raise DatabaseNotReadyError
 
+        # A coalesced update may stand in for skipped updates of other problems,
+        # whose score changes it wouldn't apply, so it recomputes the subsections.
+        if 'coalesce_version' not in kwargs and _update_grades_from_score_delta(
+                course_key, scored_block_usage_key, **kwargs
+        ):
+            return
+
         _update_subsection_grades(
             course_key,
             scored_block_usage_key,
@@ -198,6 +236,143 @@ def _recalculate_subsection_grade(self, **kwargs):
         raise self.retry(kwargs=kwargs, exc=exc)
 
 
+def register_pending_subsection_update(user_id, course_id, usage_id, only_if_higher=False):
+    """
+    Records that a subsection update task is being queued for the given
+    user and problem, and returns the version to pass to the task as
+    coalesce_version.
+
+    Versions are counted per user and course, and the problem of each
+    version is recorded, so that when the tasks run, updates for problems
+    of the same subsections can be coalesced.
+    """
+    key = _pending_update_cache_key(user_id, course_id)
+    cache.add(key, 0, PENDING_UPDATE_CACHE_TIMEOUT)
+    try:
+        version = cache.incr(key)
+    except ValueError:
+        # The key was evicted since it was added.
+        cache.set(key, 1, PENDING_UPDATE_CACHE_TIMEOUT)
+        version = 1
+    cache.set(
+        _pending_update_version_key(key, version),
+        (usage_id, bool(only_if_higher)),
+        PENDING_UPDATE_CACHE_TIMEOUT,
+    )
+    return version
+
+
+def _is_superseded_subsection_update(course_key, scored_block_usage_key, **kwargs):
+    """
+    Returns whether later subsection update tasks were queued for the user
+    and course of this task which update all of the subsections containing
+    this task's problem, in which case this task's update can be skipped.
+    Otherwise, reports the number of skipped updates that this task's
+    update may be standing in for.
+    """
+    version = kwargs['coalesce_version']
+    key = _pending_update_cache_key(kwargs['user_id'], kwargs['course_id'])
+    coalesced_key = key + u'.coalesced'
+    latest_version = cache.get(key)
+    if latest_version is not None and latest_version > version:
+        later_updates = cache.get_many([
+            _pending_update_version_key(key, later_version)
+            for later_version in range(version + 1, min(latest_version, version + COALESCE_MAX_LATER_UPDATES) + 1)
+        ]).values()
+
+        collected_structure = get_block_structure_manager(course_key).get_collected()
+
+        def _subsections(usage_key):
+            """
+            Returns the keys of the subsections containing the given block.
+            """
+            if usage_key not in collected_structure:
+                return set()
+            return collected_structure.get_transformer_block_field(usage_key, GradesTransformer, 'subsections', set())
+
+        subsections = _subsections(scored_block_usage_key)
+        updated_later = set()
+        for usage_id, only_if_higher in later_updates:
+            # Updates made only if higher may not include this task's score.
+            if not only_if_higher:
+                updated_later |= _subsections(UsageKey.from_string(usage_id).replace(course_key=course_key))
+
+        if subsections and subsections <= updated_later:
+            set_custom_metric('subsection_update_coalesced', True)
+            log.info(
+                u'Grades: Skipping subsection update superseded by later versions up to %s. Kwargs: %s',
+                latest_version,
+                kwargs,
+            )
+            cache.add(coalesced_key, 0, PENDING_UPDATE_CACHE_TIMEOUT)
+            try:
+                cache.incr(coalesced_key)
+            except ValueError:
+                pass
+            return True
+
+    num_coalesced = cache.get(coalesced_key)
+    if num_coalesced:
+        try:
+            cache.decr(coalesced_key, num_coalesced)
+        except ValueError:
+            pass
+        set_custom_metric('num_coalesced_subsection_updates', num_coalesced)
+    return False
+
+
+def _pending_update_cache_key(user_id, course_id):
+    """
+    Returns the cache key of the latest subsection update version
+    for the given user and course.
+    """
+    return u'grades.pending_subsection_update.{}.{}'.format(
+        user_id,
+        hashlib.sha1(unicode(course_id).encode('utf-8')).hexdigest(),
+    )
+
+
+def _pending_update_version_key(key, version):
+    """
+    Returns the cache key of the problem of the given subsection
+    update version.
+    """
+    return u'{}.{}'.format(key, version)
+
+
+def _update_grades_from_score_delta(course_key, scored_block_usage_key, **kwargs):
+    """
+    Updates the persisted grades from the change in the problem's score,
+    when the task was given the problem's previous score.  Returns whether
+    the grades were updated.
+    """
+    if 'previous_weighted_earned' not in kwargs or kwargs['only_if_higher'] or kwargs['score_deleted']:
+        return False
+    if not waffle().is_enabled(INCREMENTAL_SUBSECTION_REGRADE):
+        return False
+
+    previous_modified = None
+    if kwargs['previous_modified_time']:
+        # Serialized timestamps are truncated to the second, so round up
+        # to never treat a grade as newer than the previous score when
+        # it is not.
+        previous_modified = from_timestamp(kwargs['previous_modified_time']) + timedelta(seconds=1)
+    score_delta = ScoreDelta(
+        previous_earned=kwargs['previous_weighted_earned'],
+        previous_possible=kwargs['previous_weighted_possible'],
+        previous_modified=previous_modified,
+        earned=kwargs['weighted_earned'],
+        possible=kwargs['weighted_possible'],
+    )
+    return update_grades_from_score_delta(
+        User.objects.get(id=kwargs['user_id']),
+        course_key,
+        scored_block_usage_key,
+        score_delta,
+        from_timestamp(kwargs['expected_modified_time']),
+    )
+
+
 def _has_db_updated_with_new_score(self, scored_block_usage_key, **kwargs):
     """
     Returns whether the database has been updated with the
@@ -0,0 +1,100 @@
+"""
+Tests for incremental grade updates from the change in a problem's score.
+"""
+from datetime import timedelta
+
+from courseware.model_data import set_score
+from student.tests.factories import UserFactory
+
+from ..incremental import ScoreDelta, update_grades_from_score_delta
+from ..models import PersistentCourseGrade, PersistentSubsectionGrade
+from ..new.course_grade_factory import CourseGradeFactory
+from .test_new import GradeTestBase
+
+
+class IncrementalUpdateTest(GradeTestBase):
+    """
+    Tests that incremental updates of persisted grades
+    match full regrades, or are not made.
+    """
+    ENABLED_SIGNALS = ['course_published']
+
+    def setUp(self):
+        super(IncrementalUpdateTest, self).setUp()
+        self.user = self.request.user
+        CourseGradeFactory().update(self.user, self.course)
+
+    def _subsection_grade(self, subsection):
+        return PersistentSubsectionGrade.read_grade(self.user.id, subsection.location)
+
+    def _update(self, score_delta, score_modified=None):
+        """
+        Saves the new score of the problem and incrementally updates
+        the grades from the given ScoreDelta.
+        """
+        modified = set_score(self.user.id, self.problem.location, score_delta.earned, score_delta.possible)
+        return update_grades_from_score_delta(
+            self.user, self.course.id, self.problem.location, score_delta, score_modified or modified,
+        )
+
+    def test_matches_full_regrade(self):
+        self.assertTrue(self._update(ScoreDelta(None, None, None, 1.0, 1.0)))
+
+        subsection_grade = self._subsection_grade(self.sequence)
+        self.assertEqual((subsection_grade.earned_all, subsection_grade.earned_graded), (1.0, 1.0))
+        self.assertIsNotNone(subsection_grade.first_attempted)
+        incremental_percent = PersistentCourseGrade.read(self.user.id, self.course.id).percent_grade
+        self.assertEqual(incremental_percent, 0.5)
+
+        course_grade = CourseGradeFactory().update(self.user, self.course, force_update_subsections=True)
+        self.assertEqual(course_grade.percent, incremental_percent)
+        self.assertEqual(self._subsection_grade(self.sequence).earned_all, subsection_grade.earned_all)
+
+    def test_applies_only_the_change(self):
+        self.assertTrue(self._update(ScoreDelta(None, None, None, 1.0, 1.0)))
+        previous_modified = self._subsection_grade(self.sequence).modified - timedelta(seconds=1)
+        self.assertTrue(self._update(ScoreDelta(1.0, 1.0, previous_modified, 0.0, 1.0)))
+        self.assertEqual(self._subsection_grade(self.sequence).earned_all, 0.0)
+        self.assertEqual(PersistentCourseGrade.read(self.user.id, self.course.id).percent_grade, 0.0)
+
+    def test_grade_newer_than_score(self):
+        score_modified = self._subsection_grade(self.sequence).modified - timedelta(seconds=1)
+        self.assertFalse(self._update(ScoreDelta(None, None, None, 1.0, 1.0), score_modified=score_modified))
+        self.assertEqual(self._subsection_grade(self.sequence).earned_all, 0.0)
+
+    def test_grade_older_than_previous_score(self):
+        previous_modified = self._subsection_grade(self.sequence).modified + timedelta(seconds=1)
+        self.assertFalse(self._update(ScoreDelta(0.0, 1.0, previous_modified, 1.0, 1.0)))
+        self.assertEqual(self._subsection_grade(self.sequence).earned_all, 0.0)
+
+    def test_possible_changed(self):
+        self.assertFalse(self._update(ScoreDelta(None, None, None, 1.0, 2.0)))
+        self.assertEqual(self._subsection_grade(self.sequence).earned_all, 0.0)
+
+    def test_grade_from_other_course_version(self):
+        PersistentSubsectionGrade.objects.filter(user_id=self.user.id).update(course_version='other version')
+        self.assertFalse(self._update(ScoreDelta(None, None, None, 1.0, 1.0)))
+        self.assertEqual(self._subsection_grade(self.sequence).earned_all, 0.0)
+
+    def test_missing_subsection_grade(self):
+        PersistentSubsectionGrade.objects.filter(user_id=self.user.id).delete()
+        self.assertFalse(self._update(ScoreDelta(None, None, None, 1.0, 1.0)))
+        self.assertFalse(PersistentSubsectionGrade.objects.filter(user_id=self.user.id).exists())
+
+    def test_lost_access_to_subsection(self):
+        self._set_visible_to_staff_only(self.sequence2, True)
+        self.addCleanup(self._set_visible_to_staff_only, self.sequence2, False)
+
+        self.assertTrue(self._update(ScoreDelta(None, None, None, 1.0, 1.0)))
+        # The persisted grade of the subsection the learner can't see no longer counts.
+        incremental_percent = PersistentCourseGrade.read(self.user.id, self.course.id).percent_grade
+        self.assertEqual(incremental_percent, 1.0)
+        course_grade = CourseGradeFactory().update(self.user, self.course, force_update_subsections=True)
+        self.assertEqual(course_grade.percent, incremental_percent)
+
+    def _set_visible_to_staff_only(self, block, visible_to_staff_only):
+        """
+        Updates whether the given block is visible to staff only.
+        """
+        block.visible_to_staff_only = visible_to_staff_only
+        self.store.update_item(block, UserFactory().id)
@@ -9,15 +9,19 @@ import itertools
 import ddt
 import pytz
 from django.conf import settings
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
 from mock import patch
+from submissions import api as submissions_api
 
 from capa.tests.response_xml_factory import MultipleChoiceResponseXMLFactory
 from courseware.access import has_access
+from courseware.model_data import set_score
 from courseware.tests.test_submitting_problems import ProblemSubmissionTestMixin
 from lms.djangoapps.course_blocks.api import get_course_blocks
 from lms.djangoapps.grades.config.tests.utils import persistent_grades_feature_flags
 from openedx.core.djangolib.testing.utils import get_mock_request
-from student.models import CourseEnrollment
+from student.models import CourseEnrollment, anonymous_id_for_user
 from student.tests.factories import UserFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase, SharedModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
@@ -25,7 +29,7 @@ from xmodule.modulestore.tests.utils import TEST_DATA_DIR
 from xmodule.modulestore.xml_importer import import_course_from_xml
 
 from ..config.waffle import ASSUME_ZERO_GRADE_IF_ABSENT, WRITE_ONLY_IF_ENGAGED, waffle
-from ..models import PersistentSubsectionGrade
+from ..models import PersistentCourseGrade, PersistentSubsectionGrade
 from ..new.course_data import CourseData
 from ..new.course_grade import CourseGrade, ZeroCourseGrade
 from ..new.course_grade_factory import CourseGradeFactory
@@ -260,6 +264,115 @@ class TestCourseGradeFactory(GradeTestBase):
         self.assertTrue(desired_call.called)
         self.assertFalse(undesired_call.called)
 
+    def _set_submissions_score(self, user, block, earned, possible):
+        """
+        Saves the given score of the given user for the given block with the Submissions API.
+        """
+        submission = submissions_api.create_submission(
+            {
+                'student_id': anonymous_id_for_user(user, self.course.id),
+                'course_id': unicode(self.course.id),
+                'item_id': unicode(block.location),
+                'item_type': 'problem',
+            },
+            'answer',
+        )
+        submissions_api.set_score(submission['uuid'], earned, possible)
+
+    def _enroll_users_with_scores(self):
+        """
+        Returns users enrolled in the course: one with a courseware score for
+        the first problem, one with a Submissions API score for the second
+        problem, and one without scores.
+        """
+        users = [self.request.user, UserFactory(), UserFactory()]
+        for user in users[1:]:
+            CourseEnrollment.enroll(user, self.course.id)
+        set_score(users[0].id, self.problem.location, 1, 1)
+        self._set_submissions_score(users[1], self.problem2, 1, 1)
+        return users
+
+    def test_bulk_read_scores(self):
+        users = self._enroll_users_with_scores()
+        grade_factory = CourseGradeFactory()
+        course_data = CourseData(None, course=self.course)
+        grade_factory._bulk_read_scores(users, course_data)
+
+        # The scores of any number of users are read with the same queries,
+        # except for the Submissions API scores, which are read per user.
+        with CaptureQueriesContext(connection) as one_user_queries:
+            grade_factory._bulk_read_scores(users[:1], course_data)
+        with self.assertNumQueries(len(one_user_queries) + len(users) - 1):
+            bulk_scores = grade_factory._bulk_read_scores(users, course_data)
+
+        self.assertEqual(bulk_scores.csm_scores[users[0].id].get(self.problem.location).correct, 1)
+        self.assertIsNone(bulk_scores.csm_scores[users[1].id].get(self.problem.location))
+        self.assertEqual(bulk_scores.submissions_scores[users[0].id], {})
+        submissions_score = bulk_scores.submissions_scores[users[1].id][unicode(self.problem2.location)]
+        self.assertEqual(submissions_score['points_earned'], 1)
+
+    @ddt.data(True, False)
+    def test_bulk_update(self, force_update_subsections):
+        users = self._enroll_users_with_scores()
+        grade_factory = CourseGradeFactory()
+        results = grade_factory.bulk_update(
+            users, self.course.id, course=self.course, force_update_subsections=force_update_subsections,
+        )
+
+        self.assertEqual([result.student for result in results], users)
+        self.assertEqual([result.error for result in results], [None, None, None])
+        self.assertEqual([result.course_grade.percent for result in results], [0.5, 0.5, 0.0])
+        for user, course_grade, _ in results:
+            self.assertEqual(grade_factory.read(user, self.course).percent, course_grade.percent)
+            # As updating each user's grades on their own computes them
+            expected_grade = grade_factory.update(user, self.course, force_update_subsections=True)
+            self.assertEqual(course_grade.percent, expected_grade.percent)
+            self.assertEqual(course_grade.letter_grade, expected_grade.letter_grade)
+
+    def test_bulk_update_existing_grades(self):
+        grade_factory = CourseGradeFactory()
+        grade_factory.update(self.request.user, self.course)
+        set_score(self.request.user.id, self.problem.location, 1, 1)
+        set_score(self.request.user.id, self.problem2.location, 1, 1)
+
+        with patch.object(PersistentSubsectionGrade, 'save') as mock_subsection_save:
+            with patch.object(PersistentCourseGrade, 'save') as mock_course_save:
+                results = grade_factory.bulk_update(
+                    [self.request.user], self.course.id, course=self.course, force_update_subsections=True,
+                )
+        # The existing grades are updated in bulk.
+        self.assertFalse(mock_subsection_save.called)
+        self.assertFalse(mock_course_save.called)
+
+        self.assertEqual(results[0].course_grade.percent, 1.0)
+        self.assertEqual(grade_factory.read(self.request.user, self.course).percent, 1.0)
+        for grade in PersistentSubsectionGrade.bulk_read_grades(self.request.user.id, self.course.id):
+            self.assertEqual(grade.earned_all, grade.possible_all)
+
+    def test_bulk_update_integrity_error(self):
+        users = self._enroll_users_with_scores()
+        failing_user = users[2]
+        bulk_update_or_create = PersistentCourseGrade.bulk_update_or_create
+
+        def fail_for_user(course_id, grade_params_iter):
+            """
+            Fails to save the course grades of any batch of users with failing_user.
+            """
+            if any(params['user_id'] == failing_user.id for params in grade_params_iter):
+                raise IntegrityError
+            return bulk_update_or_create(course_id, grade_params_iter)
+
+        with patch.object(PersistentCourseGrade, 'bulk_update_or_create', side_effect=fail_for_user):
+            results = CourseGradeFactory().bulk_update(users, self.course.id, course=self.course)
+
+        self.assertIsInstance(results[2].error, IntegrityError)
+        self.assertIsNone(results[2].course_grade)
+        self.assertFalse(PersistentSubsectionGrade.objects.filter(user_id=failing_user.id).exists())
+        self.assertFalse(PersistentCourseGrade.objects.filter(user_id=failing_user.id).exists())
+        for user, course_grade, error in results[:2]:
+            self.assertIsNone(error)
+            self.assertEqual(PersistentCourseGrade.read(user.id, self.course.id).percent_grade, course_grade.percent)
+
 
 @ddt.ddt
 class TestSubsectionGradeFactory(ProblemSubmissionTestMixin, GradeTestBase):
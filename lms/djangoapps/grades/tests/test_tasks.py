@@ -15,11 +15,17 @@ from django.db.utils import IntegrityError
 from mock import MagicMock, patch
 
 from lms.djangoapps.grades.config.models import PersistentGradesEnabledFlag
+from lms.djangoapps.grades.config.waffle import (
+    COALESCE_SUBSECTION_REGRADES,
+    INCREMENTAL_SUBSECTION_REGRADE,
+    waffle
+)
 from lms.djangoapps.grades.constants import ScoreDatabaseTableEnum
 from lms.djangoapps.grades.models import PersistentCourseGrade, PersistentSubsectionGrade
 from lms.djangoapps.grades.services import GradesService
 from lms.djangoapps.grades.signals.signals import PROBLEM_WEIGHTED_SCORE_CHANGED
 from lms.djangoapps.grades.tasks import (
+    RECALCULATE_GRADE_COALESCE_DELAY,
     RECALCULATE_GRADE_DELAY,
     _course_task_args,
     compute_all_grades_for_course,
@@ -252,6 +258,29 @@ class RecalculateSubsectionGradeTest(HasCourseWithProblemsMixin, ModuleStoreTest
             self.assertIsNotNone(PersistentCourseGrade.read(self.user.id, self.course.id))
             self.assertGreater(len(PersistentSubsectionGrade.bulk_read_grades(self.user.id, self.course.id)), 0)
 
+    @ddt.data(
+        (True, True, False),
+        (True, False, True),
+        (False, True, True),
+    )
+    @ddt.unpack
+    @patch('lms.djangoapps.grades.tasks._update_subsection_grades')
+    @patch('lms.djangoapps.grades.tasks.update_grades_from_score_delta')
+    def test_incremental_update(self, switch_enabled, delta_applied, full_update_expected, mock_delta, mock_full):
+        self.set_up_course()
+        mock_delta.return_value = delta_applied
+        self.recalculate_subsection_grade_kwargs.update(
+            weighted_earned=1.0,
+            weighted_possible=2.0,
+            previous_weighted_earned=None,
+            previous_weighted_possible=None,
+            previous_modified_time=None,
+        )
+        with waffle().override(INCREMENTAL_SUBSECTION_REGRADE, active=switch_enabled):
+            self._apply_recalculate_subsection_grade()
+        self.assertEqual(mock_delta.called, switch_enabled)
+        self.assertEqual(mock_full.called, full_update_expected)
+
     @patch('lms.djangoapps.grades.signals.signals.SUBSECTION_SCORE_CHANGED.send')
     @patch('lms.djangoapps.grades.new.subsection_grade_factory.SubsectionGradeFactory.update')
     def test_retry_first_time_only(self, mock_update, mock_course_signal):
@@ -397,6 +426,90 @@ class RecalculateSubsectionGradeTest(HasCourseWithProblemsMixin, ModuleStoreTest
         self.assertFalse(mock_retry.called)
 
 
+@patch.dict(settings.FEATURES, {'PERSISTENT_GRADES_ENABLED_FOR_ALL_TESTS': False})
+class CoalesceSubsectionUpdateTest(HasCourseWithProblemsMixin, ModuleStoreTestCase):
+    """
+    Ensures that subsection update tasks queued for the same
+    user and subsection are coalesced into a single update.
+    """
+    ENABLED_CACHES = ['default']
+    ENABLED_SIGNALS = ['course_published', 'pre_publish']
+
+    def setUp(self):
+        super(CoalesceSubsectionUpdateTest, self).setUp()
+        self.user = UserFactory()
+        PersistentGradesEnabledFlag.objects.create(enabled_for_all_courses=True, enabled=True)
+        self.set_up_course()
+        self.sibling_problem = ItemFactory.create(parent=self.sequential, category='problem')
+        other_sequential = ItemFactory.create(parent=self.chapter, category='sequential')
+        self.other_problem = ItemFactory.create(parent=other_sequential, category='problem')
+
+    def _enqueue_updates(self, problems):
+        """
+        Sends a PROBLEM_WEIGHTED_SCORE_CHANGED signal for each of the given
+        problems, returning the kwargs of the queued tasks.
+        """
+        with waffle().override(COALESCE_SUBSECTION_REGRADES, active=True):
+            with patch('lms.djangoapps.grades.tasks.recalculate_subsection_grade_v3.apply_async') as mock_apply:
+                for problem in problems:
+                    signal_kwargs = dict(self.problem_weighted_score_changed_kwargs, usage_id=unicode(problem.location))
+                    PROBLEM_WEIGHTED_SCORE_CHANGED.send(sender=None, **signal_kwargs)
+        for call in mock_apply.call_args_list:
+            self.assertEqual(call[1]['countdown'], RECALCULATE_GRADE_COALESCE_DELAY)
+        return [call[1]['kwargs'] for call in mock_apply.call_args_list]
+
+    def _run_tasks(self, task_kwargs):
+        """
+        Runs the queued tasks, returning the problems for which subsections were updated.
+        """
+        score = MagicMock(modified=self.frozen_now_datetime)
+        with patch('lms.djangoapps.grades.tasks._update_subsection_grades') as mock_update:
+            with patch('lms.djangoapps.grades.tasks.get_score', return_value=score):
+                for kwargs in task_kwargs:
+                    recalculate_subsection_grade_v3.apply(kwargs=kwargs)
+        return [call[0][1] for call in mock_update.call_args_list]
+
+    def test_enqueued_versions(self):
+        task_kwargs = self._enqueue_updates([self.problem, self.sibling_problem, self.other_problem])
+        self.assertEqual([kwargs['coalesce_version'] for kwargs in task_kwargs], [1, 2, 3])
+
+    @patch('lms.djangoapps.grades.tasks.set_custom_metric')
+    def test_updates_coalesced_per_subsection(self, mock_metric):
+        task_kwargs = self._enqueue_updates([self.problem, self.sibling_problem, self.problem])
+        self.assertEqual(self._run_tasks(task_kwargs), [self.problem.location])
+        mock_metric.assert_any_call('subsection_update_coalesced', True)
+        mock_metric.assert_any_call('num_coalesced_subsection_updates', 2)
+
+    def test_other_subsections_not_coalesced(self):
+        task_kwargs = self._enqueue_updates([self.problem, self.other_problem, self.sibling_problem])
+        self.assertEqual(
+            self._run_tasks(task_kwargs),
+            [self.other_problem.location, self.sibling_problem.location],
+        )
+
+    def test_not_coalesced_with_updates_only_if_higher(self):
+        task_kwargs = self._enqueue_updates([self.problem])
+        with waffle().override(COALESCE_SUBSECTION_REGRADES, active=True):
+            with patch('lms.djangoapps.grades.tasks.recalculate_subsection_grade_v3.apply_async') as mock_apply:
+                signal_kwargs = dict(
+                    self.problem_weighted_score_changed_kwargs,
+                    usage_id=unicode(self.sibling_problem.location),
+                    only_if_higher=True,
+                )
+                PROBLEM_WEIGHTED_SCORE_CHANGED.send(sender=None, **signal_kwargs)
+        task_kwargs.append(mock_apply.call_args[1]['kwargs'])
+        self.assertEqual(
+            self._run_tasks(task_kwargs),
+            [self.problem.location, self.sibling_problem.location],
+        )
+
+    def test_not_coalesced_without_switch(self):
+        with patch('lms.djangoapps.grades.tasks.recalculate_subsection_grade_v3.apply_async') as mock_apply:
+            PROBLEM_WEIGHTED_SCORE_CHANGED.send(sender=None, **self.problem_weighted_score_changed_kwargs)
+        self.assertNotIn('coalesce_version', mock_apply.call_args[1]['kwargs'])
+        self.assertEqual(mock_apply.call_args[1]['countdown'], RECALCULATE_GRADE_DELAY)
+
+
 @ddt.ddt
 class ComputeGradesForCourseTest(HasCourseWithProblemsMixin, ModuleStoreTestCase):
     """
@@ -9,6 +9,9 @@ from django.db.models import IntegerField
 class GradeReportSetting(ConfigurationModel):
     """
     Sets the batch size used when running grade reports
-    with multiple celery workers.
+    with multiple celery workers.  When num_workers is
+    greater than 1, batches of users are graded in parallel
+    by a pool of forked worker processes.
     """
     batch_size = IntegerField(default=100)
+    num_workers = IntegerField(default=1)
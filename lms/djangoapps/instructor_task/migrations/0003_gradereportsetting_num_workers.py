@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('instructor_task', '0002_gradereportsetting'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gradereportsetting',
+            name='num_workers',
+            field=models.IntegerField(default=1),
+        ),
+    ]
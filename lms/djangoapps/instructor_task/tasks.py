@@ -43,6 +43,7 @@ from lms.djangoapps.instructor_task.tasks_helper.misc import (
     upload_proctored_exam_results_report
 )
 from lms.djangoapps.instructor_task.tasks_helper.module_state import (
+    batch_rescore_executions,
     delete_problem_module_state,
     perform_module_state_update,
     override_score_module_state,
@@ -77,7 +78,14 @@ def rescore_problem(entry_id, xmodule_instance_args):
     action_name = ugettext_noop('rescored')
     update_fcn = partial(rescore_problem_module_state, xmodule_instance_args)
 
-    visit_fcn = partial(perform_module_state_update, update_fcn, None)
+    if settings.RESCORE_SAFE_EXEC_BATCH_SIZE > 1:
+        prepare_fcn = partial(batch_rescore_executions, xmodule_instance_args)
+        visit_fcn = partial(
+            perform_module_state_update, update_fcn, None,
+            prepare_fcn=prepare_fcn, chunk_size=settings.RESCORE_SAFE_EXEC_BATCH_SIZE,
+        )
+    else:
+        visit_fcn = partial(perform_module_state_update, update_fcn, None)
     return run_main_task(entry_id, visit_fcn, action_name)
 
 
@@ -2,12 +2,17 @@
 Functionality for generating grade reports.
 """
 import logging
+import multiprocessing
 import re
 from collections import OrderedDict
 from datetime import datetime
 from itertools import chain, izip, izip_longest
 from time import time
 
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connections
 from lazy import lazy
 from pytz import UTC
 
@@ -18,6 +23,7 @@ from instructor_analytics.csvs import format_dictlist
 from lms.djangoapps.grades.context import grading_context, grading_context_for_course
 from lms.djangoapps.grades.models import PersistentCourseGrade
 from lms.djangoapps.grades.new.course_grade_factory import CourseGradeFactory
+from lms.djangoapps.instructor_task.config.models import GradeReportSetting
 from lms.djangoapps.teams.models import CourseTeamMembership
 from lms.djangoapps.verify_student.models import SoftwareSecurePhotoVerification
 from openedx.core.djangoapps.content.block_structure.api import get_course_in_cache
@@ -25,6 +31,7 @@ from openedx.core.djangoapps.course_groups.cohorts import bulk_cache_cohorts, ge
 from openedx.core.djangoapps.user_api.course_tag.api import BulkCourseTags
 from student.models import CourseEnrollment
 from student.roles import BulkRoleCache
+from xmodule.contentstore.django import contentstore
 from xmodule.modulestore.django import modulestore
 from xmodule.partitions.partitions_service import PartitionService
 from xmodule.split_test_module import get_split_user_partitions
@@ -54,6 +61,43 @@ def _flatten(iterable):
     return list(chain.from_iterable(iterable))
 
 
+# The report context shared with forked grade report workers.  It is set in
+# the parent process immediately before the worker pool is created, so that
+# each child inherits the already loaded course and collected block structure
+# instead of fetching and unpickling them again.
+_SHARD_CONTEXT = None
+
+
+def _init_report_worker():
+    """
+    Initializer for grade report worker processes.  Closes the Mongo and cache
+    clients inherited from the parent process, so that each worker opens its
+    own connections on first use instead of sharing the parent's sockets.
+    """
+    modulestore().close_all_connections()
+    contentstore().close_connections()
+    for cache in caches.all():
+        cache.close()
+
+
+def _users_with_ids(user_ids):
+    """
+    Returns the users with the given ids, in the order of the given ids.
+    """
+    users_by_id = User.objects.filter(id__in=user_ids).select_related('profile__allow_certificate').in_bulk()
+    return [users_by_id[user_id] for user_id in user_ids if user_id in users_by_id]
+
+
+def _rows_for_user_ids(user_ids):
+    """
+    Entry point for a grade report worker process.  Returns the
+    (success_rows, error_rows) for the users with the given ids, in the
+    order of the given ids.
+    """
+    users = _users_with_ids(user_ids)
+    return CourseGradeReport()._rows_for_users(_SHARD_CONTEXT, users)  # pylint: disable=protected-access
+
+
 class _CourseGradeReportContext(object):
     """
     Internal class that provides a common context to use for a single grade
@@ -97,6 +141,24 @@ class _CourseGradeReportContext(object):
     def cohorts_enabled(self):
         return is_course_cohorted(self.course_id)
 
+    @lazy
+    def report_setting(self):
+        return GradeReportSetting.current()
+
+    @property
+    def num_workers(self):
+        """
+        Returns the number of worker processes to grade users with.
+        """
+        return self.report_setting.num_workers if self.report_setting.enabled else 1
+
+    @property
+    def batch_size(self):
+        """
+        Returns the number of users to grade per batch.
+        """
+        return self.report_setting.batch_size if self.report_setting.enabled else CourseGradeReport.USER_BATCH_SIZE
+
     @lazy
     def graded_assignments(self):
         """
@@ -242,9 +304,84 @@ class CourseGradeReport(object):
         """
         A generator of batches of (success_rows, error_rows) for this report.
         """
-        for users in self._batch_users(context):
-            users = filter(lambda u: u is not None, users)
-            yield self._rows_for_users(context, users)
+        if context.num_workers > 1:
+            for rows in self._sharded_batched_rows(context):
+                yield rows
+        else:
+            for users in self._batch_users(context):
+                users = filter(lambda u: u is not None, users)
+                yield self._rows_for_users(context, users)
+
+    def _sharded_batched_rows(self, context):
+        """
+        A generator of batches of (success_rows, error_rows) for this report,
+        where the batches are graded in parallel by a pool of worker processes.
+        Batches are yielded in the same order as the users were batched, so the
+        merged report is identical to one generated serially.  If the pool
+        can't be started, or a worker fails or doesn't return its batch within
+        GRADE_REPORT_WORKER_TIMEOUT seconds, the pool is stopped and the
+        remaining batches are graded in this process.
+        """
+        global _SHARD_CONTEXT  # pylint: disable=global-statement
+
+        # Load everything the workers share before forking, so the course and
+        # its collected block structure are fetched once for the whole report.
+        for shared_attribute in (
+            'course', 'course_structure', 'graded_assignments',
+            'course_experiments', 'teams_enabled', 'cohorts_enabled',
+        ):
+            getattr(context, shared_attribute)
+
+        batches = [
+            [user_id for user_id in user_ids if user_id is not None]
+            for user_ids in self._batch_user_ids(context)
+        ]
+        _SHARD_CONTEXT = context
+        pool = None
+        failed_batch = None
+        try:
+            try:
+                pool = self._worker_pool(context.num_workers)
+                results = pool.imap(_rows_for_user_ids, batches)
+            except Exception:  # pylint: disable=broad-except
+                TASK_LOG.exception(
+                    u'%s, Task type: %s, Grade report workers could not be started, grading all batches serially',
+                    context.task_info_string, context.action_name,
+                )
+                failed_batch = 0
+            else:
+                for batch_index in range(len(batches)):
+                    # A worker which dies loses its batch without an error, so
+                    # wait a limited time for each one rather than forever.
+                    try:
+                        rows = results.next(timeout=settings.GRADE_REPORT_WORKER_TIMEOUT)
+                    except Exception:  # pylint: disable=broad-except
+                        TASK_LOG.exception(
+                            u'%s, Task type: %s, Grade report worker failed on batch %d of %d, '
+                            u'grading the remaining batches serially',
+                            context.task_info_string, context.action_name, batch_index + 1, len(batches),
+                        )
+                        failed_batch = batch_index
+                        break
+                    yield rows
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+            _SHARD_CONTEXT = None
+
+        if failed_batch is not None:
+            for user_ids in batches[failed_batch:]:
+                yield self._rows_for_users(context, _users_with_ids(user_ids))
+
+    def _worker_pool(self, num_workers):
+        """
+        Returns a pool of forked worker processes for grading batches of users.
+        """
+        # Database connections must not be shared across a fork; the
+        # parent and each worker will reconnect lazily on their next query.
+        connections.close_all()
+        return multiprocessing.Pool(processes=num_workers, initializer=_init_report_worker)
 
     def _compile(self, context, batched_rows):
         """
@@ -285,17 +422,28 @@ class CourseGradeReport(object):
             grades_header.append(assignment_info['average_header'])
         return grades_header
 
+    def _grouper(self, context, iterable, fillvalue=None):
+        """
+        Groups the given iterable into chunks of the configured batch size.
+        """
+        args = [iter(iterable)] * context.batch_size
+        return izip_longest(*args, fillvalue=fillvalue)
+
     def _batch_users(self, context):
         """
         Returns a generator of batches of users.
         """
-        def grouper(iterable, chunk_size=self.USER_BATCH_SIZE, fillvalue=None):
-            args = [iter(iterable)] * chunk_size
-            return izip_longest(*args, fillvalue=fillvalue)
-
         users = CourseEnrollment.objects.users_enrolled_in(context.course_id, include_inactive=True)
         users = users.select_related('profile__allow_certificate')
-        return grouper(users)
+        return self._grouper(context, users)
+
+    def _batch_user_ids(self, context):
+        """
+        Returns a generator of batches of user ids, in the same order
+        as the users returned by _batch_users.
+        """
+        users = CourseEnrollment.objects.users_enrolled_in(context.course_id, include_inactive=True)
+        return self._grouper(context, users.values_list('id', flat=True))
 
     def _user_grade_results(self, course_grade, context):
         """
@@ -3,6 +3,9 @@ Instructor Tasks related to module state.
 """
 import json
 import logging
+from contextlib import contextmanager
+from functools import partial
+from itertools import islice
 from time import time
 
 from django.contrib.auth.models import User
@@ -11,6 +14,7 @@ from xblock.runtime import KvsFieldData
 
 import dogstats_wrapper as dog_stats_api
 from capa.responsetypes import LoncapaProblemError, ResponseError, StudentInputError
+from capa.safe_exec.batch import SafeExecBatch
 from courseware.courses import get_course_by_id, get_problems_in_section
 from courseware.model_data import DjangoKeyValueStore, FieldDataCache
 from courseware.models import StudentModule
@@ -36,8 +40,12 @@ TASK_LOG = logging.getLogger('edx.celery.task')
 GRADES_RESCORE_EVENT_TYPE = 'edx.grades.problem.rescored'
 GRADES_OVERRIDE_EVENT_TYPE = 'edx.grades.problem.score_overridden'
 
+# Maximum number of times the learners' rescoring is collected, for each batch of sandboxed executions
+RESCORE_BATCH_MAX_ROUNDS = 5
 
-def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, task_input, action_name):
+
+def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, task_input, action_name,
+                                prepare_fcn=None, chunk_size=1):
     """
     Performs generic update by visiting StudentModule instances with the update_fcn provided.
 
@@ -56,6 +64,10 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     the update is successful; False indicates the update on the particular student module failed.
     A raised exception indicates a fatal condition -- that no other student modules should be considered.
 
+    If a `prepare_fcn` is not None, the StudentModules are updated in chunks of `chunk_size`.  It is passed
+    the list of (module_descriptor, StudentModule) pairs of each chunk, and the task_input, and returns a
+    context manager within which the chunk's StudentModules are updated.
+
     The return value is a dict containing the task's results, with the following keys:
 
           'attempted': number of attempts made
@@ -116,27 +128,103 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     task_progress = TaskProgress(action_name, modules_to_update.count(), start_time)
     task_progress.update_task_state()
 
-    for module_to_update in modules_to_update:
-        task_progress.attempted += 1
-        module_descriptor = problems[unicode(module_to_update.module_state_key)]
-        # There is no try here:  if there's an error, we let it throw, and the task will
-        # be marked as FAILED, with a stack trace.
-        with dog_stats_api.timer('instructor_tasks.module.time.step', tags=[u'action:{name}'.format(name=action_name)]):
-            update_status = update_fcn(module_descriptor, module_to_update, task_input)
-            if update_status == UPDATE_STATUS_SUCCEEDED:
-                # If the update_fcn returns true, then it performed some kind of work.
-                # Logging of failures is left to the update_fcn itself.
-                task_progress.succeeded += 1
-            elif update_status == UPDATE_STATUS_FAILED:
-                task_progress.failed += 1
-            elif update_status == UPDATE_STATUS_SKIPPED:
-                task_progress.skipped += 1
-            else:
-                raise UpdateProblemModuleStateError("Unexpected update_status returned: {}".format(update_status))
+    modules_to_update = iter(modules_to_update)
+    while True:
+        chunk = [
+            (problems[unicode(module_to_update.module_state_key)], module_to_update)
+            for module_to_update in islice(modules_to_update, chunk_size if prepare_fcn is not None else 1)
+        ]
+        if not chunk:
+            break
+        with prepare_fcn(chunk, task_input) if prepare_fcn is not None else _no_preparation():
+            for module_descriptor, module_to_update in chunk:
+                task_progress.attempted += 1
+                # There is no try here:  if there's an error, we let it throw, and the task will
+                # be marked as FAILED, with a stack trace.
+                with dog_stats_api.timer(
+                    'instructor_tasks.module.time.step', tags=[u'action:{name}'.format(name=action_name)]
+                ):
+                    update_status = update_fcn(module_descriptor, module_to_update, task_input)
+                    if update_status == UPDATE_STATUS_SUCCEEDED:
+                        # If the update_fcn returns true, then it performed some kind of work.
+                        # Logging of failures is left to the update_fcn itself.
+                        task_progress.succeeded += 1
+                    elif update_status == UPDATE_STATUS_FAILED:
+                        task_progress.failed += 1
+                    elif update_status == UPDATE_STATUS_SKIPPED:
+                        task_progress.skipped += 1
+                    else:
+                        raise UpdateProblemModuleStateError(
+                            "Unexpected update_status returned: {}".format(update_status)
+                        )
 
     return task_progress.update_task_state()
 
 
+@contextmanager
+def _no_preparation():
+    """
+    The context of the StudentModules updated without a prepare_fcn.
+    """
+    yield
+
+
+def batch_rescore_executions(xmodule_instance_args, module_pairs, task_input):  # pylint: disable=unused-argument
+    """
+    Runs the sandboxed executions which rescoring the given (module_descriptor, StudentModule)
+    pairs needs in batches, rather than each in its own sandboxed process, and returns the
+    context manager within which rescoring them uses the results.
+
+    The executions are collected by calculating the learners' scores with a SafeExecBatch
+    collecting, which interrupts each calculation at its first execution without a result.
+    The batch then runs the executions it collected, and the interrupted calculations are
+    collected again, as their later executions may depend on the results of the earlier ones.
+    """
+    batch = SafeExecBatch()
+    waiting = list(module_pairs)
+    rounds = 0
+    while waiting and rounds < RESCORE_BATCH_MAX_ROUNDS:
+        rounds += 1
+        waiting = [
+            (module_descriptor, student_module)
+            for module_descriptor, student_module in waiting
+            if not batch.collect(
+                partial(_calculate_score_for_task, xmodule_instance_args, module_descriptor, student_module)
+            )
+        ]
+        batch.run_pending()
+    TASK_LOG.debug(
+        u"Ran the sandboxed executions of %d rescorings in %d rounds of batches", len(module_pairs), rounds
+    )
+    return batch.activate()
+
+
+def _calculate_score_for_task(xmodule_instance_args, module_descriptor, student_module):
+    """
+    Calculates the learner's score for the StudentModule from their current answers,
+    without saving it. Errors are left for rescoring to report.
+    """
+    course_id = student_module.course_id
+    try:
+        with modulestore().bulk_operations(course_id):
+            instance = _get_module_instance_for_task(
+                course_id,
+                student_module.student,
+                module_descriptor,
+                xmodule_instance_args,
+                grade_bucket_type='rescore',
+                course=get_course_by_id(course_id),
+            )
+            if isinstance(instance, ScorableXBlockMixin) and instance.has_submitted_answer():
+                instance.calculate_score()
+    except Exception:  # pylint: disable=broad-except
+        pass
+    finally:
+        # Unbind the descriptor, so that it constructs the module again the next time it is
+        # bound, even to the same learner, rather than reusing one which may be incomplete.
+        module_descriptor.scope_ids = module_descriptor.scope_ids._replace(user_id=None)
+
+
 @outer_atomic
 def rescore_problem_module_state(xmodule_instance_args, module_descriptor, student_module, task_input):
     '''
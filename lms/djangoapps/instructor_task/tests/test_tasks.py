@@ -11,11 +11,13 @@ from uuid import uuid4
 
 import ddt
 from celery.states import FAILURE, SUCCESS
+from django.test.utils import override_settings
 from django.utils.translation import ugettext_noop
 from mock import MagicMock, Mock, patch
 from nose.plugins.attrib import attr
 from opaque_keys.edx.locations import i4xEncoder
 
+from capa.safe_exec.batch import SafeExecBatch
 from courseware.models import StudentModule
 from courseware.tests.factories import StudentModuleFactory
 from lms.djangoapps.instructor_task.exceptions import UpdateProblemModuleStateError
@@ -447,6 +449,37 @@ class TestRescoreInstructorTask(TestInstructorTasks):
             action_name='rescored'
         )
 
+    @override_settings(RESCORE_SAFE_EXEC_BATCH_SIZE=4)
+    def test_rescoring_in_batches(self):
+        """
+        Tests rescoring the students in chunks, running the sandboxed executions of each chunk in batches.
+        """
+        mock_instance = MagicMock()
+        mock_instance.has_submitted_answer.return_value = True
+
+        num_students = 10
+        self._create_students_with_state(num_students)
+        task_entry = self._create_input_entry()
+        with patch(
+                'lms.djangoapps.instructor_task.tasks_helper.module_state.get_module_for_descriptor_internal'
+        ) as mock_get_module:
+            mock_get_module.return_value = mock_instance
+            with patch.object(SafeExecBatch, 'run_pending') as mock_run_pending:
+                self._run_task_with_mock_celery(rescore_problem, task_entry.id, task_entry.task_id)
+
+        # The students' rescoring needed no executions, so each chunk ran one empty batch.
+        self.assertEqual(mock_run_pending.call_count, 3)
+        self.assertEqual(mock_instance.rescore.call_count, num_students)
+        self.assert_task_output(
+            output=self.get_task_output(task_entry.id),
+            total=num_students,
+            attempted=num_students,
+            succeeded=num_students,
+            skipped=0,
+            failed=0,
+            action_name='rescored'
+        )
+
 
 @attr(shard=3)
 class TestResetAttemptsInstructorTask(TestInstructorTasks):
@@ -8,6 +8,7 @@ Unit tests for LMS instructor-initiated background tasks helper functions.
 
 """
 
+import multiprocessing
 import os
 import shutil
 import tempfile
@@ -33,6 +34,7 @@ from courseware.tests.factories import InstructorFactory
 from instructor_analytics.basic import UNAVAILABLE
 from lms.djangoapps.grades.models import PersistentCourseGrade
 from lms.djangoapps.grades.transformer import GradesTransformer
+from lms.djangoapps.instructor_task.config.models import GradeReportSetting
 from lms.djangoapps.instructor_task.tasks_helper.certs import generate_students_certificates
 from lms.djangoapps.instructor_task.tasks_helper.enrollments import (
     upload_enrollment_report,
@@ -45,7 +47,9 @@ from lms.djangoapps.instructor_task.tasks_helper.grades import (
     NOT_ENROLLED_IN_COURSE,
     CourseGradeReport,
     ProblemGradeReport,
-    ProblemResponses
+    ProblemResponses,
+    _init_report_worker,
+    _rows_for_user_ids
 )
 from lms.djangoapps.instructor_task.tasks_helper.misc import (
     cohort_students_and_upload,
@@ -394,7 +398,7 @@ class TestInstructorGradeReport(InstructorGradeReportTestCase):
 
         RequestCache.clear_request_cache()
 
-        expected_query_count = 41
+        expected_query_count = 42
         with patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task'):
             with check_mongo_calls(mongo_count):
                 with self.assertNumQueries(expected_query_count):
@@ -422,6 +426,102 @@ class TestInstructorGradeReport(InstructorGradeReportTestCase):
             {'attempted': expected_students, 'succeeded': expected_students, 'failed': 0}, result
         )
 
+    @patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task')
+    def test_sharded_grading(self, _mock_current_task):
+        """
+        Test that a report graded in parallel batches by worker processes
+        contains the same rows, in the same order, as one graded serially.
+        """
+        for i in range(5):
+            self.create_student('student{0}'.format(i), 'student{0}@example.com'.format(i))
+
+        serial_rows = self._report_rows()
+
+        GradeReportSetting.objects.create(enabled=True, batch_size=2, num_workers=3)
+        with patch.object(multiprocessing, 'Pool', wraps=multiprocessing.Pool) as mock_pool:
+            with patch('lms.djangoapps.instructor_task.tasks_helper.grades.TASK_LOG') as mock_log:
+                with self._patch_serial_grading() as mock_serial_grading:
+                    sharded_rows = self._report_rows()
+        mock_pool.assert_called_once_with(processes=3, initializer=_init_report_worker)
+        # Every batch was graded by a worker, none by the serial fallback.
+        self.assertFalse(mock_log.exception.called)
+        self.assertFalse(mock_serial_grading.called)
+        self.assertEqual(len(sharded_rows), 5)
+        self.assertEqual(sharded_rows, serial_rows)
+
+    @override_settings(GRADE_REPORT_WORKER_TIMEOUT=3)
+    @patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task')
+    def test_sharded_grading_worker_dies(self, _mock_current_task):
+        """
+        Test that a batch lost by a worker process which dies is graded
+        serially once the worker timeout expires.
+        """
+        for i in range(5):
+            self.create_student('student{0}'.format(i), 'student{0}@example.com'.format(i))
+
+        serial_rows = self._report_rows()
+
+        GradeReportSetting.objects.create(enabled=True, batch_size=2, num_workers=3)
+        with patch(
+            'lms.djangoapps.instructor_task.tasks_helper.grades._rows_for_user_ids', _rows_or_die_for_user_ids
+        ):
+            with patch('lms.djangoapps.instructor_task.tasks_helper.grades.TASK_LOG') as mock_log:
+                with self._patch_serial_grading() as mock_serial_grading:
+                    sharded_rows = self._report_rows()
+        # The first two batches were graded by workers, and only the last
+        # one, whose worker died, by the serial fallback.
+        self.assertEqual(mock_log.exception.call_count, 1)
+        self.assertEqual(mock_log.exception.call_args[0][3:], (3, 3))
+        self.assertEqual(mock_serial_grading.call_count, 1)
+        self.assertEqual(sharded_rows, serial_rows)
+
+    @patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task')
+    def test_sharded_grading_pool_fails(self, _mock_current_task):
+        """
+        Test that a report is graded serially when its worker pool can't be started.
+        """
+        for i in range(5):
+            self.create_student('student{0}'.format(i), 'student{0}@example.com'.format(i))
+
+        serial_rows = self._report_rows()
+
+        GradeReportSetting.objects.create(enabled=True, batch_size=2, num_workers=3)
+        with patch.object(multiprocessing, 'Pool', side_effect=OSError):
+            with patch('lms.djangoapps.instructor_task.tasks_helper.grades.TASK_LOG') as mock_log:
+                with self._patch_serial_grading() as mock_serial_grading:
+                    sharded_rows = self._report_rows()
+        self.assertEqual(mock_log.exception.call_count, 1)
+        self.assertEqual(mock_serial_grading.call_count, 3)
+        self.assertEqual(sharded_rows, serial_rows)
+
+    def _patch_serial_grading(self):
+        """
+        Patches the grading of batches of users so that the batches graded in
+        this process, rather than by forked workers, can be counted.
+        """
+        return patch.object(
+            CourseGradeReport, '_rows_for_users', autospec=True, side_effect=CourseGradeReport._rows_for_users
+        )
+
+    def _report_rows(self):
+        """
+        Generates a grade report and returns its successfully graded rows.
+        """
+        with patch.object(CourseGradeReport, '_upload') as mock_upload:
+            CourseGradeReport.generate(None, None, self.course.id, None, 'graded')
+        _context, _success_headers, success_rows, _error_headers, _error_rows = mock_upload.call_args[0]
+        return success_rows
+
+
+def _rows_or_die_for_user_ids(user_ids):
+    """
+    Grade report worker entry point which kills its worker process,
+    without returning, when given a batch of a single user.
+    """
+    if len(user_ids) == 1:
+        os._exit(1)  # pylint: disable=protected-access
+    return _rows_for_user_ids(user_ids)
+
 
 class TestTeamGradeReport(InstructorGradeReportTestCase):
     """ Test that teams appear correctly in the grade report when it is enabled for the course. """
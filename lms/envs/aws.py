@@ -380,6 +380,8 @@ for name, value in ENV_TOKENS.get("CODE_JAIL", {}).items():
         CODE_JAIL[name] = value
 
 COURSES_WITH_UNSAFE_CODE = ENV_TOKENS.get("COURSES_WITH_UNSAFE_CODE", [])
+RESCORE_SAFE_EXEC_BATCH_SIZE = ENV_TOKENS.get('RESCORE_SAFE_EXEC_BATCH_SIZE', RESCORE_SAFE_EXEC_BATCH_SIZE)
+CAPA_TEMPLATE_CACHE_SIZE = ENV_TOKENS.get('CAPA_TEMPLATE_CACHE_SIZE', CAPA_TEMPLATE_CACHE_SIZE)
 
 ASSET_IGNORE_REGEX = ENV_TOKENS.get('ASSET_IGNORE_REGEX', ASSET_IGNORE_REGEX)
 
@@ -503,6 +505,13 @@ MODULESTORE_FIELD_OVERRIDE_PROVIDERS = ENV_TOKENS.get(
     MODULESTORE_FIELD_OVERRIDE_PROVIDERS
 )
 
+COURSE_STRUCTURE_PROCESS_CACHE_MAX_BLOCKS = ENV_TOKENS.get(
+    'COURSE_STRUCTURE_PROCESS_CACHE_MAX_BLOCKS',
+    COURSE_STRUCTURE_PROCESS_CACHE_MAX_BLOCKS
+)
+
+MODULESTORE_QUERY_STATS = ENV_TOKENS.get('MODULESTORE_QUERY_STATS', MODULESTORE_QUERY_STATS)
+
 XBLOCK_FIELD_DATA_WRAPPERS = ENV_TOKENS.get(
     'XBLOCK_FIELD_DATA_WRAPPERS',
     XBLOCK_FIELD_DATA_WRAPPERS
@@ -641,6 +650,7 @@ DISABLE_ACCOUNT_ACTIVATION_REQUIREMENT_SWITCH = ENV_TOKENS.get(
 GRADES_DOWNLOAD_ROUTING_KEY = ENV_TOKENS.get('GRADES_DOWNLOAD_ROUTING_KEY', HIGH_MEM_QUEUE)
 
 GRADES_DOWNLOAD = ENV_TOKENS.get("GRADES_DOWNLOAD", GRADES_DOWNLOAD)
+GRADE_REPORT_WORKER_TIMEOUT = ENV_TOKENS.get('GRADE_REPORT_WORKER_TIMEOUT', GRADE_REPORT_WORKER_TIMEOUT)
 
 # financial reports
 FINANCIAL_REPORTS = ENV_TOKENS.get("FINANCIAL_REPORTS", FINANCIAL_REPORTS)
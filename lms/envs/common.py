@@ -804,6 +804,7 @@ MODULESTORE = {
                         'default_class': 'xmodule.hidden_module.HiddenDescriptor',
                         'fs_root': DATA_DIR,
                         'render_template': 'edxmako.shortcuts.render_to_string',
+                        'prefetch_definitions': True,
                     }
                 },
                 {
@@ -821,6 +822,15 @@ MODULESTORE = {
     }
 }
 
+# Upper bound on the total number of blocks of the split modulestore structures which
+# each process keeps decoded in memory, in front of the course_structure_cache. 0 turns
+# off this in-process cache.
+COURSE_STRUCTURE_PROCESS_CACHE_MAX_BLOCKS = 100000
+
+# Whether to count the modulestores' round trips to Mongo, the bytes they read and the
+# time spent decoding them, per request and per course, in the request cache.
+MODULESTORE_QUERY_STATS = False
+
 #################### Python sandbox ############################################
 
 CODE_JAIL = {
@@ -834,6 +844,20 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # Pool of warm sandboxed Python processes, which have imported numpy, scipy and the
+    # other modules assumed by problems, to execute problems' code in.
+    'pool': {
+        # How many processes does each server process keep?  0 starts a new sandboxed
+        # process for each execution.
+        'size': 0,
+        # How many executions does a process run before it is replaced?  Executions in
+        # the same process could affect each other.
+        'max_executions': 1,
+        # How many executions can wait for a process to be free, and for how many seconds?
+        'max_waiting': 16,
+        'wait_timeout': 10,
+    },
 }
 
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
@@ -846,6 +870,15 @@ CODE_JAIL = {
 #   ]
 COURSES_WITH_UNSAFE_CODE = []
 
+# Number of learners whose answers a rescoring task rescores together, executing the problem's
+# sandboxed code for all of them in one sandboxed process, rather than one process per execution.
+# The executions of a batch are less isolated from each other.  1 turns batching off.
+RESCORE_SAFE_EXEC_BATCH_SIZE = 1
+
+# Number of capa problem templates, parsed problem trees and the contexts which their scripts
+# compute for a seed, which each process keeps to build problems from.  0 turns this cache off.
+CAPA_TEMPLATE_CACHE_SIZE = 0
+
 ############################### DJANGO BUILT-INS ###############################
 # Change DEBUG in your environment settings files, not here
 DEBUG = False
@@ -1875,6 +1908,12 @@ BLOCK_STRUCTURES_SETTINGS = dict(
     # Maximum number of retries per task.
     TASK_MAX_RETRIES=5,
 
+    # Upper bound on the total number of blocks of the collected block
+    # structures each process keeps in memory when the
+    # block_structure.in_process_cache switch is enabled.  Each deserialized
+    # block takes several kilobytes.
+    IN_PROCESS_CACHE_MAX_BLOCKS=20000,
+
     # Backend storage
     # STORAGE_CLASS='storages.backends.s3boto.S3BotoStorage',
     # STORAGE_KWARGS=dict(bucket='nim-beryl-test'),
@@ -2553,6 +2592,10 @@ GRADES_DOWNLOAD = {
     'ROOT_PATH': '/tmp/edx-s3/grades',
 }
 
+# Seconds that a grade report graded by several worker processes waits for each
+# batch of learners before it grades the remaining batches itself.
+GRADE_REPORT_WORKER_TIMEOUT = 10 * 60
+
 FINANCIAL_REPORTS = {
     'STORAGE_TYPE': 'localfs',
     'BUCKET': 'edx-financial-reports',
@@ -237,6 +237,9 @@ CACHES = {
     },
 }
 
+# Don't keep decoded structures between tests, like the dummy course_structure_cache
+COURSE_STRUCTURE_PROCESS_CACHE_MAX_BLOCKS = 0
+
 # Dummy secret key for dev
 SECRET_KEY = '85920908f28904ed733fe576320db18cabd7b6cd'
 
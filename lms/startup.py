@@ -19,6 +19,8 @@ from openedx.core.djangoapps.monkey_patch import django_db_models_options
 
 import xmodule.x_module
 import lms_xblock.runtime
+from capa import template_cache
+from capa.safe_exec import sandbox_pool
 
 from startup_configurations.validate_config import validate_lms_config
 from openedx.core.djangoapps.theming.core import enable_theming
@@ -86,6 +88,12 @@ def run():
     xmodule.x_module.descriptor_global_handler_url = lms_xblock.runtime.handler_url
     xmodule.x_module.descriptor_global_local_resource_url = lms_xblock.runtime.local_resource_url
 
+    # Configure the pool of sandboxed processes for the code of capa problems.
+    sandbox_pool.configure(**settings.CODE_JAIL.get('pool', {}))
+
+    # Size the cache of the templates which capa problems are built from.
+    template_cache.configure(size=settings.CAPA_TEMPLATE_CACHE_SIZE)
+
     # Set the version of docs that help-tokens will go to.
     settings.HELP_TOKENS_LANGUAGE_CODE = settings.LANGUAGE_CODE
     settings.HELP_TOKENS_VERSION = doc_version()
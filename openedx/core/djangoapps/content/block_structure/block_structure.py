@@ -8,8 +8,9 @@ The following internal data structures are implemented:
     _BlockRelations - Data structure for a single block's relations.
     _BlockData - Data structure for a single block's data.
 """
-from copy import deepcopy
+from copy import copy, deepcopy
 from functools import partial
+from itertools import chain
 from logging import getLogger
 
 from openedx.core.lib.graph_traversals import traverse_topologically, traverse_post_order
@@ -39,6 +40,15 @@ class _BlockRelations(object):
         # list [UsageKey]
         self.children = []
 
+    def copy(self):
+        """
+        Returns a new instance with copies of this instance's lists.
+        """
+        relations = _BlockRelations.__new__(_BlockRelations)
+        relations.parents = list(self.parents)
+        relations.children = list(self.children)
+        return relations
+
 
 class BlockStructure(object):
     """
@@ -62,6 +72,14 @@ class BlockStructure(object):
         # dict {UsageKey: _BlockRelations}
         self._block_relations = {}
 
+        # For a copy-on-write copy, the structure it was copied from,
+        # and the ids of the _BlockRelations and BlockData objects it
+        # still shares with that structure.  A shared object is
+        # replaced by a copy before it is modified.
+        # BlockStructure, frozenset {int}
+        self._copied_from = None
+        self._shared_object_ids = frozenset()
+
         # Add the root block.
         self._add_block(self._block_relations, root_block_usage_key)
 
@@ -120,7 +138,7 @@ class BlockStructure(object):
                 new root of the block structure.
         """
         self.root_block_usage_key = usage_key
-        self._block_relations[usage_key].parents = []
+        self._get_relations_for_update(usage_key).parents = []
 
     def __contains__(self, usage_key):
         """
@@ -237,8 +255,23 @@ class BlockStructure(object):
             parent_key (UsageKey) - Usage key of the parent block.
             child_key (UsageKey) - Usage key of the child block.
         """
+        if self._shared_object_ids:
+            for usage_key in (parent_key, child_key):
+                if usage_key in self._block_relations:
+                    self._get_relations_for_update(usage_key)
         self._add_to_relations(self._block_relations, parent_key, child_key)
 
+    def _get_relations_for_update(self, usage_key):
+        """
+        Returns the _BlockRelations of the given block, first replacing
+        them with a copy if they are shared with the structure this one
+        was copied from.
+        """
+        relations = self._block_relations[usage_key]
+        if id(relations) in self._shared_object_ids:
+            relations = self._block_relations[usage_key] = relations.copy()
+        return relations
+
     @staticmethod
     def _add_to_relations(block_relations, parent_key, child_key):
         """
@@ -294,6 +327,22 @@ class FieldData(object):
         # dict {string: any picklable type}
         self.fields = {}
 
+    def __copy__(self):
+        """
+        Returns a copy that has its own fields, but shares their values.
+        """
+        copied = self.__class__.__new__(self.__class__)
+        copied.__dict__.update(self.__dict__)
+        self._copy_fields_to(copied)
+        return copied
+
+    def _copy_fields_to(self, copied):
+        """
+        Gives the given copy of this instance its own copy of the fields
+        dict.  Can be overridden by subclasses that store fields elsewhere.
+        """
+        copied.__dict__['fields'] = dict(self.fields)
+
     def __getattr__(self, field_name):
         if self._is_own_field(field_name):
             return super(FieldData, self).__getattr__(field_name)
@@ -312,7 +361,10 @@ class FieldData(object):
         if self._is_own_field(field_name):
             return super(FieldData, self).__delattr__(field_name)
         else:
-            delattr(self.fields, field_name)
+            try:
+                del self.fields[field_name]
+            except KeyError:
+                raise AttributeError("Field {0} does not exist".format(field_name))
 
     def _is_own_field(self, field_name):
         """
@@ -391,6 +443,18 @@ class BlockData(FieldData):
         # Map of transformer name to its block-specific data.
         self.transformer_data = TransformerDataMap()
 
+    def __copy__(self):
+        """
+        Returns a copy that has its own fields and transformer data,
+        but shares their values.
+        """
+        copied = super(BlockData, self).__copy__()
+        copied.__dict__['transformer_data'] = TransformerDataMap(
+            (transformer_name, copy(transformer_data))
+            for transformer_name, transformer_data in self.transformer_data.iteritems()
+        )
+        return copied
+
 
 class BlockStructureBlockData(BlockStructure):
     """
@@ -427,6 +491,32 @@ class BlockStructureBlockData(BlockStructure):
             deepcopy(self._block_data_map),
         )
 
+    def copy_on_write(self):
+        """
+        Returns a new instance of BlockStructureBlockData that shares
+        this instance's block relations and block data, copying each
+        block's relations and data only when the copy first modifies them.
+
+        Unlike copy, the time taken does not depend on the amount of
+        data collected for each block.  However, the values of the fields
+        are shared, so the copy must set new values rather than modify
+        values in place, and this instance must not be modified afterwards.
+        """
+        from .factory import BlockStructureFactory
+        block_structure = BlockStructureFactory.create_new(
+            self.root_block_usage_key,
+            # Copying the dicts reuses the hashes of their keys.
+            self._block_relations.copy(),
+            deepcopy(self.transformer_data),
+            self._block_data_map.copy(),
+        )
+        block_structure._copied_from = self  # pylint: disable=protected-access
+        block_structure._shared_object_ids = frozenset(  # pylint: disable=protected-access
+            id(shared_object)
+            for shared_object in chain(self._block_relations.itervalues(), self._block_data_map.itervalues())
+        )
+        return block_structure
+
     def iteritems(self):
         """
         Returns iterator of (UsageKey, BlockData) pairs for all
@@ -578,9 +668,12 @@ class BlockStructureBlockData(BlockStructure):
         """
         try:
             transformer_block_data = self.get_transformer_block_data(usage_key, transformer)
-            delattr(transformer_block_data, key)
-        except (AttributeError, KeyError):
-            pass
+        except KeyError:
+            return
+        if hasattr(transformer_block_data, key):
+            # The block's data may be shared with the structure this one
+            # was copied from, so delete the field from its own copy.
+            delattr(self._get_or_create_block(usage_key).transformer_data[transformer], key)
 
     def remove_block(self, usage_key, keep_descendants):
         """
@@ -607,11 +700,11 @@ class BlockStructureBlockData(BlockStructure):
 
         # Remove block from its children.
         for child in children:
-            self._block_relations[child].parents.remove(usage_key)
+            self._get_relations_for_update(child).parents.remove(usage_key)
 
         # Remove block from its parents.
         for parent in parents:
-            self._block_relations[parent].children.remove(usage_key)
+            self._get_relations_for_update(parent).children.remove(usage_key)
 
         # Remove block.
         self._block_relations.pop(usage_key, None)
@@ -736,16 +829,19 @@ class BlockStructureBlockData(BlockStructure):
 
     def _get_or_create_block(self, usage_key):
         """
-        Returns the BlockData associated with the given usage_key.
-        If not found, creates and returns a new BlockData and
-        maps it to the given key.
+        Returns the BlockData associated with the given usage_key,
+        for update.  If not found, creates and returns a new BlockData
+        and maps it to the given key.
         """
         try:
-            return self._block_data_map[usage_key]
+            block_data = self._block_data_map[usage_key]
         except KeyError:
             block_data = BlockData(usage_key)
             self._block_data_map[usage_key] = block_data
             return block_data
+        if id(block_data) in self._shared_object_ids:
+            block_data = self._block_data_map[usage_key] = copy(block_data)
+        return block_data
 
 
 class BlockStructureModulestoreData(BlockStructureBlockData):
@@ -0,0 +1,722 @@
+"""
+Compact, array-backed representation of collected block structures.
+
+BlockStructureBlockData keeps a _BlockRelations object with its own parents
+and children lists, and a BlockData object with its own fields dict and
+TransformerDataMap, for every block.  CompactBlockStructure instead:
+    - maps each usage key to an integer index,
+    - keeps the parents and children of all blocks as indices in compressed
+      sparse row (CSR) arrays, replacing a block's list only once it is
+      modified,
+    - keeps each xBlock field, and each field of each transformer's block
+      data, as a column of values by block index.
+
+It supports the same methods as BlockStructureBlockData.  Traversals run on
+block indices rather than usage keys, which are expensive to hash, and
+copy_on_write copies only the per-block flags, sharing the arrays and
+columns until they are modified.
+
+BlockData objects are not kept.  Indexing the structure, or iterating its
+items, returns lightweight views of a block's fields in the columns.
+"""
+# pylint: disable=protected-access
+from array import array
+from copy import deepcopy
+from itertools import chain
+
+from openedx.core.lib.graph_traversals import traverse_post_order, traverse_topologically
+
+from .block_structure import BlockData, BlockStructureBlockData, TransformerData, TransformerDataMap, _BlockRelations
+
+
+# Value of a column for blocks without a value for the column's field.
+_MISSING = object()
+
+# Group of the columns of xBlock fields.  The columns of transformers'
+# block data are grouped by transformer name.
+_XBLOCK_FIELDS_GROUP = None
+
+
+def _transformer_name(transformer):
+    """
+    Returns the name of the given transformer, which may be given as
+    its class or its name.
+    """
+    try:
+        return transformer.name()
+    except AttributeError:
+        return transformer
+
+
+class _Adjacency(object):
+    """
+    The lists of neighbors, by index, of all blocks of a structure.
+
+    The lists are kept in CSR arrays, except for the lists of blocks that
+    were modified, which are replaced by new lists in _overrides.  Lists
+    in _overrides are never modified in place, so copies can share them.
+    """
+    __slots__ = ('_offsets', '_targets', '_overrides')
+
+    def __init__(self, index_lists):
+        self._offsets = array('l', [0])
+        self._targets = array('l')
+        for indices in index_lists:
+            self._targets.extend(indices)
+            self._offsets.append(len(self._targets))
+        self._overrides = {}
+
+    def get(self, index):
+        """
+        Returns the list of neighbors of the given block.
+        """
+        indices = self._overrides.get(index)
+        if indices is None:
+            indices = self._targets[self._offsets[index]:self._offsets[index + 1]].tolist()
+        return indices
+
+    def set(self, index, indices):
+        """
+        Replaces the list of neighbors of the given block.
+        """
+        self._overrides[index] = indices
+
+    def copy(self):
+        """
+        Returns a copy that shares the CSR arrays with this instance.
+        """
+        copied = _Adjacency.__new__(_Adjacency)
+        copied._offsets = self._offsets
+        copied._targets = self._targets
+        copied._overrides = dict(self._overrides)
+        return copied
+
+
+class CompactBlockStructure(BlockStructureBlockData):  # pylint: disable=abstract-method
+    """
+    Subclass of BlockStructureBlockData that keeps block relations in CSR
+    arrays and block data in columns.  Create instances with create_from.
+    """
+    def __init__(self, root_block_usage_key):  # pylint: disable=super-init-not-called
+        self.root_block_usage_key = root_block_usage_key
+        self.transformer_data = TransformerDataMap()
+        self._copied_from = None
+        self._shared_object_ids = frozenset()
+
+        # Usage keys by block index, and block index by usage key.
+        # list [UsageKey], dict {UsageKey: int}
+        self._keys = [root_block_usage_key]
+        self._indices = {root_block_usage_key: 0}
+
+        # Whether each block is in the structure's relations, and whether
+        # it has block data.
+        # bytearray
+        self._in_relations = bytearray([1])
+        self._has_data = bytearray([0])
+        self._num_blocks = 1
+
+        # _Adjacency
+        self._children = _Adjacency([[]])
+        self._parents = _Adjacency([[]])
+
+        # Columns of xBlock fields by field name, and of each transformer's
+        # block data by transformer name and field name.
+        # dict {string: list}, dict {string: dict {string: list}}
+        self._columns = {}
+        self._transformer_columns = {}
+
+        # Whether each block has block data for each transformer.
+        # dict {string: bytearray}
+        self._transformer_blocks = {}
+
+        # The ids of the columns shared with the structure this one was
+        # copied from.  A shared column is replaced by a copy before it is
+        # modified.
+        # frozenset {int}
+        self._shared_column_ids = frozenset()
+
+    @classmethod
+    def create_from(cls, block_structure):
+        """
+        Returns a CompactBlockStructure with the relations and data of the
+        given BlockStructureBlockData, sharing the values of its fields.
+        """
+        block_relations = block_structure._block_relations
+        block_data_map = block_structure._block_data_map
+
+        keys = block_relations.keys()
+        keys.extend(usage_key for usage_key in block_data_map if usage_key not in block_relations)
+        indices = {usage_key: index for index, usage_key in enumerate(keys)}
+
+        # Usage keys compute their hash on each call, so neighbors are first
+        # looked up by identity, which matches for keys restored by a pickle.
+        indices_by_id = {id(usage_key): index for index, usage_key in enumerate(keys)}
+
+        def _indices_of(usage_keys):
+            """
+            Returns the indices of the given usage keys.
+            """
+            return [
+                indices_by_id[id(usage_key)] if id(usage_key) in indices_by_id else indices[usage_key]
+                for usage_key in usage_keys
+            ]
+
+        num_keys = len(keys)
+        compact = cls(block_structure.root_block_usage_key)
+        compact.transformer_data = deepcopy(block_structure.transformer_data)
+        compact._keys = keys
+        compact._indices = indices
+        compact._in_relations = bytearray([1]) * len(block_relations) + bytearray(num_keys - len(block_relations))
+        compact._has_data = bytearray(num_keys)
+        compact._num_blocks = len(block_relations)
+
+        relations = block_relations.values()
+        compact._children = _Adjacency(_indices_of(relation.children) for relation in relations)
+        compact._parents = _Adjacency(_indices_of(relation.parents) for relation in relations)
+        for index in xrange(len(block_relations), num_keys):
+            compact._children.set(index, [])
+            compact._parents.set(index, [])
+
+        for usage_key, block_data in block_data_map.iteritems():
+            index = indices_by_id.get(id(usage_key))
+            if index is None:
+                index = indices[usage_key]
+            compact._has_data[index] = 1
+            _add_to_columns(compact._columns, index, block_data.fields, num_keys)
+            for transformer_name, transformer_data in block_data.transformer_data.iteritems():
+                if transformer_name not in compact._transformer_blocks:
+                    compact._transformer_blocks[transformer_name] = bytearray(num_keys)
+                    compact._transformer_columns[transformer_name] = {}
+                compact._transformer_blocks[transformer_name][index] = 1
+                _add_to_columns(
+                    compact._transformer_columns[transformer_name], index, transformer_data.fields, num_keys,
+                )
+        return compact
+
+    def copy(self):
+        """
+        Returns a new instance of CompactBlockStructure with a deep-copy
+        of this instance's contents.
+        """
+        copied = self._copy_flags()
+        memo = {id(_MISSING): _MISSING}
+        copied._columns = deepcopy(self._columns, memo)
+        copied._transformer_columns = deepcopy(self._transformer_columns, memo)
+        return copied
+
+    def copy_on_write(self):
+        """
+        Returns a new instance of CompactBlockStructure that shares this
+        instance's relation arrays and columns, copying a column only when
+        the copy first modifies it.
+
+        As with BlockStructureBlockData.copy_on_write, the copy must set new
+        values rather than modify values in place, and this instance must
+        not be modified afterwards.
+        """
+        copied = self._copy_flags()
+        copied._columns = dict(self._columns)
+        copied._transformer_columns = {
+            transformer_name: dict(columns)
+            for transformer_name, columns in self._transformer_columns.iteritems()
+        }
+        copied._copied_from = self
+        copied._shared_column_ids = frozenset(id(column) for column in self._all_columns())
+        return copied
+
+    def _copy_flags(self):
+        """
+        Returns a new instance with copies of this instance's relations and
+        flags, sharing its usage keys, but without any columns.
+        """
+        copied = CompactBlockStructure.__new__(CompactBlockStructure)
+        copied.__dict__.update(self.__dict__)
+        copied.transformer_data = deepcopy(self.transformer_data)
+        copied._in_relations = bytearray(self._in_relations)
+        copied._has_data = bytearray(self._has_data)
+        copied._children = self._children.copy()
+        copied._parents = self._parents.copy()
+        copied._transformer_blocks = {
+            transformer_name: bytearray(flags)
+            for transformer_name, flags in self._transformer_blocks.iteritems()
+        }
+        copied._copied_from = None
+        copied._shared_column_ids = frozenset()
+        return copied
+
+    #--- Block structure relation methods ---#
+
+    def __len__(self):
+        return self._num_blocks
+
+    def __contains__(self, usage_key):
+        index = self._indices.get(usage_key)
+        return index is not None and bool(self._in_relations[index])
+
+    def get_block_keys(self):
+        keys = self._keys
+        in_relations = self._in_relations
+        return (keys[index] for index in xrange(len(keys)) if in_relations[index])
+
+    def get_parents(self, usage_key):
+        index = self._indices.get(usage_key)
+        return self._keys_of(self._parent_indices(index)) if index is not None else []
+
+    def get_children(self, usage_key):
+        index = self._indices.get(usage_key)
+        return self._keys_of(self._child_indices(index)) if index is not None else []
+
+    def set_root_block(self, usage_key):
+        index = self._indices[usage_key]
+        self.root_block_usage_key = usage_key
+        self._parents.set(index, [])
+
+    #--- Block structure traversal methods ---#
+
+    def topological_traversal(
+            self,
+            filter_func=None,
+            yield_descendants_of_unyielded=False,
+            start_node=None,
+    ):
+        keys = self._keys
+        return (
+            keys[index]
+            for index in traverse_topologically(
+                start_node=self._indices[start_node or self.root_block_usage_key],
+                get_parents=self._parent_indices,
+                get_children=self._child_indices,
+                filter_func=self._index_filter(filter_func),
+                yield_descendants_of_unyielded=yield_descendants_of_unyielded,
+            )
+        )
+
+    def post_order_traversal(
+            self,
+            filter_func=None,
+            start_node=None,
+    ):
+        keys = self._keys
+        return (
+            keys[index]
+            for index in traverse_post_order(
+                start_node=self._indices[start_node or self.root_block_usage_key],
+                get_children=self._child_indices,
+                filter_func=self._index_filter(filter_func),
+            )
+        )
+
+    #--- Block data methods ---#
+
+    def iteritems(self):
+        keys = self._keys
+        has_data = self._has_data
+        return (
+            (keys[index], _CompactBlockData(self, index))
+            for index in xrange(len(keys)) if has_data[index]
+        )
+
+    def itervalues(self):
+        return (block_data for _, block_data in self.iteritems())
+
+    def __getitem__(self, usage_key):
+        index = self._indices[usage_key]
+        if not self._has_data[index]:
+            raise KeyError(usage_key)
+        return _CompactBlockData(self, index)
+
+    def get_xblock_field(self, usage_key, field_name, default=None):
+        index = self._indices.get(usage_key)
+        if index is None or not self._has_data[index]:
+            return default
+        return self._get_field(_XBLOCK_FIELDS_GROUP, index, field_name, default)
+
+    def get_transformer_block_data(self, usage_key, transformer):
+        return self[usage_key].transformer_data[transformer]
+
+    def get_transformer_block_field(self, usage_key, transformer, key, default=None):
+        index = self._indices.get(usage_key)
+        if index is None or not self._has_data[index]:
+            return default
+        return self._get_field(_transformer_name(transformer), index, key, default)
+
+    def set_transformer_block_field(self, usage_key, transformer, key, value):
+        index = self._index_for_update(usage_key, in_relations=False)
+        self._set_field(_transformer_name(transformer), index, key, value)
+
+    def remove_block(self, usage_key, keep_descendants):
+        index = self._indices[usage_key]
+        if not self._in_relations[index]:
+            raise KeyError(usage_key)
+        children = self._child_indices(index)
+        parents = self._parent_indices(index)
+
+        # Remove block from its children.
+        for child in children:
+            self._parents.set(child, _without(self._parents.get(child), index))
+
+        # Remove block from its parents.
+        for parent in parents:
+            self._children.set(parent, _without(self._children.get(parent), index))
+
+        # Remove block.
+        self._children.set(index, [])
+        self._parents.set(index, [])
+        self._in_relations[index] = 0
+        self._has_data[index] = 0
+        self._num_blocks -= 1
+
+        # Recreate the graph connections if descendants are to be kept.
+        if keep_descendants:
+            for child in children:
+                for parent in parents:
+                    self._add_relation_by_index(parent, child)
+
+    #--- Internal methods ---#
+
+    @property
+    def _block_relations(self):
+        """
+        Returns the relations of this structure, as kept by
+        BlockStructureBlockData.  Used for serialization.
+        """
+        return {
+            self._keys[index]: self._relations_of(index)
+            for index in xrange(len(self._keys)) if self._in_relations[index]
+        }
+
+    @property
+    def _block_data_map(self):
+        """
+        Returns the block data of this structure, as kept by
+        BlockStructureBlockData.  Used for serialization.
+        """
+        block_data_map = {}
+        for usage_key, compact_block_data in self.iteritems():
+            block_data = BlockData(usage_key)
+            block_data.fields = compact_block_data.fields
+            for transformer_name, compact_transformer_data in compact_block_data.transformer_data.iteritems():
+                block_data.transformer_data[transformer_name] = TransformerData()
+                block_data.transformer_data[transformer_name].fields = compact_transformer_data.fields
+            block_data_map[usage_key] = block_data
+        return block_data_map
+
+    def _prune_unreachable(self):
+        reachable = bytearray(len(self._keys))
+        root_index = self._indices[self.root_block_usage_key]
+        for index in traverse_post_order(start_node=root_index, get_children=self._child_indices):
+            reachable[index] = 1
+
+        for index in xrange(len(self._keys)):
+            if not self._in_relations[index]:
+                continue
+            if not reachable[index]:
+                self._in_relations[index] = 0
+                self._num_blocks -= 1
+                self._children.set(index, [])
+                self._parents.set(index, [])
+            else:
+                parents = self._parents.get(index)
+                if not all(reachable[parent] for parent in parents):
+                    self._parents.set(index, [parent for parent in parents if reachable[parent]])
+
+    def _add_relation(self, parent_key, child_key):
+        self._add_relation_by_index(self._index_for_update(parent_key), self._index_for_update(child_key))
+
+    def _get_or_create_block(self, usage_key):
+        return _CompactBlockData(self, self._index_for_update(usage_key, in_relations=False))
+
+    def _add_relation_by_index(self, parent, child):
+        """
+        Adds a parent to child relationship between the given blocks.
+        """
+        self._parents.set(child, self._parents.get(child) + [parent])
+        self._children.set(parent, self._children.get(parent) + [child])
+
+    def _child_indices(self, index):
+        """
+        Returns the indices of the children of the given block.
+        """
+        return self._children.get(index) if self._in_relations[index] else []
+
+    def _parent_indices(self, index):
+        """
+        Returns the indices of the parents of the given block.
+        """
+        return self._parents.get(index) if self._in_relations[index] else []
+
+    def _keys_of(self, indices):
+        """
+        Returns the usage keys of the given block indices.
+        """
+        keys = self._keys
+        return [keys[index] for index in indices]
+
+    def _relations_of(self, index):
+        """
+        Returns the _BlockRelations of the given block.
+        """
+        relations = _BlockRelations()
+        relations.children = self._keys_of(self._children.get(index))
+        relations.parents = self._keys_of(self._parents.get(index))
+        return relations
+
+    def _index_filter(self, filter_func):
+        """
+        Returns the given filter of usage keys as a filter of block indices.
+        """
+        if filter_func is None:
+            return None
+        keys = self._keys
+        return lambda index: filter_func(keys[index])
+
+    def _index_for_update(self, usage_key, in_relations=True):
+        """
+        Returns the index of the given block, adding the block if it's
+        not in the structure.  If in_relations is False, the block is only
+        added to the structure's block data, as _get_or_create_block does.
+        """
+        index = self._indices.get(usage_key)
+        if index is None:
+            index = self._add_key(usage_key)
+        if in_relations and not self._in_relations[index]:
+            self._in_relations[index] = 1
+            self._num_blocks += 1
+        if not in_relations and not self._has_data[index]:
+            self._clear_block_data(index)
+            self._has_data[index] = 1
+        return index
+
+    def _add_key(self, usage_key):
+        """
+        Adds the given usage key to the structure, without adding it to
+        its relations or block data, and returns its index.
+        """
+        index = len(self._keys)
+        self._keys = self._keys + [usage_key]
+        self._indices = dict(self._indices)
+        self._indices[usage_key] = index
+        self._in_relations.append(0)
+        self._has_data.append(0)
+        self._children.set(index, [])
+        self._parents.set(index, [])
+        for flags in self._transformer_blocks.itervalues():
+            flags.append(0)
+        for group, field_name in self._all_column_names():
+            self._column_for_update(group, field_name).append(_MISSING)
+        return index
+
+    def _clear_block_data(self, index):
+        """
+        Removes any values left in the columns by block data removed from
+        the given block.
+        """
+        for flags in self._transformer_blocks.itervalues():
+            flags[index] = 0
+        for group, field_name in self._all_column_names():
+            if self._group_columns(group)[field_name][index] is not _MISSING:
+                self._column_for_update(group, field_name)[index] = _MISSING
+
+    def _group_columns(self, group):
+        """
+        Returns the columns of the given group, by field name.
+        """
+        if group is _XBLOCK_FIELDS_GROUP:
+            return self._columns
+        return self._transformer_columns.get(group, {})
+
+    def _all_columns(self):
+        """
+        Returns an iterator of all columns.
+        """
+        return chain(
+            self._columns.itervalues(),
+            *[columns.itervalues() for columns in self._transformer_columns.itervalues()]
+        )
+
+    def _all_column_names(self):
+        """
+        Returns a list of the (group, field_name) pairs of all columns.
+        """
+        return [(_XBLOCK_FIELDS_GROUP, field_name) for field_name in self._columns] + [
+            (transformer_name, field_name)
+            for transformer_name, columns in self._transformer_columns.iteritems()
+            for field_name in columns
+        ]
+
+    def _column_for_update(self, group, field_name):
+        """
+        Returns the column of the given field, first replacing it with a
+        copy if it's shared with the structure this one was copied from.
+        """
+        if group is _XBLOCK_FIELDS_GROUP:
+            columns = self._columns
+        else:
+            columns = self._transformer_columns.setdefault(group, {})
+        column = columns.get(field_name)
+        if column is None:
+            column = columns[field_name] = [_MISSING] * len(self._keys)
+        elif id(column) in self._shared_column_ids:
+            column = columns[field_name] = list(column)
+        return column
+
+    def _get_field(self, group, index, field_name, default):
+        """
+        Returns the value of the given field of the given block, or default
+        if it has no value.
+        """
+        column = self._group_columns(group).get(field_name)
+        if column is None:
+            return default
+        value = column[index]
+        return default if value is _MISSING else value
+
+    def _set_field(self, group, index, field_name, value):
+        """
+        Sets the value of the given field of the given block.
+        """
+        if group is not _XBLOCK_FIELDS_GROUP:
+            self._set_transformer_block(group, index)
+        self._column_for_update(group, field_name)[index] = value
+
+    def _remove_field(self, group, index, field_name):
+        """
+        Removes the value of the given field of the given block.  Raises
+        AttributeError if it has no value.
+        """
+        if self._get_field(group, index, field_name, _MISSING) is _MISSING:
+            raise AttributeError("Field {0} does not exist".format(field_name))
+        self._column_for_update(group, field_name)[index] = _MISSING
+
+    def _set_transformer_block(self, transformer_name, index):
+        """
+        Records that the given block has block data for the given transformer.
+        """
+        flags = self._transformer_blocks.get(transformer_name)
+        if flags is None:
+            flags = self._transformer_blocks[transformer_name] = bytearray(len(self._keys))
+        flags[index] = 1
+
+
+def _add_to_columns(columns, index, fields, num_keys):
+    """
+    Adds the given block's field values to the given columns.
+    """
+    for field_name, value in fields.iteritems():
+        column = columns.get(field_name)
+        if column is None:
+            column = columns[field_name] = [_MISSING] * num_keys
+        column[index] = value
+
+
+def _without(indices, index):
+    """
+    Returns a copy of the given list without the first occurrence of index.
+    """
+    indices = list(indices)
+    indices.remove(index)
+    return indices
+
+
+class _CompactFieldData(object):
+    """
+    View of the fields of a block, of a group of columns of a
+    CompactBlockStructure, with the interface of FieldData.
+    """
+    __slots__ = ('_structure', '_group', '_index')
+
+    def __init__(self, structure, group, index):
+        object.__setattr__(self, '_structure', structure)
+        object.__setattr__(self, '_group', group)
+        object.__setattr__(self, '_index', index)
+
+    @property
+    def fields(self):
+        """
+        Returns a dict of the values of the block's fields.
+        """
+        return {
+            field_name: column[self._index]
+            for field_name, column in self._structure._group_columns(self._group).iteritems()
+            if column[self._index] is not _MISSING
+        }
+
+    def __getattr__(self, field_name):
+        structure = object.__getattribute__(self, '_structure')
+        value = structure._get_field(self._group, self._index, field_name, _MISSING)
+        if value is _MISSING:
+            raise AttributeError("Field {0} does not exist".format(field_name))
+        return value
+
+    def __setattr__(self, field_name, field_value):
+        self._structure._set_field(self._group, self._index, field_name, field_value)
+
+    def __delattr__(self, field_name):
+        self._structure._remove_field(self._group, self._index, field_name)
+
+
+class _CompactBlockData(_CompactFieldData):
+    """
+    View of the data of a block of a CompactBlockStructure, with the
+    interface of BlockData.
+    """
+    __slots__ = ()
+
+    def __init__(self, structure, index):
+        super(_CompactBlockData, self).__init__(structure, _XBLOCK_FIELDS_GROUP, index)
+
+    @property
+    def location(self):
+        """
+        Returns the usage key of the block.
+        """
+        return self._structure._keys[self._index]
+
+    @property
+    def transformer_data(self):
+        """
+        Returns the block's data for each transformer.
+        """
+        return _CompactTransformerDataMap(self._structure, self._index)
+
+
+class _CompactTransformerDataMap(object):
+    """
+    View of the data of a block of a CompactBlockStructure for each
+    transformer, with the interface of TransformerDataMap.
+    """
+    __slots__ = ('_structure', '_index')
+
+    def __init__(self, structure, index):
+        self._structure = structure
+        self._index = index
+
+    def __getitem__(self, transformer):
+        transformer_name = _transformer_name(transformer)
+        if transformer_name not in self:
+            raise KeyError(transformer_name)
+        return _CompactFieldData(self._structure, transformer_name, self._index)
+
+    def __contains__(self, transformer):
+        flags = self._structure._transformer_blocks.get(_transformer_name(transformer))
+        return flags is not None and bool(flags[self._index])
+
+    def __iter__(self):
+        return (transformer_name for transformer_name, _ in self.iteritems())
+
+    def iteritems(self):
+        """
+        Returns an iterator of (transformer name, data) pairs.
+        """
+        for transformer_name, flags in self._structure._transformer_blocks.iteritems():
+            if flags[self._index]:
+                yield transformer_name, _CompactFieldData(self._structure, transformer_name, self._index)
+
+    def get_or_create(self, transformer):
+        """
+        Returns the block's data for the given transformer, creating it
+        if not found.
+        """
+        transformer_name = _transformer_name(transformer)
+        self._structure._set_transformer_block(transformer_name, self._index)
+        return _CompactFieldData(self._structure, transformer_name, self._index)
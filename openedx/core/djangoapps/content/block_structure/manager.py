@@ -60,7 +60,12 @@ class BlockStructureManager(object):
             BlockStructureBlockData - A transformed block structure,
                 starting at starting_block_usage_key.
         """
-        block_structure = collected_block_structure.copy() if collected_block_structure else self.get_collected()
+        if collected_block_structure is None:
+            block_structure = self.get_collected()
+        elif config.waffle().is_enabled(config.IN_PROCESS_CACHE):
+            block_structure = collected_block_structure.copy_on_write()
+        else:
+            block_structure = collected_block_structure.copy()
 
         if starting_block_usage_key:
             # Override the root_block_usage_key so traversals start at the
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""
+Compares the memory used by, and the time taken to copy and transform, a
+synthetic collected block structure as a BlockStructureBlockData and as a
+CompactBlockStructure.
+"""
+import gc
+import sys
+import timeit
+from types import ModuleType
+
+from openedx.core.djangoapps.content.block_structure.compact import CompactBlockStructure
+from openedx.core.djangoapps.content.block_structure.perf_tests.benchmark_serialization import make_block_structure
+
+try:
+    import click
+except ImportError:
+    click = None
+
+
+def deep_size(obj):
+    """
+    Returns the total size in bytes of the given object and of all objects
+    it references, other than classes and modules.
+    """
+    seen = set()
+    total_size = 0
+    pending = [obj]
+    while pending:
+        current = pending.pop()
+        if id(current) in seen or isinstance(current, (type, ModuleType)):
+            continue
+        seen.add(id(current))
+        total_size += sys.getsizeof(current)
+        pending.extend(gc.get_referents(current))
+    return total_size
+
+
+def transform(block_structure):
+    """
+    Mimics a typical transformer: reads a field of each block in a
+    topological traversal, removing a third of the problems, and then
+    reads the children of each remaining block.
+    """
+    def removal_condition(block_key):
+        """
+        Returns whether to remove the given block.
+        """
+        return (
+            block_structure.get_xblock_field(block_key, 'category') == 'problem' and
+            block_structure.get_transformer_block_field(block_key, 'start_date', 'merged_start_date') and
+            hash(block_key.block_id) % 3 == 0
+        )
+
+    block_structure.remove_block_traversal(removal_condition)
+    for block_key in block_structure.topological_traversal():
+        block_structure.get_children(block_key)
+        block_structure.set_transformer_block_field(block_key, 'block_depth', 'depth', 1)
+
+
+def run_benchmark(block_structure, repeat):
+    """
+    Returns a dict of the memory used by each representation of the given
+    block structure, and the best times in seconds to create it, to copy
+    it, and to transform a copy of it.
+    """
+    compact = CompactBlockStructure.create_from(block_structure)
+
+    def best_time(func):
+        """
+        Returns the best time of running func.
+        """
+        return min(timeit.repeat(func, number=1, repeat=repeat))
+
+    return {
+        'dict': {
+            'memory': deep_size(block_structure),
+            'create': 0.0,
+            'copy_on_write': best_time(block_structure.copy_on_write),
+            'transform': best_time(lambda: transform(block_structure.copy_on_write())),
+        },
+        'compact': {
+            'memory': deep_size(compact),
+            'create': best_time(lambda: CompactBlockStructure.create_from(block_structure)),
+            'copy_on_write': best_time(compact.copy_on_write),
+            'transform': best_time(lambda: transform(compact.copy_on_write())),
+        },
+    }
+
+
+if click is not None:
+    # pylint: disable=bad-continuation
+    @click.command()
+    @click.option('--num_chapters',
+                  type=click.INT,
+                  default=20,
+                  help="Number of chapters in the course.",
+                  required=False
+                  )
+    @click.option('--num_problems',
+                  type=click.INT,
+                  default=9,
+                  help="Number of problems per vertical.",
+                  required=False
+                  )
+    @click.option('--repeat',
+                  type=click.INT,
+                  default=3,
+                  help="Number of timed runs of each operation.",
+                  required=False
+                  )
+    def cli(num_chapters, num_problems, repeat):
+        """
+        Measures a synthetic course's block structure as a
+        BlockStructureBlockData and as a CompactBlockStructure.
+        """
+        block_structure = make_block_structure(num_chapters, 5, 5, num_problems)
+        results = run_benchmark(block_structure, repeat)
+        click.echo(u"Blocks: {}".format(len(block_structure)))
+        for name, result in sorted(results.iteritems()):
+            click.echo(
+                u"{}: memory {} bytes, create {:.3f}s, copy_on_write {:.4f}s, transform {:.3f}s".format(
+                    name,
+                    result['memory'],
+                    result['create'],
+                    result['copy_on_write'],
+                    result['transform'],
+                )
+            )
+
+if __name__ == '__main__':
+    if click is not None:
+        cli()  # pylint: disable=no-value-for-parameter
+    else:
+        print "Aborted! Module 'click' is not installed."
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+"""
+Compares the size of, and the time taken to serialize and deserialize, a
+synthetic collected block structure with zpickle and with the format in
+block_structure.serialization.
+"""
+# pylint: disable=protected-access
+
+import timeit
+from datetime import datetime
+
+from opaque_keys.edx.locator import BlockUsageLocator, CourseLocator
+from pytz import UTC
+
+from openedx.core.djangoapps.content.block_structure import serialization
+from openedx.core.djangoapps.content.block_structure.block_structure import BlockStructureBlockData
+from openedx.core.lib.cache_utils import zpickle, zunpickle
+
+try:
+    import click
+except ImportError:
+    click = None
+
+
+TRANSFORMER_FIELDS = {
+    'blocks_api:student_view_data': ['student_view_multi_device', 'block_counts'],
+    'grades': ['max_score', 'subsections', 'explicit_graded'],
+    'start_date': ['merged_start_date'],
+    'visibility': ['merged_visible_to_staff_only'],
+    'user_partitions': ['merged_group_access'],
+}
+
+
+class _Transformer(object):
+    """
+    Stand-in for a registered transformer, as needed to record its version.
+    """
+    READ_VERSION = 1
+    WRITE_VERSION = 1
+
+    def __init__(self, name):
+        self._name = name
+
+    def name(self):
+        """
+        Returns the transformer's name.
+        """
+        return self._name
+
+
+def make_block_structure(num_chapters, num_sequentials, num_verticals, num_problems):
+    """
+    Returns a collected block structure of a synthetic course with the given
+    number of chapters, sequentials per chapter, verticals per sequential
+    and problems per vertical.
+    """
+    course_key = CourseLocator('org', 'course', 'run')
+    root_key = BlockUsageLocator(course_key, 'course', 'course')
+    block_structure = BlockStructureBlockData(root_key)
+    for name in TRANSFORMER_FIELDS:
+        block_structure._add_transformer(_Transformer(name))
+
+    def add_block(block_key, parent_key, subsection_key):
+        """
+        Adds the block to the structure, with typical collected data.
+        """
+        if parent_key:
+            block_structure._add_relation(parent_key, block_key)
+        block_data = block_structure._get_or_create_block(block_key)
+        block_data.display_name = u'Block {}'.format(block_key.block_id)
+        block_data.category = block_key.block_type
+        block_data.graded = block_key.block_type == 'sequential'
+        block_data.format = 'Homework' if block_data.graded else None
+        block_data.due = datetime(2020, 1, 1, tzinfo=UTC)
+        block_data.start = datetime(2010, 1, 1, tzinfo=UTC)
+        block_data.visible_to_staff_only = False
+        block_data.group_access = {}
+        block_data.has_score = block_key.block_type == 'problem'
+        block_data.weight = None
+        for name, fields in TRANSFORMER_FIELDS.iteritems():
+            for field in fields:
+                value = {subsection_key} if field == 'subsections' and subsection_key else 1.0
+                block_structure.set_transformer_block_field(block_key, name, field, value)
+
+    add_block(root_key, None, None)
+    for chapter in range(num_chapters):
+        chapter_key = root_key.replace(block_type='chapter', block_id='c{}'.format(chapter))
+        add_block(chapter_key, root_key, None)
+        for sequential in range(num_sequentials):
+            sequential_key = root_key.replace(block_type='sequential', block_id='s{}_{}'.format(chapter, sequential))
+            add_block(sequential_key, chapter_key, None)
+            for vertical in range(num_verticals):
+                vertical_key = root_key.replace(
+                    block_type='vertical', block_id='v{}_{}_{}'.format(chapter, sequential, vertical),
+                )
+                add_block(vertical_key, sequential_key, sequential_key)
+                for problem in range(num_problems):
+                    problem_key = root_key.replace(
+                        block_type='problem',
+                        block_id='p{}_{}_{}_{}'.format(chapter, sequential, vertical, problem),
+                    )
+                    add_block(problem_key, vertical_key, sequential_key)
+    return block_structure
+
+
+def _pickle(block_structure):
+    """
+    Serializes the block structure as BlockStructureStore does without
+    the binary format.
+    """
+    return zpickle(
+        (block_structure._block_relations, block_structure.transformer_data, block_structure._block_data_map)
+    )
+
+
+def _read_fields(block_structure):
+    """
+    Reads two fields of every block, as a transformer would.
+    """
+    for block_key in block_structure:
+        block_structure.get_xblock_field(block_key, 'visible_to_staff_only')
+        block_structure.get_transformer_block_field(block_key, 'start_date', 'merged_start_date')
+
+
+def run_benchmark(block_structure, repeat):
+    """
+    Returns a dict of the size of each serialization of the given block
+    structure, and the best times in seconds to create and to read it.
+    """
+    root_key = block_structure.root_block_usage_key
+    pickled = _pickle(block_structure)
+    binary = serialization.serialize(block_structure)
+
+    def best_time(func):
+        """
+        Returns the best time of running func.
+        """
+        return min(timeit.repeat(func, number=1, repeat=repeat))
+
+    return {
+        'zpickle': {
+            'size': len(pickled),
+            'serialize': best_time(lambda: _pickle(block_structure)),
+            'deserialize': best_time(lambda: zunpickle(pickled)),
+            'deserialize_and_read': best_time(lambda: _read_fields(_unpickle(pickled, root_key))),
+        },
+        'binary': {
+            'size': len(binary),
+            'serialize': best_time(lambda: serialization.serialize(block_structure)),
+            'deserialize': best_time(lambda: serialization.deserialize(binary, root_key)),
+            'deserialize_and_read': best_time(lambda: _read_fields(serialization.deserialize(binary, root_key))),
+        },
+    }
+
+
+def _unpickle(pickled, root_key):
+    """
+    Deserializes the block structure as BlockStructureStore does without
+    the binary format.
+    """
+    block_structure = BlockStructureBlockData(root_key)
+    block_structure._block_relations, block_structure.transformer_data, block_structure._block_data_map = (
+        zunpickle(pickled)
+    )
+    return block_structure
+
+
+if click is not None:
+    # pylint: disable=bad-continuation
+    @click.command()
+    @click.option('--num_chapters',
+                  type=click.INT,
+                  default=20,
+                  help="Number of chapters in the course.",
+                  required=False
+                  )
+    @click.option('--num_problems',
+                  type=click.INT,
+                  default=5,
+                  help="Number of problems per vertical.",
+                  required=False
+                  )
+    @click.option('--repeat',
+                  type=click.INT,
+                  default=3,
+                  help="Number of timed runs of each operation.",
+                  required=False
+                  )
+    def cli(num_chapters, num_problems, repeat):
+        """
+        Times serializing a synthetic course's block structure with zpickle
+        and with the binary format.
+        """
+        block_structure = make_block_structure(num_chapters, 5, 5, num_problems)
+        results = run_benchmark(block_structure, repeat)
+        click.echo(u"Blocks: {}".format(len(block_structure)))
+        for name, result in sorted(results.iteritems()):
+            click.echo(
+                u"{}: size {} bytes, serialize {:.3f}s, deserialize {:.3f}s, deserialize and read {:.3f}s".format(
+                    name,
+                    result['size'],
+                    result['serialize'],
+                    result['deserialize'],
+                    result['deserialize_and_read'],
+                )
+            )
+
+if __name__ == '__main__':
+    if click is not None:
+        cli()  # pylint: disable=no-value-for-parameter
+    else:
+        print "Aborted! Module 'click' is not installed."
@@ -0,0 +1,121 @@
+"""
+In-process cache of collected block structures.
+
+Each process keeps the collected block structures it most recently read,
+already deserialized, so that repeated requests for the same course don't
+fetch and deserialize the same structure again.  Cached structures are
+never handed out themselves, only copy-on-write copies of them, so they
+are never modified.
+"""
+from collections import OrderedDict
+from logging import getLogger
+from threading import Lock
+
+from django.conf import settings
+
+
+logger = getLogger(__name__)  # pylint: disable=C0103
+
+
+# Default upper bound on the total number of blocks of the cached block
+# structures.  A deserialized block with its collected transformer data
+# takes several kilobytes, much more than its compressed serialization.
+# Override it with the IN_PROCESS_CACHE_MAX_BLOCKS key of
+# settings.BLOCK_STRUCTURES_SETTINGS.
+DEFAULT_MAX_BLOCKS = 20000
+
+
+class BlockStructureProcessCache(object):
+    """
+    A least recently used cache of collected block structures, bounded by
+    their total number of blocks.
+
+    Entries are keyed by a cache key that changes whenever the collected data
+    of the structure changes, so entries are never updated, only evicted.
+    """
+    def __init__(self, max_blocks=None):
+        """
+        Arguments:
+            max_blocks (int) - Upper bound on the total number of blocks of
+                the cached block structures.  If None, the number configured
+                in the settings is used.
+        """
+        self._max_blocks = max_blocks
+
+        # Map of cache key to a (root_block_usage_key, block_structure, num_blocks)
+        # tuple, ordered from least to most recently used.
+        self._entries = OrderedDict()
+        self._total_blocks = 0
+        self._lock = Lock()
+
+    @property
+    def max_blocks(self):
+        """
+        Returns the upper bound on the total number of blocks of cached block structures.
+        """
+        if self._max_blocks is not None:
+            return self._max_blocks
+        return settings.BLOCK_STRUCTURES_SETTINGS.get('IN_PROCESS_CACHE_MAX_BLOCKS', DEFAULT_MAX_BLOCKS)
+
+    def get(self, cache_key):
+        """
+        Returns a copy-on-write copy of the block structure cached for the
+        given key, or None if not found.
+        """
+        with self._lock:
+            entry = self._entries.pop(cache_key, None)
+            if entry is None:
+                return None
+            self._entries[cache_key] = entry
+        logger.info("BlockStructure: Read from process cache; %s.", cache_key)
+        return entry[1].copy_on_write()
+
+    def add(self, cache_key, block_structure):
+        """
+        Caches the given block structure under the given key, evicting the
+        least recently used structures as needed to stay within max_blocks.
+
+        The given block structure must not be modified afterwards.
+
+        Arguments:
+            cache_key (unicode) - Key that changes whenever the collected
+                data of the structure changes.
+
+            block_structure (BlockStructureBlockData) - The collected block
+                structure to cache.
+        """
+        max_blocks = self.max_blocks
+        num_blocks = len(block_structure)
+        if num_blocks > max_blocks:
+            return
+        with self._lock:
+            previous_entry = self._entries.pop(cache_key, None)
+            if previous_entry is not None:
+                self._total_blocks -= previous_entry[2]
+            while self._entries and self._total_blocks + num_blocks > max_blocks:
+                _, (_, _, evicted_blocks) = self._entries.popitem(last=False)
+                self._total_blocks -= evicted_blocks
+            self._entries[cache_key] = (block_structure.root_block_usage_key, block_structure, num_blocks)
+            self._total_blocks += num_blocks
+
+    def delete(self, root_block_usage_key):
+        """
+        Removes all cached block structures with the given root.
+        """
+        with self._lock:
+            for cache_key, (entry_root_key, _, num_blocks) in self._entries.items():
+                if entry_root_key == root_block_usage_key:
+                    del self._entries[cache_key]
+                    self._total_blocks -= num_blocks
+
+    def clear(self):
+        """
+        Removes all cached block structures.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._total_blocks = 0
+
+
+# The cache of the current process.
+process_cache = BlockStructureProcessCache()  # pylint: disable=invalid-name
@@ -0,0 +1,419 @@
+"""
+Binary, versioned serialization format for collected block structures.
+
+Unlike a pickle of the whole structure, the format stores:
+    - a header with a magic string and a format version,
+    - a table of the structure's usage keys, each interned as a
+      (block_type, block_id) pair when it shares the root's course,
+    - the structure's relations as lists of indices into the key table,
+    - each xBlock field, and each field of each transformer's block data,
+      as a separately pickled column of values by block index.
+
+The body after the header is zlib compressed.  On deserialization, the
+relations and key table are decoded right away, but a column is only
+unpickled when a field of that column is first read from a block, so a
+transformer only pays for the fields it actually reads.
+"""
+import cPickle as pickle
+import struct
+import zlib
+from copy import deepcopy
+
+from opaque_keys.edx.keys import UsageKey
+
+from .block_structure import BlockData, TransformerData, TransformerDataMap, _BlockRelations
+from .factory import BlockStructureFactory
+
+
+MAGIC = 'BSBF'
+
+# The version of the serialization format.  Incrementally update this value
+# whenever the format changes, and keep support for reading older versions
+# for as long as they may be found in the cache or storage.
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('!4sH')
+_MANIFEST_LENGTH = struct.Struct('!I')
+
+_XBLOCK_FIELDS_GROUP = None
+
+
+def is_serialized_block_structure(serialized_data):
+    """
+    Returns whether the given data was serialized with this module's
+    format, rather than pickled.
+    """
+    return serialized_data[:len(MAGIC)] == MAGIC
+
+
+def serialize(block_structure):
+    """
+    Returns the serialization of the given BlockStructureBlockData.
+    """
+    writer = _SectionWriter()
+    key_indices = {}
+
+    root_key = block_structure.root_block_usage_key
+    root_state = _key_state(root_key)
+    key_table = []
+    for usage_key in _all_usage_keys(block_structure):
+        key_indices[usage_key] = len(key_table)
+        key_table.append(_intern_key(usage_key, root_key, root_state))
+
+    block_relations = block_structure._block_relations  # pylint: disable=protected-access
+    relations = [
+        (
+            key_indices[usage_key],
+            [key_indices[child] for child in relation.children],
+            [key_indices[parent] for parent in relation.parents],
+        )
+        for usage_key, relation in block_relations.iteritems()
+    ]
+
+    columns = {}
+    transformer_blocks = {}
+    for usage_key, block_data in block_structure.iteritems():
+        block_index = key_indices[usage_key]
+        _add_to_columns(columns, _XBLOCK_FIELDS_GROUP, block_index, block_data.fields)
+        for transformer_name, transformer_data in block_data.transformer_data.iteritems():
+            transformer_blocks.setdefault(transformer_name, []).append(block_index)
+            _add_to_columns(columns, transformer_name, block_index, transformer_data.fields)
+
+    manifest = {
+        'keys': writer.add(key_table),
+        'relations': writer.add(relations),
+        'blocks': writer.add([key_indices[usage_key] for usage_key in block_structure._block_data_map]),  # pylint: disable=protected-access
+        'transformer_data': writer.add(
+            {name: data.fields for name, data in block_structure.transformer_data.iteritems()}
+        ),
+        'transformer_blocks': writer.add(transformer_blocks),
+        'columns': {
+            group_and_field: writer.add(values)
+            for group_and_field, values in columns.iteritems()
+        },
+    }
+    return writer.getvalue(manifest)
+
+
+def deserialize(serialized_data, root_block_usage_key):
+    """
+    Returns the BlockStructureBlockData for the given serialized data,
+    as returned by serialize.
+
+    Raises ValueError if the data is not in a supported format.
+    """
+    reader = _SectionReader(serialized_data)
+    manifest = reader.manifest
+
+    root_state = _key_state(root_block_usage_key)
+    key_table = [_resolve_key(entry, root_block_usage_key, root_state) for entry in reader.read(manifest['keys'])]
+
+    block_relations = {}
+    for block_index, children, parents in reader.read(manifest['relations']):
+        relation = _BlockRelations.__new__(_BlockRelations)
+        relation.children = [key_table[child] for child in children]
+        relation.parents = [key_table[parent] for parent in parents]
+        block_relations[key_table[block_index]] = relation
+
+    transformer_data = TransformerDataMap()
+    for transformer_name, fields in reader.read(manifest['transformer_data']).iteritems():
+        transformer_data[transformer_name] = TransformerData()
+        transformer_data[transformer_name].fields = fields
+
+    columns_by_group = {}
+    for (group, field_name), location in manifest['columns'].iteritems():
+        columns_by_group.setdefault(group, {})[field_name] = _Column(reader, location)
+
+    # Opaque keys compute their hash on each call, so blocks are looked up
+    # by index rather than by key while they are created.
+    block_data_by_index = {}
+    xblock_columns = columns_by_group.get(_XBLOCK_FIELDS_GROUP, {})
+    for block_index in reader.read(manifest['blocks']):
+        block_data_by_index[block_index] = _LazyBlockData.create(
+            xblock_columns,
+            block_index,
+            location=key_table[block_index],
+            transformer_data=TransformerDataMap(),
+        )
+
+    for transformer_name, block_indices in reader.read(manifest['transformer_blocks']).iteritems():
+        transformer_columns = columns_by_group.get(transformer_name, {})
+        for block_index in block_indices:
+            dict.__setitem__(
+                block_data_by_index[block_index].transformer_data,
+                transformer_name,
+                _LazyTransformerData.create(transformer_columns, block_index),
+            )
+
+    block_data_map = {
+        block_data.location: block_data
+        for block_data in block_data_by_index.itervalues()
+    }
+
+    return BlockStructureFactory.create_new(
+        root_block_usage_key,
+        block_relations,
+        transformer_data,
+        block_data_map,
+    )
+
+
+def _all_usage_keys(block_structure):
+    """
+    Returns the usage keys of all blocks in the given structure's
+    relations and block data, in a deterministic order.
+    """
+    seen = set()
+    for usage_key in block_structure._block_relations.keys() + block_structure._block_data_map.keys():  # pylint: disable=protected-access
+        if usage_key not in seen:
+            seen.add(usage_key)
+            yield usage_key
+
+
+def _key_state(usage_key):
+    """
+    Returns the pickle state of the given usage key, or None if
+    it is not an opaque key.
+    """
+    return usage_key.__getstate__() if isinstance(usage_key, UsageKey) else None
+
+
+def _intern_key(usage_key, root_key, root_state):
+    """
+    Returns the entry of the key table for the given usage key: a
+    (block_type, block_id) tuple if it differs from the root key
+    only by those fields, otherwise the usage key itself.
+    """
+    if root_state is not None and type(usage_key) is type(root_key):
+        entry = (usage_key.block_type, usage_key.block_id)
+        if usage_key.__getstate__() == dict(root_state, block_type=entry[0], block_id=entry[1]):
+            return entry
+    return usage_key
+
+
+def _resolve_key(entry, root_key, root_state):
+    """
+    Returns the usage key for the given entry of the key table, given
+    the root key and its pickle state.
+    """
+    if not isinstance(entry, tuple):
+        return entry
+    state = dict(root_state)
+    state['block_type'], state['block_id'] = entry
+    # Restores the key the way pickle does, without parsing
+    # or validating its fields again.
+    key_class = type(root_key)
+    usage_key = key_class.__new__(key_class)
+    usage_key.__setstate__(state)
+    return usage_key
+
+
+def _add_to_columns(columns, group, block_index, fields):
+    """
+    Adds the given block's field values to the columns of the given group.
+    """
+    for field_name, value in fields.iteritems():
+        columns.setdefault((group, field_name), {})[block_index] = value
+
+
+class _SectionWriter(object):
+    """
+    Accumulates separately pickled sections of a serialization.
+    """
+    def __init__(self):
+        self._sections = []
+        self._offset = 0
+
+    def add(self, value):
+        """
+        Pickles the given value as a new section, and returns
+        its (offset, length) location in the body.
+        """
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        location = (self._offset, len(data))
+        self._sections.append(data)
+        self._offset += len(data)
+        return location
+
+    def getvalue(self, manifest):
+        """
+        Returns the serialization of the sections, described by the given
+        manifest.
+        """
+        manifest_data = pickle.dumps(manifest, pickle.HIGHEST_PROTOCOL)
+        body = _MANIFEST_LENGTH.pack(len(manifest_data)) + manifest_data + ''.join(self._sections)
+        return _HEADER.pack(MAGIC, FORMAT_VERSION) + zlib.compress(body)
+
+
+class _SectionReader(object):
+    """
+    Reads the sections of a serialization.
+    """
+    def __init__(self, serialized_data):
+        magic, version = _HEADER.unpack_from(serialized_data)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(u"Unsupported block structure format: {!r} version {}".format(magic, version))
+
+        body = zlib.decompress(serialized_data[_HEADER.size:])
+        manifest_length, = _MANIFEST_LENGTH.unpack_from(body)
+        self._body = body
+        self._sections_offset = _MANIFEST_LENGTH.size + manifest_length
+        self.manifest = pickle.loads(body[_MANIFEST_LENGTH.size:self._sections_offset])
+
+    def read(self, location):
+        """
+        Unpickles and returns the section at the given location.
+        """
+        offset, length = location
+        start = self._sections_offset + offset
+        return pickle.loads(self._body[start:start + length])
+
+
+class _Column(object):
+    """
+    The values of one field for all blocks, unpickled on first use.
+    """
+    def __init__(self, reader, location):
+        self._reader = reader
+        self._location = location
+        self._values = None
+
+    def values(self):
+        """
+        Returns a dict of block index to the field's value.
+        """
+        values = self._values
+        if values is None:
+            # Structures may be shared between threads, so the values are
+            # published before the reader is dropped: a thread finding no
+            # reader finds the values another thread has just unpickled.
+            reader = self._reader
+            if reader is None:
+                return self._values
+            values = reader.read(self._location)
+            self._values = values
+            self._reader = None
+        return values
+
+
+class _LazyFieldsMixin(object):
+    """
+    Mixin for FieldData whose fields are read from columns as they are
+    first accessed, rather than all at deserialization.
+
+    Accessing the fields dict directly, or setting a field, loads
+    all remaining fields from the columns.
+    """
+    _columns = None
+    _index = None
+
+    # When True, values read from the columns are deep-copied, since the
+    # columns are shared with the structure this one was copied from.
+    _copy_values = False
+
+    def class_field_names(self):
+        return super(_LazyFieldsMixin, self).class_field_names() + [
+            '_columns', '_index', '_copy_values', '_loaded_fields',
+        ]
+
+    @classmethod
+    def create(cls, columns, index, **attrs):
+        """
+        Returns a new instance that reads its fields from the given
+        columns at the given index, with the given class fields.
+
+        Bypasses __init__ and __setattr__, since many instances are
+        created on each deserialization.
+        """
+        instance = cls.__new__(cls)
+        instance.__dict__.update(attrs, _loaded_fields={}, _columns=columns, _index=index)
+        return instance
+
+    @property
+    def fields(self):
+        """
+        Returns the dict of all fields, loading any not yet read.
+        """
+        self._load_all_fields()
+        return self._loaded_fields
+
+    @fields.setter
+    def fields(self, value):
+        self._loaded_fields = value
+        self._columns = None
+
+    def __getattr__(self, field_name):
+        loaded_fields = self.__dict__.get('_loaded_fields')
+        if loaded_fields is None:
+            raise AttributeError(field_name)
+        try:
+            return loaded_fields[field_name]
+        except KeyError:
+            if self._load_field(field_name):
+                return loaded_fields[field_name]
+            raise AttributeError("Field {0} does not exist".format(field_name))
+
+    def _load_all_fields(self):
+        """
+        Loads all fields not yet read from the columns.
+        """
+        if self._columns:
+            for field_name in self._columns:
+                self._load_field(field_name)
+            self._columns = None
+
+    def _load_field(self, field_name):
+        """
+        Loads the given field from its column, if not yet loaded.
+        Returns whether the field has a value.
+        """
+        if field_name in self._loaded_fields:
+            return True
+        if not self._columns or field_name not in self._columns:
+            return False
+        values = self._columns[field_name].values()
+        if self._index not in values:
+            return False
+        value = values[self._index]
+        self._loaded_fields[field_name] = deepcopy(value) if self._copy_values else value
+        return True
+
+    def __getstate__(self):
+        self._load_all_fields()
+        state = dict(self.__dict__)
+        state.pop('_columns', None)
+        return state
+
+    def __deepcopy__(self, memo):
+        """
+        Returns a copy that shares this instance's columns, leaving
+        fields not yet read to be loaded by the copy as needed.
+        """
+        copied = self.__class__.__new__(self.__class__)
+        for attr_name, value in self.__dict__.iteritems():
+            if attr_name != '_columns':
+                object.__setattr__(copied, attr_name, deepcopy(value, memo))
+        object.__setattr__(copied, '_columns', self._columns)
+        object.__setattr__(copied, '_copy_values', True)
+        return copied
+
+    def _copy_fields_to(self, copied):
+        """
+        Gives the given shallow copy its own dict of the fields read so
+        far, leaving it to share this instance's columns.
+        """
+        copied.__dict__['_loaded_fields'] = dict(self._loaded_fields)
+
+
+class _LazyBlockData(_LazyFieldsMixin, BlockData):
+    """
+    BlockData whose xBlock fields are read from columns as needed.
+    """
+    pass
+
+
+class _LazyTransformerData(_LazyFieldsMixin, TransformerData):
+    """
+    TransformerData whose fields are read from columns as needed.
+    """
+    pass
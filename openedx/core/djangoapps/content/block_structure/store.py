@@ -2,15 +2,18 @@
 Module for the Storage of BlockStructure objects.
 """
 # pylint: disable=protected-access
+from hashlib import sha1
 from logging import getLogger
 
 from openedx.core.lib.cache_utils import zpickle, zunpickle
 
-from . import config
+from . import config, serialization
 from .block_structure import BlockStructureBlockData
+from .compact import CompactBlockStructure
 from .exceptions import BlockStructureNotFound
 from .factory import BlockStructureFactory
 from .models import BlockStructureModel
+from .process_cache import process_cache
 from .transformer_registry import TransformerRegistry
 
 
@@ -74,6 +77,11 @@ class BlockStructureStore(object):
         The given root_block_usage_key must equate the
         root_block_usage_key previously passed to the `add` method.
 
+        If the in_process_cache switch is enabled, the deserialized
+        block structure is also cached in process, and a copy-on-write
+        copy of it is returned.  If the compact_representation switch is
+        also enabled, it is cached as a CompactBlockStructure.
+
         Arguments:
             root_block_usage_key (UsageKey) - The usage_key for the
                 root of the block structure that is to be retrieved
@@ -89,13 +97,32 @@ class BlockStructureStore(object):
         """
         bs_model = self._get_model(root_block_usage_key)
 
+        use_process_cache = _is_process_cache_enabled()
+        if use_process_cache and _is_storage_backing_enabled():
+            # The model's cache key includes its version, so the
+            # structure is current without fetching its serialization.
+            block_structure = process_cache.get(self._encode_process_cache_key(bs_model))
+            if block_structure is not None:
+                return block_structure
+
         try:
             serialized_data = self._get_from_cache(bs_model)
         except BlockStructureNotFound:
             serialized_data = self._get_from_store(bs_model)
             self._add_to_cache(serialized_data, bs_model)
 
-        return self._deserialize(serialized_data, root_block_usage_key)
+        if not use_process_cache:
+            return self._deserialize(serialized_data, root_block_usage_key)
+
+        process_cache_key = self._encode_process_cache_key(bs_model, serialized_data)
+        block_structure = process_cache.get(process_cache_key)
+        if block_structure is None:
+            cached_block_structure = self._deserialize(serialized_data, root_block_usage_key)
+            if config.waffle().is_enabled(config.COMPACT_REPRESENTATION):
+                cached_block_structure = CompactBlockStructure.create_from(cached_block_structure)
+            process_cache.add(process_cache_key, cached_block_structure)
+            block_structure = cached_block_structure.copy_on_write()
+        return block_structure
 
     def delete(self, root_block_usage_key):
         """
@@ -108,6 +135,7 @@ class BlockStructureStore(object):
         """
         bs_model = self._get_model(root_block_usage_key)
         self._cache.delete(self._encode_root_cache_key(bs_model))
+        process_cache.delete(root_block_usage_key)
         bs_model.delete()
         logger.info("BlockStructure: Deleted from cache and store; %s.", bs_model)
 
@@ -193,6 +221,9 @@ class BlockStructureStore(object):
         """
         Serializes the data for the given block_structure.
         """
+        if config.waffle().is_enabled(config.BINARY_SERIALIZATION):
+            return serialization.serialize(block_structure)
+
         data_to_cache = (
             block_structure._block_relations,
             block_structure.transformer_data,
@@ -204,6 +235,9 @@ class BlockStructureStore(object):
         """
         Deserializes the given data and returns the parsed block_structure.
         """
+        if serialization.is_serialized_block_structure(serialized_data):
+            return serialization.deserialize(serialized_data, root_block_usage_key)
+
         block_relations, transformer_data, block_data_map = zunpickle(serialized_data)
         return BlockStructureFactory.create_new(
             root_block_usage_key,
@@ -227,6 +261,21 @@ class BlockStructureStore(object):
                 root_usage_key=unicode(bs_model.data_usage_key),
             )
 
+    @classmethod
+    def _encode_process_cache_key(cls, bs_model, serialized_data=None):
+        """
+        Returns the key under which to cache the given BlockStructureModel
+        or StubModel in process.
+
+        Without storage backing, the cache key does not change with the
+        version of the data, so the digest of the given serialized data is
+        included in the key.
+        """
+        cache_key = cls._encode_root_cache_key(bs_model)
+        if _is_storage_backing_enabled():
+            return cache_key
+        return u"{}.{}".format(cache_key, sha1(serialized_data).hexdigest())
+
     @staticmethod
     def _version_data_of_block(root_block):
         """
@@ -256,3 +305,10 @@ def _is_storage_backing_enabled():
     Returns whether storage backing for Block Structures is enabled.
     """
     return config.waffle().is_enabled(config.STORAGE_BACKING_FOR_CACHE)
+
+
+def _is_process_cache_enabled():
+    """
+    Returns whether collected block structures are cached in process.
+    """
+    return config.waffle().is_enabled(config.IN_PROCESS_CACHE)
@@ -268,3 +268,33 @@ class TestBlockStructureData(TestCase, ChildrenMapTestMixin):
         _set_value(new_copy, 'edit2')
         self.assertEquals(_get_value(block_structure), 'edit1')
         self.assertEquals(_get_value(new_copy), 'edit2')
+
+    def test_copy_on_write(self):
+        block_structure = self.create_block_structure(ChildrenMapTestMixin.LINEAR_CHILDREN_MAP)
+        block_structure.set_transformer_block_field(1, 'transformer', 'test_key', 'original_value')
+        block_structure.set_transformer_block_field(2, 'transformer', 'test_key', 'original_value')
+        block_structure[1].display_name = 'original_name'
+
+        new_copy = block_structure.copy_on_write()
+        self.assert_block_structure(new_copy, [[1], [2], [3], []])
+        self.assertIs(new_copy[2], block_structure[2])
+
+        # verify edits to the copy do not affect the original
+        new_copy.remove_block(2, keep_descendants=True)
+        new_copy.set_transformer_block_field(1, 'transformer', 'test_key', 'edit')
+        new_copy[1].display_name = 'new_name'
+        self.assert_block_structure(new_copy, [[1], [3], [], []], missing_blocks=[2])
+        self.assert_block_structure(block_structure, [[1], [2], [3], []])
+        new_copy.set_root_block(1)
+        self.assertEquals(new_copy.get_parents(1), [])
+        self.assertEquals(block_structure.get_parents(1), [0])
+        self.assertEquals(new_copy.get_transformer_block_field(1, 'transformer', 'test_key'), 'edit')
+        self.assertEquals(new_copy.get_xblock_field(1, 'display_name'), 'new_name')
+        self.assertEquals(block_structure.get_transformer_block_field(1, 'transformer', 'test_key'), 'original_value')
+        self.assertEquals(block_structure.get_xblock_field(1, 'display_name'), 'original_name')
+
+        # verify a copy of the copy does not affect either
+        second_copy = new_copy.copy_on_write()
+        second_copy.set_transformer_block_field(1, 'transformer', 'test_key', 'edit2')
+        self.assertEquals(new_copy.get_transformer_block_field(1, 'transformer', 'test_key'), 'edit')
+        self.assertEquals(block_structure.get_transformer_block_field(1, 'transformer', 'test_key'), 'original_value')
@@ -0,0 +1,174 @@
+"""
+Tests for compact.py
+"""
+# pylint: disable=protected-access
+from copy import deepcopy
+import itertools
+from unittest import TestCase
+
+import ddt
+from nose.plugins.attrib import attr
+
+from .. import serialization
+from ..compact import CompactBlockStructure
+from .helpers import ChildrenMapTestMixin, MockTransformer
+
+
+@attr(shard=2)
+@ddt.ddt
+class TestCompactBlockStructure(ChildrenMapTestMixin, TestCase):
+    """
+    Tests that CompactBlockStructure behaves as the
+    BlockStructureBlockData it was created from.
+    """
+    CHILDREN_MAPS = [
+        ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP,
+        ChildrenMapTestMixin.LINEAR_CHILDREN_MAP,
+        ChildrenMapTestMixin.DAG_CHILDREN_MAP,
+    ]
+
+    def create_structures(self, children_map):
+        """
+        Returns a block structure for the given children_map, with
+        fields set on each block, and its compact equivalent.
+        """
+        block_structure = self.create_block_structure(children_map)
+        block_structure._add_transformer(MockTransformer)
+        for block_key in range(len(children_map)):
+            block_structure._get_or_create_block(block_key).display_name = u'Block {}'.format(block_key)
+            block_structure.set_transformer_block_field(block_key, MockTransformer, 'value', [block_key])
+        return block_structure, CompactBlockStructure.create_from(block_structure)
+
+    def assert_same_structure(self, compact, block_structure):
+        """
+        Verifies that the given structures have the same blocks, relations and data.
+        """
+        self.assertEqual(len(compact), len(block_structure))
+        self.assertEqual(set(compact), set(block_structure))
+        self.assertEqual(compact.root_block_usage_key, block_structure.root_block_usage_key)
+        for block_key in block_structure:
+            self.assertEqual(compact.get_children(block_key), block_structure.get_children(block_key))
+            self.assertEqual(set(compact.get_parents(block_key)), set(block_structure.get_parents(block_key)))
+        self.assertEqual(
+            {block_key: block_data.fields for block_key, block_data in compact.iteritems()},
+            {block_key: block_data.fields for block_key, block_data in block_structure.iteritems()},
+        )
+        for block_key, block_data in block_structure.iteritems():
+            self.assertEqual(
+                compact.get_transformer_block_data(block_key, MockTransformer).fields,
+                block_data.transformer_data[MockTransformer].fields,
+            )
+
+    @ddt.data(*CHILDREN_MAPS)
+    def test_create_from(self, children_map):
+        block_structure, compact = self.create_structures(children_map)
+        self.assert_block_structure(compact, children_map)
+        self.assert_same_structure(compact, block_structure)
+        self.assertEqual(compact._get_transformer_data_version(MockTransformer), MockTransformer.WRITE_VERSION)
+        self.assertEqual(compact[1].location, 1)
+        self.assertEqual(compact.get_xblock_field(1, 'display_name'), u'Block 1')
+        self.assertEqual(compact.get_transformer_block_field(1, MockTransformer, 'value'), [1])
+        self.assertIsNone(compact.get_xblock_field(1, 'missing'))
+        self.assertEqual(compact.get_transformer_block_field(1, MockTransformer, 'missing', 'default'), 'default')
+        self.assertEqual(compact.get_xblock_field(len(children_map), 'display_name', 'default'), 'default')
+
+    @ddt.data(*CHILDREN_MAPS)
+    def test_traversals(self, children_map):
+        block_structure, compact = self.create_structures(children_map)
+
+        def filter_func(block_key):
+            """
+            Filters out block 2.
+            """
+            return block_key != 2
+
+        self.assertEqual(list(compact.topological_traversal()), list(block_structure.topological_traversal()))
+        self.assertEqual(
+            list(compact.topological_traversal(filter_func=filter_func, yield_descendants_of_unyielded=True)),
+            list(block_structure.topological_traversal(filter_func=filter_func, yield_descendants_of_unyielded=True)),
+        )
+        self.assertEqual(list(compact.post_order_traversal()), list(block_structure.post_order_traversal()))
+        self.assertEqual(
+            list(compact.post_order_traversal(start_node=1)),
+            list(block_structure.post_order_traversal(start_node=1)),
+        )
+
+    @ddt.data(*itertools.product([True, False], range(1, 7), CHILDREN_MAPS))
+    @ddt.unpack
+    def test_remove_block(self, keep_descendants, block_to_remove, children_map):
+        if block_to_remove >= len(children_map):
+            return
+        block_structure, compact = self.create_structures(children_map)
+
+        for structure in (block_structure, compact):
+            structure.remove_block(block_to_remove, keep_descendants)
+        self.assert_same_structure(compact, block_structure)
+        self.assertNotIn(block_to_remove, compact)
+        with self.assertRaises(KeyError):
+            compact[block_to_remove]  # pylint: disable=pointless-statement
+
+        for structure in (block_structure, compact):
+            structure._prune_unreachable()
+        self.assert_same_structure(compact, block_structure)
+
+    def test_remove_block_traversal(self):
+        block_structure, compact = self.create_structures(self.DAG_CHILDREN_MAP)
+        for structure in (block_structure, compact):
+            structure.remove_block_traversal(lambda block: block == 3)
+        self.assert_block_structure(compact, [[1, 2], [], [4], [], [], [], []], missing_blocks=[3])
+        self.assert_same_structure(compact, block_structure)
+
+    def test_set_fields(self):
+        block_structure, compact = self.create_structures(self.SIMPLE_CHILDREN_MAP)
+        for structure in (block_structure, compact):
+            structure.set_transformer_block_field(1, MockTransformer, 'value', 'new')
+            structure.set_transformer_block_field(1, 'other_transformer', 'other', 'other')
+            structure[2].display_name = u'New name'
+            structure.set_transformer_block_field(10, MockTransformer, 'value', 'new block')
+            structure._add_relation(4, 11)
+            structure.set_root_block(1)
+        self.assertEqual(compact.get_transformer_block_field(10, MockTransformer, 'value'), 'new block')
+        self.assertEqual(compact.get_transformer_block_field(1, 'other_transformer', 'other'), 'other')
+        self.assertNotIn(10, compact)
+        self.assertEqual(compact.get_parents(1), [])
+        self.assertEqual(compact.get_children(4), [11])
+        self.assert_same_structure(compact, block_structure)
+
+    def test_copy_on_write(self):
+        block_structure, compact = self.create_structures(self.SIMPLE_CHILDREN_MAP)
+        copied = compact.copy_on_write()
+        copied.set_transformer_block_field(1, MockTransformer, 'value', 'new')
+        copied.remove_block(2, keep_descendants=False)
+        copied.set_transformer_block_field(10, MockTransformer, 'value', 'new block')
+        self.assertEqual(copied.get_transformer_block_field(1, MockTransformer, 'value'), 'new')
+        self.assert_same_structure(compact, block_structure)
+
+        copied = compact.copy()
+        copied.get_transformer_block_field(1, MockTransformer, 'value').append('new')
+        self.assert_same_structure(compact, block_structure)
+
+    def test_remove_transformer_block_field(self):
+        block_structure, compact = self.create_structures(self.SIMPLE_CHILDREN_MAP)
+        copied = compact.copy_on_write()
+        for structure in (block_structure, copied):
+            structure.remove_transformer_block_field(1, MockTransformer, 'value')
+            structure.remove_transformer_block_field(1, MockTransformer, 'missing')
+        self.assertIsNone(copied.get_transformer_block_field(1, MockTransformer, 'value'))
+        self.assertNotIn('value', copied.get_transformer_block_data(1, MockTransformer).fields)
+        self.assertEqual(compact.get_transformer_block_field(1, MockTransformer, 'value'), [1])
+        self.assert_same_structure(copied, block_structure)
+
+    def test_removed_block_data_is_cleared(self):
+        block_structure, compact = self.create_structures(self.SIMPLE_CHILDREN_MAP)
+        for structure in (block_structure, compact):
+            structure.remove_block(3, keep_descendants=False)
+            structure.set_transformer_block_field(3, MockTransformer, 'other', 'other')
+        self.assertIsNone(compact.get_transformer_block_field(3, MockTransformer, 'value'))
+        self.assertIsNone(compact.get_xblock_field(3, 'display_name'))
+        self.assert_same_structure(compact, block_structure)
+
+    def test_serialize(self):
+        block_structure, compact = self.create_structures(self.DAG_CHILDREN_MAP)
+        deserialized = serialization.deserialize(serialization.serialize(compact), 0)
+        self.assert_same_structure(CompactBlockStructure.create_from(deserialized), block_structure)
+        self.assert_same_structure(CompactBlockStructure.create_from(deepcopy(block_structure)), block_structure)
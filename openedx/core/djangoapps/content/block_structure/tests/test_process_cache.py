@@ -0,0 +1,76 @@
+"""
+Tests for process_cache.py
+"""
+from unittest import TestCase
+
+from nose.plugins.attrib import attr
+
+from ..process_cache import BlockStructureProcessCache
+from .helpers import ChildrenMapTestMixin
+
+
+@attr(shard=2)
+class TestBlockStructureProcessCache(ChildrenMapTestMixin, TestCase):
+    """
+    Tests for BlockStructureProcessCache
+    """
+    def setUp(self):
+        super(TestBlockStructureProcessCache, self).setUp()
+        # Room for two structures of SIMPLE_CHILDREN_MAP's 5 blocks
+        self.process_cache = BlockStructureProcessCache(max_blocks=12)
+
+    def _add(self, cache_key, root_block_usage_key=0, children_map=None):
+        """
+        Adds a new block structure with the given root to the cache.
+        """
+        block_structure = self.create_block_structure(children_map or self.SIMPLE_CHILDREN_MAP)
+        block_structure.root_block_usage_key = root_block_usage_key
+        self.process_cache.add(cache_key, block_structure)
+        return block_structure
+
+    def test_get_returns_copies(self):
+        block_structure = self._add('key')
+        cached_copy = self.process_cache.get('key')
+        self.assertIsNot(cached_copy, block_structure)
+        self.assert_block_structure(cached_copy, self.SIMPLE_CHILDREN_MAP)
+
+        cached_copy.remove_block(1, keep_descendants=False)
+        self.assert_block_structure(self.process_cache.get('key'), self.SIMPLE_CHILDREN_MAP)
+
+    def test_remove_transformer_block_field_from_copy(self):
+        block_structure = self._add('key')
+        block_structure.set_transformer_block_field(1, 'transformer', 'test_key', 'value')
+
+        cached_copy = self.process_cache.get('key')
+        cached_copy.remove_transformer_block_field(1, 'transformer', 'test_key')
+        self.assertIsNone(cached_copy.get_transformer_block_field(1, 'transformer', 'test_key'))
+        self.assertEquals(
+            self.process_cache.get('key').get_transformer_block_field(1, 'transformer', 'test_key'), 'value'
+        )
+
+    def test_get_not_found(self):
+        self.assertIsNone(self.process_cache.get('key'))
+
+    def test_evicts_least_recently_used(self):
+        self._add('first')
+        self._add('second')
+        self.process_cache.get('first')
+        self._add('third')
+
+        self.assertIsNotNone(self.process_cache.get('first'))
+        self.assertIsNone(self.process_cache.get('second'))
+        self.assertIsNotNone(self.process_cache.get('third'))
+
+    def test_too_large(self):
+        self._add('key', children_map=[[index + 1] for index in range(12)] + [[]])
+        self.assertIsNone(self.process_cache.get('key'))
+
+    def test_delete(self):
+        self._add('first', root_block_usage_key=0)
+        self._add('second', root_block_usage_key=0)
+        self._add('third', root_block_usage_key=1)
+        self.process_cache.delete(0)
+
+        self.assertIsNone(self.process_cache.get('first'))
+        self.assertIsNone(self.process_cache.get('second'))
+        self.assertIsNotNone(self.process_cache.get('third'))
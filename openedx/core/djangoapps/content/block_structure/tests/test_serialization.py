@@ -0,0 +1,109 @@
+"""
+Tests for serialization.py
+"""
+# pylint: disable=protected-access
+from unittest import TestCase
+
+import ddt
+from mock import patch
+from nose.plugins.attrib import attr
+from opaque_keys.edx.locator import BlockUsageLocator, CourseLocator
+
+from .. import serialization
+from ..block_structure import BlockStructureBlockData
+from .helpers import ChildrenMapTestMixin, MockTransformer, UsageKeyFactoryMixin
+
+
+@attr(shard=2)
+@ddt.ddt
+class TestSerialization(UsageKeyFactoryMixin, ChildrenMapTestMixin, TestCase):
+    """
+    Tests for serializing and deserializing block structures.
+    """
+    def _create_block_structure(self, children_map):
+        """
+        Returns a block structure for the given children_map, with
+        xBlock fields and transformer data set on each block.
+        """
+        block_structure = self.create_block_structure(children_map)
+        block_structure._add_transformer(MockTransformer)
+        block_structure.set_transformer_data(MockTransformer, 'course_data', {'key': 'value'})
+        for block_index in range(len(children_map)):
+            block_key = self.block_key_factory(block_index)
+            block_data = block_structure._get_or_create_block(block_key)
+            block_data.display_name = u'Block {}'.format(block_index)
+            block_data.children_count = len(children_map[block_index])
+            block_structure.set_transformer_block_field(block_key, MockTransformer, 'list_value', [block_index])
+        return block_structure
+
+    def _round_trip(self, block_structure):
+        """
+        Returns the given block structure, serialized and deserialized.
+        """
+        serialized_data = serialization.serialize(block_structure)
+        self.assertTrue(serialization.is_serialized_block_structure(serialized_data))
+        return serialization.deserialize(serialized_data, block_structure.root_block_usage_key)
+
+    @ddt.data(
+        ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP,
+        ChildrenMapTestMixin.LINEAR_CHILDREN_MAP,
+        ChildrenMapTestMixin.DAG_CHILDREN_MAP,
+    )
+    def test_round_trip(self, children_map):
+        block_structure = self._create_block_structure(children_map)
+        deserialized = self._round_trip(block_structure)
+
+        self.assert_block_structure(deserialized, children_map)
+        self.assertEqual(deserialized.get_transformer_data(MockTransformer, 'course_data'), {'key': 'value'})
+        self.assertEqual(deserialized._get_transformer_data_version(MockTransformer), MockTransformer.WRITE_VERSION)
+        for block_key in block_structure:
+            self.assertEqual(deserialized.get_children(block_key), block_structure.get_children(block_key))
+            self.assertEqual(deserialized.get_parents(block_key), block_structure.get_parents(block_key))
+            self.assertEqual(deserialized[block_key].fields, block_structure[block_key].fields)
+            self.assertEqual(deserialized[block_key].location, block_key)
+            self.assertEqual(
+                deserialized.get_transformer_block_data(block_key, MockTransformer).fields,
+                block_structure.get_transformer_block_data(block_key, MockTransformer).fields,
+            )
+
+    def test_keys_of_other_courses(self):
+        block_structure = self._create_block_structure(self.SIMPLE_CHILDREN_MAP)
+        other_key = BlockUsageLocator(CourseLocator('other', 'course', 'run'), 'html', 'other')
+        block_structure._add_relation(self.block_key_factory(2), other_key)
+        deserialized = self._round_trip(block_structure)
+        self.assertEqual(deserialized.get_children(self.block_key_factory(2)), [other_key])
+
+    def test_fields_are_read_lazily(self):
+        deserialized = self._round_trip(self._create_block_structure(self.SIMPLE_CHILDREN_MAP))
+        block_key = self.block_key_factory(1)
+
+        with patch.object(serialization.pickle, 'loads', wraps=serialization.pickle.loads) as mock_read:
+            self.assertEqual(deserialized.get_xblock_field(block_key, 'display_name'), u'Block 1')
+            self.assertEqual(deserialized.get_xblock_field(self.block_key_factory(3), 'display_name'), u'Block 3')
+            self.assertIsNone(deserialized.get_xblock_field(block_key, 'missing_field'))
+        # Only the display_name column was read, and only once.
+        self.assertEqual(mock_read.call_count, 1)
+
+    def test_copy_does_not_share_values(self):
+        deserialized = self._round_trip(self._create_block_structure(self.SIMPLE_CHILDREN_MAP))
+        block_key = self.block_key_factory(1)
+
+        copied = deserialized.copy()
+        copied.get_transformer_block_field(block_key, MockTransformer, 'list_value').append('copied')
+        copied.set_transformer_block_field(block_key, MockTransformer, 'new_value', True)
+
+        self.assertEqual(deserialized.get_transformer_block_field(block_key, MockTransformer, 'list_value'), [1])
+        self.assertIsNone(deserialized.get_transformer_block_field(block_key, MockTransformer, 'new_value'))
+        self.assertEqual(copied.get_transformer_block_field(block_key, MockTransformer, 'list_value'), [1, 'copied'])
+
+    def test_unsupported_version(self):
+        block_structure = self._create_block_structure(self.SIMPLE_CHILDREN_MAP)
+        with patch.object(serialization, 'FORMAT_VERSION', serialization.FORMAT_VERSION + 1):
+            serialized_data = serialization.serialize(block_structure)
+        with self.assertRaises(ValueError):
+            serialization.deserialize(serialized_data, block_structure.root_block_usage_key)
+
+    def test_pickled_data_is_not_binary_format(self):
+        self.assertFalse(serialization.is_serialized_block_structure(
+            serialization.pickle.dumps(BlockStructureBlockData(self.block_key_factory(0)))
+        ))
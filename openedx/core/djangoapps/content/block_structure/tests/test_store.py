@@ -2,13 +2,18 @@
 Tests for block_structure/cache.py
 """
 import ddt
+from mock import patch
 from nose.plugins.attrib import attr
 
 from openedx.core.djangolib.testing.utils import CacheIsolationTestCase
 
-from ..config import STORAGE_BACKING_FOR_CACHE, waffle
+from ..compact import CompactBlockStructure
+from ..config import (
+    BINARY_SERIALIZATION, COMPACT_REPRESENTATION, IN_PROCESS_CACHE, STORAGE_BACKING_FOR_CACHE, waffle
+)
 from ..config.models import BlockStructureConfiguration
 from ..exceptions import BlockStructureNotFound
+from ..process_cache import process_cache
 from ..store import BlockStructureStore
 from .helpers import ChildrenMapTestMixin, UsageKeyFactoryMixin, MockCache, MockTransformer
 
@@ -59,6 +64,51 @@ class TestBlockStructureStore(UsageKeyFactoryMixin, ChildrenMapTestMixin, CacheI
             self.assertIsNotNone(stored_value)
             self.assert_block_structure(stored_value, self.children_map)
 
+    @ddt.data(True, False)
+    def test_add_and_get_binary_serialization(self, with_storage_backing):
+        with waffle().override(STORAGE_BACKING_FOR_CACHE, active=with_storage_backing):
+            with waffle().override(BINARY_SERIALIZATION, active=True):
+                self.store.add(self.block_structure)
+            stored_value = self.store.get(self.block_structure.root_block_usage_key)
+            self.assert_block_structure(stored_value, self.children_map)
+            self.assertEqual(
+                stored_value.get_transformer_block_field(self.block_key_factory(0), MockTransformer, 'test'),
+                '{} val'.format(MockTransformer.name()),
+            )
+
+    @ddt.data(True, False)
+    def test_add_and_get_in_process(self, with_storage_backing):
+        self.addCleanup(process_cache.clear)
+        with waffle().override(STORAGE_BACKING_FOR_CACHE, active=with_storage_backing):
+            with waffle().override(IN_PROCESS_CACHE, active=True):
+                self.store.add(self.block_structure)
+                first_value = self.store.get(self.block_structure.root_block_usage_key)
+                first_value.remove_block(self.block_key_factory(1), keep_descendants=False)
+
+                with patch.object(self.store, '_deserialize') as mock_deserialize:
+                    with patch.object(self.mock_cache, 'get', wraps=self.mock_cache.get) as mock_cache_get:
+                        second_value = self.store.get(self.block_structure.root_block_usage_key)
+                self.assertFalse(mock_deserialize.called)
+                # With storage backing, the version of the structure is known
+                # without reading the cache.
+                self.assertEqual(mock_cache_get.called, not with_storage_backing)
+                self.assert_block_structure(second_value, self.children_map)
+
+                self.store.delete(self.block_structure.root_block_usage_key)
+                with self.assertRaises(BlockStructureNotFound):
+                    self.store.get(self.block_structure.root_block_usage_key)
+
+    def test_get_compact_in_process(self):
+        self.addCleanup(process_cache.clear)
+        with waffle().override(IN_PROCESS_CACHE, active=True):
+            with waffle().override(COMPACT_REPRESENTATION, active=True):
+                self.store.add(self.block_structure)
+                for _ in range(2):
+                    stored_value = self.store.get(self.block_structure.root_block_usage_key)
+                    self.assertIsInstance(stored_value, CompactBlockStructure)
+                    self.assert_block_structure(stored_value, self.children_map)
+                    stored_value.remove_block(self.block_key_factory(1), keep_descendants=False)
+
     @ddt.data(True, False)
     def test_delete(self, with_storage_backing):
         with waffle().override(STORAGE_BACKING_FOR_CACHE, active=with_storage_backing):
@@ -82,3 +82,17 @@ class TestBlockStructureTransformers(ChildrenMapTestMixin, TestCase):
                 self.transformers.verify_versions(block_structure)
             self.transformers.collect(block_structure)
             self.assertTrue(self.transformers.verify_versions(block_structure))
+
+    def test_transform_context_key(self):
+        self.add_mock_transformer()
+        self.assertIsNone(self.transformers.transform_context_key(block_structure=MagicMock()))
+
+        helpers_path = 'openedx.core.djangoapps.content.block_structure.tests.helpers.'
+        with patch(helpers_path + 'MockTransformer.transform_context_key', return_value='context'):
+            self.assertIsNone(self.transformers.transform_context_key(block_structure=MagicMock()))
+
+            with patch(helpers_path + 'MockFilteringTransformer.transform_context_key', return_value=()):
+                self.assertEqual(
+                    self.transformers.transform_context_key(block_structure=MagicMock()),
+                    (('MockFilteringTransformer', ()), ('MockTransformer', 'context')),
+                )
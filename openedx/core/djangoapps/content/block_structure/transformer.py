@@ -155,6 +155,32 @@ class BlockStructureTransformer(object):
         """
         raise NotImplementedError
 
+    def transform_context_key(self, usage_info, block_structure):  # pylint: disable=unused-argument
+        """
+        Returns a hashable value that identifies everything about the
+        given usage_info that the transformer's transform depends on,
+        for the given collected block_structure.
+
+        Transforms for two usage_infos with equal keys must produce the
+        same result, so that a structure transformed for one of them can
+        be shared with the other.  For example, a transformer that only
+        checks whether the user has staff access may return that
+        boolean.
+
+        The default implementation returns None, meaning that the
+        transform is specific to the given usage_info and that its
+        result can not be shared.
+
+        Arguments:
+            usage_info (any negotiated type) - A usage-specific object,
+                as passed to the transform method.
+
+            block_structure (BlockStructureBlockData) - The collected
+                block structure that is about to be transformed.  It
+                must not be modified.
+        """
+        return None
+
 
 class FilteringTransformerMixin(BlockStructureTransformer):
     """
@@ -118,6 +118,24 @@ class BlockStructureTransformers(object):
         # Prune the block structure to remove any unreachable blocks.
         block_structure._prune_unreachable()  # pylint: disable=protected-access
 
+    def transform_context_key(self, block_structure):
+        """
+        Returns a hashable value that identifies the result of
+        transforming the given collected block structure for the
+        collection's usage_info, combined from the transform_context_key
+        of each transformer in the collection.
+
+        Returns None if any of the transformers' transforms is specific
+        to the usage_info.
+        """
+        context_keys = []
+        for transformer in self._transformers['supports_filter'] + self._transformers['no_filter']:
+            context_key = transformer.transform_context_key(self.usage_info, block_structure)
+            if context_key is None:
+                return None
+            context_keys.append((transformer.name(), context_key))
+        return tuple(context_keys)
+
     def _transform_with_filters(self, block_structure):
         """
         Transforms the given block_structure using the transform_block_filters